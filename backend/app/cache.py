@@ -1,28 +1,411 @@
 """
 Redis Cache Utilities
+
+Values are stored with a one-byte header identifying the codec and the
+compression applied, so entries written by different releases can coexist.
+Entries without a header are legacy plain JSON and are still readable.
 """
 
 import json
 import logging
-from typing import Any, Optional
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional
 from redis import Redis
+from redis.exceptions import RedisError
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - optional dependency
+    lz4_frame = None
 
 from .config import get_settings
+from .invalidation import LocalCache, build_invalidation_message, evict_local, register_local_cache
+from .metrics import (
+    CACHE_CIRCUIT_STATE,
+    CACHE_ERRORS,
+    CACHE_LOOKUPS,
+    REDIS_COMMAND_DURATION,
+    cache_key_family,
+)
+from .timing import time_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# Initialize Redis client
+# Initialize Redis client with tight timeouts, so a slow or unreachable
+# Redis costs milliseconds per request instead of blocking it
 try:
-    redis_client = Redis.from_url(settings.redis_url, decode_responses=False)
+    redis_client = Redis.from_url(
+        settings.redis_url,
+        decode_responses=False,
+        socket_connect_timeout=settings.redis_connect_timeout,
+        socket_timeout=settings.redis_socket_timeout,
+        retry_on_timeout=False,
+    )
 except Exception as e:
     logger.error(f"Failed to connect to Redis: {e}")
     redis_client = None
 
 
+# Optional in-process L1 in front of Redis; kept coherent across processes
+# by the invalidation channel (see invalidation.py)
+response_cache = register_local_cache(LocalCache(
+    "responses",
+    max_entries=settings.l1_cache_max_entries,
+    ttl=settings.l1_cache_ttl,
+))
+
+_MISSING = object()
+
+
+# ============================================================================
+# Circuit Breaker
+# ============================================================================
+
+class CircuitOpenError(Exception):
+    """Raised when a cache call is skipped because the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker guarding Redis calls
+    
+    closed    - calls go through; outcomes are tracked over a sliding window
+    open      - calls are skipped until reset_timeout has elapsed
+    half_open - a single probe call is let through; success closes the
+                circuit, failure opens it again
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+    
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        min_calls: int = 10,
+        window_seconds: float = 10.0,
+        reset_timeout: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque()  # (timestamp, succeeded)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._set_state(self.CLOSED)
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+    
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        CACHE_CIRCUIT_STATE.set(self._STATE_VALUES[state])
+    
+    def allow_request(self) -> bool:
+        """Return True if a call may be attempted now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._set_state(self.HALF_OPEN)
+            # Half-open: allow exactly one probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+    
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                self._outcomes.clear()
+                self._set_state(self.CLOSED)
+                logger.info("Cache circuit closed; Redis calls resumed")
+                return
+            self._record(True)
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                self._open()
+                return
+            self._record(False)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if (
+                self._state == self.CLOSED
+                and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.failure_rate
+            ):
+                self._open()
+    
+    def release(self) -> None:
+        """End a call without recording an outcome, freeing the half-open probe slot"""
+        with self._lock:
+            self._probe_in_flight = False
+    
+    def reset(self) -> None:
+        """Force the circuit closed and forget recorded outcomes"""
+        with self._lock:
+            self._outcomes.clear()
+            self._probe_in_flight = False
+            self._set_state(self.CLOSED)
+    
+    def _record(self, succeeded: bool) -> None:
+        now = self._clock()
+        self._outcomes.append((now, succeeded))
+        cutoff = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+    
+    def _open(self) -> None:
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self._set_state(self.OPEN)
+        logger.warning(f"Cache circuit opened; skipping Redis for {self.reset_timeout}s")
+
+
+circuit_breaker = CircuitBreaker(
+    failure_rate=settings.cache_breaker_failure_rate,
+    min_calls=settings.cache_breaker_min_calls,
+    window_seconds=settings.cache_breaker_window,
+    reset_timeout=settings.cache_breaker_reset_timeout,
+)
+
+
+def _execute(command: str, *args) -> Any:
+    """
+    Run a Redis command through the circuit breaker
+    
+    Raises:
+        CircuitOpenError: If the circuit is open and the call was skipped
+        RedisError: If the command failed (recorded as a breaker failure)
+        Exception: Anything else the client raised (not recorded)
+    """
+    if not circuit_breaker.allow_request():
+        raise CircuitOpenError(command)
+    
+    start = time.perf_counter()
+    try:
+        result = getattr(redis_client, command)(*args)
+    except RedisError:
+        circuit_breaker.record_failure()
+        raise
+    except Exception:
+        # Not a Redis health problem (e.g. a bad argument): no outcome either way
+        circuit_breaker.release()
+        raise
+    REDIS_COMMAND_DURATION.labels(command).observe(time.perf_counter() - start)
+    circuit_breaker.record_success()
+    return result
+
+
+# ============================================================================
+# Codecs
+# ============================================================================
+
+# Header byte layout: 1ccc cddd
+#   bit 7    - always set; legacy JSON entries never start with a byte >= 0x80
+#   bits 3-6 - compression id
+#   bits 0-2 - codec id
+HEADER_FLAG = 0x80
+
+CODEC_JSON = 0
+CODEC_ORJSON = 1
+CODEC_MSGPACK = 2
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_LZ4 = 2
+
+CODEC_NAMES = {"json": CODEC_JSON, "orjson": CODEC_ORJSON, "msgpack": CODEC_MSGPACK}
+COMPRESSION_NAMES = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "lz4": COMPRESSION_LZ4}
+
+# msgpack extension types
+_EXT_DECIMAL = 1
+_EXT_DATETIME = 2
+
+
+class CacheCodecError(Exception):
+    """Raised when a cached value cannot be decoded"""
+
+
+def _json_default(obj: Any) -> Any:
+    """Fallback serializer for types the JSON codecs do not support"""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return str(obj)
+
+
+def _msgpack_default(obj: Any) -> Any:
+    """Encode Decimals and datetimes as extension types so they round-trip"""
+    if isinstance(obj, Decimal):
+        return msgpack.ExtType(_EXT_DECIMAL, str(obj).encode("ascii"))
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode("ascii"))
+    if isinstance(obj, date):
+        return obj.isoformat()
+    return str(obj)
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _EXT_DECIMAL:
+        return Decimal(data.decode("ascii"))
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode("ascii"))
+    return msgpack.ExtType(code, data)
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+
+
+# codec id -> (dumps, loads); only codecs whose library is installed are registered
+CODECS = {CODEC_JSON: (_json_dumps, json.loads)}
+if orjson is not None:
+    CODECS[CODEC_ORJSON] = (_orjson_dumps, orjson.loads)
+if msgpack is not None:
+    CODECS[CODEC_MSGPACK] = (_msgpack_dumps, _msgpack_loads)
+
+# compression id -> (compress, decompress)
+COMPRESSORS = {COMPRESSION_ZLIB: (lambda data: zlib.compress(data, 6), zlib.decompress)}
+if lz4_frame is not None:
+    COMPRESSORS[COMPRESSION_LZ4] = (lz4_frame.compress, lz4_frame.decompress)
+
+
+def _resolve_codec(name: Optional[str]) -> int:
+    """Map a codec name to an id, falling back to stdlib JSON if unavailable"""
+    codec = CODEC_NAMES.get((name or settings.cache_codec).lower(), CODEC_JSON)
+    return codec if codec in CODECS else CODEC_JSON
+
+
+def _resolve_compression(name: Optional[str]) -> int:
+    """Map a compression name to an id, falling back to zlib if unavailable"""
+    compression = COMPRESSION_NAMES.get((name or settings.cache_compression).lower(), COMPRESSION_NONE)
+    if compression != COMPRESSION_NONE and compression not in COMPRESSORS:
+        return COMPRESSION_ZLIB
+    return compression
+
+
+def encode_value(
+    value: Any,
+    codec: Optional[str] = None,
+    compression: Optional[str] = None,
+    compress_threshold: Optional[int] = None,
+) -> bytes:
+    """
+    Serialize a value for storage in Redis
+    
+    Args:
+        value: Value to serialize
+        codec: Codec name (json, orjson, msgpack); defaults to settings.cache_codec
+        compression: Compression name (none, zlib, lz4); defaults to settings.cache_compression
+        compress_threshold: Minimum payload size in bytes before compression is applied
+        
+    Returns:
+        Header byte followed by the (optionally compressed) payload
+    """
+    codec_id = _resolve_codec(codec)
+    compression_id = _resolve_compression(compression)
+    if compress_threshold is None:
+        compress_threshold = settings.cache_compress_threshold
+    
+    dumps, _ = CODECS[codec_id]
+    payload = dumps(value)
+    
+    if compression_id != COMPRESSION_NONE and len(payload) >= compress_threshold:
+        compress, _ = COMPRESSORS[compression_id]
+        payload = compress(payload)
+    else:
+        compression_id = COMPRESSION_NONE
+    
+    header = HEADER_FLAG | (compression_id << 3) | codec_id
+    return bytes((header,)) + payload
+
+
+def decode_value(data: bytes) -> Any:
+    """
+    Deserialize a value read from Redis
+    
+    Args:
+        data: Raw bytes as stored by encode_value, or legacy plain JSON
+        
+    Returns:
+        Deserialized value
+        
+    Raises:
+        CacheCodecError: If the header names a codec or compression that is not available
+    """
+    if not data:
+        raise CacheCodecError("Empty cache payload")
+    
+    header = data[0]
+    if not header & HEADER_FLAG:
+        # Legacy entry written before the codec header existed
+        return json.loads(data)
+    
+    codec_id = header & 0x07
+    compression_id = (header >> 3) & 0x0F
+    payload = data[1:]
+    
+    if compression_id != COMPRESSION_NONE:
+        if compression_id not in COMPRESSORS:
+            raise CacheCodecError(f"Unsupported cache compression id {compression_id}")
+        _, decompress = COMPRESSORS[compression_id]
+        payload = decompress(payload)
+    
+    if codec_id not in CODECS:
+        raise CacheCodecError(f"Unsupported cache codec id {codec_id}")
+    _, loads = CODECS[codec_id]
+    return loads(payload)
+
+
+@time_cache
 def get_cache(key: str) -> Optional[Any]:
     """
-    Retrieve value from Redis cache
+    Retrieve value from the L1 cache or Redis
     
     Args:
         key: Cache key
@@ -30,47 +413,96 @@ def get_cache(key: str) -> Optional[Any]:
     Returns:
         Deserialized value or None if not found
     """
+    family = cache_key_family(key)
+    
+    if settings.l1_cache_enabled:
+        value = response_cache.get(key, _MISSING)
+        if value is not _MISSING:
+            CACHE_LOOKUPS.labels(family, "local_hit").inc()
+            return value
+    
     if not redis_client:
         return None
     
     try:
-        data = redis_client.get(key)
+        data = _execute("get", key)
         if data:
-            return json.loads(data)
+            value = decode_value(data)
+            CACHE_LOOKUPS.labels(family, "hit").inc()
+            if settings.l1_cache_enabled:
+                response_cache.set(key, value)
+            return value
+        CACHE_LOOKUPS.labels(family, "miss").inc()
+    except CircuitOpenError:
+        CACHE_LOOKUPS.labels(family, "bypass").inc()
     except Exception as e:
+        CACHE_LOOKUPS.labels(family, "error").inc()
+        CACHE_ERRORS.labels(family, "get").inc()
         logger.error(f"Cache get error for key {key}: {e}")
     
     return None
 
 
+@time_cache
 def set_cache(key: str, value: Any, ttl: int = None) -> bool:
     """
-    Store value in Redis cache
+    Store value in Redis cache (and the L1 cache when enabled)
     
     Args:
         key: Cache key
-        value: Value to cache (will be JSON serialized)
+        value: Value to cache (serialized with the configured codec)
         ttl: Time to live in seconds (defaults to settings.cache_ttl)
         
     Returns:
         True if successful, False otherwise
     """
+    ttl = ttl or settings.cache_ttl
+    if settings.l1_cache_enabled:
+        response_cache.set(key, value, ttl=min(ttl, settings.l1_cache_ttl))
+    
     if not redis_client:
         return False
     
     try:
-        serialized = json.dumps(value, default=str)
-        ttl = ttl or settings.cache_ttl
-        redis_client.setex(key, ttl, serialized)
+        serialized = encode_value(value)
+        _execute("setex", key, ttl, serialized)
         return True
+    except CircuitOpenError:
+        return False
     except Exception as e:
+        CACHE_ERRORS.labels(cache_key_family(key), "set").inc()
         logger.error(f"Cache set error for key {key}: {e}")
         return False
 
 
+def publish_invalidation(patterns: List[str]) -> bool:
+    """
+    Evict matching L1 entries here and in every other API process
+    
+    Args:
+        patterns: Key patterns in Redis glob syntax
+        
+    Returns:
+        True if the event was published, False otherwise
+    """
+    evict_local(patterns)
+    
+    if not redis_client:
+        return False
+    
+    try:
+        _execute("publish", settings.invalidation_channel, build_invalidation_message(patterns))
+        return True
+    except CircuitOpenError:
+        return False
+    except Exception as e:
+        logger.error(f"Cache invalidation publish error for {patterns}: {e}")
+        return False
+
+
 def delete_cache(key: str) -> bool:
     """
-    Delete key from Redis cache
+    Delete key from Redis cache and every process's L1 cache
     
     Args:
         key: Cache key to delete
@@ -79,19 +511,25 @@ def delete_cache(key: str) -> bool:
         True if deleted, False otherwise
     """
     if not redis_client:
+        evict_local([key])
         return False
     
     try:
-        redis_client.delete(key)
+        _execute("delete", key)
         return True
+    except CircuitOpenError:
+        return False
     except Exception as e:
+        CACHE_ERRORS.labels(cache_key_family(key), "delete").inc()
         logger.error(f"Cache delete error for key {key}: {e}")
         return False
+    finally:
+        publish_invalidation([key])
 
 
 def clear_cache_pattern(pattern: str) -> int:
     """
-    Clear all keys matching a pattern
+    Clear all keys matching a pattern from Redis and every process's L1 cache
     
     Args:
         pattern: Redis key pattern (e.g., "district:*")
@@ -100,14 +538,88 @@ def clear_cache_pattern(pattern: str) -> int:
         Number of keys deleted
     """
     if not redis_client:
+        evict_local([pattern])
         return 0
     
     try:
-        keys = redis_client.keys(pattern)
+        keys = _execute("keys", pattern)
         if keys:
-            return redis_client.delete(*keys)
+            return _execute("delete", *keys)
+        return 0
+    except CircuitOpenError:
         return 0
     except Exception as e:
+        CACHE_ERRORS.labels(cache_key_family(pattern), "clear").inc()
         logger.error(f"Cache clear pattern error for {pattern}: {e}")
         return 0
+    finally:
+        publish_invalidation([pattern])
+
+
+# ============================================================================
+# District Popularity
+# ============================================================================
+
+class ViewCounter:
+    """
+    Counts dashboard views per district for the ingestion scheduler
+    
+    Views are tallied in process and added to a Redis sorted set at most
+    once per flush interval, so recording a view costs no Redis round trip.
+    Counts that fail to flush are dropped; popularity is only a hint.
+    
+    Args:
+        key: Sorted set holding district_code -> views
+        flush_interval: Seconds between flushes
+        clock: Monotonic clock (tests)
+    """
+    
+    def __init__(self, key: str, flush_interval: float, clock: Callable[[], float] = time.monotonic):
+        self.key = key
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._last_flush = clock()
+    
+    def record(self, district_code: str) -> None:
+        """Count one view, flushing if the interval has passed"""
+        with self._lock:
+            self._counts[district_code] += 1
+            if self._clock() - self._last_flush < self.flush_interval:
+                return
+        self.flush()
+    
+    def flush(self) -> int:
+        """
+        Add the pending counts to Redis
+        
+        Returns:
+            Number of districts flushed
+        """
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._last_flush = self._clock()
+        if not counts or not redis_client or not circuit_breaker.allow_request():
+            return 0
+        
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for district_code, views in counts.items():
+                pipe.zincrby(self.key, views, district_code)
+            pipe.execute()
+        except RedisError as e:
+            circuit_breaker.record_failure()
+            logger.warning(f"District view flush failed: {e}")
+            return 0
+        circuit_breaker.record_success()
+        return len(counts)
+
+
+district_views = ViewCounter(settings.popularity_key, settings.popularity_flush_interval)
+
 
+def record_district_view(district_code: str) -> None:
+    """Count a dashboard view of a district (no-op when tracking is disabled)"""
+    if settings.popularity_tracking_enabled:
+        district_views.record(district_code)
@@ -2,23 +2,179 @@
 Database Configuration and Session Management
 """
 
-from sqlalchemy import create_engine
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, DisconnectionError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.pool import QueuePool
+from typing import Callable, Generator, List, Optional
+from fastapi import Request, Response
 
 from .config import get_settings
+from .metrics import (
+    DB_POOL_CHECKOUT_TIMEOUTS,
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_IDLE,
+    DB_POOL_IN_USE,
+    DB_POOL_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_POOL_STALE_PINGS,
+)
+from .timing import instrument_sql
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Methods that never write and may be served by a replica
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Cookie that pins a client to the primary for a short time after it wrote
+PRIMARY_STICKY_COOKIE = "db_primary"
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+    
+    metrics_label = "primary"
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(self.metrics_label).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.metrics_label).observe(time.perf_counter() - start)
+    
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep its metrics label
+        pool = super().recreate()
+        pool.metrics_label = self.metrics_label
+        return pool
+
+
+class StalenessCheck:
+    """
+    Checkout-time liveness check for connections that sat idle too long
+    
+    pool_pre_ping costs a round trip on every checkout. Connections that
+    were returned to the pool moments ago are almost certainly alive, so
+    only those idle for at least ``stale_after`` seconds are pinged. A
+    failed ping raises DisconnectionError, which makes the pool discard the
+    connection and open a new one.
+    """
+    
+    def __init__(self, label: str, stale_after: float, clock: Callable[[], float] = time.monotonic):
+        self.label = label
+        self.stale_after = stale_after
+        self._clock = clock
+    
+    def attach(self, target: Engine) -> None:
+        """Register the pool listeners on an engine"""
+        event.listen(target, "connect", self.on_connect)
+        event.listen(target, "checkin", self.on_checkin)
+        event.listen(target, "checkout", self.on_checkout)
+    
+    def on_connect(self, dbapi_connection, connection_record):
+        connection_record.info["last_used"] = self._clock()
+    
+    def on_checkin(self, dbapi_connection, connection_record):
+        connection_record.info["last_used"] = self._clock()
+    
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        idle = self._clock() - connection_record.info.get("last_used", 0.0)
+        if idle < self.stale_after:
+            return
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except Exception as e:
+            DB_POOL_STALE_PINGS.labels(self.label, "failed").inc()
+            logger.warning(f"Discarding stale {self.label} connection idle {idle:.0f}s: {e}")
+            raise DisconnectionError() from e
+        DB_POOL_STALE_PINGS.labels(self.label, "ok").inc()
+        connection_record.info["last_used"] = self._clock()
+
+
+def create_pooled_engine(url: str, label: str = "primary") -> Engine:
+    """
+    Create an engine on an instrumented connection pool
+    
+    Args:
+        url: Database URL
+        label: Pool name used in the pool metrics
+    
+    Returns:
+        SQLAlchemy engine
+    """
+    pooled_engine = create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        echo=False,  # Set to True for SQL query logging
+    )
+    pooled_engine.pool.metrics_label = label
+    StalenessCheck(label, settings.db_pool_stale_after).attach(pooled_engine)
+    
+    # Sampled at scrape time, so there is no per-request cost. The lambdas
+    # follow engine.pool, which dispose() replaces.
+    DB_POOL_SIZE.labels(label).set_function(lambda: pooled_engine.pool.size())
+    DB_POOL_IN_USE.labels(label).set_function(lambda: pooled_engine.pool.checkedout())
+    DB_POOL_IDLE.labels(label).set_function(lambda: pooled_engine.pool.checkedin())
+    DB_POOL_OVERFLOW.labels(label).set_function(lambda: max(0, pooled_engine.pool.overflow()))
+    return pooled_engine
+
+
+def prewarm_pool(target: Engine, connections: Optional[int] = None) -> int:
+    """
+    Open pool connections concurrently so first requests skip connection setup
+    
+    All connections are checked out at once (forcing the pool to open that
+    many), then returned to the pool together.
+    
+    Args:
+        target: Engine whose pool is warmed
+        connections: Number to open (defaults to the pool size)
+    
+    Returns:
+        Number of connections opened successfully
+    """
+    count = connections if connections is not None else target.pool.size()
+    if count <= 0:
+        return 0
+    
+    def checkout(_):
+        try:
+            return target.pool.connect()
+        except Exception as e:
+            logger.warning(f"Pool pre-warm connection failed: {e}")
+            return None
+    
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        opened = [conn for conn in executor.map(checkout, range(count)) if conn is not None]
+    for conn in opened:
+        conn.close()
+    return len(opened)
+
+
+# Count and time every statement (primary, replicas and test engines alike)
+instrument_sql(Engine)
 
 # Create SQLAlchemy engine with connection pooling
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_size=10,
-    max_overflow=20,
-    echo=False,  # Set to True for SQL query logging
-)
+engine = create_pooled_engine(settings.database_url)
 
 # Create SessionLocal factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -27,14 +183,184 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
-def get_db() -> Generator[Session, None, None]:
+@dataclass
+class Replica:
+    """A read replica with its session factory and last known health"""
+    
+    name: str
+    engine: Engine
+    session_factory: sessionmaker
+    healthy: bool = True
+    checked_at: float = 0.0
+
+
+class ReplicaRouter:
     """
-    Database dependency for FastAPI routes
-    Yields a database session, closes it after request
+    Round-robin selection over read replicas
+    
+    Each replica is probed with ``SELECT 1`` at most once per health check
+    interval, on the request that selects it. Replicas that fail a probe or
+    raise a connection error while serving a request are skipped until the
+    next probe; when none are healthy the caller falls back to the primary.
     """
-    db = SessionLocal()
+    
+    def __init__(
+        self,
+        urls: List[str],
+        health_check_interval: float = 5.0,
+        engine_factory: Callable[[str, str], Engine] = create_pooled_engine,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.health_check_interval = health_check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self.replicas: List[Replica] = []
+        for index, url in enumerate(urls):
+            name = f"replica{index}"
+            replica_engine = engine_factory(url, name)
+            self.replicas.append(Replica(
+                name=name,
+                engine=replica_engine,
+                session_factory=sessionmaker(autocommit=False, autoflush=False, bind=replica_engine),
+            ))
+    
+    def _check(self, replica: Replica) -> bool:
+        """Probe a replica if its last check is older than the interval"""
+        now = self._clock()
+        with self._lock:
+            if now - replica.checked_at < self.health_check_interval:
+                return replica.healthy
+            # Claim the probe so concurrent requests don't all hit a dead host
+            replica.checked_at = now
+        
+        try:
+            with replica.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            healthy = True
+        except DBAPIError as e:
+            logger.warning(f"Read replica {replica.name} failed health check: {e}")
+            healthy = False
+        
+        replica.healthy = healthy
+        return healthy
+    
+    def choose(self) -> Optional[Replica]:
+        """
+        Pick the next healthy replica in round-robin order
+        
+        Returns:
+            Replica, or None if no replica is configured or healthy
+        """
+        if not self.replicas:
+            return None
+        
+        start = next(self._counter)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if self._check(replica):
+                return replica
+        return None
+    
+    def mark_unhealthy(self, replica: Replica) -> None:
+        """Take a replica out of rotation until its next health check"""
+        replica.healthy = False
+        replica.checked_at = self._clock()
+    
+    def prewarm(self) -> int:
+        """Pre-warm every replica pool; returns connections opened"""
+        return sum(prewarm_pool(replica.engine) for replica in self.replicas)
+    
+    def dispose(self) -> None:
+        """Close all replica connection pools"""
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+
+replica_router = ReplicaRouter(
+    settings.database_replica_urls,
+    health_check_interval=settings.replica_health_check_interval,
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_session_wrote(session: Session, flush_context) -> None:
+    """Remember that a session wrote so read-your-writes can pin the client"""
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _pin_client_to_primary(session: Session) -> None:
+    """Set the stickiness cookie once a write has been committed"""
+    response = session.info.get("response")
+    if response is None or not session.info.pop("wrote", False):
+        return
+    window = settings.read_your_writes_seconds
+    response.set_cookie(
+        PRIMARY_STICKY_COOKIE,
+        str(int(time.time() + window)),
+        max_age=int(window) or 1,
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def _pinned_to_primary(request: Request) -> bool:
+    """Whether the client wrote recently enough to need the primary"""
+    pinned_until = request.cookies.get(PRIMARY_STICKY_COOKIE)
+    if not pinned_until:
+        return False
+    try:
+        return float(pinned_until) > time.time()
+    except ValueError:
+        return False
+
+
+def _session_scope(
+    request: Optional[Request],
+    response: Optional[Response],
+    use_replica: bool,
+    router: ReplicaRouter,
+) -> Generator[Session, None, None]:
+    """Yield a replica or primary session and close it afterwards"""
+    replica = None
+    if use_replica and not (request is not None and _pinned_to_primary(request)):
+        replica = router.choose()
+    
+    if replica is not None:
+        db = replica.session_factory()
+    else:
+        db = SessionLocal()
+        if response is not None and settings.read_your_writes_seconds > 0:
+            db.info["response"] = response
+    
     try:
         yield db
+    except DBAPIError as e:
+        if replica is not None and e.connection_invalidated:
+            router.mark_unhealthy(replica)
+        raise
     finally:
         db.close()
 
+
+def get_db(request: Request = None, response: Response = None) -> Generator[Session, None, None]:
+    """
+    Database dependency for FastAPI routes
+    Yields a database session, closes it after request
+    
+    GET requests are served by a read replica when one is configured and
+    healthy; everything else, and clients that wrote within the last
+    ``read_your_writes_seconds``, use the primary.
+    """
+    use_replica = request is not None and request.method in READ_METHODS
+    yield from _session_scope(request, response, use_replica, replica_router)
+
+
+def get_read_db(request: Request = None, response: Response = None) -> Generator[Session, None, None]:
+    """
+    Database dependency for read-only routes that are not GETs
+    
+    Same as get_db, but prefers a replica regardless of the HTTP method.
+    """
+    yield from _session_scope(request, response, True, replica_router)
@@ -0,0 +1,250 @@
+"""
+Cross-process Cache Invalidation
+
+In-process (L1) caches register here. Writers publish invalidation events
+on a Redis channel, and every API process runs a background listener that
+evicts matching local entries, so local caches can use long TTLs without
+serving stale data after ingestion.
+
+Message format (JSON):
+    {"patterns": ["district:snapshot:UP-LUC", "district:trend:UP-LUC:*"],
+     "origin": "host:pid"}
+
+Patterns use Redis glob syntax (*, ?, [...]).
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Iterable, List, Optional
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from .config import get_settings
+from .metrics import CACHE_INVALIDATIONS_RECEIVED
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Identifies this process in published messages
+INVALIDATION_ORIGIN = f"{socket.gethostname()}:{os.getpid()}"
+
+_MISSING = object()
+_GLOB_CHARS = ("*", "?", "[")
+
+
+# ============================================================================
+# Local Caches
+# ============================================================================
+
+class LocalCache:
+    """
+    Thread-safe in-process LRU cache with per-entry TTL
+    
+    Entries are evicted by TTL, by LRU when max_entries is reached, or by
+    invalidation patterns received from other processes.
+    """
+    
+    def __init__(self, name: str, max_entries: int = 1024, ttl: float = 300.0):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def evict(self, pattern: str) -> int:
+        """
+        Remove entries matching a glob pattern
+        
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            if not any(char in pattern for char in _GLOB_CHARS):
+                return 1 if self._entries.pop(pattern, _MISSING) is not _MISSING else 0
+            matched = [key for key in self._entries if fnmatchcase(key, pattern)]
+            for key in matched:
+                del self._entries[key]
+            return len(matched)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_local_caches: List[LocalCache] = []
+_callbacks: List[Callable[[List[str]], None]] = []
+
+
+def register_local_cache(cache: LocalCache) -> LocalCache:
+    """Register a local cache so it is evicted by invalidation events"""
+    _local_caches.append(cache)
+    return cache
+
+
+def add_invalidation_callback(callback: Callable[[List[str]], None]) -> None:
+    """Call callback(patterns) for every invalidation event (for non-dict caches)"""
+    _callbacks.append(callback)
+
+
+def evict_local(patterns: Iterable[str]) -> int:
+    """
+    Apply invalidation patterns to every registered local cache in this process
+    
+    Returns:
+        Number of entries removed
+    """
+    patterns = list(patterns)
+    removed = 0
+    for cache in _local_caches:
+        for pattern in patterns:
+            removed += cache.evict(pattern)
+    for callback in _callbacks:
+        try:
+            callback(patterns)
+        except Exception as e:
+            logger.error(f"Invalidation callback error: {e}")
+    return removed
+
+
+def build_invalidation_message(patterns: Iterable[str]) -> str:
+    """Serialize an invalidation event for publishing"""
+    return json.dumps({"patterns": list(patterns), "origin": INVALIDATION_ORIGIN})
+
+
+def parse_invalidation_message(data: Any) -> List[str]:
+    """
+    Extract patterns from a published invalidation event
+    
+    Returns:
+        List of patterns (empty if the message is malformed)
+    """
+    try:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        patterns = json.loads(data).get("patterns", [])
+        return [str(pattern) for pattern in patterns]
+    except (ValueError, AttributeError) as e:
+        logger.error(f"Malformed invalidation message: {e}")
+        return []
+
+
+# ============================================================================
+# Subscriber
+# ============================================================================
+
+class InvalidationListener:
+    """
+    Background thread subscribed to the invalidation channel
+    
+    Reconnects with exponential backoff. Events published while the
+    subscription was down are lost, so every (re)subscribe flushes all
+    local caches.
+    """
+    
+    def __init__(
+        self,
+        redis_url: str,
+        channel: str,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        poll_timeout: float = 1.0,
+        client_factory: Optional[Callable[[], Redis]] = None,
+    ):
+        self.redis_url = redis_url
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.poll_timeout = poll_timeout
+        self.client_factory = client_factory or self._default_client
+        self.subscribed = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self.subscribed.clear()
+    
+    def _default_client(self) -> Redis:
+        return Redis.from_url(
+            self.redis_url,
+            socket_connect_timeout=settings.redis_connect_timeout,
+            health_check_interval=30,
+        )
+    
+    def _run(self) -> None:
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            client = None
+            pubsub = None
+            try:
+                client = self.client_factory()
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                
+                evict_local(["*"])
+                self.subscribed.set()
+                delay = self.reconnect_delay
+                logger.info(f"Subscribed to cache invalidation channel '{self.channel}'")
+                
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=self.poll_timeout)
+                    if message and message.get("type") == "message":
+                        patterns = parse_invalidation_message(message["data"])
+                        if patterns:
+                            CACHE_INVALIDATIONS_RECEIVED.inc()
+                            evict_local(patterns)
+            except (RedisError, OSError) as e:
+                self.subscribed.clear()
+                logger.warning(f"Cache invalidation subscriber disconnected: {e}; retrying in {delay:.0f}s")
+                self._stop.wait(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+                if client is not None:
+                    client.close()
+
+
+listener = InvalidationListener(settings.redis_url, settings.invalidation_channel)
@@ -3,17 +3,21 @@ FastAPI Main Application
 Our Voice, Our Rights - MGNREGA Transparency Dashboard
 """
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import logging
+import time
 
 from .config import get_settings
-from .database import engine, Base
+from .database import engine, prewarm_pool, replica_router
+from .invalidation import listener as invalidation_listener
+from .metrics import MetricsMiddleware, render_metrics
+from .registry import load_registry
+from .timing import ServerTimingMiddleware
 from .routers import districts, geolocate
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 # Get settings
 settings = get_settings()
 
@@ -24,13 +28,84 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+async def _run_startup_step(name: str, func, timeout: float):
+    """
+    Run a blocking startup step in a thread, giving up after timeout
+    
+    A slow database delays boot by at most the timeout; the step keeps
+    running in its thread and lazy initialization covers the gap.
+    """
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    result = await asyncio.wait_for(loop.run_in_executor(None, func), timeout=timeout)
+    logger.info(f"Startup step '{name}' took {(time.perf_counter() - start) * 1000:.1f} ms")
+    return result
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application startup and shutdown
+    
+    Nothing touches the database or Redis at import time. Schema creation
+    is a separate command (python -m app.migrate); here the app optionally
+    checks the schema version and preloads in-memory state, each bounded
+    by startup_timeout. Connections are otherwise opened lazily.
+    """
+    logger.info("Starting MGNREGA Dashboard API...")
+    logger.info(f"Environment: {settings.environment}")
+    logger.info(f"Debug mode: {settings.debug}")
+    
+    if settings.invalidation_listener_enabled:
+        invalidation_listener.start()
+    
+    if settings.schema_check != "off":
+        from .migrate import SchemaVersionError, check_schema_version
+        try:
+            current, _ = await _run_startup_step("schema check", check_schema_version, settings.startup_timeout)
+            logger.info(f"Schema version {current}")
+        except (SchemaVersionError, asyncio.TimeoutError) as e:
+            if settings.schema_check == "strict":
+                raise
+            logger.warning(f"Schema check failed: {e or 'timed out'}")
+    
+    if settings.db_pool_prewarm:
+        # Pay TCP and auth setup now rather than on the first requests
+        try:
+            opened = await _run_startup_step(
+                "pool pre-warm", lambda: prewarm_pool(engine) + replica_router.prewarm(), settings.startup_timeout
+            )
+            logger.info(f"Pre-warmed {opened} database connections")
+        except asyncio.TimeoutError:
+            logger.warning("Pool pre-warm timed out; remaining connections open on demand")
+    
+    if settings.district_registry_preload:
+        # Load districts before serving so requests skip the code lookup
+        try:
+            await _run_startup_step("district registry", load_registry, settings.startup_timeout)
+        except Exception as e:
+            logger.warning(f"District registry not preloaded, loading on first request: {e or 'timed out'}")
+    
+    if settings.cache_warm_on_startup:
+        # Warm in the background so the worker starts serving immediately
+        from .warmup import warm_cache
+        asyncio.get_running_loop().run_in_executor(None, warm_cache)
+    
+    yield
+    
+    logger.info("Shutting down MGNREGA Dashboard API...")
+    invalidation_listener.stop()
+    replica_router.dispose()
+
 # Create FastAPI app
 app = FastAPI(
     title="Our Voice, Our Rights - MGNREGA Dashboard API",
     description="Digital India Initiative - MGNREGA Transparency Dashboard API",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -44,6 +119,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Split each response's time into db, cache and serialize
+if settings.server_timing_enabled:
+    app.add_middleware(ServerTimingMiddleware)
+
+# Record per-route latency (outermost, so CORS handling is included)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(districts.router, prefix="/api/v1")
 app.include_router(geolocate.router, prefix="/api/v1")
@@ -65,16 +148,8 @@ async def health_check():
     return {"status": "ok"}
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Application startup event"""
-    logger.info("Starting MGNREGA Dashboard API...")
-    logger.info(f"Environment: {settings.environment}")
-    logger.info(f"Debug mode: {settings.debug}")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Application shutdown event"""
-    logger.info("Shutting down MGNREGA Dashboard API...")
-
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics endpoint"""
+    payload, content_type = render_metrics()
+    return Response(content=payload, headers={"Content-Type": content_type})
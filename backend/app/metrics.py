@@ -0,0 +1,184 @@
+"""
+Prometheus Metrics
+Request latency, cache and database pool telemetry exposed at /metrics
+"""
+
+import os
+import time
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# Cache key prefixes reported as separate label values; anything else is "other"
+CACHE_KEY_FAMILIES = ("districts:state", "district:snapshot", "district:trend", "states")
+
+# Latency buckets tuned for a cached API (sub-millisecond to a few seconds)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+# ============================================================================
+# Metric Definitions
+# ============================================================================
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status_code"],
+    buckets=LATENCY_BUCKETS,
+)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups by key family and result (local_hit, hit, miss, error, bypass)",
+    ["family", "result"],
+)
+
+CACHE_ERRORS = Counter(
+    "cache_errors_total",
+    "Cache operation errors by key family and operation",
+    ["family", "operation"],
+)
+
+CACHE_INVALIDATIONS_RECEIVED = Counter(
+    "cache_invalidations_received_total",
+    "Invalidation events received from the Redis invalidation channel",
+)
+
+CACHE_CIRCUIT_STATE = Gauge(
+    "cache_circuit_state",
+    "Redis circuit breaker state (0 closed, 1 half-open, 2 open)",
+    multiprocess_mode="max",
+)
+
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds",
+    "Latency of Redis commands issued by the cache layer",
+    ["command"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the SQLAlchemy pool",
+    ["pool"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Connections currently checked out of the SQLAlchemy pool",
+    ["pool"],
+)
+
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured number of persistent connections in the SQLAlchemy pool",
+    ["pool"],
+)
+
+DB_POOL_IDLE = Gauge(
+    "db_pool_connections_idle",
+    "Open connections waiting in the SQLAlchemy pool",
+    ["pool"],
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections opened beyond pool_size (bounded by max_overflow)",
+    ["pool"],
+)
+
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up waiting for a free connection",
+    ["pool"],
+)
+
+DB_POOL_STALE_PINGS = Counter(
+    "db_pool_stale_pings_total",
+    "Liveness pings of connections idle longer than the staleness limit, by result",
+    ["pool", "result"],
+)
+
+
+def cache_key_family(key: str) -> str:
+    """
+    Map a cache key to its family label
+    
+    Args:
+        key: Cache key (e.g. "district:trend:UP-LUC:6")
+        
+    Returns:
+        Family prefix (e.g. "district:trend") or "other"
+    """
+    for family in CACHE_KEY_FAMILIES:
+        if key == family or key.startswith(family + ":"):
+            return family
+    return "other"
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render all metrics in Prometheus text format
+    
+    When PROMETHEUS_MULTIPROC_DIR is set (several uvicorn workers), samples
+    from every worker process are aggregated.
+    
+    Returns:
+        Tuple of (payload, content type)
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+# ============================================================================
+# ASGI Middleware
+# ============================================================================
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route request latency
+    
+    Labels use the matched route template (e.g. /api/v1/districts/{district_code}/snapshot)
+    rather than the raw path, so label cardinality stays bounded.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.labels(
+                method=scope["method"],
+                route=route_path,
+                status_code=str(status_code),
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,179 @@
+"""
+Schema Migration Command
+
+Schema changes run here, before the API starts, instead of at import time
+in every worker.
+
+Usage:
+    python -m app.migrate create          # create missing tables from the ORM models and stamp the version
+    python -m app.migrate apply [DIR]     # run pending numbered SQL migrations (PostgreSQL)
+    python -m app.migrate check           # exit 1 if the database is behind SCHEMA_VERSION
+
+``create`` is meant for fresh development and SQLite databases; PostgreSQL
+deployments get their schema from init.sql and migrations/*.sql.
+"""
+
+import argparse
+import logging
+import re
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .database import Base, engine
+from .models import SchemaMigration
+
+logger = logging.getLogger(__name__)
+
+# Highest numbered migration this code expects (migrations/NNN_*.sql)
+SCHEMA_VERSION = 7
+
+DEFAULT_MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{3})_.+\.sql$")
+
+
+class SchemaVersionError(RuntimeError):
+    """Raised when the database schema is older than the code expects"""
+
+
+def current_schema_version(bind: Engine = engine) -> Optional[int]:
+    """
+    Read the highest applied schema version
+    
+    A single indexed aggregate, cheap enough to run on every worker boot.
+    
+    Returns:
+        Version number, or None if the database has no schema_migrations table
+    """
+    with Session(bind=bind) as session:
+        try:
+            return session.query(func.max(SchemaMigration.version)).scalar()
+        except SQLAlchemyError:
+            # Most likely the table does not exist yet
+            return None
+
+
+def check_schema_version(bind: Engine = engine, expected: int = SCHEMA_VERSION) -> Tuple[Optional[int], int]:
+    """
+    Compare the database schema version with the version this code needs
+    
+    Returns:
+        Tuple of (current, expected)
+    
+    Raises:
+        SchemaVersionError: If the database is behind
+    """
+    current = current_schema_version(bind)
+    if current is None or current < expected:
+        raise SchemaVersionError(
+            f"Database schema version is {current}, this build needs {expected}; "
+            f"run `python -m app.migrate apply` (or `create` for a new database)"
+        )
+    return current, expected
+
+
+def _stamp(bind: Engine, versions: List[int]) -> None:
+    """Record versions as applied (ignoring ones already present)"""
+    with Session(bind=bind) as session:
+        applied = {v for (v,) in session.query(SchemaMigration.version).all()}
+        for version in versions:
+            if version not in applied:
+                session.add(SchemaMigration(version=version))
+        session.commit()
+
+
+def create_schema(bind: Engine = engine) -> List[str]:
+    """
+    Create missing tables from the ORM models and stamp SCHEMA_VERSION
+    
+    Returns:
+        Names of the tables that were created
+    """
+    existing = set(inspect(bind).get_table_names())
+    Base.metadata.create_all(bind=bind)
+    created = [table for table in Base.metadata.tables if table not in existing]
+    _stamp(bind, list(range(1, SCHEMA_VERSION + 1)))
+    return created
+
+
+def pending_migrations(directory: Path, current: Optional[int]) -> List[Tuple[int, Path]]:
+    """
+    List numbered SQL migrations newer than the current version
+    
+    Returns:
+        (version, path) pairs in ascending order
+    """
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        match = MIGRATION_FILE_PATTERN.match(path.name)
+        if match:
+            version = int(match.group(1))
+            if current is None or version > current:
+                migrations.append((version, path))
+    return migrations
+
+
+def apply_migrations(directory: Path = DEFAULT_MIGRATIONS_DIR, bind: Engine = engine) -> List[int]:
+    """
+    Run pending SQL migrations in order
+    
+    Each file manages its own transaction (BEGIN/COMMIT), so it is sent to
+    the server as one script on an autocommit connection. schema_migrations
+    is created first: databases from before migration 003 do not have it,
+    and every applied file is stamped there.
+    
+    Returns:
+        Versions that were applied
+    """
+    SchemaMigration.__table__.create(bind=bind, checkfirst=True)
+    applied = []
+    for version, path in pending_migrations(directory, current_schema_version(bind)):
+        logger.info(f"Applying migration {path.name}")
+        script = path.read_text()
+        raw = bind.raw_connection()
+        try:
+            raw.autocommit = True
+            cursor = raw.cursor()
+            cursor.execute(script)
+            cursor.close()
+        finally:
+            raw.close()
+        _stamp(bind, [version])
+        applied.append(version)
+    return applied
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Manage the MGNREGA dashboard database schema")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("create", help="Create missing tables from the ORM models")
+    apply_parser = subcommands.add_parser("apply", help="Run pending numbered SQL migrations")
+    apply_parser.add_argument("directory", nargs="?", type=Path, default=DEFAULT_MIGRATIONS_DIR)
+    subcommands.add_parser("check", help="Exit 1 if the schema is behind this build")
+    args = parser.parse_args(argv)
+    
+    if args.command == "create":
+        created = create_schema(engine)
+        print(f"Created {len(created)} tables ({', '.join(created) or 'none'}); schema version {SCHEMA_VERSION}")
+    elif args.command == "apply":
+        applied = apply_migrations(args.directory, engine)
+        print(f"Applied migrations: {', '.join(map(str, applied)) or 'none'}")
+    elif args.command == "check":
+        try:
+            current, expected = check_schema_version(engine)
+        except SchemaVersionError as e:
+            print(e)
+            return 1
+        print(f"Schema version {current} (needs {expected})")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -3,7 +3,11 @@ SQLAlchemy ORM Models for MGNREGA Dashboard
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, TIMESTAMP, JSONB, CheckConstraint
+from sqlalchemy import (
+    JSON, BigInteger, Column, Integer, String, Numeric, ForeignKey, ForeignKeyConstraint, Sequence, TIMESTAMP,
+    CheckConstraint, UniqueConstraint
+)
+from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
 
@@ -30,31 +34,204 @@ class District(Base):
         return f"<District(id={self.id}, code='{self.district_code}', name='{self.district_name}')>"
 
 
+# Shared by the partitions in Postgres (init.sql); registered with the
+# metadata so `migrate create` makes it there too
+SNAPSHOT_ID_SEQUENCE = Sequence("mgnrega_snapshots_id_seq", metadata=Base.metadata)
+
+
 class MGNREGASnapshot(Base):
-    """MGNREGA performance snapshot model - monthly data per district"""
+    """
+    MGNREGA performance snapshot model - monthly data per district
+    
+    The table is range-partitioned by year in Postgres (see init.sql), so
+    the primary key is (id, year) and ids come from one sequence. SQLite
+    has no sequences and cannot autoincrement a composite key, so rows
+    inserted there need an explicit id. The unique (district_id, year,
+    month) index serves both the upsert and the per-district latest-first
+    queries.
+    
+    The raw API payload lives in mgnrega_snapshot_raw and is only loaded
+    when ``raw`` (or ``raw_json``) is accessed, so snapshot queries read
+    narrow rows.
+    """
     
     __tablename__ = "mgnrega_snapshots"
     
-    id = Column(Integer, primary_key=True, index=True)
-    district_id = Column(Integer, ForeignKey("districts.id", ondelete="CASCADE"), nullable=False, index=True)
-    year = Column(Integer, nullable=False)
+    id = Column(Integer, SNAPSHOT_ID_SEQUENCE, primary_key=True, autoincrement=False)
+    district_id = Column(Integer, ForeignKey("districts.id", ondelete="CASCADE"), nullable=False)
+    year = Column(Integer, primary_key=True, autoincrement=False)
     month = Column(Integer, nullable=False)
     people_benefited = Column(Integer, default=0)
     workdays_created = Column(Integer, default=0)
     wages_paid = Column(Numeric(15, 2), default=0)
     payments_on_time_percent = Column(Numeric(5, 2), default=0)
     works_completed = Column(Integer, default=0)
-    raw_json = Column(JSONB)
     fetched_at = Column(TIMESTAMP, default=datetime.utcnow)
+    # SHA-256 of the fetched payload; ingestion skips rows whose hash is unchanged
+    content_hash = Column(String)
     
     # Relationship to district
     district = relationship("District", back_populates="snapshots")
     
-    # Add constraint for month range
+    # Raw payload, loaded on first access
+    raw = relationship(
+        "MGNREGASnapshotRaw",
+        uselist=False,
+        lazy="select",
+        cascade="all, delete-orphan",
+    )
+    raw_json = association_proxy(
+        "raw", "raw_json", creator=lambda raw_json: MGNREGASnapshotRaw(raw_json=raw_json)
+    )
+    
+    # Add constraints for month range and one snapshot per district-month
     __table_args__ = (
         CheckConstraint('month >= 1 AND month <= 12', name='check_month_range'),
+        UniqueConstraint('district_id', 'year', 'month', name='uq_snapshot_district_month'),
     )
     
     def __repr__(self):
         return f"<MGNREGASnapshot(id={self.id}, district_id={self.district_id}, {self.year}/{self.month:02d})>"
 
+
+class MGNREGASnapshotRaw(Base):
+    """
+    Original API payload of a snapshot, kept out of the snapshot rows
+    
+    Keyed by the snapshot's (id, year), the primary key of the partitioned
+    table in Postgres; rows are deleted with their snapshot.
+    """
+    
+    __tablename__ = "mgnrega_snapshot_raw"
+    
+    snapshot_id = Column(Integer, primary_key=True, autoincrement=False)
+    snapshot_year = Column(Integer, primary_key=True, autoincrement=False)
+    raw_json = Column(JSONB().with_variant(JSON(), "sqlite"), nullable=False)
+    
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["snapshot_id", "snapshot_year"],
+            ["mgnrega_snapshots.id", "mgnrega_snapshots.year"],
+            ondelete="CASCADE",
+        ),
+    )
+    
+    def __repr__(self):
+        return f"<MGNREGASnapshotRaw(snapshot_id={self.snapshot_id}, year={self.snapshot_year})>"
+
+
+class DistrictLatest(Base):
+    """
+    Denormalized current and previous month metrics per district
+    
+    Maintained by a trigger on mgnrega_snapshots (see init.sql), so the
+    dashboard snapshot is a single primary-key lookup. Percentage changes are
+    precomputed with the same rules as the API (NULL when the previous value
+    is 0 or missing).
+    """
+    
+    __tablename__ = "district_latest"
+    
+    district_id = Column(Integer, ForeignKey("districts.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    people_benefited = Column(Integer)
+    workdays_created = Column(Integer)
+    wages_paid = Column(Numeric(15, 2))
+    payments_on_time_percent = Column(Numeric(5, 2))
+    works_completed = Column(Integer)
+    prev_year = Column(Integer)
+    prev_month = Column(Integer)
+    prev_people_benefited = Column(Integer)
+    prev_workdays_created = Column(Integer)
+    prev_wages_paid = Column(Numeric(15, 2))
+    prev_payments_on_time_percent = Column(Numeric(5, 2))
+    prev_works_completed = Column(Integer)
+    people_benefited_change = Column(Numeric(12, 2))
+    workdays_created_change = Column(Numeric(12, 2))
+    wages_paid_change = Column(Numeric(12, 2))
+    payments_on_time_percent_change = Column(Numeric(12, 2))
+    works_completed_change = Column(Numeric(12, 2))
+    fetched_at = Column(TIMESTAMP)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<DistrictLatest(district_id={self.district_id}, {self.year}/{self.month:02d})>"
+
+
+class MGNREGADerivedMetrics(Base):
+    """
+    Precomputed changes, rolling averages and ratios per district and month
+    
+    Recomputed by ingestion with window functions over mgnrega_snapshots
+    (ingest/derived.py). Month-over-month changes compare with the previous
+    snapshot, like district_latest; year-over-year changes are NULL when the
+    same month a year earlier is missing.
+    """
+    
+    __tablename__ = "mgnrega_derived_metrics"
+    
+    district_id = Column(Integer, ForeignKey("districts.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    month = Column(Integer, primary_key=True, autoincrement=False)
+    people_benefited_mom = Column(Numeric(12, 2))
+    workdays_created_mom = Column(Numeric(12, 2))
+    wages_paid_mom = Column(Numeric(12, 2))
+    payments_on_time_percent_mom = Column(Numeric(12, 2))
+    works_completed_mom = Column(Numeric(12, 2))
+    people_benefited_yoy = Column(Numeric(12, 2))
+    workdays_created_yoy = Column(Numeric(12, 2))
+    wages_paid_yoy = Column(Numeric(12, 2))
+    payments_on_time_percent_yoy = Column(Numeric(12, 2))
+    works_completed_yoy = Column(Numeric(12, 2))
+    people_benefited_avg_3m = Column(Numeric(15, 2))
+    workdays_created_avg_3m = Column(Numeric(15, 2))
+    wages_paid_avg_3m = Column(Numeric(15, 2))
+    wages_per_workday = Column(Numeric(15, 2))
+    workdays_per_person = Column(Numeric(15, 2))
+    wages_per_person = Column(Numeric(15, 2))
+    computed_at = Column(TIMESTAMP, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<MGNREGADerivedMetrics(district_id={self.district_id}, {self.year}/{self.month:02d})>"
+
+
+class MGNREGASnapshotQuarantine(Base):
+    """
+    Fetched snapshot held back by ingestion's anomaly detection
+    
+    Written by the ingest workers instead of the snapshot when a value breaks
+    a hard rule or is far from the district's trailing history; ``reasons``
+    lists why. Column types are wider than the snapshot's so implausible
+    values still fit.
+    """
+    
+    __tablename__ = "mgnrega_snapshot_quarantine"
+    
+    district_id = Column(Integer, ForeignKey("districts.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    month = Column(Integer, primary_key=True, autoincrement=False)
+    people_benefited = Column(BigInteger)
+    workdays_created = Column(BigInteger)
+    wages_paid = Column(Numeric(18, 2))
+    payments_on_time_percent = Column(Numeric(15, 2))
+    works_completed = Column(BigInteger)
+    raw_json = Column(JSONB().with_variant(JSON(), "sqlite"))
+    content_hash = Column(String)
+    reasons = Column(JSONB().with_variant(JSON(), "sqlite"), nullable=False)
+    quarantined_at = Column(TIMESTAMP, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<MGNREGASnapshotQuarantine(district_id={self.district_id}, {self.year}/{self.month:02d})>"
+
+
+class SchemaMigration(Base):
+    """Applied schema versions; the API compares the highest one with SCHEMA_VERSION at startup"""
+    
+    __tablename__ = "schema_migrations"
+    
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    applied_at = Column(TIMESTAMP, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<SchemaMigration(version={self.version})>"
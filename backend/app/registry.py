@@ -0,0 +1,239 @@
+"""
+In-memory District Registry
+
+The districts table is small and changes only when districts are seeded,
+so every API process keeps a copy indexed by code, id and state. Routers
+validate codes and build DistrictListItem from it, and only go to the
+database for snapshot rows.
+
+The registry reloads when an invalidation event touches the district
+lists (the same events that evict districts:* and states:* cache keys),
+and compares a fingerprint of the district rows at most once per
+``district_registry_check_interval`` seconds, so edits to existing rows are
+picked up as well as inserts and deletes.
+"""
+
+import logging
+import threading
+import time
+from fnmatch import fnmatchcase
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .database import SessionLocal
+from .invalidation import add_invalidation_callback
+from .models import District
+from .schemas import DistrictListItem
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Cache keys whose invalidation also means the districts table changed
+REGISTRY_KEYS = ("districts:state:all", "states:all")
+
+# Minimum seconds between version checks triggered by unknown codes
+MISS_RECHECK_INTERVAL = 5.0
+
+
+class DistrictRecord:
+    """Immutable in-memory copy of a districts row"""
+    
+    __slots__ = ("id", "state", "district_name", "district_code", "latitude", "longitude", "list_item")
+    
+    def __init__(self, id: int, state: str, district_name: str, district_code: str,
+                 latitude: Optional[float] = None, longitude: Optional[float] = None):
+        self.id = id
+        self.state = state
+        self.district_name = district_name
+        self.district_code = district_code
+        self.latitude = latitude
+        self.longitude = longitude
+        # Built once; response models are immutable in practice
+        self.list_item = DistrictListItem(
+            id=id, state=state, district_name=district_name, district_code=district_code
+        )
+    
+    def __repr__(self):
+        return f"<DistrictRecord(id={self.id}, code='{self.district_code}')>"
+
+
+class _Indexes:
+    """One consistent generation of the registry, swapped in atomically"""
+    
+    __slots__ = ("by_code", "by_id", "by_state", "ordered", "states", "version")
+    
+    def __init__(self, records: List[DistrictRecord], version: int):
+        self.ordered = sorted(records, key=lambda r: r.district_name)
+        self.by_code: Dict[str, DistrictRecord] = {r.district_code: r for r in self.ordered}
+        self.by_id: Dict[int, DistrictRecord] = {r.id: r for r in self.ordered}
+        self.by_state: Dict[str, List[DistrictRecord]] = {}
+        for record in self.ordered:
+            self.by_state.setdefault(record.state.lower(), []).append(record)
+        counts: Dict[str, int] = {}
+        for record in self.ordered:
+            counts[record.state] = counts.get(record.state, 0) + 1
+        self.states = sorted(counts.items())
+        self.version = version
+
+
+def _district_rows(db: Session) -> List[Tuple]:
+    """Every districts row, in id order, with the columns the registry keeps"""
+    return db.query(
+        District.id, District.state, District.district_name, District.district_code,
+        District.latitude, District.longitude
+    ).order_by(District.id).all()
+
+
+def _table_version(rows: List[Tuple]) -> int:
+    """
+    Fingerprint of the district rows
+    
+    districts has no updated_at column, so the rows themselves are hashed
+    (a few hundred short rows); a count or max(id) misses renames and
+    coordinate fixes.
+    """
+    return hash(tuple(tuple(row) for row in rows))
+
+
+class DistrictRegistry:
+    """
+    Process-wide index of districts
+    
+    Readers never block: each load builds new indexes and replaces the
+    reference in a single assignment.
+    """
+    
+    def __init__(self, check_interval: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.check_interval = check_interval
+        self._clock = clock
+        self._indexes: Optional[_Indexes] = None
+        self._stale = False
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+    
+    @property
+    def loaded(self) -> bool:
+        return self._indexes is not None
+    
+    def load(self, db: Session) -> int:
+        """
+        Load every district from the database
+        
+        Returns:
+            Number of districts loaded
+        """
+        return self._build(_district_rows(db))
+    
+    def _build(self, rows: List[Tuple]) -> int:
+        """Swap in indexes built from district rows"""
+        records = [
+            DistrictRecord(
+                id=row.id,
+                state=row.state,
+                district_name=row.district_name,
+                district_code=row.district_code,
+                latitude=float(row.latitude) if row.latitude is not None else None,
+                longitude=float(row.longitude) if row.longitude is not None else None,
+            )
+            for row in rows
+        ]
+        self._indexes = _Indexes(records, _table_version(rows))
+        self._stale = False
+        self._checked_at = self._clock()
+        logger.info(f"District registry loaded {len(records)} districts")
+        return len(records)
+    
+    def mark_stale(self) -> None:
+        """Reload on next access (called from the invalidation listener thread)"""
+        self._stale = True
+    
+    def clear(self) -> None:
+        """Drop all loaded districts"""
+        self._indexes = None
+        self._stale = False
+        self._checked_at = 0.0
+    
+    def ensure_fresh(self, db: Session, force_check: bool = False) -> None:
+        """
+        Load or reload the registry if needed
+        
+        Args:
+            db: Session used for the version check and reload
+            force_check: Check the version now if the last check is older
+                than MISS_RECHECK_INTERVAL (used for unknown codes)
+        """
+        if self._indexes is None or self._stale:
+            with self._lock:
+                if self._indexes is None or self._stale:
+                    self.load(db)
+            return
+        
+        interval = MISS_RECHECK_INTERVAL if force_check else self.check_interval
+        if self._clock() - self._checked_at < interval:
+            return
+        
+        with self._lock:
+            if self._clock() - self._checked_at < interval:
+                return
+            self._checked_at = self._clock()
+            rows = _district_rows(db)
+            if _table_version(rows) != self._indexes.version:
+                self._build(rows)
+    
+    def get(self, db: Session, district_code: str) -> Optional[DistrictRecord]:
+        """
+        Look up a district by code
+        
+        Unknown codes trigger a rate-limited version check, so districts
+        seeded since the last reload are found without waiting for the
+        periodic check.
+        """
+        self.ensure_fresh(db)
+        record = self._indexes.by_code.get(district_code)
+        if record is None:
+            self.ensure_fresh(db, force_check=True)
+            record = self._indexes.by_code.get(district_code)
+        return record
+    
+    def get_by_id(self, db: Session, district_id: int) -> Optional[DistrictRecord]:
+        """Look up a district by primary key"""
+        self.ensure_fresh(db)
+        return self._indexes.by_id.get(district_id)
+    
+    def districts(self, db: Session, state: Optional[str] = None) -> List[DistrictRecord]:
+        """All districts ordered by name, optionally filtered by state (case-insensitive)"""
+        self.ensure_fresh(db)
+        if state:
+            return list(self._indexes.by_state.get(state.lower(), []))
+        return list(self._indexes.ordered)
+    
+    def states(self, db: Session) -> List[Tuple[str, int]]:
+        """(state, district count) pairs ordered by state"""
+        self.ensure_fresh(db)
+        return list(self._indexes.states)
+
+
+def load_registry(session_factory: Callable[[], Session] = SessionLocal) -> int:
+    """
+    Load the process-wide registry with a fresh session (used at startup)
+    
+    Returns:
+        Number of districts loaded
+    """
+    db = session_factory()
+    try:
+        return registry.load(db)
+    finally:
+        db.close()
+
+
+def _on_invalidation(patterns: List[str]) -> None:
+    """Mark the registry stale when district list keys are invalidated"""
+    if any(fnmatchcase(key, pattern) for pattern in patterns for key in REGISTRY_KEYS):
+        registry.mark_stale()
+
+
+registry = DistrictRegistry(check_interval=settings.district_registry_check_interval)
+add_invalidation_callback(_on_invalidation)
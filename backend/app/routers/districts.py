@@ -2,28 +2,54 @@
 Districts API Router
 """
 
-from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Dict, Optional, List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import and_, desc
 
 from ..database import get_db
-from ..models import District, MGNREGASnapshot
+from ..models import DistrictLatest, MGNREGADerivedMetrics, MGNREGASnapshot
+from ..registry import DistrictRecord, registry
 from ..schemas import (
     DistrictList,
-    DistrictListItem,
     StatesResponse,
     StateInfo,
     Snapshot,
     SnapshotBase,
     DashboardSnapshot,
+    DerivedMetrics,
     TrendData,
     TrendResponse,
     Comparison
 )
-from ..cache import get_cache, set_cache, delete_cache, clear_cache_pattern
+from ..cache import get_cache, set_cache, delete_cache, clear_cache_pattern, record_district_view
+from ..timing import TimedRoute
 
-router = APIRouter(prefix="/districts", tags=["districts"])
+router = APIRouter(prefix="/districts", tags=["districts"], route_class=TimedRoute)
+
+# Cache TTLs in seconds
+LIST_CACHE_TTL = 3600  # 1 hour
+DISTRICT_CACHE_TTL = 1800  # 30 minutes
+
+STATES_CACHE_KEY = "states:all"
+
+# Set by the ingestion cache warmer so its requests are not counted as views
+CACHE_WARM_HEADER = "X-Cache-Warm"
+
+
+def districts_cache_key(state: Optional[str] = None) -> str:
+    """Cache key for the district list, optionally filtered by state"""
+    return f"districts:state:{state or 'all'}"
+
+
+def snapshot_cache_key(district_code: str) -> str:
+    """Cache key for a district dashboard snapshot"""
+    return f"district:snapshot:{district_code}"
+
+
+def trend_cache_key(district_code: str, months: int) -> str:
+    """Cache key for a district trend series"""
+    return f"district:trend:{district_code}:{months}"
 
 
 def _calculate_change(current: int, previous: int) -> Optional[float]:
@@ -39,6 +65,73 @@ def _calculate_change(current: int, previous: int) -> Optional[float]:
     return round(change, 2)
 
 
+# Metrics compared month over month on the dashboard
+COMPARISON_FIELDS = (
+    'people_benefited',
+    'workdays_created',
+    'wages_paid',
+    'payments_on_time_percent',
+    'works_completed',
+)
+
+
+def _snapshot_from_latest(latest: DistrictLatest, prefix: str = "") -> Optional[SnapshotBase]:
+    """Build a SnapshotBase from the current (or prev_-prefixed) columns of district_latest"""
+    year = getattr(latest, f"{prefix}year")
+    if year is None:
+        return None
+    return SnapshotBase(
+        year=year,
+        month=getattr(latest, f"{prefix}month"),
+        **{field: getattr(latest, f"{prefix}{field}") for field in COMPARISON_FIELDS}
+    )
+
+
+def _comparison_from_latest(latest: DistrictLatest) -> Dict[str, Optional[float]]:
+    """Read the precomputed percentage changes from district_latest"""
+    comparison = {}
+    for field in COMPARISON_FIELDS:
+        change = getattr(latest, f"{field}_change")
+        comparison[field] = float(change) if change is not None else None
+    return comparison
+
+
+def _changes_from_derived(derived: MGNREGADerivedMetrics, suffix: str) -> Dict[str, Optional[float]]:
+    """Read precomputed percentage changes (``_mom`` or ``_yoy``) from mgnrega_derived_metrics"""
+    changes = {}
+    for field in COMPARISON_FIELDS:
+        change = getattr(derived, f"{field}{suffix}")
+        changes[field] = float(change) if change is not None else None
+    return changes
+
+
+def _derived_metrics(derived: Optional[MGNREGADerivedMetrics]) -> Optional[DerivedMetrics]:
+    """Response model for a derived metrics row (None before ingestion computed it)"""
+    if derived is None:
+        return None
+    return DerivedMetrics(
+        year_over_year=_changes_from_derived(derived, "_yoy"),
+        **{field: getattr(derived, field) for field in DerivedMetrics.model_fields if field != "year_over_year"}
+    )
+
+
+def _calculate_comparison(current: SnapshotBase, previous: SnapshotBase) -> Dict[str, Optional[float]]:
+    """Compute month-over-month percentage changes in Python"""
+    return {
+        field: _calculate_change(float(getattr(current, field)), float(getattr(previous, field)))
+        for field in COMPARISON_FIELDS
+    }
+
+
+def build_districts(db: Session, state: Optional[str] = None) -> DistrictList:
+    """
+    Build the district list response from the database
+    """
+    district_items = [record.list_item for record in registry.districts(db, state)]
+    
+    return DistrictList(districts=district_items, total=len(district_items))
+
+
 @router.get("", response_model=DistrictList)
 def get_districts(
     state: Optional[str] = Query(None, description="Filter by state name"),
@@ -47,89 +140,61 @@ def get_districts(
     """
     Get list of districts, optionally filtered by state
     """
-    cache_key = f"districts:state:{state or 'all'}"
+    cache_key = districts_cache_key(state)
     
     # Try to get from cache
     cached = get_cache(cache_key)
     if cached:
         return DistrictList(**cached)
     
-    # Query database
-    query = db.query(District)
-    if state:
-        query = query.filter(func.lower(District.state) == func.lower(state))
-    
-    districts = query.order_by(District.district_name).all()
-    
-    # Format response
-    district_items = [
-        DistrictListItem(
-            id=d.id,
-            state=d.state,
-            district_name=d.district_name,
-            district_code=d.district_code
-        ) for d in districts
-    ]
-    
-    result = DistrictList(districts=district_items, total=len(district_items))
+    result = build_districts(db, state)
     
     # Cache the result
-    set_cache(cache_key, result.model_dump(), ttl=3600)  # 1 hour
+    set_cache(cache_key, result.model_dump(), ttl=LIST_CACHE_TTL)
     
     return result
 
 
+def build_states(db: Session) -> StatesResponse:
+    """
+    Build the states response from the database
+    """
+    states = [
+        StateInfo(name=name, district_count=count)
+        for name, count in registry.states(db)
+    ]
+    
+    return StatesResponse(states=states)
+
+
 @router.get("/states", response_model=StatesResponse)
 def get_states(db: Session = Depends(get_db)):
     """
     Get list of all states with district counts
     """
-    cache_key = "states:all"
+    cache_key = STATES_CACHE_KEY
     
     # Try cache
     cached = get_cache(cache_key)
     if cached:
         return StatesResponse(**cached)
     
-    # Query database
-    results = db.query(
-        District.state,
-        func.count(District.id).label('count')
-    ).group_by(District.state).order_by(District.state).all()
-    
-    states = [
-        StateInfo(name=row[0], district_count=row[1])
-        for row in results
-    ]
-    
-    result = StatesResponse(states=states)
+    result = build_states(db)
     
     # Cache for 1 hour
-    set_cache(cache_key, result.model_dump(), ttl=3600)
+    set_cache(cache_key, result.model_dump(), ttl=LIST_CACHE_TTL)
     
     return result
 
 
-@router.get("/{district_code}/snapshot", response_model=DashboardSnapshot)
-def get_district_snapshot(
-    district_code: str,
-    db: Session = Depends(get_db)
-):
-    """
-    Get latest snapshot for a district with comparison to previous month
+def _snapshot_from_history(db: Session, district: DistrictRecord, district_code: str):
     """
-    cache_key = f"district:snapshot:{district_code}"
-    
-    # Try cache
-    cached = get_cache(cache_key)
-    if cached:
-        return DashboardSnapshot(**cached)
-    
-    # Get district
-    district = db.query(District).filter(District.district_code == district_code).first()
-    if not district:
-        raise HTTPException(status_code=404, detail=f"District '{district_code}' not found")
+    Compute current/previous/comparison from mgnrega_snapshots
     
+    Fallback for databases where district_latest has not been populated
+    (e.g. before migration 002 runs, or schemas built without the trigger).
+    Changes come from mgnrega_derived_metrics when ingestion computed them.
+    """
     # Get latest 2 snapshots
     snapshots = db.query(MGNREGASnapshot).filter(
         MGNREGASnapshot.district_id == district.id
@@ -138,90 +203,107 @@ def get_district_snapshot(
     if not snapshots:
         raise HTTPException(status_code=404, detail=f"No data available for district '{district_code}'")
     
-    current = SnapshotBase(
-        year=snapshots[0].year,
-        month=snapshots[0].month,
-        people_benefited=snapshots[0].people_benefited,
-        workdays_created=snapshots[0].workdays_created,
-        wages_paid=snapshots[0].wages_paid,
-        payments_on_time_percent=snapshots[0].payments_on_time_percent,
-        works_completed=snapshots[0].works_completed
-    )
-    
-    previous = None
-    if len(snapshots) > 1:
-        previous = SnapshotBase(
-            year=snapshots[1].year,
-            month=snapshots[1].month,
-            people_benefited=snapshots[1].people_benefited,
-            workdays_created=snapshots[1].workdays_created,
-            wages_paid=snapshots[1].wages_paid,
-            payments_on_time_percent=snapshots[1].payments_on_time_percent,
-            works_completed=snapshots[1].works_completed
+    points = [
+        SnapshotBase(
+            year=snapshot.year,
+            month=snapshot.month,
+            **{field: getattr(snapshot, field) for field in COMPARISON_FIELDS}
         )
+        for snapshot in snapshots
+    ]
+    current = points[0]
+    previous = points[1] if len(points) > 1 else None
+    
+    if not previous:
+        comparison = {}
+    else:
+        derived = db.get(MGNREGADerivedMetrics, (district.id, current.year, current.month))
+        if derived is not None:
+            comparison = _changes_from_derived(derived, "_mom")
+        else:
+            comparison = _calculate_comparison(current, previous)
+    return current, previous, comparison
+
+
+def build_district_snapshot(db: Session, district_code: str) -> DashboardSnapshot:
+    """
+    Build the dashboard snapshot for a district from the database
     
-    # Calculate comparisons
-    comparison = {}
-    if previous:
-        comparison['people_benefited'] = _calculate_change(
-            current.people_benefited, previous.people_benefited
-        )
-        comparison['workdays_created'] = _calculate_change(
-            current.workdays_created, previous.workdays_created
-        )
-        comparison['wages_paid'] = _calculate_change(
-            float(current.wages_paid), float(previous.wages_paid)
-        )
-        comparison['payments_on_time_percent'] = _calculate_change(
-            float(current.payments_on_time_percent), float(previous.payments_on_time_percent)
-        )
-        comparison['works_completed'] = _calculate_change(
-            current.works_completed, previous.works_completed
-        )
+    Raises:
+        HTTPException: 404 if the district or its data does not exist
+    """
+    district = registry.get(db, district_code)
+    if not district:
+        raise HTTPException(status_code=404, detail=f"District '{district_code}' not found")
     
-    district_item = DistrictListItem(
-        id=district.id,
-        state=district.state,
-        district_name=district.district_name,
-        district_code=district.district_code
-    )
+    # Denormalized latest row by primary key
+    latest = db.get(DistrictLatest, district.id)
+    if latest is not None:
+        current = _snapshot_from_latest(latest)
+        previous = _snapshot_from_latest(latest, prefix="prev_")
+        comparison = _comparison_from_latest(latest) if previous else {}
+    else:
+        current, previous, comparison = _snapshot_from_history(db, district, district_code)
     
-    result = DashboardSnapshot(
+    derived = db.get(MGNREGADerivedMetrics, (district.id, current.year, current.month))
+    
+    return DashboardSnapshot(
         current=current,
         previous=previous,
-        district=district_item,
-        comparison=comparison
+        district=district.list_item,
+        comparison=comparison,
+        derived=_derived_metrics(derived)
     )
-    
-    # Cache for 30 minutes
-    set_cache(cache_key, result.model_dump(), ttl=1800)
-    
-    return result
 
 
-@router.get("/{district_code}/trend", response_model=TrendResponse)
-def get_district_trend(
+@router.get("/{district_code}/snapshot", response_model=DashboardSnapshot)
+def get_district_snapshot(
     district_code: str,
-    months: int = Query(6, ge=1, le=24, description="Number of months to retrieve"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache_warm: bool = Header(False, alias=CACHE_WARM_HEADER, include_in_schema=False)
 ):
     """
-    Get trend data for a district (last N months)
+    Get latest snapshot for a district with comparison to previous month
     """
-    cache_key = f"district:trend:{district_code}:{months}"
+    cache_key = snapshot_cache_key(district_code)
     
     # Try cache
     cached = get_cache(cache_key)
     if cached:
-        return TrendResponse(**cached)
+        if not cache_warm:
+            record_district_view(district_code)
+        return DashboardSnapshot(**cached)
+    
+    result = build_district_snapshot(db, district_code)
+    if not cache_warm:
+        record_district_view(district_code)
+    
+    # Cache for 30 minutes
+    set_cache(cache_key, result.model_dump(), ttl=DISTRICT_CACHE_TTL)
     
-    # Get district
-    district = db.query(District).filter(District.district_code == district_code).first()
+    return result
+
+
+def build_district_trend(db: Session, district_code: str, months: int) -> TrendResponse:
+    """
+    Build trend data for a district (last N months) from the database
+    
+    Raises:
+        HTTPException: 404 if the district or its data does not exist
+    """
+    district = registry.get(db, district_code)
     if not district:
         raise HTTPException(status_code=404, detail=f"District '{district_code}' not found")
     
-    # Get snapshots
-    snapshots = db.query(MGNREGASnapshot).filter(
+    # Get snapshots with their derived metrics (NULL until ingestion computed them)
+    snapshots = db.query(MGNREGASnapshot, MGNREGADerivedMetrics).outerjoin(
+        MGNREGADerivedMetrics,
+        and_(
+            MGNREGADerivedMetrics.district_id == MGNREGASnapshot.district_id,
+            MGNREGADerivedMetrics.year == MGNREGASnapshot.year,
+            MGNREGADerivedMetrics.month == MGNREGASnapshot.month,
+        )
+    ).filter(
         MGNREGASnapshot.district_id == district.id
     ).order_by(desc(MGNREGASnapshot.year), desc(MGNREGASnapshot.month)).limit(months).all()
     
@@ -235,7 +317,7 @@ def get_district_trend(
     ]
     
     trends = []
-    for snapshot in reversed(snapshots):  # Chronological order
+    for snapshot, derived in reversed(snapshots):  # Chronological order
         month_year = f"{month_names[snapshot.month - 1]} {snapshot.year}"
         trends.append(TrendData(
             month_year=month_year,
@@ -243,20 +325,33 @@ def get_district_trend(
             workdays_created=snapshot.workdays_created,
             wages_paid=snapshot.wages_paid,
             payments_on_time_percent=snapshot.payments_on_time_percent,
-            works_completed=snapshot.works_completed
+            works_completed=snapshot.works_completed,
+            derived=_derived_metrics(derived)
         ))
     
-    district_item = DistrictListItem(
-        id=district.id,
-        state=district.state,
-        district_name=district.district_name,
-        district_code=district.district_code
-    )
+    return TrendResponse(district=district.list_item, trends=trends)
+
+
+@router.get("/{district_code}/trend", response_model=TrendResponse)
+def get_district_trend(
+    district_code: str,
+    months: int = Query(6, ge=1, le=24, description="Number of months to retrieve"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get trend data for a district (last N months)
+    """
+    cache_key = trend_cache_key(district_code, months)
+    
+    # Try cache
+    cached = get_cache(cache_key)
+    if cached:
+        return TrendResponse(**cached)
     
-    result = TrendResponse(district=district_item, trends=trends)
+    result = build_district_trend(db, district_code, months)
     
     # Cache for 30 minutes
-    set_cache(cache_key, result.model_dump(), ttl=1800)
+    set_cache(cache_key, result.model_dump(), ttl=DISTRICT_CACHE_TTL)
     
     return result
 
@@ -5,13 +5,13 @@ Geolocation API Router
 import math
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
-from ..database import get_db
-from ..models import District
-from ..schemas import GeolocateRequest, GeolocateResponse, DistrictListItem
+from ..database import get_read_db
+from ..registry import registry
+from ..schemas import GeolocateRequest, GeolocateResponse
+from ..timing import TimedRoute
 
-router = APIRouter(prefix="/geolocate", tags=["geolocate"])
+router = APIRouter(prefix="/geolocate", tags=["geolocate"], route_class=TimedRoute)
 
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -49,16 +49,16 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
 @router.post("", response_model=GeolocateResponse)
 def geolocate_district(
     request: GeolocateRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Find nearest district to given coordinates using Haversine formula
     """
     # Get all districts with coordinates
-    districts = db.query(District).filter(
-        District.latitude.isnot(None),
-        District.longitude.isnot(None)
-    ).all()
+    districts = [
+        d for d in registry.districts(db)
+        if d.latitude is not None and d.longitude is not None
+    ]
     
     if not districts:
         raise Exception("No districts with geographic data available")
@@ -71,7 +71,7 @@ def geolocate_district(
         if district.latitude and district.longitude:
             distance = haversine_distance(
                 request.latitude, request.longitude,
-                float(district.latitude), float(district.longitude)
+                district.latitude, district.longitude
             )
             
             if distance < min_distance:
@@ -81,15 +81,8 @@ def geolocate_district(
     if not nearest:
         raise Exception("Could not find nearest district")
     
-    district_item = DistrictListItem(
-        id=nearest.id,
-        state=nearest.state,
-        district_name=nearest.district_name,
-        district_code=nearest.district_code
-    )
-    
     return GeolocateResponse(
-        district=district_item,
+        district=nearest.list_item,
         distance_km=min_distance
     )
 
@@ -98,7 +91,7 @@ def geolocate_district(
 def geolocate_test(
     lat: float = Query(..., description="Latitude"),
     lon: float = Query(..., description="Longitude"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Test endpoint for geolocation (GET instead of POST)
@@ -91,12 +91,24 @@ class Comparison(BaseModel):
     works_completed: Optional[float] = None
 
 
+class DerivedMetrics(BaseModel):
+    """Precomputed metrics for one district month (mgnrega_derived_metrics)"""
+    year_over_year: Comparison = Comparison()
+    people_benefited_avg_3m: Optional[Decimal] = None
+    workdays_created_avg_3m: Optional[Decimal] = None
+    wages_paid_avg_3m: Optional[Decimal] = None
+    wages_per_workday: Optional[Decimal] = None
+    workdays_per_person: Optional[Decimal] = None
+    wages_per_person: Optional[Decimal] = None
+
+
 class DashboardSnapshot(BaseModel):
     """Current snapshot for dashboard"""
     current: SnapshotBase
     previous: Optional[SnapshotBase] = None
     district: DistrictListItem
     comparison: Dict[str, Optional[float]]
+    derived: Optional[DerivedMetrics] = None
 
 
 class TrendData(BaseModel):
@@ -107,6 +119,7 @@ class TrendData(BaseModel):
     wages_paid: Decimal
     payments_on_time_percent: Decimal
     works_completed: int
+    derived: Optional[DerivedMetrics] = None
 
 
 class TrendResponse(BaseModel):
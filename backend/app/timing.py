@@ -0,0 +1,236 @@
+"""
+Per-Request Timing
+SQL instrumentation, slow-query logging and the Server-Timing header
+"""
+
+import functools
+import inspect
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+
+class RequestTimings:
+    """Time spent per phase while serving one request"""
+    
+    __slots__ = ("db_queries", "db_time", "cache_time", "serialize_time", "endpoint_done_at")
+    
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_time = 0.0
+        self.serialize_time = 0.0
+        self.endpoint_done_at: Optional[float] = None
+    
+    def server_timing(self) -> str:
+        """Format the timings as a Server-Timing header value (milliseconds)"""
+        return (
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.db_queries} queries", '
+            f"cache;dur={self.cache_time * 1000:.2f}, "
+            f"serialize;dur={self.serialize_time * 1000:.2f}"
+        )
+
+
+# Shared by reference with threadpool workers, which run in a copy of the context
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in test mode when a request issues more queries than allowed"""
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Return the timings of the request being served, if any"""
+    return _current.get()
+
+
+@contextmanager
+def track_request() -> Iterator[RequestTimings]:
+    """
+    Collect timings for everything executed inside the block
+    
+    Yields:
+        RequestTimings filled in as queries, cache calls and serialization run
+    """
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[RequestTimings]:
+    """
+    Fail if the block issues more than ``limit`` SQL statements
+    
+    Intended for tests guarding routers against N+1 query regressions.
+    
+    Raises:
+        QueryBudgetExceeded: If the block ran too many queries
+    """
+    with track_request() as timings:
+        yield timings
+    if timings.db_queries > limit:
+        raise QueryBudgetExceeded(f"Expected at most {limit} queries, {timings.db_queries} were executed")
+
+
+def time_cache(func: Callable) -> Callable:
+    """Decorator adding the wrapped cache call's duration to the request's cache time"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.cache_time += time.perf_counter() - start
+    return wrapper
+
+
+# ============================================================================
+# SQLAlchemy Instrumentation
+# ============================================================================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    
+    timings = _current.get()
+    if timings is not None:
+        timings.db_queries += 1
+        timings.db_time += elapsed
+    
+    threshold = settings.slow_query_threshold_ms
+    if threshold and elapsed * 1000 >= threshold:
+        slow_query_logger.warning(
+            f"Slow query ({elapsed * 1000:.1f} ms): {statement} parameters={parameters!r}"
+        )
+
+
+def _handle_error(exception_context):
+    # The after hook never runs for a failed statement; drop its start time
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_sql(target: Any = Engine) -> None:
+    """
+    Attach query timing hooks to an engine (or every engine by default)
+    
+    Args:
+        target: Engine instance or the Engine class
+    """
+    if event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+
+
+# ============================================================================
+# Routing and Middleware
+# ============================================================================
+
+def _mark_endpoint_done(endpoint: Callable) -> Callable:
+    """Wrap an endpoint so the time it returns is recorded"""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            result = await endpoint(*args, **kwargs)
+            timings = _current.get()
+            if timings is not None:
+                timings.endpoint_done_at = time.perf_counter()
+            return result
+        return async_wrapper
+    
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        result = endpoint(*args, **kwargs)
+        timings = _current.get()
+        if timings is not None:
+            timings.endpoint_done_at = time.perf_counter()
+        return result
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that measures response serialization
+    
+    Serialization is everything between the endpoint returning and the
+    response object being ready: response_model validation, jsonable
+    encoding and rendering the JSON body.
+    """
+    
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _mark_endpoint_done(endpoint), **kwargs)
+    
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        
+        async def timed_handler(request):
+            response = await handler(request)
+            timings = _current.get()
+            if timings is not None and timings.endpoint_done_at is not None:
+                timings.serialize_time += time.perf_counter() - timings.endpoint_done_at
+            return response
+        
+        return timed_handler
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware collecting per-request timings
+    
+    Adds a Server-Timing header splitting db, cache and serialize time.
+    When ``sql_query_budget`` is set, requests issuing more queries are
+    logged, or fail with QueryBudgetExceeded when the environment is "test".
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        with track_request() as timings:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+            
+            await self.app(scope, receive, send_wrapper)
+        
+        budget = settings.sql_query_budget
+        if budget and timings.db_queries > budget:
+            message = (
+                f"{scope['method']} {scope['path']} ran {timings.db_queries} queries "
+                f"(budget {budget}); possible N+1"
+            )
+            if settings.environment == "test":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
@@ -0,0 +1,175 @@
+"""
+Cache Warmer
+Precomputes the hot cache entries so the first user of each district does
+not pay the cold-miss cost after a deploy or an ingestion run.
+
+Run manually with:
+    python -m app.warmup
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from .cache import set_cache
+from .config import get_settings
+from .database import SessionLocal
+from .models import District
+from .routers.districts import (
+    DISTRICT_CACHE_TTL,
+    LIST_CACHE_TTL,
+    STATES_CACHE_KEY,
+    build_district_snapshot,
+    build_district_trend,
+    build_districts,
+    build_states,
+    districts_cache_key,
+    snapshot_cache_key,
+    trend_cache_key,
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass
+class WarmupReport:
+    """Outcome of a cache warming run"""
+    keys_written: int = 0
+    skipped: int = 0
+    errors: int = 0
+    duration_seconds: float = 0.0
+    
+    def merge(self, other: "WarmupReport") -> None:
+        self.keys_written += other.keys_written
+        self.skipped += other.skipped
+        self.errors += other.errors
+
+
+def _store(report: WarmupReport, key: str, build: Callable, ttl: int) -> None:
+    """Build one cache entry and store it, recording the outcome"""
+    try:
+        result = build()
+    except HTTPException:
+        # No data for this district yet; nothing to cache
+        report.skipped += 1
+        return
+    except Exception as e:
+        logger.error(f"Cache warm error for key {key}: {e}")
+        report.errors += 1
+        return
+    
+    if set_cache(key, result.model_dump(), ttl=ttl):
+        report.keys_written += 1
+    else:
+        report.errors += 1
+
+
+def _warm_lists(session_factory: Callable[[], Session], states: Iterable[str]) -> WarmupReport:
+    """Warm states:all and districts:state:* entries"""
+    report = WarmupReport()
+    db = session_factory()
+    try:
+        _store(report, STATES_CACHE_KEY, lambda: build_states(db), LIST_CACHE_TTL)
+        _store(report, districts_cache_key(None), lambda: build_districts(db, None), LIST_CACHE_TTL)
+        for state in states:
+            _store(report, districts_cache_key(state), lambda: build_districts(db, state), LIST_CACHE_TTL)
+    finally:
+        db.close()
+    return report
+
+
+def _warm_district(
+    session_factory: Callable[[], Session],
+    district_code: str,
+    trend_months: Sequence[int],
+) -> WarmupReport:
+    """Warm the snapshot and trend entries for one district"""
+    report = WarmupReport()
+    db = session_factory()
+    try:
+        _store(
+            report,
+            snapshot_cache_key(district_code),
+            lambda: build_district_snapshot(db, district_code),
+            DISTRICT_CACHE_TTL,
+        )
+        for months in trend_months:
+            _store(
+                report,
+                trend_cache_key(district_code, months),
+                lambda: build_district_trend(db, district_code, months),
+                DISTRICT_CACHE_TTL,
+            )
+    finally:
+        db.close()
+    return report
+
+
+def warm_cache(
+    session_factory: Callable[[], Session] = SessionLocal,
+    concurrency: Optional[int] = None,
+    trend_months: Sequence[int] = (6, 12),
+    district_codes: Optional[List[str]] = None,
+) -> WarmupReport:
+    """
+    Precompute and store the hot cache entries for every district
+    
+    Entries are overwritten rather than skipped, so a warm run after
+    ingestion also replaces stale values.
+    
+    Args:
+        session_factory: Callable returning a new database session
+        concurrency: Maximum number of districts warmed in parallel
+            (defaults to settings.cache_warm_concurrency)
+        trend_months: Trend window sizes to precompute
+        district_codes: Restrict warming to these districts (lists are always warmed)
+        
+    Returns:
+        WarmupReport with counts and elapsed time
+    """
+    concurrency = concurrency or settings.cache_warm_concurrency
+    start = time.perf_counter()
+    report = WarmupReport()
+    
+    db = session_factory()
+    try:
+        rows = db.query(District.district_code, District.state).all()
+    finally:
+        db.close()
+    
+    states = sorted({state for _, state in rows})
+    codes = [code for code, _ in rows]
+    if district_codes is not None:
+        wanted = set(district_codes)
+        codes = [code for code in codes if code in wanted]
+    
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="cache-warm") as pool:
+        futures = [pool.submit(_warm_lists, session_factory, states)]
+        futures += [
+            pool.submit(_warm_district, session_factory, code, trend_months)
+            for code in codes
+        ]
+        for future in as_completed(futures):
+            report.merge(future.result())
+    
+    report.duration_seconds = time.perf_counter() - start
+    logger.info(
+        f"Cache warmed: {report.keys_written} keys for {len(codes)} districts in "
+        f"{report.duration_seconds:.2f}s ({report.skipped} skipped, {report.errors} errors)"
+    )
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    result = warm_cache()
+    print(
+        f"Warmed {result.keys_written} keys in {result.duration_seconds:.2f}s "
+        f"({result.skipped} skipped, {result.errors} errors)"
+    )
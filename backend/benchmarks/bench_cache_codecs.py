@@ -0,0 +1,147 @@
+"""
+Cache Codec Benchmark
+Compares encode/decode time and stored size of the cache codecs on
+realistic dashboard payloads.
+
+Run from the backend directory:
+    python -m benchmarks.bench_cache_codecs [--iterations 500]
+"""
+
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from app.cache import (
+    CODEC_NAMES,
+    CODECS,
+    COMPRESSION_NAMES,
+    COMPRESSORS,
+    COMPRESSION_NONE,
+    decode_value,
+    encode_value,
+)
+from app.schemas import (
+    DashboardSnapshot,
+    DistrictList,
+    DistrictListItem,
+    SnapshotBase,
+    TrendData,
+    TrendResponse,
+)
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+               "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def _district(i: int) -> DistrictListItem:
+    return DistrictListItem(
+        id=i,
+        state=f"State {i % 36:02d}",
+        district_name=f"District {i:03d}",
+        district_code=f"S{i % 36:02d}-D{i:03d}",
+    )
+
+
+def _snapshot(rng: random.Random, year: int, month: int) -> SnapshotBase:
+    people = rng.randint(35000, 55000)
+    workdays = people * rng.randint(18, 22)
+    return SnapshotBase(
+        year=year,
+        month=month,
+        people_benefited=people,
+        workdays_created=workdays,
+        wages_paid=Decimal(workdays * 176).quantize(Decimal("0.01")),
+        payments_on_time_percent=Decimal(str(round(rng.uniform(85, 98), 2))),
+        works_completed=rng.randint(250, 450),
+    )
+
+
+def build_payloads(seed: int = 42) -> dict:
+    """Build cache payloads shaped like the real router responses"""
+    rng = random.Random(seed)
+    
+    current = _snapshot(rng, 2025, 2)
+    previous = _snapshot(rng, 2025, 1)
+    snapshot = DashboardSnapshot(
+        current=current,
+        previous=previous,
+        district=_district(1),
+        comparison={
+            "people_benefited": 2.27,
+            "workdays_created": -1.5,
+            "wages_paid": 3.1,
+            "payments_on_time_percent": 0.45,
+            "works_completed": None,
+        },
+    )
+    
+    trends = []
+    for i in range(24):
+        point = _snapshot(rng, 2023 + i // 12, i % 12 + 1)
+        trends.append(TrendData(
+            month_year=f"{MONTH_NAMES[point.month - 1]} {point.year}",
+            people_benefited=point.people_benefited,
+            workdays_created=point.workdays_created,
+            wages_paid=point.wages_paid,
+            payments_on_time_percent=point.payments_on_time_percent,
+            works_completed=point.works_completed,
+        ))
+    trend = TrendResponse(district=_district(1), trends=trends)
+    
+    districts = [_district(i) for i in range(1, 751)]
+    district_list = DistrictList(districts=districts, total=len(districts))
+    
+    return {
+        "DashboardSnapshot": snapshot.model_dump(),
+        "TrendResponse (24m)": trend.model_dump(),
+        "DistrictList (750)": district_list.model_dump(),
+    }
+
+
+def _time_per_op(func, iterations: int) -> float:
+    """Return mean microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run(iterations: int) -> None:
+    payloads = build_payloads()
+    
+    codecs = [name for name, codec_id in CODEC_NAMES.items() if codec_id in CODECS]
+    compressions = [
+        name for name, compression_id in COMPRESSION_NAMES.items()
+        if compression_id == COMPRESSION_NONE or compression_id in COMPRESSORS
+    ]
+    
+    print("\n" + "=" * 78)
+    print("  CACHE CODEC BENCHMARK")
+    print(f"  {iterations} iterations per measurement")
+    print("=" * 78)
+    
+    for payload_name, value in payloads.items():
+        print(f"\n{payload_name}")
+        print(f"  {'codec':<10}{'compression':<14}{'encode µs':>12}{'decode µs':>12}{'bytes':>10}")
+        for codec in codecs:
+            for compression in compressions:
+                encoded = encode_value(value, codec=codec, compression=compression,
+                                       compress_threshold=0)
+                encode_us = _time_per_op(
+                    lambda: encode_value(value, codec=codec, compression=compression,
+                                         compress_threshold=0),
+                    iterations,
+                )
+                decode_us = _time_per_op(lambda: decode_value(encoded), iterations)
+                print(f"  {codec:<10}{compression:<14}{encode_us:>12.1f}{decode_us:>12.1f}"
+                      f"{len(encoded):>10}")
+    
+    print("\n" + "=" * 78 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cache codecs")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    run(args.iterations)
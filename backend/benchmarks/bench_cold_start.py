@@ -0,0 +1,135 @@
+"""
+Cold-Start Benchmark
+Measures how long a fresh API process takes from launch to its first
+responses: module import, first /health response (lifespan done) and
+first API response (lazy connections and registry load included).
+
+Run from the backend directory:
+    python -m benchmarks.bench_cold_start [--runs 5] [--database-url URL]
+
+Without --database-url a temporary SQLite database is created and seeded,
+so the numbers reflect process startup rather than network latency.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _prepare_sqlite(directory: str) -> str:
+    """Create and seed a throwaway SQLite database"""
+    url = f"sqlite:///{Path(directory) / 'cold_start.db'}"
+    script = (
+        "from app.migrate import create_schema; from app.database import engine, SessionLocal; "
+        "from app.models import District; create_schema(engine); s = SessionLocal(); "
+        "s.add_all([District(state=f'State {i % 30}', district_name=f'District {i}', "
+        "district_code=f'D-{i:04d}', latitude=20 + i / 100, longitude=80 + i / 100) for i in range(700)]); "
+        "s.commit()"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, check=True,
+                   env={**os.environ, "DATABASE_URL": url})
+    return url
+
+
+def _wait_for(client: httpx.Client, url: str, deadline: float) -> None:
+    while time.monotonic() < deadline:
+        try:
+            if client.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"{url} did not respond in time")
+
+
+def measure_import(env: dict) -> float:
+    """Seconds to import app.main in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env,
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_boot(env: dict, timeout: float = 30.0) -> tuple:
+    """
+    Launch uvicorn and time its first responses
+    
+    Returns:
+        Tuple of (seconds to first /health, seconds to first API response)
+    """
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            _wait_for(client, f"{base}/health", start + timeout)
+            health = time.monotonic() - start
+            _wait_for(client, f"{base}/api/v1/districts/states", start + timeout)
+            first_api = time.monotonic() - start
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return health, first_api
+
+
+def _summary(label: str, samples: list) -> None:
+    ms = [s * 1000 for s in samples]
+    print(f"  {label:<28}{statistics.median(ms):>10.1f}{min(ms):>10.1f}{max(ms):>10.1f}")
+
+
+def run(runs: int, database_url: str = None) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        env = {**os.environ, "PYTHONPATH": str(BACKEND_DIR), "DEBUG": "false"}
+        env["DATABASE_URL"] = database_url or _prepare_sqlite(directory)
+        
+        print("\n" + "=" * 60)
+        print("  COLD-START BENCHMARK")
+        print(f"  {runs} runs, database: {env['DATABASE_URL'].split('@')[-1]}")
+        print("=" * 60)
+        
+        imports, health, first_api = [], [], []
+        for _ in range(runs):
+            imports.append(measure_import(env))
+            boot_health, boot_api = measure_boot(env)
+            health.append(boot_health)
+            first_api.append(boot_api)
+        
+        print(f"\n  {'ms':<28}{'median':>10}{'min':>10}{'max':>10}")
+        _summary("import app.main", imports)
+        _summary("launch -> /health", health)
+        _summary("launch -> first API call", first_api)
+        print("\n" + "=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark API cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+    run(args.runs, args.database_url)
@@ -4,33 +4,48 @@ Pytest configuration and shared fixtures
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 import fakeredis
 import json
 
-from app.database import Base, get_db
-from app.cache import redis_client
+from app.database import Base, get_db, get_read_db
+from app.cache import circuit_breaker, redis_client
 from app.main import app
+from app.models import District, MGNREGASnapshot
+from app.registry import registry
 
 
 # ============================================================================
 # Database Fixtures
 # ============================================================================
 
-@pytest.fixture(scope="function")
-def db_session():
-    """In-memory SQLite database for unit tests"""
-    engine = create_engine("sqlite:///:memory:")
+@pytest.fixture
+def db_session_factory():
+    """Session factory on an in-memory SQLite database (one connection shared with the app's worker threads)"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
     Base.metadata.create_all(bind=engine)
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    session = TestingSessionLocal()
+    
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def db_session(db_session_factory):
+    """Session on the in-memory database for unit tests"""
+    session = db_session_factory()
     
     try:
         yield session
     finally:
         session.close()
-        Base.metadata.drop_all(bind=engine)
 
 
 @pytest.fixture
@@ -43,6 +58,7 @@ def client(db_session):
             db_session.close()
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     
     with TestClient(app) as test_client:
         yield test_client
@@ -50,6 +66,34 @@ def client(db_session):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def skip_startup_io(monkeypatch):
+    """Keep app startup away from the configured database; tests override get_db instead"""
+    monkeypatch.setattr('app.main.settings.district_registry_preload', False)
+    monkeypatch.setattr('app.main.settings.schema_check', "off")
+    monkeypatch.setattr('app.main.settings.db_pool_prewarm', False)
+
+
+@pytest.fixture(autouse=True)
+def reset_district_registry():
+    """Start every test with an empty district registry loaded lazily from the test database"""
+    registry.clear()
+    
+    yield registry
+    
+    registry.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_cache_breaker():
+    """Start every test with the cache circuit closed, whatever Redis errors earlier tests caused"""
+    circuit_breaker.reset()
+    
+    yield circuit_breaker
+    
+    circuit_breaker.reset()
+
+
 # ============================================================================
 # Redis Mock Fixture
 # ============================================================================
@@ -102,10 +146,10 @@ def db_with_sample_data(db_session, sample_district_data, sample_snapshot_data):
     """Database populated with sample data"""
     # Insert district
     db_session.execute(
-        """
+        text("""
         INSERT INTO districts (state, district_name, district_code, latitude, longitude)
         VALUES (:state, :name, :code, :lat, :lon)
-        """,
+        """),
         {
             "state": sample_district_data["state"],
             "name": sample_district_data["district_name"],
@@ -118,20 +162,20 @@ def db_with_sample_data(db_session, sample_district_data, sample_snapshot_data):
     
     # Get district ID
     result = db_session.execute(
-        "SELECT id FROM districts WHERE district_code = :code",
+        text("SELECT id FROM districts WHERE district_code = :code"),
         {"code": sample_district_data["district_code"]}
     )
     district_id = result.scalar()
     
     # Insert snapshot
     db_session.execute(
-        """
+        text("""
         INSERT INTO mgnrega_snapshots
-        (district_id, year, month, people_benefited, workdays_created,
+        (id, district_id, year, month, people_benefited, workdays_created,
          wages_paid, payments_on_time_percent, works_completed)
-        VALUES (:district_id, :year, :month, :people, :workdays,
+        VALUES (1, :district_id, :year, :month, :people, :workdays,
                 :wages, :payments, :works)
-        """,
+        """),
         {
             "district_id": district_id,
             "year": sample_snapshot_data["year"],
@@ -147,3 +191,25 @@ def db_with_sample_data(db_session, sample_district_data, sample_snapshot_data):
     
     yield db_session
 
+
+@pytest.fixture
+def latest_db(db_session):
+    """Two months of history for one district, as (session, district)"""
+    district = District(state="Uttar Pradesh", district_name="Lucknow", district_code="UP-LUC")
+    db_session.add(district)
+    db_session.flush()
+    db_session.add_all([
+        MGNREGASnapshot(
+            id=1, district_id=district.id, year=2025, month=1,
+            people_benefited=40000, workdays_created=800000,
+            wages_paid=140000000, payments_on_time_percent=90.0, works_completed=300
+        ),
+        MGNREGASnapshot(
+            id=2, district_id=district.id, year=2025, month=2,
+            people_benefited=45000, workdays_created=900000,
+            wages_paid=158400000, payments_on_time_percent=92.5, works_completed=350
+        ),
+    ])
+    db_session.commit()
+    
+    return db_session, district
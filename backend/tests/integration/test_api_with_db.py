@@ -4,6 +4,7 @@ These tests require a running PostgreSQL instance
 """
 
 import pytest
+from unittest.mock import patch
 
 
 class TestDistrictsAPI:
@@ -54,6 +55,15 @@ class TestDistrictsAPI:
             assert "month" in current
             assert "people_benefited" in current
     
+    def test_cache_warm_requests_are_not_counted_as_views(self, client, db_with_sample_data, mock_redis):
+        """Test the snapshot endpoint skips view counting for the ingestion cache warmer"""
+        with patch('app.routers.districts.record_district_view') as record:
+            client.get("/api/v1/districts/UP-LUC/snapshot", headers={"X-Cache-Warm": "1"})
+            record.assert_not_called()
+            
+            client.get("/api/v1/districts/UP-LUC/snapshot")
+            record.assert_called_once_with("UP-LUC")
+    
     def test_get_district_trend(self, client, db_with_sample_data):
         """Test GET /api/v1/districts/{code}/trend endpoint"""
         response = client.get("/api/v1/districts/UP-LUC/trend?months=6")
@@ -3,7 +3,21 @@ Unit tests for cache utilities
 """
 
 import pytest
-from app.cache import get_cache, set_cache, delete_cache
+from decimal import Decimal
+from app.cache import (
+    get_cache,
+    set_cache,
+    delete_cache,
+    encode_value,
+    decode_value,
+    CacheCodecError,
+    CODECS,
+    CODEC_MSGPACK,
+    COMPRESSORS,
+    COMPRESSION_LZ4,
+    HEADER_FLAG,
+    ViewCounter,
+)
 import json
 
 
@@ -77,3 +91,123 @@ class TestCacheFunctions:
         cached = get_cache(key)
         assert cached == value
 
+
+
+class TestCacheCodecs:
+    """Test codec header, compression and legacy compatibility"""
+    
+    @pytest.mark.parametrize("codec", ["json", "orjson", "msgpack"])
+    def test_codec_round_trip(self, codec):
+        """Test every codec round-trips a nested payload"""
+        value = {"districts": [{"id": 1, "name": "Lucknow"}], "total": 1}
+        
+        encoded = encode_value(value, codec=codec, compression="none")
+        
+        assert encoded[0] & HEADER_FLAG
+        assert decode_value(encoded) == value
+    
+    def test_compression_applied_above_threshold(self):
+        """Test payloads above the threshold are compressed"""
+        value = {"items": ["Uttar Pradesh"] * 500}
+        
+        small = encode_value(value, codec="json", compression="none")
+        compressed = encode_value(value, codec="json", compression="zlib", compress_threshold=100)
+        
+        assert len(compressed) < len(small)
+        assert decode_value(compressed) == value
+    
+    def test_compression_skipped_below_threshold(self):
+        """Test small payloads are stored uncompressed"""
+        value = {"test": "data"}
+        
+        plain = encode_value(value, codec="json", compression="none")
+        encoded = encode_value(value, codec="json", compression="zlib", compress_threshold=4096)
+        
+        assert encoded == plain
+    
+    @pytest.mark.skipif(COMPRESSION_LZ4 not in COMPRESSORS, reason="lz4 not installed")
+    def test_lz4_round_trip(self):
+        """Test lz4 compressed payloads decode"""
+        value = {"items": list(range(1000))}
+        
+        encoded = encode_value(value, codec="json", compression="lz4", compress_threshold=0)
+        
+        assert decode_value(encoded) == value
+    
+    @pytest.mark.skipif(CODEC_MSGPACK not in CODECS, reason="msgpack not installed")
+    def test_msgpack_preserves_decimal(self):
+        """Test msgpack keeps Decimal values exact"""
+        value = {"wages_paid": Decimal("158400000.25")}
+        
+        decoded = decode_value(encode_value(value, codec="msgpack", compression="none"))
+        
+        assert decoded["wages_paid"] == Decimal("158400000.25")
+        assert isinstance(decoded["wages_paid"], Decimal)
+    
+    def test_json_codec_serializes_decimal(self):
+        """Test JSON codecs store Decimals as exact strings"""
+        value = {"wages_paid": Decimal("92.50")}
+        
+        decoded = decode_value(encode_value(value, codec="json", compression="none"))
+        
+        assert Decimal(decoded["wages_paid"]) == Decimal("92.50")
+    
+    def test_decode_legacy_json_entry(self, mock_redis):
+        """Test entries written before the codec header are still readable"""
+        value = {"test": "legacy", "count": 3}
+        mock_redis.set("test:legacy", json.dumps(value, default=str))
+        
+        assert get_cache("test:legacy") == value
+    
+    def test_decode_unknown_codec_raises(self):
+        """Test an unknown codec id is reported instead of returning garbage"""
+        with pytest.raises(CacheCodecError):
+            decode_value(bytes((HEADER_FLAG | 0x07,)) + b"{}")
+    
+    def test_unknown_codec_name_falls_back_to_json(self):
+        """Test a misconfigured codec name falls back to stdlib JSON"""
+        value = {"test": "data"}
+        
+        encoded = encode_value(value, codec="does-not-exist", compression="none")
+        
+        assert decode_value(encoded) == value
+
+
+class TestViewCounter:
+    """Test per-district view counting for the ingestion scheduler"""
+    
+    def test_views_are_buffered_until_interval(self, mock_redis):
+        """Test views stay in process until the flush interval passes"""
+        now = [0.0]
+        counter = ViewCounter("district:views", 10.0, clock=lambda: now[0])
+        
+        counter.record("UP-LUC")
+        counter.record("UP-LUC")
+        assert mock_redis.zscore("district:views", "UP-LUC") is None
+        
+        now[0] = 10.0
+        counter.record("UP-AGR")
+        
+        assert mock_redis.zscore("district:views", "UP-LUC") == 2
+        assert mock_redis.zscore("district:views", "UP-AGR") == 1
+    
+    def test_flush_accumulates(self, mock_redis):
+        """Test successive flushes add to the stored counts"""
+        counter = ViewCounter("district:views", 60.0)
+        
+        counter.record("UP-LUC")
+        assert counter.flush() == 1
+        counter.record("UP-LUC")
+        counter.flush()
+        
+        assert mock_redis.zscore("district:views", "UP-LUC") == 2
+        assert counter.flush() == 0
+    
+    def test_flush_without_redis(self, monkeypatch):
+        """Test counts are dropped quietly when Redis is not configured"""
+        monkeypatch.setattr("app.cache.redis_client", None)
+        counter = ViewCounter("district:views", 60.0)
+        
+        counter.record("UP-LUC")
+        
+        assert counter.flush() == 0
@@ -0,0 +1,243 @@
+"""
+Unit tests for the Redis circuit breaker
+"""
+
+import socket
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from redis import ConnectionError as RedisConnectionError, Redis
+
+import app.cache as cache
+from app.cache import CircuitBreaker, get_cache, set_cache
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+    
+    def advance(self, seconds):
+        self.now += seconds
+
+
+# ============================================================================
+# Hung Redis Harness
+# ============================================================================
+
+@pytest.fixture
+def hung_redis_server():
+    """
+    Local TCP server that accepts connections and never replies,
+    standing in for a Redis that is up but unresponsive
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", 0))
+    server.listen(64)
+    server.settimeout(0.1)
+    
+    accepted = []
+    stop = threading.Event()
+    
+    def accept_loop():
+        while not stop.is_set():
+            try:
+                conn, _ = server.accept()
+                accepted.append(conn)  # hold the socket open, never answer
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+    
+    thread = threading.Thread(target=accept_loop, daemon=True)
+    thread.start()
+    
+    yield server.getsockname()
+    
+    stop.set()
+    thread.join(timeout=1)
+    for conn in accepted:
+        conn.close()
+    server.close()
+
+
+@pytest.fixture
+def hung_redis(monkeypatch, hung_redis_server):
+    """Cache layer pointed at the hung server with a fresh, sensitive breaker"""
+    host, port = hung_redis_server
+    client = Redis(host=host, port=port, socket_connect_timeout=0.05, socket_timeout=0.05)
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=3, window_seconds=10, reset_timeout=0.2)
+    
+    monkeypatch.setattr(cache, "redis_client", client)
+    monkeypatch.setattr(cache, "circuit_breaker", breaker)
+    
+    yield breaker
+    
+    client.close()
+
+
+class TestCircuitBreakerStates:
+    """Test the breaker state machine"""
+    
+    def test_stays_closed_below_min_calls(self):
+        """Test failures below min_calls do not open the circuit"""
+        breaker = CircuitBreaker(min_calls=5, clock=FakeClock())
+        
+        for _ in range(4):
+            breaker.record_failure()
+        
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow_request()
+    
+    def test_opens_at_failure_rate(self):
+        """Test the circuit opens once the failure rate reaches the threshold"""
+        breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, clock=FakeClock())
+        
+        breaker.record_success()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request()
+    
+    def test_old_outcomes_leave_window(self):
+        """Test failures older than the window are forgotten"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, window_seconds=10, clock=clock)
+        
+        for _ in range(3):
+            breaker.record_failure()
+        clock.advance(11)
+        for _ in range(3):
+            breaker.record_success()
+        breaker.record_failure()
+        
+        assert breaker.state == CircuitBreaker.CLOSED
+    
+    def test_half_open_allows_single_probe(self):
+        """Test only one probe goes through after the reset timeout"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(min_calls=1, reset_timeout=5, clock=clock)
+        breaker.record_failure()
+        
+        clock.advance(5)
+        
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+    
+    def test_successful_probe_closes(self):
+        """Test a successful half-open probe closes the circuit"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(min_calls=1, reset_timeout=5, clock=clock)
+        breaker.record_failure()
+        clock.advance(5)
+        
+        assert breaker.allow_request()
+        breaker.record_success()
+        
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow_request()
+    
+    def test_failed_probe_reopens(self):
+        """Test a failed half-open probe opens the circuit again"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(min_calls=1, reset_timeout=5, clock=clock)
+        breaker.record_failure()
+        clock.advance(5)
+        
+        assert breaker.allow_request()
+        breaker.record_failure()
+        
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request()
+
+
+class TestExecuteOutcomes:
+    """Test which Redis command outcomes reach the breaker"""
+    
+    @pytest.fixture
+    def broken_client(self, monkeypatch):
+        """Mock Redis client whose commands raise whatever a test sets"""
+        client = MagicMock()
+        monkeypatch.setattr(cache, "redis_client", client)
+        return client
+    
+    def test_non_redis_errors_are_not_successes(self, broken_client, monkeypatch):
+        """Test client errors that say nothing about Redis health do not dilute the failure rate"""
+        breaker = CircuitBreaker(failure_rate=0.5, min_calls=2, window_seconds=10, clock=FakeClock())
+        monkeypatch.setattr(cache, "circuit_breaker", breaker)
+        
+        broken_client.get.side_effect = RedisConnectionError("down")
+        get_cache("district:snapshot:UP-LUC")
+        broken_client.get.side_effect = TypeError("bad argument")
+        for _ in range(5):
+            get_cache("district:snapshot:UP-LUC")
+        broken_client.get.side_effect = RedisConnectionError("down")
+        get_cache("district:snapshot:UP-LUC")
+        
+        assert breaker.state == CircuitBreaker.OPEN
+    
+    def test_non_redis_error_does_not_close_half_open(self, broken_client, monkeypatch):
+        """Test a probe that fails outside Redis frees the slot but leaves the circuit half-open"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_rate=0.5, min_calls=1, reset_timeout=5, clock=clock)
+        monkeypatch.setattr(cache, "circuit_breaker", breaker)
+        breaker.record_failure()
+        clock.advance(6)
+        
+        broken_client.get.side_effect = TypeError("bad argument")
+        get_cache("district:snapshot:UP-LUC")
+        
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request() is True
+
+
+class TestHungRedis:
+    """Test cache behaviour against an unresponsive Redis"""
+    
+    def test_calls_fail_fast_once_open(self, hung_redis):
+        """Test the circuit opens and later calls skip Redis entirely"""
+        for _ in range(3):
+            assert get_cache("district:snapshot:UP-LUC") is None
+        
+        assert hung_redis.state == CircuitBreaker.OPEN
+        
+        start = time.perf_counter()
+        for _ in range(100):
+            assert get_cache("district:snapshot:UP-LUC") is None
+            assert set_cache("district:snapshot:UP-LUC", {"test": "data"}) is False
+        elapsed = time.perf_counter() - start
+        
+        # 200 skipped calls should cost far less than a single socket timeout each
+        assert elapsed < 0.05
+    
+    def test_timeouts_bound_each_call(self, hung_redis):
+        """Test a single call against a hung Redis is bounded by the socket timeout"""
+        start = time.perf_counter()
+        get_cache("district:snapshot:UP-LUC")
+        
+        assert time.perf_counter() - start < 0.5
+    
+    def test_recovers_after_redis_returns(self, hung_redis, monkeypatch, mock_redis):
+        """Test a half-open probe against a healthy Redis closes the circuit"""
+        monkeypatch.setattr(cache, "redis_client", Redis(
+            host="127.0.0.1", port=1, socket_connect_timeout=0.05, socket_timeout=0.05
+        ))
+        for _ in range(3):
+            get_cache("district:snapshot:UP-LUC")
+        assert hung_redis.state == CircuitBreaker.OPEN
+        
+        monkeypatch.setattr(cache, "redis_client", mock_redis)
+        time.sleep(0.25)
+        
+        assert set_cache("district:snapshot:UP-LUC", {"test": "data"}) is True
+        assert hung_redis.state == CircuitBreaker.CLOSED
+        assert get_cache("district:snapshot:UP-LUC") == {"test": "data"}
@@ -3,6 +3,7 @@ Unit tests for database utilities
 """
 
 import pytest
+from sqlalchemy import text
 
 
 class TestDatabaseOperations:
@@ -17,10 +18,10 @@ class TestDatabaseOperations:
         """Test inserting a district into database"""
         # Insert district
         db_session.execute(
-            """
+            text("""
             INSERT INTO districts (state, district_name, district_code, latitude, longitude)
             VALUES (:state, :name, :code, :lat, :lon)
-            """,
+            """),
             {
                 "state": sample_district_data["state"],
                 "name": sample_district_data["district_name"],
@@ -33,7 +34,7 @@ class TestDatabaseOperations:
         
         # Verify insertion
         result = db_session.execute(
-            "SELECT district_code, district_name FROM districts WHERE district_code = :code",
+            text("SELECT district_code, district_name FROM districts WHERE district_code = :code"),
             {"code": sample_district_data["district_code"]}
         ).fetchone()
         
@@ -45,18 +46,18 @@ class TestDatabaseOperations:
         """Test upsert logic for snapshots"""
         # Get district ID
         result = db_with_sample_data.execute(
-            "SELECT id FROM districts"
+            text("SELECT id FROM districts")
         ).fetchone()
         district_id = result[0]
         
         # Upsert same snapshot again (should not create duplicate)
         db_with_sample_data.execute(
-            """
+            text("""
             INSERT INTO mgnrega_snapshots
-            (district_id, year, month, people_benefited, workdays_created)
-            VALUES (:district_id, :year, :month, :people, :workdays)
+            (id, district_id, year, month, people_benefited, workdays_created)
+            VALUES (2, :district_id, :year, :month, :people, :workdays)
             ON CONFLICT (district_id, year, month) DO NOTHING
-            """,
+            """),
             {
                 "district_id": district_id,
                 "year": sample_snapshot_data["year"],
@@ -69,7 +70,7 @@ class TestDatabaseOperations:
         
         # Verify only one record exists
         count = db_with_sample_data.execute(
-            "SELECT COUNT(*) FROM mgnrega_snapshots"
+            text("SELECT COUNT(*) FROM mgnrega_snapshots")
         ).scalar()
         
         assert count == 1
@@ -77,7 +78,7 @@ class TestDatabaseOperations:
     def test_query_districts(self, db_with_sample_data):
         """Test querying districts from database"""
         result = db_with_sample_data.execute(
-            "SELECT COUNT(*) FROM districts"
+            text("SELECT COUNT(*) FROM districts")
         ).scalar()
         
         assert result >= 1
@@ -85,7 +86,7 @@ class TestDatabaseOperations:
     def test_query_snapshots(self, db_with_sample_data):
         """Test querying snapshots from database"""
         result = db_with_sample_data.execute(
-            "SELECT COUNT(*) FROM mgnrega_snapshots"
+            text("SELECT COUNT(*) FROM mgnrega_snapshots")
         ).scalar()
         
         assert result >= 1
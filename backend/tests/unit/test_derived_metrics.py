@@ -0,0 +1,67 @@
+"""
+Unit tests for reading precomputed derived metrics
+"""
+
+from decimal import Decimal
+
+from app.models import MGNREGADerivedMetrics
+from app.routers.districts import build_district_snapshot, build_district_trend
+
+
+def add_derived(session, district, month, **values):
+    session.add(MGNREGADerivedMetrics(district_id=district.id, year=2025, month=month, **values))
+    session.commit()
+
+
+class TestDerivedMetricsReads:
+    """Test the snapshot and trend builders with mgnrega_derived_metrics"""
+    
+    def test_snapshot_without_derived_row(self, latest_db):
+        """Test the snapshot still builds before ingestion computed derived metrics"""
+        session, _ = latest_db
+        
+        snapshot = build_district_snapshot(session, "UP-LUC")
+        
+        assert snapshot.derived is None
+        assert snapshot.comparison["people_benefited"] == 12.5
+    
+    def test_snapshot_reads_precomputed_metrics(self, latest_db):
+        """Test comparison, YoY and ratios come from the derived row instead of Python"""
+        session, district = latest_db
+        add_derived(
+            session, district, 2,
+            people_benefited_mom=Decimal("99.00"), wages_paid_yoy=Decimal("-4.25"),
+            people_benefited_avg_3m=Decimal("42500.00"), wages_per_workday=Decimal("176.00"),
+            workdays_per_person=Decimal("20.00"), wages_per_person=Decimal("3520.00"),
+        )
+        
+        snapshot = build_district_snapshot(session, "UP-LUC")
+        
+        assert snapshot.comparison["people_benefited"] == 99.0
+        assert snapshot.comparison["works_completed"] is None
+        assert snapshot.derived.year_over_year.wages_paid == -4.25
+        assert snapshot.derived.year_over_year.people_benefited is None
+        assert snapshot.derived.people_benefited_avg_3m == Decimal("42500.00")
+        assert snapshot.derived.wages_per_workday == Decimal("176.00")
+        assert snapshot.derived.wages_per_person == Decimal("3520.00")
+    
+    def test_derived_metrics_survive_the_cache_round_trip(self, latest_db):
+        """Test cached snapshots rebuild the same response"""
+        session, district = latest_db
+        add_derived(session, district, 2, wages_paid_yoy=Decimal("3.10"), wages_per_workday=Decimal("176.00"))
+        
+        snapshot = build_district_snapshot(session, "UP-LUC")
+        
+        assert type(snapshot)(**snapshot.model_dump()) == snapshot
+    
+    def test_trend_joins_derived_rows(self, latest_db):
+        """Test each trend point carries its month's derived metrics, or None"""
+        session, district = latest_db
+        add_derived(session, district, 2, people_benefited_mom=Decimal("12.50"),
+                    wages_per_workday=Decimal("176.00"))
+        
+        trend = build_district_trend(session, "UP-LUC", 6)
+        
+        assert [point.month_year for point in trend.trends] == ["Jan 2025", "Feb 2025"]
+        assert trend.trends[0].derived is None
+        assert trend.trends[1].derived.wages_per_workday == Decimal("176.00")
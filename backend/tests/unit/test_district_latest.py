@@ -0,0 +1,100 @@
+"""
+Unit tests for snapshot reads through the district_latest table
+"""
+
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import District, DistrictLatest, MGNREGASnapshot, MGNREGASnapshotRaw
+from app.routers.districts import build_district_snapshot
+
+
+class TestDistrictLatestReads:
+    """Test the dashboard snapshot builder"""
+    
+    def test_falls_back_to_history_without_latest_row(self, latest_db):
+        """Test snapshot is computed from history before the table is backfilled"""
+        session, _ = latest_db
+        
+        snapshot = build_district_snapshot(session, "UP-LUC")
+        
+        assert snapshot.current.month == 2
+        assert snapshot.previous.month == 1
+        assert snapshot.comparison["people_benefited"] == 12.5
+    
+    def test_reads_precomputed_latest_row(self, latest_db):
+        """Test snapshot and comparison come from district_latest when present"""
+        session, district = latest_db
+        session.add(DistrictLatest(
+            district_id=district.id, year=2025, month=2,
+            people_benefited=45000, workdays_created=900000,
+            wages_paid=158400000, payments_on_time_percent=92.5, works_completed=350,
+            prev_year=2025, prev_month=1,
+            prev_people_benefited=40000, prev_workdays_created=800000,
+            prev_wages_paid=140000000, prev_payments_on_time_percent=90.0,
+            prev_works_completed=300,
+            people_benefited_change=Decimal("12.50"), workdays_created_change=Decimal("12.50"),
+            wages_paid_change=Decimal("13.14"), payments_on_time_percent_change=Decimal("2.78"),
+            works_completed_change=Decimal("16.67"),
+        ))
+        session.commit()
+        
+        from_latest = build_district_snapshot(session, "UP-LUC")
+        session.query(DistrictLatest).delete()
+        session.commit()
+        from_history = build_district_snapshot(session, "UP-LUC")
+        
+        assert from_latest.current == from_history.current
+        assert from_latest.previous == from_history.previous
+        assert from_latest.comparison == from_history.comparison
+    
+    def test_missing_district_returns_404(self, latest_db):
+        """Test unknown district codes raise 404"""
+        session, _ = latest_db
+        
+        with pytest.raises(HTTPException) as exc_info:
+            build_district_snapshot(session, "XX-NONE")
+        
+        assert exc_info.value.status_code == 404
+
+
+
+class TestSnapshotRawPayload:
+    """Test raw payloads kept in mgnrega_snapshot_raw"""
+    
+    def test_raw_json_is_loaded_on_access(self, latest_db):
+        """Test snapshot queries leave the payload unloaded until it is read"""
+        session, district = latest_db
+        district_id = district.id
+        snapshot = session.query(MGNREGASnapshot).filter_by(district_id=district_id, month=2).one()
+        snapshot.raw_json = {"source": "test", "month": 2}
+        session.commit()
+        session.expunge_all()
+        
+        snapshot = session.query(MGNREGASnapshot).filter_by(district_id=district_id, month=2).one()
+        
+        assert "raw" not in snapshot.__dict__
+        assert snapshot.raw_json == {"source": "test", "month": 2}
+        assert (snapshot.raw.snapshot_id, snapshot.raw.snapshot_year) == (snapshot.id, 2025)
+    
+    def test_snapshot_without_payload(self, latest_db):
+        """Test raw_json is None when no payload was stored"""
+        session, district = latest_db
+        snapshot = session.query(MGNREGASnapshot).filter_by(district_id=district.id, month=1).one()
+        
+        assert snapshot.raw is None
+        assert snapshot.raw_json is None
+    
+    def test_payload_deleted_with_snapshot(self, latest_db):
+        """Test deleting a snapshot removes its payload"""
+        session, district = latest_db
+        snapshot = session.query(MGNREGASnapshot).filter_by(district_id=district.id, month=2).one()
+        snapshot.raw_json = {"source": "test"}
+        session.commit()
+        
+        session.delete(snapshot)
+        session.commit()
+        
+        assert session.query(MGNREGASnapshotRaw).count() == 0
@@ -0,0 +1,159 @@
+"""
+Unit tests for local caches and cross-process invalidation
+"""
+
+import time
+
+import fakeredis
+import pytest
+
+import app.cache as cache
+from app.cache import get_cache, set_cache, delete_cache, publish_invalidation
+from app.invalidation import (
+    InvalidationListener,
+    LocalCache,
+    add_invalidation_callback,
+    build_invalidation_message,
+    evict_local,
+    parse_invalidation_message,
+    register_local_cache,
+)
+
+
+@pytest.fixture
+def l1_enabled(monkeypatch):
+    """Enable the L1 response cache for one test"""
+    monkeypatch.setattr(cache.settings, "l1_cache_enabled", True)
+    cache.response_cache.clear()
+    yield cache.response_cache
+    cache.response_cache.clear()
+
+
+class TestLocalCache:
+    """Test the in-process LRU/TTL cache"""
+    
+    def test_set_and_get(self):
+        """Test values round-trip"""
+        local = LocalCache("test", max_entries=10, ttl=60)
+        local.set("district:snapshot:UP-LUC", {"test": "data"})
+        
+        assert local.get("district:snapshot:UP-LUC") == {"test": "data"}
+    
+    def test_entries_expire(self):
+        """Test entries past their TTL are not returned"""
+        local = LocalCache("test", ttl=60)
+        local.set("key", "value", ttl=0.01)
+        time.sleep(0.02)
+        
+        assert local.get("key") is None
+    
+    def test_lru_eviction(self):
+        """Test the least recently used entry is dropped at capacity"""
+        local = LocalCache("test", max_entries=2)
+        local.set("a", 1)
+        local.set("b", 2)
+        local.get("a")
+        local.set("c", 3)
+        
+        assert local.get("a") == 1
+        assert local.get("b") is None
+        assert local.get("c") == 3
+    
+    def test_evict_glob_pattern(self):
+        """Test glob patterns evict matching keys only"""
+        local = LocalCache("test")
+        local.set("district:trend:UP-LUC:6", 1)
+        local.set("district:trend:UP-LUC:12", 2)
+        local.set("district:trend:UP-AGR:6", 3)
+        
+        removed = local.evict("district:trend:UP-LUC:*")
+        
+        assert removed == 2
+        assert local.get("district:trend:UP-AGR:6") == 3
+
+
+class TestInvalidationMessages:
+    """Test invalidation event encoding and fan-out"""
+    
+    def test_message_round_trip(self):
+        """Test patterns survive encoding"""
+        message = build_invalidation_message(["district:snapshot:UP-LUC"])
+        
+        assert parse_invalidation_message(message.encode()) == ["district:snapshot:UP-LUC"]
+    
+    def test_malformed_message_ignored(self):
+        """Test malformed payloads yield no patterns"""
+        assert parse_invalidation_message(b"not json") == []
+    
+    def test_evict_local_reaches_registered_caches_and_callbacks(self):
+        """Test evict_local applies to caches and callbacks"""
+        local = register_local_cache(LocalCache("test-registered"))
+        local.set("district:snapshot:UP-LUC", 1)
+        received = []
+        add_invalidation_callback(received.append)
+        
+        evict_local(["district:snapshot:*"])
+        
+        assert local.get("district:snapshot:UP-LUC") is None
+        assert ["district:snapshot:*"] in received
+
+
+class TestL1ResponseCache:
+    """Test the L1 layer in front of Redis"""
+    
+    def test_l1_serves_without_redis(self, mock_redis, l1_enabled):
+        """Test a value set through the cache is served from L1"""
+        set_cache("district:snapshot:UP-LUC", {"test": "data"})
+        mock_redis.flushall()
+        
+        assert get_cache("district:snapshot:UP-LUC") == {"test": "data"}
+    
+    def test_delete_evicts_l1(self, mock_redis, l1_enabled):
+        """Test deleting a key also evicts it from L1"""
+        set_cache("district:snapshot:UP-LUC", {"test": "data"})
+        
+        delete_cache("district:snapshot:UP-LUC")
+        
+        assert get_cache("district:snapshot:UP-LUC") is None
+
+
+class TestInvalidationListener:
+    """Test the pub/sub subscriber"""
+    
+    def test_listener_evicts_on_published_event(self, monkeypatch, l1_enabled):
+        """Test an event published by another process evicts local entries"""
+        server = fakeredis.FakeServer()
+        publisher = fakeredis.FakeStrictRedis(server=server)
+        monkeypatch.setattr(cache, "redis_client", publisher)
+        listener = InvalidationListener(
+            "redis://unused",
+            "cache:invalidate",
+            poll_timeout=0.01,
+            client_factory=lambda: fakeredis.FakeStrictRedis(server=server),
+        )
+        listener.start()
+        try:
+            assert listener.subscribed.wait(timeout=2)
+            l1_enabled.set("district:trend:UP-LUC:6", {"test": "data"})
+            
+            publisher.publish("cache:invalidate", build_invalidation_message(["district:trend:UP-LUC:*"]))
+            
+            deadline = time.monotonic() + 2
+            while l1_enabled.get("district:trend:UP-LUC:6") is not None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert l1_enabled.get("district:trend:UP-LUC:6") is None
+        finally:
+            listener.stop()
+    
+    def test_publish_invalidation_reaches_channel(self, mock_redis):
+        """Test publish_invalidation sends the event on the configured channel"""
+        pubsub = mock_redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(cache.settings.invalidation_channel)
+        
+        assert publish_invalidation(["district:snapshot:UP-LUC"]) is True
+        
+        message = None
+        deadline = time.monotonic() + 1
+        while message is None and time.monotonic() < deadline:
+            message = pubsub.get_message(timeout=0.05)
+        assert parse_invalidation_message(message["data"]) == ["district:snapshot:UP-LUC"]
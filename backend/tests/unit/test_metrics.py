@@ -0,0 +1,66 @@
+"""
+Unit tests for Prometheus metrics
+"""
+
+import pytest
+from app.cache import get_cache, set_cache
+from app.metrics import CACHE_LOOKUPS, cache_key_family
+
+
+def _sample(counter, *labels):
+    """Read the current value of a labelled counter"""
+    return counter.labels(*labels)._value.get()
+
+
+class TestCacheKeyFamily:
+    """Test cache key family mapping"""
+    
+    @pytest.mark.parametrize("key,family", [
+        ("districts:state:all", "districts:state"),
+        ("district:snapshot:UP-LUC", "district:snapshot"),
+        ("district:trend:UP-LUC:6", "district:trend"),
+        ("states:all", "states"),
+        ("something:else", "other"),
+    ])
+    def test_cache_key_family(self, key, family):
+        """Test keys map to their family label"""
+        assert cache_key_family(key) == family
+
+
+class TestCacheMetrics:
+    """Test cache hit/miss counters"""
+    
+    def test_cache_miss_then_hit_counted(self, mock_redis):
+        """Test a miss followed by a hit increments both counters"""
+        key = "district:snapshot:UP-TEST"
+        misses = _sample(CACHE_LOOKUPS, "district:snapshot", "miss")
+        hits = _sample(CACHE_LOOKUPS, "district:snapshot", "hit")
+        
+        get_cache(key)
+        set_cache(key, {"test": "data"})
+        get_cache(key)
+        
+        assert _sample(CACHE_LOOKUPS, "district:snapshot", "miss") == misses + 1
+        assert _sample(CACHE_LOOKUPS, "district:snapshot", "hit") == hits + 1
+
+
+class TestMetricsEndpoint:
+    """Test /metrics endpoint"""
+    
+    def test_metrics_endpoint_prometheus_format(self, client):
+        """Test /metrics returns Prometheus text format"""
+        client.get("/health")
+        response = client.get("/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "http_request_duration_seconds" in response.text
+        assert "db_pool_connections_in_use" in response.text
+    
+    def test_route_template_used_as_label(self, client):
+        """Test latency is labelled with the route template, not the raw path"""
+        client.get("/api/v1/districts/UP-NOPE/snapshot")
+        response = client.get("/metrics")
+        
+        assert 'route="/api/v1/districts/{district_code}/snapshot"' in response.text
+        assert "UP-NOPE" not in response.text
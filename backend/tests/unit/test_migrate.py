@@ -0,0 +1,109 @@
+"""
+Unit tests for the schema migration command and startup schema check
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect
+
+import app.main as main
+from app.migrate import (
+    SCHEMA_VERSION,
+    SchemaVersionError,
+    apply_migrations,
+    check_schema_version,
+    create_schema,
+    current_schema_version,
+    main as migrate_main,
+    pending_migrations,
+)
+
+
+@pytest.fixture
+def empty_engine(tmp_path):
+    """Empty file-backed SQLite database"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    yield engine
+    engine.dispose()
+
+
+class TestMigrateCommand:
+    """Test schema creation and version checks"""
+    
+    def test_create_schema_creates_tables_and_stamps_version(self, empty_engine):
+        """Test create builds every ORM table and records the current version"""
+        created = create_schema(empty_engine)
+        
+        assert "districts" in created
+        assert "district_latest" in inspect(empty_engine).get_table_names()
+        assert current_schema_version(empty_engine) == SCHEMA_VERSION
+        assert check_schema_version(empty_engine) == (SCHEMA_VERSION, SCHEMA_VERSION)
+    
+    def test_create_schema_is_idempotent(self, empty_engine):
+        """Test running create twice creates nothing the second time"""
+        create_schema(empty_engine)
+        
+        assert create_schema(empty_engine) == []
+    
+    def test_check_fails_without_schema(self, empty_engine):
+        """Test an unmigrated database is reported as behind"""
+        assert current_schema_version(empty_engine) is None
+        with pytest.raises(SchemaVersionError):
+            check_schema_version(empty_engine)
+    
+    def test_pending_migrations_skips_applied(self, tmp_path):
+        """Test only numbered files newer than the current version are pending"""
+        for name in ("001_first.sql", "002_second.sql", "003_third.sql", "notes.sql"):
+            (tmp_path / name).write_text("SELECT 1;")
+        
+        pending = pending_migrations(tmp_path, current=1)
+        
+        assert [version for version, _ in pending] == [2, 3]
+        assert len(pending_migrations(tmp_path, current=None)) == 3
+    
+    def test_apply_on_unversioned_database(self, empty_engine, tmp_path):
+        """Test migrations run and are stamped on a database without schema_migrations"""
+        directory = tmp_path / "migrations"
+        directory.mkdir()
+        (directory / "001_districts.sql").write_text("CREATE TABLE IF NOT EXISTS districts (id INTEGER PRIMARY KEY)")
+        (directory / "002_snapshots.sql").write_text("CREATE TABLE IF NOT EXISTS snapshots (id INTEGER PRIMARY KEY)")
+        
+        assert apply_migrations(directory, empty_engine) == [1, 2]
+        assert current_schema_version(empty_engine) == 2
+        assert apply_migrations(directory, empty_engine) == []
+    
+    def test_check_command_exit_code(self, empty_engine, monkeypatch):
+        """Test `check` exits non-zero until the schema is created"""
+        import app.migrate as migrate
+        monkeypatch.setattr(migrate, "engine", empty_engine)
+        
+        assert migrate_main(["check"]) == 1
+        assert migrate_main(["create"]) == 0
+        assert migrate_main(["check"]) == 0
+
+
+class TestStartupSchemaCheck:
+    """Test the lifespan schema check modes"""
+    
+    def test_strict_mode_refuses_old_schema(self, monkeypatch):
+        """Test the app does not start when the schema is behind in strict mode"""
+        def behind():
+            raise SchemaVersionError("behind")
+        
+        monkeypatch.setattr("app.migrate.check_schema_version", behind)
+        monkeypatch.setattr(main.settings, "schema_check", "strict")
+        
+        with pytest.raises(SchemaVersionError):
+            with TestClient(main.app):
+                pass
+    
+    def test_warn_mode_starts_anyway(self, monkeypatch):
+        """Test the app still serves when the schema check fails in warn mode"""
+        def behind():
+            raise SchemaVersionError("behind")
+        
+        monkeypatch.setattr("app.migrate.check_schema_version", behind)
+        monkeypatch.setattr(main.settings, "schema_check", "warn")
+        
+        with TestClient(main.app) as client:
+            assert client.get("/health").status_code == 200
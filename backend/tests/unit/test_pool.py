@@ -0,0 +1,118 @@
+"""
+Unit tests for connection pool pre-warming, staleness checks and pool metrics
+"""
+
+import pytest
+from sqlalchemy import text
+
+from app.database import StalenessCheck, create_pooled_engine, prewarm_pool
+from app.metrics import DB_POOL_IDLE, DB_POOL_IN_USE, DB_POOL_SIZE, DB_POOL_STALE_PINGS
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+def _pings(label, result):
+    """Read the stale-ping counter for a pool and result"""
+    return DB_POOL_STALE_PINGS.labels(label, result)._value.get()
+
+
+@pytest.fixture
+def pooled_engine(tmp_path):
+    """Instrumented engine on a file-backed SQLite database"""
+    engine = create_pooled_engine(f"sqlite:///{tmp_path / 'pool.db'}", label="test")
+    yield engine
+    engine.dispose()
+
+
+class TestPrewarm:
+    """Test concurrent pool pre-warming"""
+    
+    def test_prewarm_opens_pool_size_connections(self, pooled_engine):
+        """Test pre-warming leaves pool_size idle connections in the pool"""
+        opened = prewarm_pool(pooled_engine)
+        
+        assert opened == pooled_engine.pool.size()
+        assert pooled_engine.pool.checkedin() == opened
+        assert pooled_engine.pool.checkedout() == 0
+    
+    def test_prewarm_tolerates_connection_errors(self, tmp_path):
+        """Test a database that cannot be reached is reported, not raised"""
+        engine = create_pooled_engine(f"sqlite:///{tmp_path / 'missing' / 'pool.db'}", label="broken")
+        
+        assert prewarm_pool(engine, connections=3) == 0
+        engine.dispose()
+
+
+class TestStalenessCheck:
+    """Test idle-time based liveness pings"""
+    
+    def test_recently_used_connection_not_pinged(self, pooled_engine):
+        """Test checkouts of fresh connections skip the ping"""
+        before = _pings("test", "ok")
+        
+        for _ in range(3):
+            with pooled_engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        
+        assert _pings("test", "ok") == before
+    
+    def test_idle_connection_pinged(self, tmp_path):
+        """Test a connection idle past the limit is pinged on checkout"""
+        clock = FakeClock()
+        engine = create_pooled_engine(f"sqlite:///{tmp_path / 'idle.db'}", label="idle")
+        StalenessCheck("idle", stale_after=30.0, clock=clock).attach(engine)
+        with engine.connect():
+            pass
+        before = _pings("idle", "ok")
+        
+        clock.now += 31.0
+        with engine.connect():
+            pass
+        
+        assert _pings("idle", "ok") == before + 1
+        engine.dispose()
+    
+    def test_failed_ping_replaces_connection(self, tmp_path):
+        """Test a dead idle connection is discarded and a new one is opened"""
+        clock = FakeClock()
+        engine = create_pooled_engine(f"sqlite:///{tmp_path / 'dead.db'}", label="dead")
+        StalenessCheck("dead", stale_after=30.0, clock=clock).attach(engine)
+        with engine.connect() as conn:
+            first = conn.connection.dbapi_connection
+        first.close()  # simulate the server dropping the idle connection
+        failed = _pings("dead", "failed")
+        
+        clock.now += 31.0
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+            assert conn.connection.dbapi_connection is not first
+        
+        assert _pings("dead", "failed") == failed + 1
+        engine.dispose()
+
+
+class TestPoolMetrics:
+    """Test pool gauges follow the pool"""
+    
+    def test_gauges_track_checkouts(self, pooled_engine):
+        """Test size, in-use and idle gauges are sampled from the pool"""
+        def sample(gauge):
+            return next(
+                s.value for metric in gauge.collect() for s in metric.samples
+                if s.labels.get("pool") == "test"
+            )
+        
+        with pooled_engine.connect():
+            assert sample(DB_POOL_IN_USE) == 1
+            assert sample(DB_POOL_SIZE) == pooled_engine.pool.size()
+        
+        assert sample(DB_POOL_IN_USE) == 0
+        assert sample(DB_POOL_IDLE) == 1
@@ -0,0 +1,108 @@
+"""
+Unit tests for the in-memory district registry
+"""
+
+import pytest
+
+from app.invalidation import evict_local
+from app.models import District
+from app.registry import DistrictRegistry, MISS_RECHECK_INTERVAL, registry
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def registry_db(db_session):
+    """Three districts in two states"""
+    db_session.add_all([
+        District(state="Uttar Pradesh", district_name="Lucknow", district_code="UP-LUC",
+                 latitude=26.8467, longitude=80.9462),
+        District(state="Uttar Pradesh", district_name="Agra", district_code="UP-AGR"),
+        District(state="Bihar", district_name="Patna", district_code="BR-PAT"),
+    ])
+    db_session.commit()
+    
+    return db_session
+
+
+class TestDistrictRegistry:
+    """Test lookups and refresh behaviour"""
+    
+    def test_indexes(self, registry_db):
+        """Test lookups by code, id and state"""
+        reg = DistrictRegistry()
+        
+        lucknow = reg.get(registry_db, "UP-LUC")
+        
+        assert lucknow.district_name == "Lucknow"
+        assert lucknow.latitude == pytest.approx(26.8467)
+        assert reg.get_by_id(registry_db, lucknow.id) is lucknow
+        assert [d.district_code for d in reg.districts(registry_db, "uttar pradesh")] == ["UP-AGR", "UP-LUC"]
+        assert reg.states(registry_db) == [("Bihar", 1), ("Uttar Pradesh", 2)]
+        assert lucknow.list_item.district_code == "UP-LUC"
+    
+    def test_records_use_slots(self, registry_db):
+        """Test records carry no per-instance __dict__"""
+        record = DistrictRegistry().get(registry_db, "BR-PAT")
+        
+        assert not hasattr(record, "__dict__")
+    
+    def test_periodic_version_check_reloads(self, registry_db):
+        """Test new districts appear after the check interval"""
+        clock = FakeClock()
+        reg = DistrictRegistry(check_interval=60.0, clock=clock)
+        reg.districts(registry_db)
+        registry_db.add(District(state="Bihar", district_name="Gaya", district_code="BR-GAY"))
+        registry_db.commit()
+        
+        assert len(reg.districts(registry_db)) == 3
+        
+        clock.now += 60.0
+        assert len(reg.districts(registry_db)) == 4
+    
+    def test_periodic_version_check_sees_updates(self, registry_db):
+        """Test edits to existing districts appear after the check interval"""
+        clock = FakeClock()
+        reg = DistrictRegistry(check_interval=60.0, clock=clock)
+        reg.districts(registry_db)
+        agra = registry_db.query(District).filter_by(district_code="UP-AGR").one()
+        agra.latitude, agra.longitude = 27.1767, 78.0081
+        registry_db.commit()
+        
+        assert reg.get(registry_db, "UP-AGR").latitude is None
+        
+        clock.now += 60.0
+        assert reg.get(registry_db, "UP-AGR").latitude == pytest.approx(27.1767)
+    
+    def test_unknown_code_triggers_recheck(self, registry_db):
+        """Test a miss re-checks the version before returning None"""
+        clock = FakeClock()
+        reg = DistrictRegistry(check_interval=60.0, clock=clock)
+        reg.districts(registry_db)
+        registry_db.add(District(state="Bihar", district_name="Gaya", district_code="BR-GAY"))
+        registry_db.commit()
+        
+        clock.now += MISS_RECHECK_INTERVAL
+        
+        assert reg.get(registry_db, "BR-GAY") is not None
+        assert reg.get(registry_db, "XX-NONE") is None
+    
+    def test_invalidation_event_marks_stale(self, registry_db):
+        """Test district list invalidations reload the shared registry"""
+        registry.districts(registry_db)
+        registry_db.add(District(state="Bihar", district_name="Gaya", district_code="BR-GAY"))
+        registry_db.commit()
+        
+        evict_local(["district:snapshot:UP-LUC"])
+        assert len(registry.districts(registry_db)) == 3
+        
+        evict_local(["districts:*", "states:*"])
+        assert len(registry.districts(registry_db)) == 4
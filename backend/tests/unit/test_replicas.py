@@ -0,0 +1,158 @@
+"""
+Unit tests for read-replica routing
+"""
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+import app.database as database
+from app.database import Base, PRIMARY_STICKY_COOKIE, ReplicaRouter, get_db
+from app.models import District
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+def _sqlite_url(tmp_path, name):
+    """File-backed SQLite database with the schema created"""
+    url = f"sqlite:///{tmp_path / name}.db"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def replica_urls(tmp_path):
+    return [_sqlite_url(tmp_path, "replica0"), _sqlite_url(tmp_path, "replica1")]
+
+
+@pytest.fixture
+def routed_app(tmp_path, replica_urls, clock, monkeypatch):
+    """Tiny app whose get_db routes between a SQLite primary and two replicas"""
+    primary_engine = create_engine(_sqlite_url(tmp_path, "primary"))
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=primary_engine))
+    router = ReplicaRouter(replica_urls, health_check_interval=5.0, clock=clock)
+    monkeypatch.setattr(database, "replica_router", router)
+    
+    app = FastAPI()
+    
+    @app.get("/which")
+    def which(db: Session = Depends(get_db)):
+        return {"database": db.get_bind().url.database}
+    
+    @app.post("/districts")
+    def create(db: Session = Depends(get_db)):
+        db.add(District(state="Bihar", district_name="Patna", district_code="BR-PAT"))
+        db.commit()
+        return {"database": db.get_bind().url.database}
+    
+    yield app, router
+    
+    router.dispose()
+    primary_engine.dispose()
+
+
+class TestReplicaRouter:
+    """Test replica selection and health checks"""
+    
+    def test_no_replicas_returns_none(self):
+        """Test routing falls back to the primary when nothing is configured"""
+        assert ReplicaRouter([]).choose() is None
+    
+    def test_round_robin(self, replica_urls, clock):
+        """Test replicas are picked in turn"""
+        router = ReplicaRouter(replica_urls, clock=clock)
+        
+        names = [router.choose().name for _ in range(4)]
+        
+        assert names == ["replica0", "replica1", "replica0", "replica1"]
+        router.dispose()
+    
+    def test_unhealthy_replica_skipped_until_next_check(self, replica_urls, clock):
+        """Test a failed replica leaves rotation and returns after the interval"""
+        router = ReplicaRouter(replica_urls, health_check_interval=5.0, clock=clock)
+        router.mark_unhealthy(router.replicas[0])
+        
+        assert {router.choose().name for _ in range(4)} == {"replica1"}
+        
+        clock.now += 5.0
+        assert {router.choose().name for _ in range(4)} == {"replica0", "replica1"}
+        router.dispose()
+    
+    def test_failed_health_check_falls_back_to_primary(self, tmp_path, clock):
+        """Test None is returned when every replica fails its probe"""
+        missing = f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+        router = ReplicaRouter([missing], clock=clock)
+        
+        assert router.choose() is None
+        assert router.replicas[0].healthy is False
+        router.dispose()
+
+
+class TestSessionRouting:
+    """Test get_db routing by request method and stickiness"""
+    
+    def test_get_uses_replica(self, routed_app):
+        """Test GET requests are served by a replica"""
+        app, _ = routed_app
+        
+        with TestClient(app) as client:
+            response = client.get("/which")
+        
+        assert response.json()["database"].endswith("replica0.db")
+    
+    def test_write_uses_primary_and_pins_client(self, routed_app, monkeypatch):
+        """Test writes go to the primary and later reads stay there"""
+        monkeypatch.setattr(database.settings, "read_your_writes_seconds", 5.0)
+        app, _ = routed_app
+        
+        with TestClient(app) as client:
+            write = client.post("/districts")
+            read = client.get("/which")
+        
+        assert write.json()["database"].endswith("primary.db")
+        assert PRIMARY_STICKY_COOKIE in write.cookies
+        assert read.json()["database"].endswith("primary.db")
+    
+    def test_stickiness_disabled(self, routed_app, monkeypatch):
+        """Test no cookie is set when read-your-writes is turned off"""
+        monkeypatch.setattr(database.settings, "read_your_writes_seconds", 0)
+        app, _ = routed_app
+        
+        with TestClient(app) as client:
+            write = client.post("/districts")
+            read = client.get("/which")
+        
+        assert PRIMARY_STICKY_COOKIE not in write.cookies
+        assert read.json()["database"].endswith("replica0.db")
+    
+    def test_connection_error_marks_replica_unhealthy(self, routed_app):
+        """Test a replica that drops connections is taken out of rotation"""
+        app, router = routed_app
+        
+        @app.get("/broken")
+        def broken(db: Session = Depends(get_db)):
+            raise OperationalError("SELECT 1", {}, Exception("server closed the connection"),
+                                   connection_invalidated=True)
+        
+        with TestClient(app, raise_server_exceptions=False) as client:
+            client.get("/broken")
+        
+        assert router.replicas[0].healthy is False
@@ -0,0 +1,163 @@
+"""
+Unit tests for SQL instrumentation and the Server-Timing header
+"""
+
+import logging
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import app.timing as timing
+from app.database import get_db, get_read_db
+from app.main import app
+from app.models import District, MGNREGASnapshot
+from app.registry import registry
+from app.timing import QueryBudgetExceeded, assert_max_queries
+
+
+def _query_count(response) -> int:
+    """Read the query count from the db entry of the Server-Timing header"""
+    match = re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response.headers["server-timing"])
+    return int(match.group(1))
+
+
+@pytest.fixture
+def timed_client(db_session_factory, mock_redis):
+    """Test client whose routes use the in-memory database"""
+    def override_get_db():
+        db = db_session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+def _add_districts(session_factory, count, start=0):
+    """Insert districts, each with two months of data"""
+    session = session_factory()
+    for index in range(start, start + count):
+        district = District(
+            state="Bihar", district_name=f"District {index}", district_code=f"BR-{index:03d}",
+            latitude=25.0 + index / 100, longitude=85.0 + index / 100
+        )
+        session.add(district)
+        session.flush()
+        for month in (1, 2):
+            session.add(MGNREGASnapshot(
+                id=index * 12 + month, district_id=district.id, year=2025, month=month,
+                people_benefited=1000, workdays_created=20000, wages_paid=5000000,
+                payments_on_time_percent=90.0, works_completed=10
+            ))
+    session.commit()
+    session.close()
+
+
+class TestQueryCounting:
+    """Test per-block query counting"""
+    
+    def test_assert_max_queries_counts_statements(self, db_session_factory):
+        """Test statements inside the block are counted and timed"""
+        session = db_session_factory()
+        
+        with assert_max_queries(2) as timings:
+            session.execute(text("SELECT 1"))
+            session.execute(text("SELECT 2"))
+        
+        assert timings.db_queries == 2
+        assert timings.db_time > 0
+        session.close()
+    
+    def test_assert_max_queries_fails_over_budget(self, db_session_factory):
+        """Test exceeding the budget raises"""
+        session = db_session_factory()
+        
+        with pytest.raises(QueryBudgetExceeded):
+            with assert_max_queries(1):
+                session.execute(text("SELECT 1"))
+                session.execute(text("SELECT 2"))
+        session.close()
+    
+    def test_slow_query_logged_with_parameters(self, db_session_factory, monkeypatch, caplog):
+        """Test statements above the threshold are logged with their parameters"""
+        monkeypatch.setattr(timing.settings, "slow_query_threshold_ms", 1e-6)
+        session = db_session_factory()
+        
+        with caplog.at_level(logging.WARNING, logger="app.sql.slow"):
+            session.execute(text("SELECT :value"), {"value": 42})
+        
+        assert any("Slow query" in r.message and "42" in r.message for r in caplog.records)
+        session.close()
+
+
+class TestServerTiming:
+    """Test the Server-Timing header and N+1 guard"""
+    
+    def test_header_splits_db_cache_serialize(self, timed_client, db_session_factory):
+        """Test API responses carry db, cache and serialize timings"""
+        _add_districts(db_session_factory, 1)
+        
+        response = timed_client.get("/api/v1/districts/BR-000/snapshot")
+        
+        header = response.headers["server-timing"]
+        assert response.status_code == 200
+        for name in ("db", "cache", "serialize"):
+            assert re.search(rf"\b{name};dur=\d+\.\d+", header)
+        assert _query_count(response) > 0
+    
+    def test_cache_hit_runs_no_queries(self, timed_client, db_session_factory):
+        """Test a cached response does not touch the database"""
+        _add_districts(db_session_factory, 1)
+        
+        timed_client.get("/api/v1/districts")
+        response = timed_client.get("/api/v1/districts")
+        
+        assert _query_count(response) == 0
+    
+    @pytest.mark.parametrize("method,path,body", [
+        ("GET", "/api/v1/districts", None),
+        ("GET", "/api/v1/districts/states", None),
+        ("POST", "/api/v1/geolocate", {"latitude": 25.0, "longitude": 85.0}),
+    ])
+    def test_query_count_independent_of_row_count(
+        self, timed_client, db_session_factory, mock_redis, method, path, body
+    ):
+        """Test list endpoints don't issue a query per district (N+1)"""
+        _add_districts(db_session_factory, 2)
+        few = timed_client.request(method, path, json=body)
+        
+        mock_redis.flushall()
+        _add_districts(db_session_factory, 8, start=2)
+        registry.mark_stale()
+        many = timed_client.request(method, path, json=body)
+        
+        assert few.status_code == many.status_code == 200
+        assert _query_count(few) > 0
+        assert _query_count(few) == _query_count(many)
+    
+    def test_query_budget_enforced_in_test_mode(self, timed_client, db_session_factory, monkeypatch):
+        """Test exceeding sql_query_budget fails the request when environment is test"""
+        monkeypatch.setattr(timing.settings, "sql_query_budget", 1)
+        monkeypatch.setattr(timing.settings, "environment", "test")
+        _add_districts(db_session_factory, 1)
+        
+        with pytest.raises(QueryBudgetExceeded):
+            timed_client.get("/api/v1/districts/BR-000/trend")
+    
+    def test_registry_serves_lists_without_queries(self, timed_client, db_session_factory, mock_redis):
+        """Test district lists come from the registry once it is loaded"""
+        _add_districts(db_session_factory, 3)
+        timed_client.get("/api/v1/districts/states")
+        mock_redis.flushall()
+        
+        response = timed_client.get("/api/v1/districts")
+        
+        assert response.json()["total"] == 3
+        assert _query_count(response) == 0
@@ -0,0 +1,61 @@
+"""
+Unit tests for the cache warmer
+"""
+
+import pytest
+
+from app.models import District, MGNREGASnapshot
+from app.warmup import warm_cache
+
+
+@pytest.fixture
+def warm_session_factory(db_session_factory):
+    """Shared in-memory database with two months for Lucknow and none for Agra"""
+    session = db_session_factory()
+    lucknow = District(state="Uttar Pradesh", district_name="Lucknow", district_code="UP-LUC")
+    agra = District(state="Uttar Pradesh", district_name="Agra", district_code="UP-AGR")
+    session.add_all([lucknow, agra])
+    session.flush()
+    for month in (1, 2):
+        session.add(MGNREGASnapshot(
+            id=month, district_id=lucknow.id, year=2025, month=month,
+            people_benefited=45000, workdays_created=900000,
+            wages_paid=158400000, payments_on_time_percent=92.5, works_completed=350
+        ))
+    session.commit()
+    session.close()
+    
+    return db_session_factory
+
+
+class TestCacheWarmer:
+    """Test cache warming"""
+    
+    def test_warm_cache_populates_hot_keys(self, mock_redis, warm_session_factory):
+        """Test lists, snapshots and trends are written for every district"""
+        report = warm_cache(session_factory=warm_session_factory, concurrency=2)
+        
+        assert mock_redis.exists("states:all")
+        assert mock_redis.exists("districts:state:all")
+        assert mock_redis.exists("districts:state:Uttar Pradesh")
+        assert mock_redis.exists("district:snapshot:UP-LUC")
+        assert mock_redis.exists("district:trend:UP-LUC:6")
+        assert mock_redis.exists("district:trend:UP-LUC:12")
+        assert report.keys_written == 6
+        assert report.duration_seconds > 0
+    
+    def test_warm_cache_skips_districts_without_data(self, mock_redis, warm_session_factory):
+        """Test districts with no snapshots are skipped, not counted as errors"""
+        report = warm_cache(session_factory=warm_session_factory, concurrency=2)
+        
+        assert not mock_redis.exists("district:snapshot:UP-AGR")
+        assert report.skipped == 3
+        assert report.errors == 0
+    
+    def test_warm_cache_overwrites_stale_entries(self, mock_redis, warm_session_factory):
+        """Test existing entries are replaced rather than kept"""
+        mock_redis.set("district:snapshot:UP-LUC", b'{"stale": true}')
+        
+        warm_cache(session_factory=warm_session_factory, district_codes=["UP-LUC"])
+        
+        assert mock_redis.get("district:snapshot:UP-LUC") != b'{"stale": true}'
@@ -0,0 +1,308 @@
+"""
+Anomaly Detection
+Flags implausible snapshots in a write batch so they are quarantined
+instead of published.
+
+Each row is checked against its district's stored history for the
+``window`` months before it:
+
+    hard rules  missing or negative counts, no wages for a month with
+                workdays, on-time payments missing or outside 0-100 %
+    robust z    0.6745 * (log(1 + value) - median) / MAD above ``threshold``
+                for people, workdays, wages and works, where median and MAD
+                (median absolute deviation) are taken over the history in
+                log space, so a 10x jump scores the same in any district
+
+Districts with fewer than ``min_history`` stored months, and every row when
+``threshold`` is 0, only get the hard rules. With NumPy installed the whole batch is scored at once (one
+rows x window x fields array); without it the same scores are computed
+row by row.
+
+Flagged rows go to mgnrega_snapshot_quarantine with their reasons; the
+published snapshot (if any) stays as it was until the row is released.
+"""
+
+import json
+import math
+import statistics
+import warnings
+
+from sqlalchemy import bindparam, text
+
+try:
+    import numpy
+    NUMPY_AVAILABLE = True
+except ImportError:
+    numpy = None
+    NUMPY_AVAILABLE = False
+
+# Fields scored against the district's history
+SCORED_FIELDS = ('people_benefited', 'workdays_created', 'wages_paid', 'works_completed')
+
+# Scales MAD to a standard deviation for normally distributed values
+MAD_TO_SIGMA = 0.6745
+
+# MAD floor in log units, so a district with a flat history is not flagged
+# for ordinary moves (at z 6 the smallest flagged change is about 2.4x)
+MIN_MAD = 0.1
+
+HISTORY_SQL = f"""
+    SELECT district_id, year * 12 + month - 1 AS period, {', '.join(SCORED_FIELDS)}
+    FROM mgnrega_snapshots
+    WHERE district_id IN :district_ids
+        AND year BETWEEN :first_year AND :last_year
+        AND year * 12 + month - 1 BETWEEN :first AND :last
+"""
+
+QUARANTINE_COLUMNS = (
+    'district_id', 'year', 'month', 'people_benefited', 'workdays_created', 'wages_paid',
+    'payments_on_time_percent', 'works_completed', 'raw_json', 'content_hash', 'reasons',
+)
+
+QUARANTINE_SQL = f"""
+    INSERT INTO mgnrega_snapshot_quarantine ({', '.join(QUARANTINE_COLUMNS)})
+    VALUES ({', '.join(':' + column for column in QUARANTINE_COLUMNS)})
+    ON CONFLICT (district_id, year, month) DO UPDATE SET
+        {', '.join(f"{column} = EXCLUDED.{column}" for column in QUARANTINE_COLUMNS[3:])},
+        quarantined_at = CURRENT_TIMESTAMP
+"""
+
+# A month written normally supersedes its quarantined version
+CLEAR_SQL = """
+    DELETE FROM mgnrega_snapshot_quarantine
+    WHERE district_id = :district_id AND year = :year AND month = :month
+"""
+
+
+def _period(row):
+    return row['year'] * 12 + row['month'] - 1
+
+
+def _float(value):
+    return math.nan if value is None else float(value)
+
+
+def hard_rule_reasons(row):
+    """
+    Reasons a row is invalid regardless of history
+    
+    Args:
+        row: Staging row (see bulk.snapshot_row)
+    
+    Returns:
+        List of reasons (empty if the row passes)
+    """
+    reasons = []
+    for field in SCORED_FIELDS:
+        value = row[field]
+        if value is None:
+            reasons.append(f"{field} missing")
+        elif value < 0:
+            reasons.append(f"{field} negative ({value})")
+    if row['wages_paid'] == 0 and (row['workdays_created'] or 0) > 0:
+        reasons.append("wages_paid is 0 with workdays created")
+    on_time = row['payments_on_time_percent']
+    if on_time is None:
+        reasons.append("payments_on_time_percent missing")
+    elif not 0 <= on_time <= 100:
+        reasons.append(f"payments_on_time_percent out of range ({on_time})")
+    return reasons
+
+
+def _reason(field, z, median):
+    return f"{field} z={z:+.1f} vs trailing median {math.expm1(median):,.0f}"
+
+
+class AnomalyDetector:
+    """
+    Batch validator for SnapshotBulkWriter
+    
+    Args:
+        threshold: Robust z-score above which a value is flagged (0: hard rules only)
+        window: Months of history before each row to compare against
+        min_history: Stored months needed before z-scores are applied
+        use_numpy: Score with NumPy (default: when installed)
+    """
+    
+    def __init__(self, threshold=6.0, window=12, min_history=6, use_numpy=None):
+        if use_numpy and not NUMPY_AVAILABLE:
+            raise ValueError("NumPy scoring requested but numpy is not installed")
+        self.threshold = threshold
+        self.window = max(1, window)
+        self.min_history = max(1, min_history)
+        self.use_numpy = NUMPY_AVAILABLE if use_numpy is None else use_numpy
+        self.rows_checked = 0
+        self.rows_flagged = 0
+    
+    def load_history(self, session, rows):
+        """
+        Stored values of the batch's districts for the months before its rows
+        
+        One query for the whole batch, whatever months it spans.
+        
+        Returns:
+            List (one per row) of lists of SCORED_FIELDS tuples, oldest first
+        """
+        periods = [_period(row) for row in rows]
+        first, last = min(periods) - self.window, max(periods) - 1
+        result = session.execute(
+            text(HISTORY_SQL).bindparams(bindparam('district_ids', expanding=True)),
+            {
+                'district_ids': sorted({row['district_id'] for row in rows}),
+                'first_year': first // 12, 'last_year': last // 12, 'first': first, 'last': last,
+            }
+        )
+        by_district = {}
+        for district_id, period, *values in result:
+            by_district.setdefault(district_id, []).append((period, tuple(_float(v) for v in values)))
+        
+        histories = []
+        for row, period in zip(rows, periods):
+            stored = sorted(by_district.get(row['district_id'], ()))
+            histories.append([values for p, values in stored if period - self.window <= p < period])
+        return histories
+    
+    def score(self, rows, histories):
+        """
+        Flag rows
+        
+        Args:
+            rows: Staging rows
+            histories: Output of load_history for the same rows
+        
+        Returns:
+            List (one per row) of reasons; empty lists pass
+        """
+        reasons = [hard_rule_reasons(row) for row in rows]
+        if self.threshold <= 0:
+            return reasons
+        current = [tuple(_float(row[field]) for field in SCORED_FIELDS) for row in rows]
+        if self.use_numpy:
+            flagged = self._score_numpy(current, histories)
+        else:
+            flagged = self._score_python(current, histories)
+        for index, field, z, median in flagged:
+            reasons[index].append(_reason(field, z, median))
+        return reasons
+    
+    def _score_numpy(self, current, histories):
+        """Robust z-scores of every row and field at once"""
+        history = numpy.full((len(current), self.window, len(SCORED_FIELDS)), numpy.nan)
+        for index, values in enumerate(histories):
+            if values:
+                history[index, :len(values)] = values
+        logs = numpy.log1p(numpy.clip(history, 0, None))
+        with warnings.catch_warnings():
+            # Rows without history are all-NaN slices; they are masked below
+            warnings.simplefilter('ignore', RuntimeWarning)
+            median = numpy.nanmedian(logs, axis=1)
+            mad = numpy.nanmedian(numpy.abs(logs - median[:, None, :]), axis=1)
+        counts = numpy.sum(~numpy.isnan(logs), axis=1)
+        values = numpy.log1p(numpy.clip(numpy.array(current, dtype=float), 0, None))
+        z = MAD_TO_SIGMA * (values - median) / numpy.maximum(mad, MIN_MAD)
+        mask = (counts >= self.min_history) & (numpy.abs(z) > self.threshold)
+        return [
+            (int(index), SCORED_FIELDS[field], float(z[index, field]), float(median[index, field]))
+            for index, field in zip(*numpy.nonzero(mask))
+        ]
+    
+    def _score_python(self, current, histories):
+        """Robust z-scores row by row (same results as _score_numpy)"""
+        flagged = []
+        for index, (values, history) in enumerate(zip(current, histories)):
+            for field, name in enumerate(SCORED_FIELDS):
+                logs = [math.log1p(max(past[field], 0)) for past in history if not math.isnan(past[field])]
+                if len(logs) < self.min_history or math.isnan(values[field]):
+                    continue
+                median = statistics.median(logs)
+                mad = statistics.median(abs(value - median) for value in logs)
+                z = MAD_TO_SIGMA * (math.log1p(max(values[field], 0)) - median) / max(mad, MIN_MAD)
+                if abs(z) > self.threshold:
+                    flagged.append((index, name, z, median))
+        return flagged
+    
+    def split(self, session, rows):
+        """
+        Separate a batch into rows to publish and rows to quarantine
+        
+        Returns:
+            (clean rows, list of (row, reasons))
+        """
+        if not rows:
+            return [], []
+        histories = self.load_history(session, rows) if self.threshold > 0 else [[] for _ in rows]
+        reasons = self.score(rows, histories)
+        clean = [row for row, why in zip(rows, reasons) if not why]
+        flagged = [(row, why) for row, why in zip(rows, reasons) if why]
+        self.rows_checked += len(rows)
+        self.rows_flagged += len(flagged)
+        return clean, flagged
+    
+    def record(self, session, published, flagged):
+        """
+        Quarantine flagged rows and clear earlier quarantines of published ones
+        
+        ``published`` are the rows written, plus keys of months fetched
+        unchanged. Runs in the batch's transaction; does not commit.
+        """
+        if published:
+            session.execute(text(CLEAR_SQL), [
+                {'district_id': row['district_id'], 'year': row['year'], 'month': row['month']}
+                for row in published
+            ])
+        if flagged:
+            session.execute(text(QUARANTINE_SQL), [
+                {**{column: row[column] for column in QUARANTINE_COLUMNS[:-1]}, 'reasons': json.dumps(why)}
+                for row, why in flagged
+            ])
+
+
+def quarantined(session, district_id=None):
+    """
+    Quarantined snapshots, newest first
+    
+    Returns:
+        List of row mappings (reasons decoded)
+    """
+    query = "SELECT * FROM mgnrega_snapshot_quarantine"
+    params = {}
+    if district_id is not None:
+        query += " WHERE district_id = :district_id"
+        params['district_id'] = district_id
+    rows = session.execute(text(query + " ORDER BY year DESC, month DESC, district_id"), params).mappings()
+    return [{**row, 'reasons': _decode(row['reasons'])} for row in rows]
+
+
+def _decode(value):
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def release(session, district_id, year, month, writer, district_code=None):
+    """
+    Publish a quarantined snapshot as-is (after checking it by hand)
+    
+    Args:
+        session: SQLAlchemy session
+        writer: SnapshotBulkWriter without a detector, used to write the row
+        district_code: Passed to the writer for cache invalidation
+    
+    Returns:
+        True if the row was written and removed from quarantine
+    """
+    row = session.execute(
+        text("SELECT * FROM mgnrega_snapshot_quarantine "
+             "WHERE district_id = :district_id AND year = :year AND month = :month"),
+        {'district_id': district_id, 'year': year, 'month': month}
+    ).mappings().first()
+    if row is None:
+        return False
+    
+    data = {field: row[field] for field in QUARANTINE_COLUMNS[3:-1]}
+    data['raw_json'] = _decode(row['raw_json'])
+    writer.add(district_id, year, month, data, district_code)
+    writer.flush()
+    if writer.rows_failed:
+        return False
+    session.execute(text(CLEAR_SQL), {'district_id': district_id, 'year': year, 'month': month})
+    session.commit()
+    return True
@@ -0,0 +1,307 @@
+"""
+Raw Payload Archive
+Append-only, compressed store of the upstream records behind each
+snapshot, so mgnrega_snapshot_raw only keeps a small reference and snapshots
+can be re-derived without re-fetching.
+
+Layout (one directory per month, one segment per writing process):
+
+    archive/2025-09/<host>-<pid>-0001.jsonl.zst   compressed JSON Lines
+    archive/2025-09/<host>-<pid>-0001.idx         plain JSON Lines index
+
+Every write batch is appended as one self-contained compressed member
+(zstd frame when ``zstandard`` is installed, gzip member otherwise), so a
+segment is also a valid stream for ``zstd -dc`` / ``zcat``. The index has
+one line per record giving the member's offset and length; the reference
+stored in the table has the same shape:
+
+    {"archive": "2025-09/<host>-<pid>-0001.jsonl.zst", "offset": 0, "length": 1234}
+"""
+
+import gzip
+import io
+import json
+import os
+import socket
+import time
+
+from client import calendar_month, to_snapshot
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+EXTENSIONS = {'zstd': '.jsonl.zst', 'gzip': '.jsonl.gz'}
+
+# Start a new segment once the current one reaches this size
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+# Snapshot fields kept next to the record, for records that cannot be
+# re-derived (mock data)
+DERIVED_FIELDS = (
+    'people_benefited', 'workdays_created', 'wages_paid',
+    'payments_on_time_percent', 'works_completed',
+)
+
+
+def default_codec():
+    return 'zstd' if ZSTD_AVAILABLE else 'gzip'
+
+
+def compress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def codec_for(path):
+    """Codec of a segment, from its extension"""
+    for codec, extension in EXTENSIONS.items():
+        if path.endswith(extension):
+            return codec
+    raise ValueError(f"not an archive segment: {path}")
+
+
+def month_dir(year, month):
+    return f"{year}-{month:02d}"
+
+
+def archive_line(row, district_code, archived_at):
+    """
+    Serialize one snapshot row as an archive line
+    
+    The row's raw_json is already JSON text (see bulk.snapshot_row) and is
+    embedded as-is instead of being decoded and encoded again.
+    """
+    head = {field: row[field] for field in ('district_id', 'year', 'month') + DERIVED_FIELDS}
+    head['district_code'] = district_code
+    head['content_hash'] = row.get('content_hash')
+    head['archived_at'] = archived_at
+    prefix = json.dumps(head, separators=(',', ':'), default=str)[:-1]
+    return f'{prefix},"record":{row["raw_json"] or "null"}}}\n'
+
+
+class RawArchive:
+    """
+    Writer for the raw payload archive
+    
+    Safe to share with forked processes: segments are named after the
+    writing process and opened per append.
+    
+    Args:
+        root: Archive directory
+        codec: 'zstd' or 'gzip' (default: zstd when available)
+        segment_max_bytes: Size at which a new segment is started
+    """
+    
+    def __init__(self, root, codec=None, segment_max_bytes=SEGMENT_MAX_BYTES):
+        if codec == 'zstd' and not ZSTD_AVAILABLE:
+            raise ValueError("zstd archive requested but the zstandard package is not installed")
+        self.root = root
+        self.codec = codec or default_codec()
+        self.segment_max_bytes = segment_max_bytes
+        self._segments = {}
+    
+    def _segment(self, year, month):
+        """Current segment path (relative to root) for this process and month"""
+        key = (os.getpid(), year, month)
+        sequence, relative = self._segments.get(key, (0, None))
+        if relative is not None:
+            try:
+                if os.path.getsize(os.path.join(self.root, relative)) < self.segment_max_bytes:
+                    return relative
+            except FileNotFoundError:
+                return relative
+        
+        directory = os.path.join(self.root, month_dir(year, month))
+        os.makedirs(directory, exist_ok=True)
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+        while True:
+            sequence += 1
+            relative = f"{month_dir(year, month)}/{prefix}-{sequence:04d}{EXTENSIONS[self.codec]}"
+            if not os.path.exists(os.path.join(self.root, relative)):
+                break
+        self._segments[key] = (sequence, relative)
+        return relative
+    
+    def append(self, rows, codes=None):
+        """
+        Archive snapshot rows, one compressed member per month
+        
+        Args:
+            rows: Rows from bulk.snapshot_row (raw_json as JSON text)
+            codes: Optional dictionary of district_id -> district_code
+        
+        Returns:
+            List of references, one per row, in order
+        """
+        codes = codes or {}
+        archived_at = time.time()
+        by_month = {}
+        for position, row in enumerate(rows):
+            by_month.setdefault((row['year'], row['month']), []).append(position)
+        
+        refs = [None] * len(rows)
+        for (year, month), positions in by_month.items():
+            lines = [archive_line(rows[i], codes.get(rows[i]['district_id']), archived_at) for i in positions]
+            member = compress(''.join(lines).encode('utf-8'), self.codec)
+            relative = self._segment(year, month)
+            path = os.path.join(self.root, relative)
+            
+            with open(path, 'ab') as f:
+                offset = f.tell()
+                f.write(member)
+            ref = {'archive': relative, 'offset': offset, 'length': len(member)}
+            
+            index = ''.join(
+                json.dumps({
+                    'district_id': rows[i]['district_id'],
+                    'district_code': codes.get(rows[i]['district_id']),
+                    'offset': offset, 'length': len(member), 'archived_at': archived_at,
+                }, separators=(',', ':')) + '\n'
+                for i in positions
+            )
+            with open(path[:-len(EXTENSIONS[self.codec])] + '.idx', 'a', encoding='utf-8') as f:
+                f.write(index)
+            for i in positions:
+                refs[i] = ref
+        return refs
+
+
+def read_member(root, ref):
+    """
+    Read the archive lines of one member
+    
+    Returns:
+        List of decoded lines
+    """
+    with open(os.path.join(root, ref['archive']), 'rb') as f:
+        f.seek(ref['offset'])
+        data = f.read(ref['length'])
+    text = decompress(data, codec_for(ref['archive'])).decode('utf-8')
+    return [json.loads(line) for line in text.splitlines() if line]
+
+
+def latest_index(root, year, month):
+    """
+    Newest archived member of every district in a month
+    
+    Returns:
+        Dictionary of district_id -> (reference, district_code)
+    """
+    directory = os.path.join(root, month_dir(year, month))
+    if not os.path.isdir(directory):
+        return {}
+    
+    latest = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.idx'):
+            continue
+        stem = name[:-len('.idx')]
+        segment = next(
+            (stem + ext for ext in EXTENSIONS.values() if os.path.exists(os.path.join(directory, stem + ext))),
+            None,
+        )
+        if segment is None:
+            continue
+        with open(os.path.join(directory, name), encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                current = latest.get(entry['district_id'])
+                if current is None or entry['archived_at'] >= current[0]:
+                    ref = {
+                        'archive': f"{month_dir(year, month)}/{segment}",
+                        'offset': entry['offset'], 'length': entry['length'],
+                    }
+                    latest[entry['district_id']] = (entry['archived_at'], ref, entry.get('district_code'))
+    return {district_id: (ref, code) for district_id, (_, ref, code) in latest.items()}
+
+
+def lookup(root, district_id, year, month):
+    """
+    Latest archived line for a district-month
+    
+    Returns:
+        Decoded archive line, or None if the district-month is not archived
+    """
+    entry = latest_index(root, year, month).get(district_id)
+    if entry is None:
+        return None
+    for line in read_member(root, entry[0]):
+        if line['district_id'] == district_id and line['year'] == year and line['month'] == month:
+            return line
+    return None
+
+
+def iter_month(root, year, month, district_ids=None):
+    """
+    Latest archived line of every district in a month, reading each member once
+    
+    Members are read in segment and offset order, so a replay streams the
+    files sequentially.
+    
+    Yields:
+        Tuples of (archive line, reference)
+    """
+    members = {}
+    for district_id, (ref, _) in latest_index(root, year, month).items():
+        if district_ids is not None and district_id not in district_ids:
+            continue
+        members.setdefault((ref['archive'], ref['offset'], ref['length']), set()).add(district_id)
+    
+    for (segment, offset, length), wanted in sorted(members.items()):
+        ref = {'archive': segment, 'offset': offset, 'length': length}
+        for line in read_member(root, ref):
+            if line['district_id'] in wanted and (line['year'], line['month']) == (year, month):
+                wanted.discard(line['district_id'])
+                yield line, ref
+
+
+def derive(line):
+    """
+    Rebuild snapshot data from an archive line
+    
+    Upstream API records are mapped again with client.to_snapshot, so fixes
+    to the field mapping apply on replay; other records (mock data) keep
+    their archived values.
+    
+    Returns:
+        Snapshot data with the full record as raw_json
+    """
+    record = line.get('record')
+    if isinstance(record, dict) and calendar_month(record) == (line['year'], line['month']):
+        return to_snapshot(record)
+    data = {field: line[field] for field in DERIVED_FIELDS}
+    data['raw_json'] = record
+    return data
+
+
+def is_reference(raw_json):
+    """True if a stored raw_json value points into the archive"""
+    return isinstance(raw_json, dict) and set(raw_json) == {'archive', 'offset', 'length'}
+
+
+def read_stream(path):
+    """Iterate the lines of a whole segment (all members), for inspection"""
+    codec = codec_for(path)
+    if codec == 'zstd':
+        f = open(path, 'rb')
+        reader = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True),
+                                  encoding='utf-8')
+    else:
+        reader = gzip.open(path, 'rt', encoding='utf-8')
+    with reader:
+        for line in reader:
+            if line.strip():
+                yield json.loads(line)
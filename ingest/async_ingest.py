@@ -0,0 +1,187 @@
+"""
+Concurrent Ingestion Engine
+Fetches districts concurrently on one httpx.AsyncClient, bounded by a
+concurrency limit and a token-bucket requests-per-second budget.
+
+Database writes stay on a single writer task (one session, run in a
+thread), so fetches overlap each other and the writes without sharing the
+session between threads.
+"""
+
+import asyncio
+import time
+
+import httpx
+
+from ratelimit import TokenBucket
+
+# Sentinel telling the writer that every fetch has finished
+_DONE = object()
+
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile
+    
+    Args:
+        values: Samples (any order)
+        p: Percentile between 0 and 100
+    
+    Returns:
+        The percentile, or 0.0 for no samples
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))  # ceil without floats
+    return ordered[int(rank) - 1]
+
+
+class RunStats:
+    """Counters and fetch latencies collected during one ingestion run"""
+    
+    def __init__(self, total=0):
+        self.total = total
+        self.succeeded = 0
+        self.failed = 0
+        self.latencies = []
+        self.rate_limit_wait = 0.0
+        self.elapsed = 0.0
+        # Extra per-run counters reported as-is (e.g. new/changed/unchanged rows)
+        self.counts = {}
+    
+    @property
+    def throughput(self):
+        """Districts processed per second"""
+        done = self.succeeded + self.failed
+        return done / self.elapsed if self.elapsed > 0 else 0.0
+    
+    def report(self):
+        """
+        Summarize the run
+        
+        Returns:
+            Dictionary with counts, throughput and fetch latency percentiles (ms)
+        """
+        return {
+            'districts': self.total,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'throughput_per_second': round(self.throughput, 2),
+            'rate_limit_wait_seconds': round(self.rate_limit_wait, 3),
+            'fetch_latency_ms': {
+                'p50': round(percentile(self.latencies, 50) * 1000, 2),
+                'p95': round(percentile(self.latencies, 95) * 1000, 2),
+                'p99': round(percentile(self.latencies, 99) * 1000, 2),
+                'max': round(max(self.latencies, default=0.0) * 1000, 2),
+            },
+            'counts': dict(self.counts),
+        }
+
+
+async def run_ingestion(districts, year, month, fetch, store, concurrency=16, rps=10.0,
+                        burst=None, client=None, limiter=None, finish=None, profiler=None):
+    """
+    Fetch and store a month of data for many districts concurrently
+    
+    Args:
+        districts: Iterable of (district_id, district_code)
+        year: Year to ingest
+        month: Month to ingest
+        fetch: ``async fetch(client, district_code, year, month) -> data``
+        store: ``store(district_id, district_code, data) -> bool``, called
+            from a worker thread one record at a time
+        concurrency: Maximum fetches in flight
+        rps: Upstream requests-per-second budget (0 disables limiting)
+        burst: Token bucket capacity (defaults to one second of budget)
+        client: httpx.AsyncClient to reuse (one is created otherwise)
+        limiter: TokenBucket to share with other runs
+        finish: Optional ``finish() -> int`` run on the writer thread after the
+            last record (e.g. flushing a bulk writer); returns how many
+            records already counted as stored failed to be written
+        profiler: Optional profiler.StageProfiler; fetches are recorded as
+            its fetch stage
+    
+    Returns:
+        RunStats for the run
+    """
+    districts = list(districts)
+    stats = RunStats(total=len(districts))
+    limiter = limiter or TokenBucket(rps, burst)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    queue = asyncio.Queue(maxsize=max(1, concurrency) * 2)
+    start = time.perf_counter()
+    
+    async def fetch_one(http, district_id, district_code):
+        async with semaphore:
+            stats.rate_limit_wait += await limiter.acquire()
+            fetch_start = time.perf_counter()
+            try:
+                data = await fetch(http, district_code, year, month)
+            except Exception as e:
+                print(f"✗ {district_code}: {e}")
+                stats.failed += 1
+                return
+            finally:
+                latency = time.perf_counter() - fetch_start
+                stats.latencies.append(latency)
+                if profiler is not None:
+                    profiler.record('fetch', latency, district_code)
+        await queue.put((district_id, district_code, data))
+    
+    async def writer():
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                if finish is not None:
+                    failed = await asyncio.to_thread(finish)
+                    stats.succeeded -= failed
+                    stats.failed += failed
+                return
+            district_id, district_code, data = item
+            try:
+                stored = await asyncio.to_thread(store, district_id, district_code, data)
+            except Exception as e:
+                print(f"✗ {district_code}: {e}")
+                stored = False
+            else:
+                print(f"✓ {district_code}" if stored else f"✗ {district_code} (storage failed)")
+            if stored:
+                stats.succeeded += 1
+            else:
+                stats.failed += 1
+    
+    async def fetch_all(http):
+        writer_task = asyncio.create_task(writer())
+        try:
+            await asyncio.gather(*(fetch_one(http, d_id, code) for d_id, code in districts))
+        finally:
+            await queue.put(_DONE)
+            await writer_task
+    
+    if client is not None:
+        await fetch_all(client)
+    else:
+        limits = httpx.Limits(max_connections=max(1, concurrency), max_keepalive_connections=max(1, concurrency))
+        async with httpx.AsyncClient(timeout=30.0, limits=limits) as http:
+            await fetch_all(http)
+    
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def print_report(stats):
+    """Print the throughput and latency summary of a run"""
+    report = stats.report()
+    latency = report['fetch_latency_ms']
+    print(f"\n{'='*60}")
+    print(f"  Summary: {report['succeeded']} successful, {report['failed']} errors")
+    print(f"  Elapsed: {report['elapsed_seconds']:.2f}s "
+          f"({report['throughput_per_second']:.1f} districts/s, "
+          f"{report['rate_limit_wait_seconds']:.2f}s waiting on rate limit)")
+    print(f"  Fetch latency: p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, "
+          f"p99 {latency['p99']:.1f} ms, max {latency['max']:.1f} ms")
+    if report['counts']:
+        print("  Rows: " + ", ".join(f"{count} {name}" for name, count in report['counts'].items()))
+    print("="*60 + "\n")
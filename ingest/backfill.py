@@ -0,0 +1,308 @@
+"""
+Historical Backfill
+Loads a range of months for all (or selected) districts across a process
+pool.
+
+Each month is one task: a worker process fetches it (one paged request
+set when the upstream API is configured), skips rows whose content hash
+is unchanged and writes the rest through the COPY-based bulk writer. All
+processes draw from one shared requests-per-second budget. Finished months
+are checkpointed, so re-running the same command resumes.
+
+Usage (from the ingest directory):
+    python backfill.py --from 2018-04 --to 2025-03 --workers 4
+    python backfill.py --from 2024-01 --to 2024-12 --state "Uttar Pradesh"
+    python backfill.py --from 2024-01 --to 2024-12 --district UP-LUC --district UP-AGR
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import time
+from multiprocessing import get_context
+
+from sqlalchemy import text
+
+import worker
+from bulk import SnapshotBulkWriter
+from client import district_key
+from incremental import UNCHANGED, ChangeTracker, Checkpoint
+from ratelimit import SharedTokenBucket
+
+# Set in each pool process by _init_process
+_limiter = None
+_batch_size = None
+
+
+def parse_month(value):
+    """Parse 'YYYY-MM' into (year, month)"""
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"month out of range in {value!r}")
+    return year, month
+
+
+def month_range(start, end):
+    """
+    Every (year, month) from start to end inclusive
+    
+    Returns:
+        List of (year, month) tuples
+    """
+    months = []
+    year, month = start
+    while (year, month) <= end:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def select_districts(session, states=None, codes=None):
+    """
+    Load the districts to backfill
+    
+    Returns:
+        List of (id, district_code, state, district_name)
+    """
+    rows = session.execute(
+        text("SELECT id, district_code, state, district_name FROM districts ORDER BY id")
+    ).fetchall()
+    wanted_states = {state.lower() for state in states or []}
+    wanted_codes = set(codes or [])
+    return [
+        tuple(row) for row in rows
+        if (not wanted_states or row[2].lower() in wanted_states)
+        and (not wanted_codes or row[1] in wanted_codes)
+    ]
+
+
+def checkpoint_for(start, end, states, codes):
+    """Checkpoint file identified by the range and filters"""
+    key = f"{start}-{end}-{sorted(s.lower() for s in states or [])}-{sorted(codes or [])}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+    return Checkpoint(os.path.join(worker.INGEST_CHECKPOINT_DIR, f"backfill-{digest}.checkpoint"))
+
+
+def _init_process(limiter, batch_size):
+    """Pool initializer: drop connections inherited from the parent"""
+    global _limiter, _batch_size
+    _limiter = limiter
+    _batch_size = batch_size
+    worker.engine.dispose(close=False)
+
+
+async def fetch_districts_month(districts, year, month, limiter=None):
+    """
+    Fetch one month for the given districts
+    
+    Args:
+        districts: List of (id, district_code, state, district_name)
+        year: Year
+        month: Month
+        limiter: Rate limiter for upstream requests (defaults to the pool's)
+    
+    Returns:
+        Dictionary of district_code -> data (districts without data omitted)
+    """
+    if not worker.API_KEY:
+        return {code: worker.fetch_mgnrega_data(code, year, month) for _, code, _, _ in districts}
+    
+    states = {state for _, _, state, _ in districts}
+    async with worker.create_api_client(limiter or _limiter) as api:
+        if len(states) == 1:
+            snapshots = await api.fetch_month(year, month, state=next(iter(states)))
+        else:
+            snapshots = await api.fetch_month(year, month)
+    found = {}
+    for _, code, state, name in districts:
+        data = snapshots.get(district_key(state, name))
+        if data is not None:
+            found[code] = data
+    return found
+
+
+def backfill_month(task):
+    """
+    Fetch, diff and bulk-write one month (runs in a pool process)
+    
+    Args:
+        task: (year, month, districts)
+    
+    Returns:
+        Dictionary of counts for the month
+    """
+    year, month, districts = task
+    result = {'year': year, 'month': month, 'new': 0, 'changed': 0, 'unchanged': 0, 'missing': 0,
+              'quarantined': 0, 'failed': 0}
+    
+    try:
+        fetched = asyncio.run(fetch_districts_month(districts, year, month))
+    except Exception as e:
+        print(f"✗ {year}-{month:02d}: fetch failed: {e}")
+        result['failed'] = len(districts)
+        return result
+    
+    session = worker.SessionLocal()
+    try:
+        worker.ensure_snapshot_partition(session, year)
+        tracker = ChangeTracker.load(session, year, month)
+        writer = SnapshotBulkWriter(session, _batch_size or worker.INGEST_BATCH_SIZE,
+                                    on_flush=worker.invalidate_district_caches, archive=worker.raw_archive(),
+                                    detector=worker.anomaly_detector())
+        for district_id, code, _, _ in districts:
+            data = fetched.get(code)
+            if data is None:
+                result['missing'] += 1
+                continue
+            status = tracker.classify(district_id, data)
+            result[status] += 1
+            if status == UNCHANGED:
+                writer.unchanged(district_id, year, month)
+            else:
+                writer.add(district_id, year, month, data, code)
+        writer.flush()
+        result['quarantined'] = writer.rows_quarantined
+        result['failed'] = writer.rows_failed
+    except Exception as e:
+        print(f"✗ {year}-{month:02d}: {e}")
+        result['failed'] = len(districts)
+    finally:
+        session.close()
+    return result
+
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def run_backfill(start, end, states=None, codes=None, processes=4, rps=None, batch_size=None, fresh=False):
+    """
+    Backfill a month range
+    
+    Args:
+        start: First (year, month)
+        end: Last (year, month)
+        states: Only districts in these states
+        codes: Only these district codes
+        processes: Pool size (1 runs in this process)
+        rps: Upstream requests per second shared by all processes
+        batch_size: Snapshots per bulk write
+        fresh: Ignore the checkpoint of a previous run
+    
+    Returns:
+        Dictionary of totals
+    """
+    session = worker.SessionLocal()
+    try:
+        districts = select_districts(session, states, codes)
+    finally:
+        session.close()
+    
+    months = month_range(start, end)
+    checkpoint = checkpoint_for(start, end, states, codes)
+    if fresh:
+        checkpoint.clear()
+    done = checkpoint.load()
+    pending = [(year, month) for year, month in months if f"{year}-{month:02d}" not in done]
+    
+    print("\n" + "="*60)
+    print("  MGNREGA HISTORICAL BACKFILL")
+    print("="*60 + "\n")
+    print(f"Range: {start[0]}-{start[1]:02d} to {end[0]}-{end[1]:02d} ({len(months)} months)")
+    print(f"Districts: {len(districts)}, processes: {processes}")
+    if len(pending) < len(months):
+        print(f"Resuming from checkpoint: {len(months) - len(pending)} months already done")
+    print()
+    
+    totals = {'months': len(pending), 'new': 0, 'changed': 0, 'unchanged': 0, 'missing': 0, 'quarantined': 0,
+              'failed': 0}
+    if not districts or not pending:
+        print("Nothing to do")
+        return totals
+    
+    limiter = SharedTokenBucket(worker.INGEST_RPS if rps is None else rps, worker.INGEST_BURST)
+    tasks = [(year, month, districts) for year, month in pending]
+    start_time = time.perf_counter()
+    
+    if processes <= 1:
+        _init_process(limiter, batch_size)
+        results = map(backfill_month, tasks)
+        pool = None
+    else:
+        pool = get_context().Pool(processes, initializer=_init_process, initargs=(limiter, batch_size))
+        results = pool.imap_unordered(backfill_month, tasks)
+    
+    try:
+        for completed, result in enumerate(results, start=1):
+            for key in ('new', 'changed', 'unchanged', 'missing', 'quarantined', 'failed'):
+                totals[key] += result[key]
+            if result['failed'] == 0:
+                checkpoint.mark([f"{result['year']}-{result['month']:02d}"])
+            
+            elapsed = time.perf_counter() - start_time
+            rows = totals['new'] + totals['changed'] + totals['unchanged']
+            eta = elapsed / completed * (len(tasks) - completed)
+            print(f"[{completed}/{len(tasks)}] {result['year']}-{result['month']:02d} "
+                  f"{completed / len(tasks):6.1%}  {rows:,} rows, {rows / elapsed:,.0f} rows/s, "
+                  f"ETA {_format_duration(eta)}")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    
+    if totals['new'] or totals['changed']:
+        # One pass over every written district's history, instead of one per month
+        session = worker.SessionLocal()
+        try:
+            district_ids = [district[0] for district in districts] if states or codes else None
+            totals['derived'] = worker.refresh_derived(session, district_ids)
+        finally:
+            session.close()
+    
+    elapsed = time.perf_counter() - start_time
+    print(f"\n{'='*60}")
+    print(f"  Backfilled {len(tasks)} months in {_format_duration(elapsed)}")
+    print(f"  Rows: {totals['new']} new, {totals['changed']} changed, {totals['unchanged']} unchanged, "
+          f"{totals['missing']} missing upstream, {totals['quarantined']} quarantined, {totals['failed']} failed")
+    print("="*60 + "\n")
+    
+    if totals['failed'] == 0:
+        checkpoint.clear()
+    return totals
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Backfill historical MGNREGA data")
+    parser.add_argument('--from', dest='start', type=parse_month, required=True, help="First month (YYYY-MM)")
+    parser.add_argument('--to', dest='end', type=parse_month, required=True, help="Last month (YYYY-MM)")
+    parser.add_argument('--state', action='append', help="Only districts in this state (repeatable)")
+    parser.add_argument('--district', action='append', help="Only this district code (repeatable)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help="Worker processes")
+    parser.add_argument('--rps', type=float, default=None,
+                        help=f"Upstream requests per second across all workers (default {worker.INGEST_RPS:g})")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help=f"Snapshots per write batch (default {worker.INGEST_BATCH_SIZE})")
+    parser.add_argument('--fresh', action='store_true', help="Ignore the checkpoint of a previous run")
+    args = parser.parse_args(argv)
+    
+    if args.start > args.end:
+        parser.error("--from must not be after --to")
+    
+    totals = run_backfill(args.start, args.end, args.state, args.district, args.workers,
+                          args.rps, args.batch_size, args.fresh)
+    return 1 if totals['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Ingestion and Database Benchmarks"""
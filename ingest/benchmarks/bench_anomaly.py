@@ -0,0 +1,90 @@
+"""
+Anomaly Scoring Benchmark
+Times AnomalyDetector.score on a month's batch for every district, with the
+NumPy scorer (one rows x window x fields array) and the pure-Python
+fallback, and checks both flag the same injected anomalies.
+
+Histories are generated in memory, so no database is needed and only the
+validate stage's CPU time is measured (load_history is one query per batch
+either way). Run from the ingest directory:
+    python -m benchmarks.bench_anomaly --districts 750 --window 12 --anomalies 10
+"""
+
+import argparse
+import random
+import time
+
+import anomaly
+from anomaly import AnomalyDetector
+from bulk import snapshot_row
+
+
+def _batch(districts, window, anomalies, seed):
+    """One month's rows and their histories, with ``anomalies`` 10x wage jumps"""
+    rng = random.Random(seed)
+    rows, histories = [], []
+    for district_id in range(districts):
+        base = rng.randint(5000, 120000)
+        history = []
+        for _ in range(window):
+            people = int(base * rng.uniform(0.8, 1.2))
+            history.append((float(people), people * 20.0, people * 20 * 176.0, float(rng.randint(250, 450))))
+        people = int(base * rng.uniform(0.8, 1.2))
+        rows.append(snapshot_row(district_id, 2025, 1, {
+            'people_benefited': people,
+            'workdays_created': people * 20,
+            'wages_paid': people * 20 * 176.0,
+            'payments_on_time_percent': 92.5,
+            'works_completed': rng.randint(250, 450),
+            'raw_json': {},
+        }))
+        histories.append(history)
+    injected = set(rng.sample(range(districts), anomalies))
+    for index in injected:
+        rows[index]['wages_paid'] *= 10
+    return rows, histories, injected
+
+
+def _time(detector, rows, histories, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        reasons = detector.score(rows, histories)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, {index for index, why in enumerate(reasons) if why}
+
+
+def run(districts, window, anomalies, repeat):
+    rows, histories, injected = _batch(districts, window, anomalies, seed=42)
+    
+    print("\n" + "="*60)
+    print("  ANOMALY SCORING BENCHMARK")
+    print(f"  {districts} rows x {window} months of history, {anomalies} injected anomalies")
+    print("="*60 + "\n")
+    print(f"  {'scorer':<16}{'ms/batch':>10}{'rows/s':>12}{'flagged':>10}{'missed':>9}")
+    
+    backends = [('pure Python', False)]
+    if anomaly.NUMPY_AVAILABLE:
+        backends.append(('NumPy', True))
+    else:
+        print("  (numpy not installed, NumPy scorer skipped)")
+    baseline = None
+    for label, use_numpy in backends:
+        detector = AnomalyDetector(window=window, use_numpy=use_numpy)
+        elapsed, flagged = _time(detector, rows, histories, repeat)
+        baseline = baseline or elapsed
+        print(f"  {label:<16}{elapsed * 1000:>10.1f}{len(rows) / elapsed:>12,.0f}"
+              f"{len(flagged):>10}{len(injected - flagged):>9}   ({baseline / elapsed:.1f}x)")
+    
+    print("\n" + "="*60 + "\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark NumPy vs pure-Python anomaly scoring")
+    parser.add_argument('--districts', type=int, default=750)
+    parser.add_argument('--window', type=int, default=12)
+    parser.add_argument('--anomalies', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.districts, args.window, args.anomalies, args.repeat)
@@ -0,0 +1,309 @@
+"""
+Bulk Snapshot Writer
+Buffers fetched snapshots and writes them a batch at a time.
+
+On PostgreSQL each batch is COPYed into a temporary staging table and
+merged into mgnrega_snapshots with a single INSERT ... SELECT ... ON
+CONFLICT DO UPDATE, in one transaction; the rows it actually wrote
+(RETURNING) carry their raw payloads into mgnrega_snapshot_raw in the
+same statement. Other databases (SQLite in tests) get the same upserts as
+one executemany per table per batch. Writers created with ``derive`` also
+refresh the batch's districts in mgnrega_derived_metrics before committing,
+and writers with a ``detector`` quarantine implausible rows instead of
+writing them (see anomaly.py).
+"""
+
+import csv
+import io
+import json
+
+from sqlalchemy import text
+
+from derived import refresh_derived_metrics
+from incremental import content_hash
+from profiler import timed
+
+SNAPSHOT_COLUMNS = (
+    'district_id', 'year', 'month', 'people_benefited', 'workdays_created',
+    'wages_paid', 'payments_on_time_percent', 'works_completed', 'raw_json',
+    'content_hash',
+)
+
+# Kept per connection; rows disappear at commit, so a pooled connection
+# reuses the table without cleanup.
+STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS snapshot_staging (
+        district_id INTEGER,
+        year INTEGER,
+        month INTEGER,
+        people_benefited INTEGER,
+        workdays_created INTEGER,
+        wages_paid NUMERIC(15, 2),
+        payments_on_time_percent NUMERIC(5, 2),
+        works_completed INTEGER,
+        raw_json JSONB,
+        content_hash TEXT
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Columns of mgnrega_snapshots itself; raw_json lives in mgnrega_snapshot_raw
+TABLE_COLUMNS = tuple(column for column in SNAPSHOT_COLUMNS if column != 'raw_json')
+
+COPY_SQL = f"COPY snapshot_staging ({', '.join(SNAPSHOT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+_UPDATE_SET = """
+    DO UPDATE SET
+        people_benefited = EXCLUDED.people_benefited,
+        workdays_created = EXCLUDED.workdays_created,
+        wages_paid = EXCLUDED.wages_paid,
+        payments_on_time_percent = EXCLUDED.payments_on_time_percent,
+        works_completed = EXCLUDED.works_completed,
+        content_hash = EXCLUDED.content_hash,
+        fetched_at = CURRENT_TIMESTAMP
+    WHERE mgnrega_snapshots.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+"""
+
+_RAW_CONFLICT = """
+    ON CONFLICT (snapshot_id, snapshot_year)
+    DO UPDATE SET raw_json = EXCLUDED.raw_json
+    WHERE mgnrega_snapshot_raw.raw_json IS DISTINCT FROM EXCLUDED.raw_json
+"""
+
+MERGE_SQL = f"""
+    WITH merged AS (
+        INSERT INTO mgnrega_snapshots ({', '.join(TABLE_COLUMNS)})
+        SELECT {', '.join(TABLE_COLUMNS)} FROM snapshot_staging
+        ON CONFLICT (district_id, year, month)
+        {_UPDATE_SET}
+        RETURNING id, district_id, year, month
+    )
+    INSERT INTO mgnrega_snapshot_raw (snapshot_id, snapshot_year, raw_json)
+    SELECT merged.id, merged.year, staging.raw_json
+    FROM merged
+    JOIN snapshot_staging staging
+        ON staging.district_id = merged.district_id
+        AND staging.year = merged.year
+        AND staging.month = merged.month
+    WHERE staging.raw_json IS NOT NULL
+    {_RAW_CONFLICT}
+"""
+
+UPSERT_SQL = f"""
+    INSERT INTO mgnrega_snapshots ({', '.join(TABLE_COLUMNS)})
+    VALUES ({', '.join(':' + column for column in TABLE_COLUMNS)})
+    ON CONFLICT (district_id, year, month)
+    {_UPDATE_SET}
+"""
+
+RAW_UPSERT_SQL = f"""
+    INSERT INTO mgnrega_snapshot_raw (snapshot_id, snapshot_year, raw_json)
+    SELECT id, year, :raw_json FROM mgnrega_snapshots
+    WHERE district_id = :district_id AND year = :year AND month = :month
+    {_RAW_CONFLICT}
+"""
+
+
+def snapshot_row(district_id, year, month, data):
+    """
+    Build a staging row from fetched data
+    
+    raw_json is serialized as JSON text so it loads into the JSONB column
+    of mgnrega_snapshot_raw. Rows whose content hash matches the stored
+    one are left untouched by the upsert.
+    """
+    raw_json = data.get('raw_json')
+    return {
+        'district_id': district_id,
+        'year': year,
+        'month': month,
+        'people_benefited': data['people_benefited'],
+        'workdays_created': data['workdays_created'],
+        'wages_paid': data['wages_paid'],
+        'payments_on_time_percent': data['payments_on_time_percent'],
+        'works_completed': data['works_completed'],
+        'raw_json': json.dumps(raw_json) if raw_json is not None else None,
+        'content_hash': data.get('content_hash') or content_hash(data),
+    }
+
+
+def copy_buffer(rows):
+    """
+    Render rows as CSV for COPY
+    
+    None becomes an unquoted empty field, which COPY reads as NULL.
+    
+    Returns:
+        StringIO positioned at the start
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for row in rows:
+        writer.writerow([row[column] for column in SNAPSHOT_COLUMNS])
+    buffer.seek(0)
+    return buffer
+
+
+class SnapshotBulkWriter:
+    """
+    Batching replacement for calling store_snapshot once per record
+    
+    Records are buffered by (district_id, year, month), so a later record for
+    the same month replaces an earlier one in the batch. ``on_flush`` receives
+    the district codes of each committed batch, for cache invalidation.
+    
+    Args:
+        session: SQLAlchemy session (not shared with other threads)
+        batch_size: Records per batch
+        on_flush: Callable taking the district codes written by a batch
+        archive: Optional archive.RawArchive; raw payloads are appended to it
+            and raw_json stores a reference instead
+        profiler: Optional profiler.StageProfiler timing the write, derive,
+            commit and invalidate stages of each batch
+        derive: Recompute the derived metrics of the batch's districts in
+            the same transaction, so they are committed (and their caches
+            invalidated) together with the snapshots
+        detector: Optional anomaly.AnomalyDetector; flagged rows are
+            quarantined instead of written and their districts' caches
+            are left alone, and months written or reported ``unchanged``
+            leave quarantine
+    """
+    
+    def __init__(self, session, batch_size=500, on_flush=None, archive=None, profiler=None, derive=False,
+                 detector=None):
+        self.session = session
+        self.batch_size = max(1, batch_size)
+        self.on_flush = on_flush
+        self.archive = archive
+        self.profiler = profiler
+        self.derive = derive
+        self.detector = detector
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.rows_quarantined = 0
+        self.batches = 0
+        self._pending = {}
+        self._codes = {}
+        self._unchanged = set()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+    
+    def __len__(self):
+        return len(self._pending)
+    
+    def add(self, district_id, year, month, data, district_code=None):
+        """
+        Buffer a record, writing the batch once it is full
+        
+        Returns:
+            True (the record is buffered; failures are counted at flush)
+        """
+        self._pending[(district_id, year, month)] = snapshot_row(district_id, year, month, data)
+        if district_code is not None:
+            self._codes[district_id] = district_code
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return True
+    
+    def unchanged(self, district_id, year, month):
+        """
+        Note a fetched record that matches the stored snapshot
+        
+        Nothing is written for it, but with a detector an earlier quarantined
+        version of the month is cleared at the next flush: upstream went back
+        to the published values.
+        """
+        if self.detector is not None:
+            self._unchanged.add((district_id, year, month))
+    
+    def flush(self):
+        """
+        Write and commit the buffered records
+        
+        A failed batch is rolled back and counted in ``rows_failed``;
+        quarantined records are counted in ``rows_quarantined``.
+        
+        Returns:
+            Number of records written
+        """
+        if not self._pending and not self._unchanged:
+            return 0
+        
+        rows = list(self._pending.values())
+        codes_by_id = self._codes
+        codes = sorted(set(codes_by_id.values()))
+        unchanged = [
+            {'district_id': district_id, 'year': year, 'month': month}
+            for district_id, year, month in sorted(self._unchanged)
+        ]
+        self._pending = {}
+        self._codes = {}
+        self._unchanged = set()
+        flagged = []
+        
+        try:
+            if self.detector is not None and rows:
+                with timed(self.profiler, 'validate', codes):
+                    rows, flagged = self.detector.split(self.session, rows)
+                codes = sorted({codes_by_id[row['district_id']] for row in rows if row['district_id'] in codes_by_id})
+            with timed(self.profiler, 'write', codes):
+                if self.detector is not None:
+                    self.detector.record(self.session, rows + unchanged, flagged)
+                if rows:
+                    self._write(rows, codes_by_id)
+            if self.derive and rows:
+                with timed(self.profiler, 'derive', codes):
+                    self._derive({row['district_id'] for row in rows})
+            with timed(self.profiler, 'commit', codes):
+                self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            self.rows_failed += len(rows) + len(flagged)
+            print(f"✗ Batch of {len(rows) + len(flagged)} snapshots failed: {e}")
+            return 0
+        
+        for row, reasons in flagged:
+            code = codes_by_id.get(row['district_id'], row['district_id'])
+            print(f"⚠ Quarantined {code} {row['year']}-{row['month']:02d}: {'; '.join(reasons)}")
+        self.rows_quarantined += len(flagged)
+        self.rows_written += len(rows)
+        if rows or flagged:
+            self.batches += 1
+        if self.on_flush and codes:
+            with timed(self.profiler, 'invalidate', codes):
+                self.on_flush(codes)
+        return len(rows)
+    
+    def _write(self, rows, codes_by_id):
+        """Upsert rows and their raw payloads (archiving the payloads first if enabled)"""
+        if self.archive is not None:
+            # Archived first: a reference never points at a missing payload
+            for row, ref in zip(rows, self.archive.append(rows, codes_by_id)):
+                row['raw_json'] = json.dumps(ref)
+        if self.session.get_bind().dialect.name == 'postgresql':
+            self._copy_merge(rows)
+        else:
+            self.session.execute(text(UPSERT_SQL), rows)
+            raw_rows = [row for row in rows if row['raw_json'] is not None]
+            if raw_rows:
+                self.session.execute(text(RAW_UPSERT_SQL), raw_rows)
+    
+    def _derive(self, district_ids):
+        """Refresh derived metrics in a savepoint; a failure keeps the snapshots"""
+        try:
+            with self.session.begin_nested():
+                refresh_derived_metrics(self.session, district_ids)
+        except Exception as e:
+            print(f"⚠ Could not refresh derived metrics: {e}")
+    
+    def _copy_merge(self, rows):
+        """COPY rows into the staging table and merge them in one statement"""
+        self.session.execute(text(STAGING_DDL))
+        dbapi_connection = self.session.connection().connection.driver_connection
+        with dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(COPY_SQL, copy_buffer(rows))
+        self.session.execute(text(MERGE_SQL))
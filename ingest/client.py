@@ -0,0 +1,299 @@
+"""
+data.gov.in MGNREGA API Client
+Fetches whole months of district records in large pages over one
+persistent connection pool.
+
+- HTTP/2 when the ``h2`` package is installed (multiplexes concurrent page
+  requests over one connection), otherwise HTTP/1.1 keep-alive
+- offset/limit pagination with large pages; after the first page the
+  remaining pages are requested concurrently
+- retries on 429, 5xx and transport errors with exponential backoff and
+  full jitter, honouring Retry-After
+- conditional requests: ETag / Last-Modified validators are remembered per
+  query and a 304 reuses the previous body
+"""
+
+import asyncio
+import math
+import random
+
+import httpx
+
+from ratelimit import TokenBucket
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# "District-wise MGNREGA Data at a Glance"
+DEFAULT_RESOURCE_ID = 'ee03643a-ee4c-48c2-ac30-9f2ff26ab722'
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+MONTH_NAMES = {number: name.capitalize() for name, number in MONTHS.items()}
+
+# The dataset reports wages in lakh rupees
+WAGES_UNIT = 100000
+
+
+class UpstreamError(Exception):
+    """Raised when the API keeps failing after all retries"""
+
+
+def fin_year(year, month):
+    """Financial year label (April to March) for a calendar month, e.g. '2024-2025'"""
+    start = year if month >= 4 else year - 1
+    return f"{start}-{start + 1}"
+
+
+def calendar_month(record):
+    """
+    Calendar (year, month) of an upstream record
+    
+    Returns:
+        Tuple of (year, month), or None if the record has no usable period
+    """
+    month = MONTHS.get(str(record.get('month', '')).strip()[:3].lower())
+    try:
+        start = int(str(record.get('fin_year', '')).split('-')[0])
+    except ValueError:
+        return None
+    if month is None:
+        return None
+    return (start if month >= 4 else start + 1), month
+
+
+def district_key(state, district_name):
+    """Case- and whitespace-insensitive key matching upstream names to ours"""
+    return (' '.join(state.split()).upper(), ' '.join(district_name.split()).upper())
+
+
+def _number(value, cast=float):
+    """Parsed value, or None if it is absent or not a finite number"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return cast(number) if math.isfinite(number) else None
+
+
+def to_snapshot(record):
+    """
+    Map an upstream record to the fields stored in mgnrega_snapshots
+    
+    The full record is kept as raw_json. Missing or unparseable values map
+    to None (never 0), so the anomaly detector quarantines the row instead
+    of publishing an empty month.
+    """
+    wages = _number(record.get('Wages'))
+    return {
+        'people_benefited': _number(record.get('Total_Individuals_Worked'), int),
+        'workdays_created': _number(record.get('Persondays_of_Central_Liability_so_far'), int),
+        'wages_paid': None if wages is None else round(wages * WAGES_UNIT, 2),
+        'payments_on_time_percent': _number(record.get('percentage_payments_gererated_within_15_days')),
+        'works_completed': _number(record.get('Number_of_Completed_Works'), int),
+        'raw_json': record,
+    }
+
+
+class MGNREGAClient:
+    """
+    Async client for the MGNREGA resource on data.gov.in
+    
+    Use as an async context manager (or call ``aclose``) so the connection
+    pool is closed.
+    
+    Args:
+        api_key: data.gov.in API key
+        base_url: Resource endpoint base, e.g. https://api.data.gov.in/resource
+        resource_id: Dataset resource id
+        page_size: Records per request
+        concurrency: Page requests in flight (and pooled connections)
+        limiter: TokenBucket applied to every HTTP request
+        max_retries: Retries per request after the first attempt
+        backoff_base: First backoff ceiling in seconds (doubles per retry)
+        backoff_cap: Maximum backoff in seconds
+        transport: Optional httpx transport (tests)
+    """
+    
+    def __init__(self, api_key, base_url='https://api.data.gov.in/resource', resource_id=DEFAULT_RESOURCE_ID,
+                 page_size=1000, concurrency=4, limiter=None, max_retries=5, backoff_base=0.5,
+                 backoff_cap=30.0, timeout=30.0, transport=None, sleep=asyncio.sleep, rng=random):
+        self.api_key = api_key
+        self.url = f"{base_url.rstrip('/')}/{resource_id}"
+        self.page_size = page_size
+        self.concurrency = max(1, concurrency)
+        self.limiter = limiter or TokenBucket(0)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._sleep = sleep
+        self._rng = rng
+        # query -> (etag, last_modified, body)
+        self._validators = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.retries = 0
+        self.http = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE and transport is None,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            headers={'Accept': 'application/json', 'Accept-Encoding': 'gzip'},
+            transport=transport,
+        )
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+    
+    async def aclose(self):
+        await self.http.aclose()
+    
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, or the server's Retry-After"""
+        if retry_after is not None:
+            try:
+                return min(self.backoff_cap, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        return self._rng.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+    
+    async def get_page(self, filters, offset):
+        """
+        Request one page, retrying transient failures
+        
+        Returns:
+            Decoded JSON body
+        
+        Raises:
+            UpstreamError: If the request still fails after all retries
+        """
+        params = {'api-key': self.api_key, 'format': 'json', 'offset': offset, 'limit': self.page_size}
+        params.update({f"filters[{name}]": value for name, value in filters.items()})
+        cache_key = tuple(sorted((k, str(v)) for k, v in params.items() if k != 'api-key'))
+        
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            headers = {}
+            cached = self._validators.get(cache_key)
+            if cached:
+                etag, last_modified, _ = cached
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+            
+            await self.limiter.acquire()
+            self.requests += 1
+            retry_after = None
+            try:
+                response = await self.http.get(self.url, params=params, headers=headers)
+            except httpx.TransportError as e:
+                last_error = e
+            else:
+                if response.status_code == 304 and cached:
+                    self.not_modified += 1
+                    return cached[2]
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    body = response.json()
+                    etag = response.headers.get('ETag')
+                    last_modified = response.headers.get('Last-Modified')
+                    if etag or last_modified:
+                        self._validators[cache_key] = (etag, last_modified, body)
+                    return body
+                last_error = UpstreamError(f"HTTP {response.status_code}")
+                retry_after = response.headers.get('Retry-After')
+            
+            if attempt < self.max_retries:
+                self.retries += 1
+                await self._sleep(self._backoff(attempt, retry_after))
+        
+        raise UpstreamError(f"{self.url} failed after {self.max_retries + 1} attempts: {last_error}")
+    
+    async def fetch_records(self, filters):
+        """
+        Fetch every record matching the filters
+        
+        The first page gives the total and the page size the server actually
+        serves (data.gov.in caps ``limit``); the rest are requested
+        concurrently at that stride. Offsets advance by the rows each page
+        returned: after a short page the remaining pages are requested again
+        from where it ended, until the total is reached or a page is empty.
+        """
+        first = await self.get_page(filters, 0)
+        records = list(first.get('records', []))
+        total = int(first.get('total') or 0)
+        stride = len(records)
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def page(offset):
+            async with semaphore:
+                return (await self.get_page(filters, offset)).get('records', [])
+        
+        exhausted = not records
+        while not exhausted and len(records) < total:
+            offsets = range(len(records), total, stride)
+            for offset, page_records in zip(offsets, await asyncio.gather(*(page(offset) for offset in offsets))):
+                if offset != len(records):
+                    break  # An earlier page was short; continue from its end
+                if not page_records:
+                    exhausted = True
+                    break
+                records.extend(page_records)
+        return records
+    
+    async def fetch_month(self, year, month, state=None):
+        """
+        Fetch one calendar month for every district (optionally one state)
+        
+        Returns:
+            Dictionary of district_key(state, district) -> snapshot data
+        """
+        filters = {'fin_year': fin_year(year, month), 'month': MONTH_NAMES[month]}
+        if state:
+            filters['state_name'] = state.upper()
+        snapshots = {}
+        for record in await self.fetch_records(filters):
+            if calendar_month(record) != (year, month):
+                continue
+            key = district_key(record.get('state_name', ''), record.get('district_name', ''))
+            snapshots[key] = to_snapshot(record)
+        return snapshots
+
+
+class MonthSource:
+    """
+    Per-district fetch function backed by one fetch_month call
+    
+    Plugs the page-based client into run_ingestion: the first district to
+    ask triggers the month download, the rest wait for it and pick their
+    record.
+    
+    Args:
+        client: MGNREGAClient
+        names: Dictionary of our district_code -> (state, district_name)
+    """
+    
+    def __init__(self, client, names):
+        self.client = client
+        self.keys = {code: district_key(state, name) for code, (state, name) in names.items()}
+        self._months = {}
+    
+    async def fetch(self, http, district_code, year, month):
+        if (year, month) not in self._months:
+            self._months[(year, month)] = asyncio.ensure_future(self.client.fetch_month(year, month))
+        snapshots = await self._months[(year, month)]
+        data = snapshots.get(self.keys.get(district_code))
+        if data is None:
+            raise LookupError(f"no upstream record for {district_code} in {month}/{year}")
+        return data
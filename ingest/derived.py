@@ -0,0 +1,142 @@
+"""
+Derived Metrics
+Recomputes mgnrega_derived_metrics from mgnrega_snapshots in one set-based
+statement, so the API reads month-over-month and year-over-year changes,
+rolling averages and per-capita ratios instead of computing them per
+request.
+
+Every metric is a window over one district's snapshots ordered by month
+number (year * 12 + month):
+
+    *_mom      change from the district's previous snapshot (as in
+               district_latest and the dashboard comparison)
+    *_yoy      change from the same month a year earlier (NULL if missing)
+    *_avg_3m   average over the current and two preceding calendar months
+    wages_per_workday, workdays_per_person, wages_per_person
+
+Changes are percentages rounded to 2 decimals, NULL when the earlier value
+is 0 or missing. Rows whose values are unchanged are not rewritten.
+"""
+
+from sqlalchemy import bindparam, text
+
+# Metrics with month-over-month and year-over-year changes
+CHANGE_FIELDS = (
+    'people_benefited', 'workdays_created', 'wages_paid',
+    'payments_on_time_percent', 'works_completed',
+)
+
+# Metrics with a rolling 3-month average
+AVERAGE_FIELDS = ('people_benefited', 'workdays_created', 'wages_paid')
+
+RATIOS = {
+    'wages_per_workday': ('wages_paid', 'workdays_created'),
+    'workdays_per_person': ('workdays_created', 'people_benefited'),
+    'wages_per_person': ('wages_paid', 'people_benefited'),
+}
+
+DERIVED_COLUMNS = (
+    tuple(f"{field}_mom" for field in CHANGE_FIELDS)
+    + tuple(f"{field}_yoy" for field in CHANGE_FIELDS)
+    + tuple(f"{field}_avg_3m" for field in AVERAGE_FIELDS)
+    + tuple(RATIOS)
+)
+
+
+def _pct_change(current, previous):
+    """SQL for a percentage change with the API's rules (see snapshot_pct_change)"""
+    return (
+        f"CASE WHEN {previous} IS NULL OR {previous} = 0 OR {current} IS NULL THEN NULL "
+        f"ELSE ROUND(({current} - {previous}) * 100.0 / {previous}, 2) END"
+    )
+
+
+def _expressions():
+    expressions = {}
+    for field in CHANGE_FIELDS:
+        expressions[f"{field}_mom"] = _pct_change(field, f"LAG({field}) OVER by_month")
+        expressions[f"{field}_yoy"] = _pct_change(field, f"FIRST_VALUE({field}) OVER year_ago")
+    for field in AVERAGE_FIELDS:
+        expressions[f"{field}_avg_3m"] = f"ROUND(AVG({field}) OVER last_3_months, 2)"
+    for name, (numerator, denominator) in RATIOS.items():
+        expressions[name] = f"ROUND({numerator} * 1.0 / NULLIF({denominator}, 0), 2)"
+    return expressions
+
+
+_SELECT = ',\n            '.join(f"{sql} AS {name}" for name, sql in _expressions().items())
+
+# A window's empty frame (no snapshot 12 months back) yields NULL, so
+# missing months never shift the year-over-year comparison
+REFRESH_SQL = f"""
+    WITH snapshots AS (
+        SELECT district_id, year, month, year * 12 + month - 1 AS period,
+               {', '.join(CHANGE_FIELDS)}
+        FROM mgnrega_snapshots
+        {{where}}
+    ),
+    derived AS (
+        SELECT
+            district_id, year, month,
+            {_SELECT}
+        FROM snapshots
+        WINDOW
+            by_month AS (PARTITION BY district_id ORDER BY period),
+            year_ago AS (PARTITION BY district_id ORDER BY period RANGE BETWEEN 12 PRECEDING AND 12 PRECEDING),
+            last_3_months AS (PARTITION BY district_id ORDER BY period RANGE BETWEEN 2 PRECEDING AND CURRENT ROW)
+    )
+    INSERT INTO mgnrega_derived_metrics (district_id, year, month, {', '.join(DERIVED_COLUMNS)}, computed_at)
+    SELECT district_id, year, month, {', '.join(DERIVED_COLUMNS)}, CURRENT_TIMESTAMP
+    FROM derived
+    WHERE true
+    ON CONFLICT (district_id, year, month) DO UPDATE SET
+        {', '.join(f"{column} = EXCLUDED.{column}" for column in DERIVED_COLUMNS)},
+        computed_at = EXCLUDED.computed_at
+    WHERE {' OR '.join(f"mgnrega_derived_metrics.{column} IS DISTINCT FROM EXCLUDED.{column}"
+                       for column in DERIVED_COLUMNS)}
+    RETURNING district_id
+"""
+
+# Derived rows whose snapshot was deleted
+PRUNE_SQL = """
+    DELETE FROM mgnrega_derived_metrics
+    WHERE {where} NOT EXISTS (
+        SELECT 1 FROM mgnrega_snapshots s
+        WHERE s.district_id = mgnrega_derived_metrics.district_id
+            AND s.year = mgnrega_derived_metrics.year
+            AND s.month = mgnrega_derived_metrics.month
+    )
+    RETURNING district_id
+"""
+
+
+def refresh_derived_metrics(session, district_ids=None):
+    """
+    Recompute derived metrics, for all districts or only some
+    
+    Windows are per district, so restricting the pass to the districts just
+    written gives the same rows as a full pass. Does not commit.
+    
+    Args:
+        session: SQLAlchemy session
+        district_ids: Only these districts (default: all)
+    
+    Returns:
+        Set of district ids whose derived metrics changed
+    """
+    params = {}
+    if district_ids is None:
+        refresh = text(REFRESH_SQL.format(where=''))
+        prune = text(PRUNE_SQL.format(where=''))
+    else:
+        district_ids = sorted(set(district_ids))
+        if not district_ids:
+            return set()
+        params['district_ids'] = district_ids
+        refresh = text(REFRESH_SQL.format(where='WHERE district_id IN :district_ids')).bindparams(
+            bindparam('district_ids', expanding=True))
+        prune = text(PRUNE_SQL.format(where='district_id IN :district_ids AND')).bindparams(
+            bindparam('district_ids', expanding=True))
+    
+    changed = {row[0] for row in session.execute(refresh, params)}
+    changed |= {row[0] for row in session.execute(prune, params)}
+    return changed
@@ -0,0 +1,149 @@
+"""
+Incremental Ingestion
+Content hashing to skip unchanged snapshots, and a checkpoint file so an
+interrupted run resumes instead of starting over.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from sqlalchemy import text
+
+# Fields that make up a snapshot's content (the hash ignores everything else)
+HASHED_FIELDS = (
+    'people_benefited', 'workdays_created', 'wages_paid',
+    'payments_on_time_percent', 'works_completed', 'raw_json',
+)
+
+NEW = 'new'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+
+
+def content_hash(data):
+    """
+    Hash the content of a fetched snapshot
+    
+    Serialized as canonical JSON (sorted keys, no whitespace) so the same
+    upstream values always give the same hash.
+    
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = {field: data.get(field) for field in HASHED_FIELDS}
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ChangeTracker:
+    """
+    Classifies fetched snapshots against the hashes already stored for a month
+    
+    The stored hashes are read once per run with a single query.
+    """
+    
+    def __init__(self, known=None):
+        self.known = dict(known or {})
+        self.counts = {NEW: 0, CHANGED: 0, UNCHANGED: 0}
+    
+    @classmethod
+    def load(cls, session, year, month):
+        """Read the stored hash of every district for a month"""
+        rows = session.execute(
+            text("SELECT district_id, content_hash FROM mgnrega_snapshots WHERE year = :year AND month = :month"),
+            {'year': year, 'month': month}
+        ).fetchall()
+        return cls({district_id: digest for district_id, digest in rows})
+    
+    def classify(self, district_id, data):
+        """
+        Compare fetched data with the stored snapshot
+        
+        Sets ``data['content_hash']`` for the write path.
+        
+        Returns:
+            NEW, CHANGED or UNCHANGED
+        """
+        digest = content_hash(data)
+        data['content_hash'] = digest
+        if district_id not in self.known:
+            status = NEW
+        elif self.known[district_id] == digest:
+            status = UNCHANGED
+        else:
+            status = CHANGED
+        self.known[district_id] = digest
+        self.counts[status] += 1
+        return status
+
+
+class Checkpoint:
+    """
+    Append-only record of the work a run has finished
+    
+    One line per finished key (a district code, or a month for backfills),
+    appended only after its snapshots are committed (or found unchanged),
+    after a header line with the time the first key was marked. Re-running
+    the same work skips the keys listed; a run that finishes deletes the
+    file.
+    
+    Args:
+        path: Checkpoint file
+    """
+    
+    def __init__(self, path):
+        self.path = path
+    
+    @classmethod
+    def for_month(cls, directory, year, month, name='ingest'):
+        """Checkpoint file for one run of a month"""
+        return cls(os.path.join(directory, f"{name}-{year}-{month:02d}.checkpoint"))
+    
+    def load(self):
+        """
+        Read the finished keys
+        
+        Returns:
+            Set of keys (empty if there is no checkpoint)
+        """
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return {line.strip() for line in f if line.strip() and not line.startswith('#')}
+        except FileNotFoundError:
+            return set()
+    
+    def age(self):
+        """
+        Seconds since the run that wrote the checkpoint started
+        
+        Returns:
+            Age in seconds (0 if there is no checkpoint)
+        """
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                header = f.readline()
+            started = float(header.split()[-1]) if header.startswith('# started') else os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return 0.0
+        return max(0.0, time.time() - started)
+    
+    def mark(self, keys):
+        """Record keys as finished"""
+        if not keys:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            if f.tell() == 0:
+                f.write(f"# started {time.time():.0f}\n")
+            f.write(''.join(f"{key}\n" for key in keys))
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def clear(self):
+        """Delete the checkpoint after a run finishes"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
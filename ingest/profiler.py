@@ -0,0 +1,244 @@
+"""
+Ingestion Stage Profiler
+Times each stage of an ingestion run and writes a JSON report at the end.
+
+Stages:
+    fetch       upstream request (or waiting for the month download)
+    transform   change detection, content hashing and row building
+    validate    anomaly detection over the batch and its districts' history
+    write       archive append and the staging COPY / upsert
+    derive      derived-metrics refresh of the batch's districts
+    commit      transaction commit
+    invalidate  cache invalidation and checkpointing after a commit
+
+Stages nest: a batch written while a record is being transformed is
+counted as validate/write/derive/commit/invalidate, not as transform, so
+every stage reports its own (exclusive) time. Batch stages are split evenly
+over the districts in the batch when ranking the slowest districts.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+from async_ingest import percentile
+
+STAGES = ('fetch', 'transform', 'validate', 'write', 'derive', 'commit', 'invalidate')
+
+# Histogram bucket upper bounds in milliseconds; slower samples go to "+Inf"
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Districts listed in the report's slowest_districts
+SLOWEST_DISTRICTS = 10
+
+
+def histogram(samples):
+    """
+    Bucket samples (seconds) by HISTOGRAM_BUCKETS_MS
+    
+    Returns:
+        Dictionary of bucket upper bound (ms, as text) -> samples in that bucket
+    """
+    counts = {str(bound): 0 for bound in HISTOGRAM_BUCKETS_MS}
+    counts['+Inf'] = 0
+    for seconds in samples:
+        ms = seconds * 1000
+        bucket = next((str(bound) for bound in HISTOGRAM_BUCKETS_MS if ms <= bound), '+Inf')
+        counts[bucket] += 1
+    return counts
+
+
+def timed(profiler, stage, districts=None):
+    """``profiler.stage(...)``, or a no-op context when profiling is off"""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(stage, districts)
+
+
+class StageProfiler:
+    """
+    Per-stage timings of one ingestion run
+    
+    Safe to use from the event loop and the writer thread at once.
+    
+    Args:
+        cprofile: Also collect a cProfile of the run (see ``profiled``)
+        clock: Monotonic clock in seconds
+    """
+    
+    def __init__(self, cprofile=False, clock=time.perf_counter):
+        self.clock = clock
+        self.samples = {stage: [] for stage in STAGES}
+        self.districts = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # One profile for the thread running the event loop, one for the
+        # writer calls (which may land on different executor threads)
+        self._profiles = (cProfile.Profile(), cProfile.Profile()) if cprofile else None
+    
+    def record(self, stage, seconds, districts=None):
+        """
+        Add one sample to a stage
+        
+        Args:
+            stage: One of STAGES
+            seconds: Duration
+            districts: District code, or list of codes sharing the sample
+        """
+        if isinstance(districts, str):
+            districts = [districts]
+        with self._lock:
+            self.samples[stage].append(seconds)
+            for code in districts or ():
+                per_stage = self.districts.setdefault(code, dict.fromkeys(STAGES, 0.0))
+                per_stage[stage] += seconds / len(districts)
+    
+    @contextmanager
+    def stage(self, stage, districts=None):
+        """Time the enclosed block as ``stage``, excluding nested stages"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = [0.0]  # time spent in nested stages
+        stack.append(frame)
+        start = self.clock()
+        try:
+            yield
+        finally:
+            elapsed = self.clock() - start
+            stack.pop()
+            if stack:
+                stack[-1][0] += elapsed
+            self.record(stage, elapsed - frame[0], districts)
+    
+    @contextmanager
+    def profiled(self, writer=False):
+        """
+        Collect the enclosed block into the cProfile (no-op unless enabled)
+        
+        cProfile only sees the thread that enabled it, so the run itself and
+        each call on the writer thread (``writer=True``) are profiled
+        separately and merged by ``dump_cprofile``.
+        """
+        if self._profiles is None:
+            yield
+            return
+        profile = self._profiles[1 if writer else 0]
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+    
+    def dump_cprofile(self, path):
+        """Write the merged cProfile stats (readable with pstats / snakeviz)"""
+        main, writer = self._profiles
+        stats = pstats.Stats(main)
+        try:
+            stats.add(writer)
+        except TypeError:
+            pass  # The writer thread never ran
+        stats.dump_stats(path)
+    
+    def stage_summary(self):
+        """
+        Per-stage counts, totals and latency percentiles
+        
+        Returns:
+            Dictionary of stage -> summary with times in milliseconds
+        """
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self.samples.items()}
+        summary = {}
+        for stage, values in samples.items():
+            summary[stage] = {
+                'count': len(values),
+                'total_seconds': round(sum(values), 3),
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p95_ms': round(percentile(values, 95) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+                'max_ms': round(max(values, default=0.0) * 1000, 2),
+                'histogram_ms': histogram(values),
+            }
+        return summary
+    
+    def slowest_districts(self, limit=SLOWEST_DISTRICTS):
+        """
+        Districts with the most time attributed to them
+        
+        Returns:
+            List of dictionaries with district_code, total_ms and per-stage ms
+        """
+        with self._lock:
+            totals = [(sum(stages.values()), code, dict(stages)) for code, stages in self.districts.items()]
+        totals.sort(key=lambda item: (-item[0], item[1]))
+        return [
+            {
+                'district_code': code,
+                'total_ms': round(total * 1000, 2),
+                'stages_ms': {stage: round(seconds * 1000, 2) for stage, seconds in stages.items()},
+            }
+            for total, code, stages in totals[:limit]
+        ]
+    
+    def report(self, stats, **run):
+        """
+        Machine-readable report of a run
+        
+        Args:
+            stats: async_ingest.RunStats of the run
+            **run: Run parameters recorded as-is (year, month, batch size, ...)
+        
+        Returns:
+            Dictionary ready for json.dump
+        """
+        report = stats.report()
+        stages = self.stage_summary()
+        staged = sum(stage['total_seconds'] for stage in stages.values())
+        for stage in stages.values():
+            stage['share'] = round(stage['total_seconds'] / staged, 4) if staged else 0.0
+        return {
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'run': run,
+            **report,
+            'stages': stages,
+            'slowest_districts': self.slowest_districts(),
+        }
+
+
+def write_report(report, directory, name=None):
+    """
+    Write a run report as JSON
+    
+    Args:
+        report: Dictionary from StageProfiler.report
+        directory: Report directory (created if missing)
+        name: File name (default: ingest-<UTC timestamp>.json)
+    
+    Returns:
+        Path of the written file
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = name or f"ingest-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def print_stages(report):
+    """Print the per-stage part of a run report"""
+    print("  Stage          count     total s     p50 ms     p95 ms     p99 ms   share")
+    for name, stage in report['stages'].items():
+        if stage['count']:
+            print(f"  {name:<12}{stage['count']:>8}{stage['total_seconds']:>12.2f}"
+                  f"{stage['p50_ms']:>11.1f}{stage['p95_ms']:>11.1f}{stage['p99_ms']:>11.1f}"
+                  f"{stage['share']:>8.0%}")
+    slowest = report['slowest_districts'][:3]
+    if slowest:
+        print("  Slowest: " + ", ".join(f"{d['district_code']} {d['total_ms']:.0f} ms" for d in slowest))
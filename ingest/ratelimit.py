@@ -0,0 +1,116 @@
+"""
+Token-Bucket Rate Limiter
+Keeps concurrent ingestion within the upstream requests-per-second budget
+"""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Async token bucket
+    
+    Tokens refill continuously at ``rate`` per second up to ``capacity``;
+    each request takes one. Bursts up to the capacity go through at once,
+    sustained traffic is held to the rate. Waiters are served in arrival
+    order.
+    
+    Args:
+        rate: Tokens added per second (0 or less disables limiting)
+        capacity: Maximum burst size (defaults to one second's worth)
+        clock: Monotonic time source
+        sleep: Coroutine used to wait for tokens
+    """
+    
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=asyncio.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    async def acquire(self, tokens=1.0):
+        """
+        Wait until ``tokens`` are available and take them
+        
+        Returns:
+            Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+        
+        async with self._lock:
+            waited = 0.0
+            self._refill()
+            while self._tokens < tokens:
+                delay = (tokens - self._tokens) / self.rate
+                await self._sleep(delay)
+                waited += delay
+                self._refill()
+            self._tokens -= tokens
+            return waited
+
+
+class SharedTokenBucket:
+    """
+    Token bucket shared by several processes
+    
+    State lives in shared memory (created by the parent and handed to pool
+    workers), so the whole process pool stays within one requests-per-second
+    budget. Each acquire reserves a token under the lock, possibly driving
+    the balance negative, and then sleeps outside the lock until its slot.
+    
+    Args:
+        rate: Tokens added per second (0 or less disables limiting)
+        capacity: Maximum burst size (defaults to one second's worth)
+        clock: Time source shared by all processes (wall-clock monotonic)
+    """
+    
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        import multiprocessing
+        
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._clock = clock
+        self._tokens = multiprocessing.Value('d', self.capacity, lock=False)
+        self._updated = multiprocessing.Value('d', clock(), lock=False)
+        self._lock = multiprocessing.Lock()
+    
+    def reserve(self, tokens=1.0):
+        """
+        Take tokens, returning how long the caller must wait before using them
+        
+        Returns:
+            Seconds to wait
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            balance = min(self.capacity, self._tokens.value + (now - self._updated.value) * self.rate)
+            balance -= tokens
+            self._tokens.value = balance
+            self._updated.value = now
+        return max(0.0, -balance / self.rate)
+    
+    async def acquire(self, tokens=1.0):
+        """Async wait for a token (same interface as TokenBucket)"""
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+    
+    def acquire_sync(self, tokens=1.0):
+        """Blocking wait for a token"""
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
@@ -0,0 +1,127 @@
+"""
+Archive Replay
+Re-derives snapshots from the raw payload archive without calling the
+upstream API, e.g. after a fix to the field mapping in client.to_snapshot.
+
+Each month's archive members are read once, in file order, and written
+through the bulk writer; snapshots whose derived content is unchanged are
+skipped, so replaying is safe to repeat. Rebuilt rows are validated like
+fetched ones, so implausible results go to quarantine.
+
+Usage (from the ingest directory):
+    python replay.py --from 2018-04 --to 2025-03
+    python replay.py --from 2025-09 --to 2025-09 --district UP-LUC
+"""
+
+import argparse
+import sys
+import time
+
+import worker
+from archive import derive, iter_month
+from backfill import month_range, parse_month, select_districts
+from bulk import SnapshotBulkWriter
+from incremental import UNCHANGED, ChangeTracker
+
+
+def replay_month(session, year, month, district_ids=None, batch_size=None):
+    """
+    Rewrite one month's snapshots from the archive
+    
+    Args:
+        session: SQLAlchemy session
+        district_ids: Only these districts (default: every archived district)
+        batch_size: Snapshots per bulk write
+    
+    Returns:
+        Dictionary of counts (new, changed, unchanged, quarantined, failed)
+    """
+    result = {'new': 0, 'changed': 0, 'unchanged': 0, 'quarantined': 0, 'failed': 0}
+    worker.ensure_snapshot_partition(session, year)
+    tracker = ChangeTracker.load(session, year, month)
+    writer = SnapshotBulkWriter(session, batch_size or worker.INGEST_BATCH_SIZE,
+                                on_flush=worker.invalidate_district_caches, detector=worker.anomaly_detector())
+    
+    for line, ref in iter_month(worker.INGEST_ARCHIVE_DIR, year, month, district_ids):
+        data = derive(line)
+        status = tracker.classify(line['district_id'], data)
+        result[status] += 1
+        if status == UNCHANGED:
+            writer.unchanged(line['district_id'], year, month)
+            continue
+        if worker.INGEST_RAW_STORAGE == 'archive':
+            # The hash covers the full record; the row keeps pointing at it
+            data['raw_json'] = ref
+        writer.add(line['district_id'], year, month, data, line.get('district_code'))
+    writer.flush()
+    result['quarantined'] = writer.rows_quarantined
+    result['failed'] = writer.rows_failed
+    return result
+
+
+def run_replay(start, end, states=None, codes=None, batch_size=None):
+    """
+    Replay a month range from the archive
+    
+    Returns:
+        Dictionary of totals
+    """
+    district_ids = None
+    session = worker.SessionLocal()
+    try:
+        if states or codes:
+            district_ids = {district[0] for district in select_districts(session, states, codes)}
+        
+        print("\n" + "="*60)
+        print("  MGNREGA ARCHIVE REPLAY")
+        print("="*60 + "\n")
+        print(f"Archive: {worker.INGEST_ARCHIVE_DIR}\n")
+        
+        totals = {'months': 0, 'new': 0, 'changed': 0, 'unchanged': 0, 'quarantined': 0, 'failed': 0}
+        start_time = time.perf_counter()
+        for year, month in month_range(start, end):
+            result = replay_month(session, year, month, district_ids, batch_size)
+            rows = sum(result[key] for key in ('new', 'changed', 'unchanged'))
+            if rows:
+                totals['months'] += 1
+                print(f"{year}-{month:02d}: {rows} archived, {result['new']} new, "
+                      f"{result['changed']} changed, {result['quarantined']} quarantined, "
+                      f"{result['failed']} failed")
+            for key in ('new', 'changed', 'unchanged', 'quarantined', 'failed'):
+                totals[key] += result[key]
+        if totals['new'] or totals['changed']:
+            totals['derived'] = worker.refresh_derived(session, district_ids)
+    finally:
+        session.close()
+    
+    elapsed = time.perf_counter() - start_time
+    rows = totals['new'] + totals['changed'] + totals['unchanged']
+    print(f"\n{'='*60}")
+    print(f"  Replayed {rows:,} snapshots from {totals['months']} months in {elapsed:.1f}s "
+          f"({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+    print(f"  {totals['new']} new, {totals['changed']} changed, {totals['unchanged']} unchanged, "
+          f"{totals['quarantined']} quarantined, {totals['failed']} failed")
+    print("="*60 + "\n")
+    return totals
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Re-derive MGNREGA snapshots from the raw payload archive")
+    parser.add_argument('--from', dest='start', type=parse_month, required=True, help="First month (YYYY-MM)")
+    parser.add_argument('--to', dest='end', type=parse_month, required=True, help="Last month (YYYY-MM)")
+    parser.add_argument('--state', action='append', help="Only districts in this state (repeatable)")
+    parser.add_argument('--district', action='append', help="Only this district code (repeatable)")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help=f"Snapshots per write batch (default {worker.INGEST_BATCH_SIZE})")
+    args = parser.parse_args(argv)
+    
+    if args.start > args.end:
+        parser.error("--from must not be after --to")
+    
+    totals = run_replay(args.start, args.end, args.state, args.district, args.batch_size)
+    return 1 if totals['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -82,6 +82,10 @@ def seed_districts():
         
         print(f"\n Inserted: {inserted}, Skipped: {skipped}")
         
+        # Refresh API district lists and registries
+        from worker import invalidate_district_lists
+        invalidate_district_lists()
+        
     finally:
         session.close()
 
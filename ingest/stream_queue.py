@@ -0,0 +1,394 @@
+"""
+Redis Streams Ingestion Queue
+Distributes (district, year, month) jobs to any number of worker
+processes on any host.
+
+- Producers XADD jobs to the ``ingest:jobs`` stream.
+- Workers read through the ``ingest-workers`` consumer group and XACK
+  (then XDEL) each job once its snapshot is committed.
+- A job that fails, or whose worker died, stays pending; after
+  ``INGEST_CLAIM_IDLE_MS`` any live worker reclaims it with XAUTOCLAIM.
+- Deliveries are counted per job; after ``INGEST_MAX_ATTEMPTS`` the job
+  moves to the ``ingest:jobs:dead`` stream with its last error.
+
+Usage (from the ingest directory):
+    python stream_queue.py produce                         # current month, all districts
+    python stream_queue.py produce --from 2024-01 --to 2024-12 --state "Uttar Pradesh"
+    python stream_queue.py work --workers 4
+    python stream_queue.py status
+    python stream_queue.py requeue-dead
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+import redis
+
+import worker
+from backfill import fetch_districts_month, month_range, parse_month, select_districts
+from bulk import SnapshotBulkWriter
+from incremental import UNCHANGED, ChangeTracker
+from ratelimit import SharedTokenBucket
+
+STREAM = os.getenv('INGEST_STREAM', 'ingest:jobs')
+GROUP = os.getenv('INGEST_STREAM_GROUP', 'ingest-workers')
+MAX_ATTEMPTS = int(os.getenv('INGEST_MAX_ATTEMPTS', '3'))
+CLAIM_IDLE_MS = int(os.getenv('INGEST_CLAIM_IDLE_MS', '60000'))
+STREAM_BATCH_SIZE = int(os.getenv('INGEST_STREAM_BATCH', '50'))
+
+
+def dead_letter_stream(stream=STREAM):
+    return f"{stream}:dead"
+
+
+def ensure_group(client, stream=STREAM, group=GROUP):
+    """Create the stream and consumer group if they do not exist"""
+    try:
+        client.xgroup_create(stream, group, id='0', mkstream=True)
+    except redis.ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def enqueue(client, jobs, stream=STREAM):
+    """
+    Add jobs to the stream
+    
+    Args:
+        jobs: Iterable of (district_code, year, month)
+    
+    Returns:
+        Message ids
+    """
+    ensure_group(client, stream)
+    pipe = client.pipeline(transaction=False)
+    for district_code, year, month in jobs:
+        pipe.xadd(stream, {'district_code': district_code, 'year': str(year), 'month': str(month)})
+    return pipe.execute()
+
+
+def parse_job(fields):
+    return {'district_code': fields['district_code'], 'year': int(fields['year']), 'month': int(fields['month'])}
+
+
+class StreamConsumer:
+    """
+    One consumer in the ingestion consumer group
+    
+    Args:
+        client: Redis client (decode_responses=True)
+        handler: ``handler([(message_id, job), ...]) -> {message_id: error}``
+            returning the jobs that failed
+        name: Consumer name, unique per process
+        batch_size: Jobs read per poll
+        block_ms: How long a poll waits for new jobs (0 does not block)
+        claim_idle_ms: Pending time after which a job is reclaimed
+        max_attempts: Deliveries before a job is dead-lettered
+    """
+    
+    def __init__(self, client, handler, name=None, stream=STREAM, group=GROUP, batch_size=STREAM_BATCH_SIZE,
+                 block_ms=5000, claim_idle_ms=CLAIM_IDLE_MS, max_attempts=MAX_ATTEMPTS):
+        self.client = client
+        self.handler = handler
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.stream = stream
+        self.group = group
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.max_attempts = max_attempts
+        self.deliveries_key = f"{stream}:deliveries"
+        self.errors_key = f"{stream}:errors"
+        self._claim_cursor = '0-0'
+        self.processed = 0
+        self.failed = 0
+        self.dead_lettered = 0
+        ensure_group(client, stream, group)
+    
+    def _reclaim(self):
+        """
+        Take over jobs left pending too long by any consumer (including dead ones)
+        
+        Entries deleted while pending come back as ids without fields (Redis
+        6.2) or in a third list of deleted ids (Redis 7); they are acked and
+        their delivery count and last error dropped.
+        """
+        response = self.client.xautoclaim(
+            self.stream, self.group, self.name, min_idle_time=self.claim_idle_ms,
+            start_id=self._claim_cursor, count=self.batch_size,
+        )
+        self._claim_cursor = response[0]
+        messages = []
+        deleted = list(response[2]) if len(response) > 2 else []
+        for message_id, fields in response[1]:
+            if fields is None:
+                deleted.append(message_id)
+            else:
+                messages.append((message_id, fields))
+        if deleted:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.xack(self.stream, self.group, *deleted)
+            pipe.hdel(self.deliveries_key, *deleted)
+            pipe.hdel(self.errors_key, *deleted)
+            pipe.execute()
+        return messages
+    
+    def _read_new(self):
+        response = self.client.xreadgroup(
+            self.group, self.name, {self.stream: '>'}, count=self.batch_size, block=self.block_ms or None,
+        )
+        return response[0][1] if response else []
+    
+    def _finish(self, message_ids):
+        """Acknowledge and delete completed jobs"""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.xack(self.stream, self.group, *message_ids)
+        pipe.xdel(self.stream, *message_ids)
+        pipe.hdel(self.deliveries_key, *message_ids)
+        pipe.hdel(self.errors_key, *message_ids)
+        pipe.execute()
+    
+    def _dead_letter(self, message_id, fields, attempts):
+        error = self.client.hget(self.errors_key, message_id) or 'worker died while processing'
+        pipe = self.client.pipeline(transaction=True)
+        pipe.xadd(dead_letter_stream(self.stream), {
+            **fields, 'original_id': message_id, 'attempts': str(attempts), 'error': error,
+            'failed_at': datetime.utcnow().isoformat(),
+        })
+        pipe.xack(self.stream, self.group, message_id)
+        pipe.xdel(self.stream, message_id)
+        pipe.hdel(self.deliveries_key, message_id)
+        pipe.hdel(self.errors_key, message_id)
+        pipe.execute()
+        self.dead_lettered += 1
+        print(f"✗ Dead-lettered job {fields.get('district_code')} {fields.get('year')}-{fields.get('month')}: {error}")
+    
+    def poll(self):
+        """
+        Process one batch of reclaimed or new jobs
+        
+        Returns:
+            Number of jobs received
+        """
+        messages = self._reclaim() or self._read_new()
+        if not messages:
+            return 0
+        
+        pipe = self.client.pipeline(transaction=False)
+        for message_id, _ in messages:
+            pipe.hincrby(self.deliveries_key, message_id, 1)
+        attempts = dict(zip((message_id for message_id, _ in messages), pipe.execute()))
+        
+        live = []
+        for message_id, fields in messages:
+            if attempts[message_id] > self.max_attempts:
+                # A worker died holding it on its last attempt
+                self._dead_letter(message_id, fields, attempts[message_id] - 1)
+            else:
+                live.append((message_id, fields))
+        if not live:
+            return len(messages)
+        
+        try:
+            failures = self.handler([(message_id, parse_job(fields)) for message_id, fields in live])
+        except Exception as e:
+            failures = {message_id: f"{type(e).__name__}: {e}" for message_id, _ in live}
+        
+        done = [message_id for message_id, _ in live if message_id not in failures]
+        if done:
+            self._finish(done)
+        if failures:
+            # Left pending: reclaimed after claim_idle_ms, or dead-lettered now if out of attempts
+            self.client.hset(self.errors_key, mapping=failures)
+            for message_id, fields in live:
+                if message_id in failures and attempts[message_id] >= self.max_attempts:
+                    self._dead_letter(message_id, fields, attempts[message_id])
+        self.processed += len(done)
+        self.failed += len(failures)
+        return len(messages)
+    
+    def run(self, stop=None):
+        """Poll until ``stop`` (a threading/multiprocessing Event) is set"""
+        while stop is None or not stop.is_set():
+            try:
+                self.poll()
+            except redis.RedisError as e:
+                print(f"⚠ Queue error in {self.name}: {e}")
+                if stop is not None:
+                    stop.wait(1.0)
+
+
+def ingest_jobs(jobs, limiter=None):
+    """
+    Queue handler: fetch and write a batch of district-month jobs
+    
+    Jobs are grouped by month so each month is fetched once and written in
+    one bulk batch; unchanged rows are skipped.
+    
+    Returns:
+        Dictionary of message_id -> error for failed jobs
+    """
+    failures = {}
+    by_month = defaultdict(list)
+    for message_id, job in jobs:
+        by_month[(job['year'], job['month'])].append((message_id, job['district_code']))
+    
+    session = worker.SessionLocal()
+    detector = worker.anomaly_detector()
+    try:
+        for (year, month), items in by_month.items():
+            districts = select_districts(session, codes={code for _, code in items})
+            known = {code for _, code, _, _ in districts}
+            for message_id, code in items:
+                if code not in known:
+                    failures[message_id] = f"unknown district {code}"
+            
+            try:
+                fetched = asyncio.run(fetch_districts_month(districts, year, month, limiter))
+            except Exception as e:
+                for message_id, _ in items:
+                    failures.setdefault(message_id, f"fetch failed: {e}")
+                continue
+            
+            worker.ensure_snapshot_partition(session, year)
+            tracker = ChangeTracker.load(session, year, month)
+            writer = SnapshotBulkWriter(session, len(items), on_flush=worker.invalidate_district_caches,
+                                        archive=worker.raw_archive(), derive=True, detector=detector)
+            for district_id, code, _, _ in districts:
+                data = fetched.get(code)
+                if data is None:
+                    continue
+                if tracker.classify(district_id, data) == UNCHANGED:
+                    writer.unchanged(district_id, year, month)
+                else:
+                    writer.add(district_id, year, month, data, code)
+            writer.flush()
+            
+            for message_id, code in items:
+                if code in known and code not in fetched:
+                    failures[message_id] = f"no upstream data for {code} in {year}-{month:02d}"
+                elif writer.rows_failed:
+                    failures.setdefault(message_id, "snapshot write failed")
+    finally:
+        session.close()
+    return failures
+
+
+def _consume(name, stop, limiter, batch_size):
+    """Worker process entry point"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker.engine.dispose(close=False)
+    consumer = StreamConsumer(
+        worker.redis_client, lambda jobs: ingest_jobs(jobs, limiter), name=name, batch_size=batch_size,
+    )
+    print(f"Consumer {name} started")
+    consumer.run(stop)
+    print(f"Consumer {name} stopped: {consumer.processed} done, {consumer.failed} failed, "
+          f"{consumer.dead_lettered} dead-lettered")
+
+
+def run_workers(processes, batch_size=STREAM_BATCH_SIZE, rps=None):
+    """Run consumer processes until SIGINT/SIGTERM; they share one rate budget"""
+    ensure_group(worker.redis_client)
+    stop = multiprocessing.Event()
+    limiter = SharedTokenBucket(worker.INGEST_RPS if rps is None else rps, worker.INGEST_BURST)
+    host = socket.gethostname()
+    children = [
+        multiprocessing.Process(target=_consume, args=(f"{host}-{os.getpid()}-{index}", stop, limiter, batch_size))
+        for index in range(processes)
+    ]
+    for child in children:
+        child.start()
+    
+    def shutdown(signum, frame):
+        stop.set()
+    
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    for child in children:
+        child.join()
+
+
+def status(client, stream=STREAM, group=GROUP):
+    """
+    Queue depth summary
+    
+    Returns:
+        Dictionary with stream length, pending jobs, dead letters and consumers
+    """
+    ensure_group(client, stream, group)
+    pending = client.xpending(stream, group)
+    return {
+        'queued': client.xlen(stream),
+        'pending': pending['pending'],
+        'dead': client.xlen(dead_letter_stream(stream)),
+        'consumers': {consumer['name']: consumer['pending'] for consumer in pending['consumers']},
+    }
+
+
+def requeue_dead(client, stream=STREAM):
+    """
+    Move every dead-lettered job back onto the stream with fresh attempts
+    
+    Returns:
+        Number of jobs requeued
+    """
+    dead = dead_letter_stream(stream)
+    entries = client.xrange(dead)
+    if entries:
+        enqueue(client, [(f['district_code'], f['year'], f['month']) for _, f in entries], stream)
+        client.xdel(dead, *[message_id for message_id, _ in entries])
+    return len(entries)
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Queue-driven MGNREGA ingestion")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    produce = commands.add_parser('produce', help="Enqueue district-month jobs")
+    produce.add_argument('--from', dest='start', type=parse_month, help="First month (default: current)")
+    produce.add_argument('--to', dest='end', type=parse_month, help="Last month (default: --from)")
+    produce.add_argument('--state', action='append')
+    produce.add_argument('--district', action='append')
+    
+    work = commands.add_parser('work', help="Run consumer processes")
+    work.add_argument('--workers', type=int, default=2)
+    work.add_argument('--batch-size', type=int, default=STREAM_BATCH_SIZE)
+    work.add_argument('--rps', type=float, default=None)
+    
+    commands.add_parser('status', help="Show queue depth")
+    commands.add_parser('requeue-dead', help="Move dead-lettered jobs back onto the queue")
+    args = parser.parse_args(argv)
+    
+    if args.command == 'produce':
+        now = datetime.now()
+        start = args.start or (now.year, now.month)
+        end = args.end or start
+        session = worker.SessionLocal()
+        try:
+            districts = select_districts(session, args.state, args.district)
+        finally:
+            session.close()
+        jobs = [(code, year, month) for year, month in month_range(start, end) for _, code, _, _ in districts]
+        enqueue(worker.redis_client, jobs)
+        print(f"Enqueued {len(jobs)} jobs on {STREAM}")
+    elif args.command == 'work':
+        run_workers(args.workers, args.batch_size, args.rps)
+    elif args.command == 'status':
+        for name, value in status(worker.redis_client).items():
+            print(f"{name}: {value}")
+    elif args.command == 'requeue-dead':
+        print(f"Requeued {requeue_dead(worker.redis_client)} jobs")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Local data.gov.in Stub Server
+Replays recorded MGNREGA API records so the client and ingestion
+throughput can be tested offline.
+
+Serves GET /resource/<resource_id> with the same query parameters as
+data.gov.in (api-key, format, offset, limit, filters[field]=value) and
+ETag-based 304 responses. Optional latency and 429 injection make retry
+and rate-limit behaviour reproducible.
+
+Usage (from the ingest directory):
+    python stub_server.py --port 8085 --fixtures fixtures/ --latency-ms 50
+    MGNREGA_API_BASE_URL=http://localhost:8085/resource MGNREGA_API_KEY=stub python worker.py
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FILTER_PARAM = re.compile(r'^filters\[(.+)\]$')
+
+
+def load_fixtures(path):
+    """
+    Load recorded records from a JSON file or every *.json file in a directory
+    
+    Each file holds either an API response ({"records": [...]}) or a list.
+    """
+    paths = [path]
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.json'))
+    records = []
+    for file_path in paths:
+        with open(file_path, encoding='utf-8') as f:
+            body = json.load(f)
+        records.extend(body['records'] if isinstance(body, dict) else body)
+    return records
+
+
+class StubAPI:
+    """
+    Request handling independent of the HTTP server
+    
+    Args:
+        records: Records to serve
+        api_key: Required api-key (None accepts any)
+        latency: Seconds added to every response
+        fail_rate: Fraction of requests answered with 429
+        seed: Seed for failure injection
+        max_limit: Largest page served whatever ``limit`` asks for (as data.gov.in)
+    """
+    
+    def __init__(self, records, api_key=None, latency=0.0, fail_rate=0.0, seed=0, max_limit=None):
+        self.records = records
+        self.max_limit = max_limit
+        self.api_key = api_key
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+    
+    def handle(self, path, query, headers):
+        """
+        Returns:
+            Tuple of (status, response headers, body bytes)
+        """
+        with self._lock:
+            self.requests += 1
+            fail = self._rng.random() < self.fail_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if not path.startswith('/resource/'):
+            return 404, {}, b'{"error": "not found"}'
+        if self.api_key is not None and query.get('api-key', [''])[0] != self.api_key:
+            return 403, {}, b'{"error": "invalid api-key"}'
+        if fail:
+            return 429, {'Retry-After': '0'}, b'{"error": "rate limited"}'
+        
+        filters = {}
+        for name, values in query.items():
+            match = FILTER_PARAM.match(name)
+            if match:
+                filters[match.group(1)] = values[0].lower()
+        matching = [
+            record for record in self.records
+            if all(str(record.get(field, '')).lower() == value for field, value in filters.items())
+        ]
+        offset = int(query.get('offset', ['0'])[0])
+        limit = int(query.get('limit', ['10'])[0])
+        if self.max_limit is not None:
+            limit = min(limit, self.max_limit)
+        page = matching[offset:offset + limit]
+        
+        body = json.dumps({
+            'total': len(matching), 'count': len(page), 'offset': offset, 'limit': limit, 'records': page,
+        }).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return 200, {'ETag': etag, 'Content-Type': 'application/json'}, body
+
+
+def make_server(api, host='127.0.0.1', port=0):
+    """Create (but do not start) a threading HTTP server for a StubAPI"""
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def do_GET(self):
+            url = urlparse(self.path)
+            status, headers, body = api.handle(url.path, parse_qs(url.query), self.headers)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay recorded data.gov.in MGNREGA responses")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8085)
+    parser.add_argument('--fixtures', default=os.path.join(os.path.dirname(__file__), 'fixtures'))
+    parser.add_argument('--api-key', default=None, help="Reject requests without this api-key")
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args()
+    
+    stub = StubAPI(load_fixtures(args.fixtures), args.api_key, args.latency_ms / 1000, args.fail_rate)
+    server = make_server(stub, args.host, args.port)
+    print(f"Serving {len(stub.records)} records on http://{args.host}:{args.port}/resource/<id>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
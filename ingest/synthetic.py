@@ -0,0 +1,365 @@
+"""
+Synthetic Dataset Generator
+Generates a national-scale, seeded-deterministic MGNREGA dataset (states x
+districts x years of monthly snapshots) and loads it with COPY, for load
+testing the API and database.
+
+Every value is derived from (seed, district_code, year), so the same
+arguments always produce the same rows, and a subset of years or states
+matches the full dataset. Synthetic districts are coded
+``SYN-<state>-<nnn>`` and can be removed with --reset without touching real
+districts.
+
+The numbers follow the shape of the real data: district sizes spread over
+two orders of magnitude, seasonal demand (peaking in the summer lean
+season, dipping during monsoon sowing and the harvest), wage rates rising
+every year and a demand spike in fiscal 2020-21.
+
+Usage (from the ingest directory):
+    python synthetic.py --states 36 --districts-per-state 20 --years 10
+    python synthetic.py --states 36 --districts-per-state 200 --years 20 --reset
+"""
+
+import argparse
+import io
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from sqlalchemy import text
+
+import worker
+from derived import refresh_derived_metrics
+
+CODE_PREFIX = 'SYN'
+
+# (name, code, latitude, longitude) of the states and union territories
+STATES = (
+    ('Uttar Pradesh', 'UP', 26.85, 80.91), ('Maharashtra', 'MH', 19.75, 75.71),
+    ('Bihar', 'BR', 25.10, 85.31), ('West Bengal', 'WB', 22.99, 87.86),
+    ('Madhya Pradesh', 'MP', 22.97, 78.66), ('Tamil Nadu', 'TN', 11.13, 78.66),
+    ('Rajasthan', 'RJ', 27.02, 74.22), ('Karnataka', 'KA', 15.32, 75.71),
+    ('Gujarat', 'GJ', 22.26, 71.19), ('Andhra Pradesh', 'AP', 15.91, 79.74),
+    ('Odisha', 'OD', 20.95, 85.10), ('Telangana', 'TS', 18.11, 79.02),
+    ('Kerala', 'KL', 10.85, 76.27), ('Jharkhand', 'JH', 23.61, 85.28),
+    ('Assam', 'AS', 26.20, 92.94), ('Punjab', 'PB', 31.15, 75.34),
+    ('Chhattisgarh', 'CG', 21.28, 81.87), ('Haryana', 'HR', 29.06, 76.09),
+    ('Jammu and Kashmir', 'JK', 33.78, 76.58), ('Uttarakhand', 'UK', 30.07, 79.02),
+    ('Himachal Pradesh', 'HP', 31.10, 77.17), ('Tripura', 'TR', 23.94, 91.99),
+    ('Meghalaya', 'ML', 25.47, 91.37), ('Manipur', 'MN', 24.66, 93.91),
+    ('Nagaland', 'NL', 26.16, 94.56), ('Goa', 'GA', 15.30, 74.12),
+    ('Arunachal Pradesh', 'AR', 28.22, 94.73), ('Mizoram', 'MZ', 23.16, 92.94),
+    ('Sikkim', 'SK', 27.53, 88.51), ('Delhi', 'DL', 28.70, 77.10),
+    ('Puducherry', 'PY', 11.94, 79.81), ('Ladakh', 'LA', 34.15, 77.58),
+    ('Andaman and Nicobar Islands', 'AN', 11.74, 92.66), ('Chandigarh', 'CH', 30.73, 76.78),
+    ('Dadra and Nagar Haveli and Daman and Diu', 'DH', 20.40, 72.83),
+    ('Lakshadweep', 'LD', 10.57, 72.64),
+)
+
+_NAME_HEADS = (
+    'Ram', 'Chand', 'Bal', 'Sita', 'Hari', 'Shiv', 'Deo', 'Ganga', 'Sultan', 'Raj',
+    'Nand', 'Bhim', 'Lal', 'Jai', 'Gopal', 'Kishan', 'Mahe', 'Sur', 'Dhar', 'Anand',
+)
+_NAME_TAILS = (
+    'pur', 'ganj', 'nagar', 'abad', 'garh', 'pura', 'gaon', 'wadi', 'kot', 'bagh',
+    'khed', 'patti', 'sar', 'ner', 'dih',
+)
+
+# Relative demand by calendar month: high in the summer lean season, low
+# during monsoon sowing and the kharif harvest
+SEASONALITY = {
+    1: 1.00, 2: 1.10, 3: 1.20, 4: 1.25, 5: 1.35, 6: 1.20,
+    7: 0.80, 8: 0.70, 9: 0.70, 10: 0.75, 11: 0.85, 12: 0.95,
+}
+
+# Demand multiplier for (year, month) ranges, e.g. the 2020-21 return migration
+SHOCKS = (((2020, 4), (2021, 3), 1.40),)
+
+# Average wage per person-day (Rs) in BASE_WAGE_YEAR, growing WAGE_GROWTH a year
+BASE_WAGE = 160.0
+BASE_WAGE_YEAR = 2015
+WAGE_GROWTH = 0.05
+
+SNAPSHOT_COLUMNS = (
+    'district_id', 'year', 'month', 'people_benefited', 'workdays_created',
+    'wages_paid', 'payments_on_time_percent', 'works_completed',
+)
+
+COPY_SQL = f"COPY mgnrega_snapshots ({', '.join(SNAPSHOT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+INSERT_SNAPSHOT_SQL = f"""
+    INSERT INTO mgnrega_snapshots ({', '.join(SNAPSHOT_COLUMNS)})
+    VALUES ({', '.join(':' + column for column in SNAPSHOT_COLUMNS)})
+"""
+
+INSERT_DISTRICT_SQL = """
+    INSERT INTO districts (state, district_name, district_code, latitude, longitude)
+    VALUES (:state, :district_name, :district_code, :latitude, :longitude)
+    ON CONFLICT (district_code) DO NOTHING
+"""
+
+
+def district_code(state_code, number):
+    return f"{CODE_PREFIX}-{state_code}-{number:03d}"
+
+
+def generate_districts(states, districts_per_state, seed=42):
+    """
+    Synthetic districts for the first ``states`` states
+    
+    Returns:
+        List of district dictionaries (state, district_name, district_code,
+        latitude, longitude)
+    """
+    districts = []
+    for index in range(states):
+        if index < len(STATES):
+            state, state_code, latitude, longitude = STATES[index]
+        else:
+            state, state_code, latitude, longitude = f"State {index + 1}", f"S{index + 1}", 22.0, 79.0
+        rng = random.Random(f"{seed}:{state_code}")
+        names = [head + tail for head in _NAME_HEADS for tail in _NAME_TAILS]
+        rng.shuffle(names)
+        for number in range(1, districts_per_state + 1):
+            name = names[(number - 1) % len(names)]
+            if number > len(names):
+                name = f"{name} {(number - 1) // len(names) + 1}"
+            districts.append({
+                'state': state,
+                'district_name': name,
+                'district_code': district_code(state_code, number),
+                'latitude': round(latitude + rng.gauss(0, 1.0), 4),
+                'longitude': round(longitude + rng.gauss(0, 1.0), 4),
+            })
+    return districts
+
+
+def _profile(seed, code):
+    """Fixed characteristics of a district"""
+    rng = random.Random(f"{seed}:{code}")
+    return {
+        # Median ~45k people a month, most districts between ~10k and ~200k
+        'people': math.exp(rng.gauss(math.log(45000), 0.6)),
+        'growth': rng.uniform(-0.02, 0.06),
+        'days_per_person': rng.uniform(15, 25),
+        'wage_factor': rng.uniform(0.85, 1.20),
+        'on_time': rng.uniform(60, 95),
+        'people_per_work': rng.uniform(100, 200),
+    }
+
+
+def _shock(year, month):
+    factor = 1.0
+    for start, end, multiplier in SHOCKS:
+        if start <= (year, month) <= end:
+            factor *= multiplier
+    return factor
+
+
+def district_year(seed, code, district_id, year, profile=None):
+    """
+    Twelve monthly snapshot rows for one district and year
+    
+    Returns:
+        List of tuples in SNAPSHOT_COLUMNS order
+    """
+    profile = profile or _profile(seed, code)
+    rng = random.Random(f"{seed}:{code}:{year}")
+    trend = (1 + profile['growth']) ** (year - BASE_WAGE_YEAR)
+    wage_rate = BASE_WAGE * profile['wage_factor'] * (1 + WAGE_GROWTH) ** (year - BASE_WAGE_YEAR)
+    # Payment timeliness improved steadily across the scheme
+    on_time_base = min(99.0, profile['on_time'] + 1.5 * (year - BASE_WAGE_YEAR))
+    
+    rows = []
+    for month in range(1, 13):
+        demand = SEASONALITY[month] * _shock(year, month) * rng.lognormvariate(0, 0.08)
+        people = max(0, int(profile['people'] * trend * demand))
+        workdays = int(people * profile['days_per_person'] * rng.uniform(0.9, 1.1))
+        wages = round(workdays * wage_rate, 2)
+        on_time = round(min(100.0, max(0.0, rng.gauss(on_time_base, 3.0))), 2)
+        works = int(people / profile['people_per_work'] * rng.uniform(0.8, 1.2))
+        rows.append((district_id, year, month, people, workdays, wages, on_time, works))
+    return rows
+
+
+def generate_snapshots(districts, years, seed=42):
+    """
+    Snapshot rows for every district and year, a year at a time
+    
+    Args:
+        districts: Iterable of (district_id, district_code)
+        years: Iterable of years
+    
+    Yields:
+        Lists of row tuples, one list per year
+    """
+    districts = list(districts)
+    profiles = {code: _profile(seed, code) for _, code in districts}
+    for year in years:
+        rows = []
+        for district_id, code in districts:
+            rows.extend(district_year(seed, code, district_id, year, profiles[code]))
+        yield rows
+
+
+def year_csv(districts, year, seed=42):
+    """
+    One year of snapshot rows for every district, as CSV for COPY
+    
+    Numeric columns only, so nothing needs quoting.
+    """
+    (rows,) = generate_snapshots(districts, [year], seed)
+    return ''.join(','.join(map(str, row)) + '\n' for row in rows)
+
+
+def csv_chunks(districts, years, seed=42, processes=None):
+    """
+    CSV text per year, generated in parallel processes
+    
+    Years are yielded in order, so the output does not depend on
+    ``processes``.
+    """
+    years = list(years)
+    processes = min(processes or os.cpu_count() or 1, len(years))
+    if processes <= 1:
+        for year in years:
+            yield year_csv(districts, year, seed)
+        return
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        yield from pool.map(year_csv, repeat(districts), years, repeat(seed))
+
+
+def _insert_districts(session, districts):
+    session.execute(text(INSERT_DISTRICT_SQL), districts)
+    codes = [district['district_code'] for district in districts]
+    result = session.execute(
+        text("SELECT id, district_code FROM districts WHERE district_code LIKE :prefix"),
+        {'prefix': f"{CODE_PREFIX}-%"}
+    )
+    wanted = set(codes)
+    return [(district_id, code) for district_id, code in result if code in wanted]
+
+
+def seed(session, states, districts_per_state, years, end_year, seed=42, reset=False, processes=None):
+    """
+    Generate and load a synthetic dataset in one transaction
+    
+    On PostgreSQL snapshots are COPYed straight into mgnrega_snapshots with
+    the district_latest trigger disabled, and district_latest is refreshed
+    once per district at the end, while the next years are generated in
+    ``processes`` worker processes. Other databases get one executemany per
+    year. Derived metrics are computed in the same transaction.
+    
+    Args:
+        session: SQLAlchemy session
+        states: Number of states
+        districts_per_state: Districts in each state
+        years: Years of history ending at ``end_year``
+        end_year: Last year generated (all twelve months)
+        seed: Random seed
+        reset: Delete existing synthetic districts (and their snapshots) first
+        processes: Generator processes (default: one per CPU)
+    
+    Returns:
+        Dictionary with districts, rows and elapsed seconds, or None if
+        synthetic snapshots already exist and ``reset`` is not set
+    """
+    postgres = session.get_bind().dialect.name == 'postgresql'
+    year_range = range(end_year - years + 1, end_year + 1)
+    start = time.perf_counter()
+    
+    if postgres:
+        for year in year_range:
+            worker.ensure_snapshot_partition(session, year)
+    
+    try:
+        if postgres:
+            # Re-enabled below; the ALTER is transactional, so a failed load
+            # never leaves the trigger off
+            session.execute(text("ALTER TABLE mgnrega_snapshots DISABLE TRIGGER trg_district_latest"))
+        if reset:
+            session.execute(text("DELETE FROM districts WHERE district_code LIKE :prefix"),
+                            {'prefix': f"{CODE_PREFIX}-%"})
+        else:
+            existing = session.execute(text("""
+                SELECT COUNT(*) FROM mgnrega_snapshots s JOIN districts d ON d.id = s.district_id
+                WHERE d.district_code LIKE :prefix
+            """), {'prefix': f"{CODE_PREFIX}-%"}).scalar()
+            if existing:
+                session.rollback()
+                return None
+        
+        districts = _insert_districts(session, generate_districts(states, districts_per_state, seed))
+        rows = 0
+        if postgres:
+            cursor = session.connection().connection.driver_connection.cursor()
+            try:
+                for chunk in csv_chunks(districts, year_range, seed, processes):
+                    cursor.copy_expert(COPY_SQL, io.StringIO(chunk))
+                    rows += chunk.count('\n')
+            finally:
+                cursor.close()
+            session.execute(
+                text("SELECT refresh_district_latest(id) FROM districts WHERE district_code LIKE :prefix"),
+                {'prefix': f"{CODE_PREFIX}-%"}
+            )
+            session.execute(text("ALTER TABLE mgnrega_snapshots ENABLE TRIGGER trg_district_latest"))
+        else:
+            for chunk in generate_snapshots(districts, year_range, seed):
+                session.execute(text(INSERT_SNAPSHOT_SQL), [dict(zip(SNAPSHOT_COLUMNS, row)) for row in chunk])
+                rows += len(chunk)
+        refresh_derived_metrics(session, [district_id for district_id, _ in districts])
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    
+    if postgres:
+        session.execute(text("ANALYZE mgnrega_snapshots"))
+        session.execute(text("ANALYZE mgnrega_derived_metrics"))
+        session.commit()
+    return {'districts': len(districts), 'rows': rows, 'elapsed': time.perf_counter() - start}
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Load a synthetic national-scale MGNREGA dataset")
+    parser.add_argument('--states', type=int, default=len(STATES), help=f"Number of states (default {len(STATES)})")
+    parser.add_argument('--districts-per-state', type=int, default=20)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--end-year', type=int, default=2025)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help="Replace existing synthetic districts and snapshots")
+    parser.add_argument('--processes', type=int, default=None, help="Generator processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+    
+    print("\n" + "="*60)
+    print("  SYNTHETIC DATASET LOADER")
+    print(f"  {args.states} states x {args.districts_per_state} districts x {args.years} years "
+          f"(seed {args.seed})")
+    print("="*60 + "\n")
+    
+    session = worker.SessionLocal()
+    try:
+        result = seed(session, args.states, args.districts_per_state, args.years, args.end_year,
+                      args.seed, args.reset, args.processes)
+    finally:
+        session.close()
+    if result is None:
+        print("✗ Synthetic snapshots already exist; use --reset to replace them")
+        return 1
+    
+    worker.invalidate_district_lists()
+    rate = result['rows'] / result['elapsed'] if result['elapsed'] else 0
+    print(f"✓ {result['districts']:,} districts, {result['rows']:,} snapshots in "
+          f"{result['elapsed']:.1f}s ({rate:,.0f} rows/s)")
+    print("\n" + "="*60 + "\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Shared test configuration
+
+SQLite versions of the tables in init.sql and the database fixtures built
+from them:
+
+    engine / session  in-memory database with three Uttar Pradesh districts
+    database          file-backed database (shared with forked pool
+                      processes) wired into worker, with deterministic fetches
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import worker
+from derived import DERIVED_COLUMNS
+
+SCHEMA_DDL = (
+    """
+    CREATE TABLE districts (
+        id INTEGER PRIMARY KEY,
+        state TEXT,
+        district_name TEXT,
+        district_code TEXT UNIQUE,
+        latitude NUMERIC,
+        longitude NUMERIC
+    )
+    """,
+    """
+    CREATE TABLE mgnrega_snapshots (
+        id INTEGER PRIMARY KEY,
+        district_id INTEGER REFERENCES districts(id) ON DELETE CASCADE,
+        year INTEGER,
+        month INTEGER,
+        people_benefited INTEGER,
+        workdays_created INTEGER,
+        wages_paid NUMERIC,
+        payments_on_time_percent NUMERIC,
+        works_completed INTEGER,
+        fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        content_hash TEXT,
+        UNIQUE(district_id, year, month)
+    )
+    """,
+    """
+    CREATE TABLE mgnrega_snapshot_raw (
+        snapshot_id INTEGER,
+        snapshot_year INTEGER,
+        raw_json TEXT NOT NULL,
+        PRIMARY KEY (snapshot_id, snapshot_year)
+    )
+    """,
+    f"""
+    CREATE TABLE mgnrega_derived_metrics (
+        district_id INTEGER REFERENCES districts(id) ON DELETE CASCADE,
+        year INTEGER,
+        month INTEGER,
+        {', '.join(f'{column} NUMERIC' for column in DERIVED_COLUMNS)},
+        computed_at TIMESTAMP,
+        PRIMARY KEY (district_id, year, month)
+    )
+    """,
+    """
+    CREATE TABLE mgnrega_snapshot_quarantine (
+        district_id INTEGER,
+        year INTEGER,
+        month INTEGER,
+        people_benefited INTEGER,
+        workdays_created INTEGER,
+        wages_paid NUMERIC,
+        payments_on_time_percent NUMERIC,
+        works_completed INTEGER,
+        raw_json TEXT,
+        content_hash TEXT,
+        reasons TEXT NOT NULL,
+        quarantined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (district_id, year, month)
+    )
+    """,
+)
+
+
+def create_schema(engine, districts):
+    with engine.begin() as conn:
+        for statement in SCHEMA_DDL:
+            conn.execute(text(statement))
+        conn.execute(
+            text("INSERT INTO districts (state, district_name, district_code, latitude, longitude) "
+                 "VALUES (:state, :name, :code, :lat, :lon)"),
+            [{'state': state, 'name': name, 'code': code, 'lat': lat, 'lon': lon}
+             for state, name, code, lat, lon in districts]
+        )
+
+
+def make_data(district_code, year, month):
+    """Deterministic fetch replacing the random mock"""
+    people = 40000 + year + month
+    return {
+        'people_benefited': people,
+        'workdays_created': people * 20,
+        'wages_paid': people * 20 * 176.0,
+        'payments_on_time_percent': 92.5,
+        'works_completed': 300,
+        'raw_json': {'district_code': district_code, 'year': year, 'month': month},
+    }
+
+
+def count_rows(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM mgnrega_snapshots")).scalar()
+
+
+@pytest.fixture
+def engine():
+    """In-memory database with UP-LUC (id 1), UP-AGR (2) and UP-KAN (3), usable from worker threads"""
+    engine = create_engine("sqlite://", connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    create_schema(engine, [
+        ('Uttar Pradesh', 'Lucknow', 'UP-LUC', 26.8467, 80.9462),
+        ('Uttar Pradesh', 'Agra', 'UP-AGR', None, None),
+        ('Uttar Pradesh', 'Kanpur', 'UP-KAN', None, None),
+    ])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    """Session on the in-memory database"""
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """File-backed SQLite database (shared with forked pool processes)"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'ingest.db'}")
+    create_schema(engine, [
+        ('Uttar Pradesh', 'Lucknow', 'UP-LUC', None, None),
+        ('Uttar Pradesh', 'Agra', 'UP-AGR', None, None),
+        ('Bihar', 'Patna', 'BR-PAT', None, None),
+    ])
+    monkeypatch.setattr(worker, 'engine', engine)
+    monkeypatch.setattr(worker, 'SessionLocal', sessionmaker(bind=engine))
+    monkeypatch.setattr(worker, 'INGEST_CHECKPOINT_DIR', str(tmp_path / 'checkpoints'))
+    monkeypatch.setattr(worker, 'API_KEY', '')
+    monkeypatch.setattr(worker, 'redis_client', MagicMock())
+    monkeypatch.setattr(worker, 'fetch_mgnrega_data', make_data)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    """Keep raw payload archives written by tests out of the source tree"""
+    path = tmp_path / 'archive'
+    monkeypatch.setattr(worker, 'INGEST_ARCHIVE_DIR', str(path))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def report_dir(tmp_path, monkeypatch):
+    """Keep ingestion run reports written by tests out of the source tree"""
+    path = tmp_path / 'reports'
+    monkeypatch.setattr(worker, 'INGEST_REPORT_DIR', str(path))
+    return path
@@ -0,0 +1,207 @@
+"""
+Tests for batch anomaly detection and the snapshot quarantine
+"""
+
+import json
+
+import pytest
+from sqlalchemy import text
+
+import anomaly
+from anomaly import AnomalyDetector, hard_rule_reasons, quarantined, release
+from bulk import SnapshotBulkWriter, snapshot_row
+
+BACKENDS = [False, pytest.param(True, marks=pytest.mark.skipif(
+    not anomaly.NUMPY_AVAILABLE, reason="numpy not installed"))]
+
+
+@pytest.fixture(autouse=True)
+def history(session):
+    """A year of history for districts 1 and 2"""
+    with SnapshotBulkWriter(session, batch_size=100) as writer:
+        for district_id in (1, 2):
+            for month in range(1, 13):
+                writer.add(district_id, 2024, month, make_data(district_id, month))
+
+
+def make_data(district_id=1, month=1, scale=1.0):
+    """Seasonal values around a district-sized base; ``scale`` multiplies wages"""
+    people = 40000 * district_id + 1500 * (month % 4)
+    return {
+        'people_benefited': people,
+        'workdays_created': people * 20,
+        'wages_paid': people * 20 * 176.0 * scale,
+        'payments_on_time_percent': 92.5,
+        'works_completed': 300 + month,
+        'raw_json': {'district_id': district_id, 'month': month},
+    }
+
+
+def row(district_id=1, year=2025, month=1, **changes):
+    return snapshot_row(district_id, year, month, {**make_data(district_id, month), **changes})
+
+
+class TestHardRules:
+    """Test checks that need no history"""
+    
+    def test_valid_row_passes(self):
+        """Test an ordinary row has no reasons"""
+        assert hard_rule_reasons(row()) == []
+    
+    def test_invalid_values(self):
+        """Test zero wages, negative and missing counts and bad percentages are flagged"""
+        assert hard_rule_reasons(row(wages_paid=0.0)) == ["wages_paid is 0 with workdays created"]
+        assert hard_rule_reasons(row(works_completed=-3)) == ["works_completed negative (-3)"]
+        assert hard_rule_reasons(row(people_benefited=None)) == ["people_benefited missing"]
+        assert hard_rule_reasons(row(payments_on_time_percent=140.0)) == [
+            "payments_on_time_percent out of range (140.0)"
+        ]
+    
+    def test_zero_wages_without_work_is_allowed(self):
+        """Test a month with no workdays may pay no wages"""
+        assert hard_rule_reasons(row(workdays_created=0, wages_paid=0.0)) == []
+
+
+class TestScoring:
+    """Test robust z-scores against the trailing history"""
+    
+    @pytest.mark.parametrize('use_numpy', BACKENDS)
+    def test_jumps_are_flagged_in_any_district(self, session, use_numpy):
+        """Test 10x jumps and drops are flagged and ordinary months pass, whatever the district size"""
+        detector = AnomalyDetector(use_numpy=use_numpy)
+        rows = [
+            row(1, wages_paid=make_data(1)['wages_paid'] * 10),
+            row(2, people_benefited=8000),
+            row(1, month=2),
+        ]
+        
+        reasons = detector.score(rows, detector.load_history(session, rows))
+        
+        assert len(reasons[0]) == 1 and reasons[0][0].startswith("wages_paid z=+")
+        assert len(reasons[1]) == 1 and reasons[1][0].startswith("people_benefited z=-")
+        assert reasons[2] == []
+    
+    @pytest.mark.parametrize('use_numpy', BACKENDS)
+    def test_short_history_only_gets_hard_rules(self, session, use_numpy):
+        """Test districts without enough stored months are not z-scored"""
+        detector = AnomalyDetector(min_history=6, use_numpy=use_numpy)
+        rows = [row(3, wages_paid=1e12), row(3, month=2, wages_paid=0.0)]
+        
+        reasons = detector.score(rows, detector.load_history(session, rows))
+        
+        assert reasons == [[], ["wages_paid is 0 with workdays created"]]
+    
+    def test_history_window_precedes_each_row(self, session):
+        """Test each row sees only the window of months before it, in one query"""
+        detector = AnomalyDetector(window=3)
+        rows = [row(1, year=2024, month=5), row(2, year=2025, month=1), row(1, year=2023, month=1)]
+        
+        histories = detector.load_history(session, rows)
+        
+        assert [len(history) for history in histories] == [3, 3, 0]
+        assert histories[0][0][3] == make_data(1, 2)['works_completed']
+        assert histories[1][-1][3] == make_data(2, 12)['works_completed']
+    
+    @pytest.mark.skipif(not anomaly.NUMPY_AVAILABLE, reason="numpy not installed")
+    def test_backends_agree(self, session):
+        """Test the NumPy and pure-Python scores give the same reasons"""
+        rows = [row(1 + i % 2, month=1 + i % 12, wages_paid=1000.0 * 4 ** i) for i in range(12)]
+        fast, slow = AnomalyDetector(use_numpy=True), AnomalyDetector(use_numpy=False)
+        histories = fast.load_history(session, rows)
+        
+        assert fast.score(rows, histories) == slow.score(rows, histories)
+    
+    def test_zero_threshold_keeps_hard_rules(self, session):
+        """Test a threshold of 0 skips z-scores but still flags invalid rows"""
+        detector = AnomalyDetector(threshold=0)
+        rows = [row(1, wages_paid=make_data(1)['wages_paid'] * 10), row(2, people_benefited=None)]
+        
+        clean, flagged = detector.split(session, rows)
+        
+        assert clean == rows[:1]
+        assert [why for _, why in flagged] == [["people_benefited missing"]]
+    
+    def test_numpy_required_when_requested(self, monkeypatch):
+        """Test asking for NumPy scoring without numpy fails early"""
+        monkeypatch.setattr(anomaly, 'NUMPY_AVAILABLE', False)
+        with pytest.raises(ValueError):
+            AnomalyDetector(use_numpy=True)
+
+
+class TestQuarantine:
+    """Test the bulk writer with a detector"""
+    
+    def count(self, session, table):
+        return session.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+    
+    def test_flagged_rows_are_quarantined_not_published(self, session):
+        """Test flagged rows go to quarantine and only clean districts are invalidated"""
+        flushed = []
+        detector = AnomalyDetector()
+        writer = SnapshotBulkWriter(session, batch_size=10, on_flush=flushed.append, detector=detector)
+        writer.add(1, 2025, 1, make_data(1, 1, scale=10), 'UP-LUC')
+        writer.add(2, 2025, 1, make_data(2, 1), 'UP-AGR')
+        writer.flush()
+        
+        assert writer.rows_written == 1
+        assert writer.rows_quarantined == 1
+        assert detector.rows_checked == 2 and detector.rows_flagged == 1
+        assert flushed == [['UP-AGR']]
+        assert self.count(session, "mgnrega_snapshots WHERE year = 2025") == 1
+        held = quarantined(session)
+        assert [(r['district_id'], r['year'], r['month']) for r in held] == [(1, 2025, 1)]
+        assert held[0]['reasons'][0].startswith("wages_paid z=+")
+    
+    def test_only_flagged_rows_still_commit(self, session):
+        """Test a batch where every row is flagged still records the quarantine"""
+        writer = SnapshotBulkWriter(session, batch_size=10, on_flush=pytest.fail, detector=AnomalyDetector())
+        writer.add(1, 2025, 1, {**make_data(1, 1), 'wages_paid': 0.0}, 'UP-LUC')
+        
+        assert writer.flush() == 0
+        session.rollback()
+        assert self.count(session, "mgnrega_snapshot_quarantine") == 1
+    
+    def test_clean_refetch_clears_quarantine(self, session):
+        """Test a later normal value for the month replaces the quarantined one"""
+        detector = AnomalyDetector()
+        with SnapshotBulkWriter(session, batch_size=10, detector=detector) as writer:
+            writer.add(1, 2025, 1, make_data(1, 1, scale=10))
+        with SnapshotBulkWriter(session, batch_size=10, detector=detector) as writer:
+            writer.add(1, 2025, 1, make_data(1, 1))
+        
+        assert self.count(session, "mgnrega_snapshot_quarantine") == 0
+        assert self.count(session, "mgnrega_snapshots WHERE year = 2025") == 1
+    
+    def test_unchanged_refetch_clears_quarantine(self, session):
+        """Test a month fetched again with its published values leaves quarantine without a write"""
+        detector = AnomalyDetector()
+        with SnapshotBulkWriter(session, batch_size=10, detector=detector) as writer:
+            writer.add(1, 2024, 12, make_data(1, 12, scale=10))
+        assert self.count(session, "mgnrega_snapshot_quarantine") == 1
+        
+        flushed = []
+        with SnapshotBulkWriter(session, batch_size=10, on_flush=flushed.append, detector=detector) as writer:
+            writer.unchanged(1, 2024, 12)
+        
+        assert self.count(session, "mgnrega_snapshot_quarantine") == 0
+        assert (writer.rows_written, writer.batches, flushed) == (0, 0, [])
+    
+    def test_release_publishes_the_quarantined_row(self, session):
+        """Test a released row is written with its payload and hash and leaves quarantine"""
+        with SnapshotBulkWriter(session, batch_size=10, detector=AnomalyDetector()) as writer:
+            writer.add(1, 2025, 1, make_data(1, 1, scale=10))
+        flushed = []
+        
+        assert release(session, 1, 2025, 1, SnapshotBulkWriter(session, 1, on_flush=flushed.append), 'UP-LUC')
+        assert release(session, 1, 2025, 1, SnapshotBulkWriter(session, 1)) is False
+        
+        assert flushed == [['UP-LUC']]
+        assert self.count(session, "mgnrega_snapshot_quarantine") == 0
+        wages, stored_hash, raw = session.execute(text(
+            "SELECT s.wages_paid, s.content_hash, r.raw_json FROM mgnrega_snapshots s "
+            "JOIN mgnrega_snapshot_raw r ON r.snapshot_id = s.id WHERE s.year = 2025"
+        )).one()
+        expected = row(1, wages_paid=make_data(1)['wages_paid'] * 10)
+        assert wages == expected['wages_paid']
+        assert stored_hash == expected['content_hash']
+        assert json.loads(raw) == make_data(1, 1)['raw_json']
@@ -0,0 +1,216 @@
+"""
+Tests for the raw payload archive and archive replay
+"""
+
+import gzip
+import json
+import os
+
+import pytest
+from sqlalchemy import text
+
+import archive
+import replay
+import worker
+from archive import RawArchive, derive, iter_month, lookup, read_member, read_stream
+from backfill import run_backfill
+from bulk import SnapshotBulkWriter, snapshot_row
+from client import calendar_month, to_snapshot
+from replay import run_replay
+from stub_server import load_fixtures
+from tests.conftest import make_data
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'fixtures', 'mgnrega_up_2025.json')
+
+
+def row(district_id, year=2025, month=9, **overrides):
+    return snapshot_row(district_id, year, month, {**make_data(f"D{district_id}", year, month), **overrides})
+
+
+class TestRawArchive:
+    """Test writing and reading archive segments"""
+    
+    def test_round_trip(self, tmp_path):
+        """Test archived rows come back with their record and derived fields"""
+        store = RawArchive(str(tmp_path), codec='gzip')
+        refs = store.append([row(1), row(2)], {1: 'UP-LUC', 2: 'UP-AGR'})
+        
+        assert refs[0] == refs[1]
+        assert refs[0]['archive'].startswith('2025-09/')
+        lines = read_member(str(tmp_path), refs[0])
+        assert [line['district_code'] for line in lines] == ['UP-LUC', 'UP-AGR']
+        assert lines[0]['record'] == {'district_code': 'D1', 'year': 2025, 'month': 9}
+        assert lines[0]['people_benefited'] == row(1)['people_benefited']
+    
+    def test_one_member_per_month(self, tmp_path):
+        """Test a batch spanning months is split into month directories"""
+        store = RawArchive(str(tmp_path), codec='gzip')
+        refs = store.append([row(1, month=8), row(1, month=9)])
+        
+        assert refs[0]['archive'].startswith('2025-08/')
+        assert refs[1]['archive'].startswith('2025-09/')
+    
+    def test_segment_is_a_plain_gzip_stream(self, tmp_path):
+        """Test appended members read back as one stream"""
+        store = RawArchive(str(tmp_path), codec='gzip')
+        first = store.append([row(1)])[0]
+        second = store.append([row(2)])[0]
+        
+        assert first['archive'] == second['archive']
+        assert second['offset'] == first['length']
+        path = os.path.join(str(tmp_path), first['archive'])
+        assert [line['district_id'] for line in read_stream(path)] == [1, 2]
+        with gzip.open(path, 'rt') as f:
+            assert len(f.read().splitlines()) == 2
+    
+    def test_segments_rotate(self, tmp_path):
+        """Test a full segment is closed and a new one started"""
+        store = RawArchive(str(tmp_path), codec='gzip', segment_max_bytes=1)
+        refs = [store.append([row(district_id)])[0] for district_id in (1, 2, 3)]
+        
+        assert len({ref['archive'] for ref in refs}) == 3
+        assert all(ref['offset'] == 0 for ref in refs)
+    
+    def test_lookup_returns_latest(self, tmp_path):
+        """Test the index resolves a district-month to its newest payload"""
+        store = RawArchive(str(tmp_path), codec='gzip')
+        store.append([row(1, people_benefited=1)])
+        store.append([row(1, people_benefited=2), row(2)])
+        
+        assert lookup(str(tmp_path), 1, 2025, 9)['people_benefited'] == 2
+        assert lookup(str(tmp_path), 3, 2025, 9) is None
+        assert lookup(str(tmp_path), 1, 2024, 9) is None
+    
+    def test_iter_month_filters_districts(self, tmp_path):
+        """Test iteration yields each wanted district once"""
+        store = RawArchive(str(tmp_path), codec='gzip')
+        store.append([row(1), row(2), row(3)])
+        store.append([row(2, people_benefited=7)])
+        
+        lines = {line['district_id']: line for line, _ in iter_month(str(tmp_path), 2025, 9, {2, 3})}
+        
+        assert sorted(lines) == [2, 3]
+        assert lines[2]['people_benefited'] == 7
+    
+    @pytest.mark.skipif(not archive.ZSTD_AVAILABLE, reason="zstandard not installed")
+    def test_zstd_round_trip(self, tmp_path):
+        """Test zstd segments"""
+        store = RawArchive(str(tmp_path), codec='zstd')
+        ref = store.append([row(1)])[0]
+        
+        assert ref['archive'].endswith('.jsonl.zst')
+        assert read_member(str(tmp_path), ref)[0]['district_id'] == 1
+    
+    def test_zstd_requires_package(self, tmp_path, monkeypatch):
+        """Test asking for zstd without the package fails early"""
+        monkeypatch.setattr(archive, 'ZSTD_AVAILABLE', False)
+        with pytest.raises(ValueError):
+            RawArchive(str(tmp_path), codec='zstd')
+
+
+class TestDerive:
+    """Test snapshot re-derivation"""
+    
+    def test_upstream_record_is_mapped_again(self):
+        """Test API records are re-mapped instead of trusting archived values"""
+        record = load_fixtures(FIXTURES)[0]
+        year, month = calendar_month(record)
+        line = {'year': year, 'month': month, 'record': record, 'people_benefited': -1, 'workdays_created': -1,
+                'wages_paid': -1, 'payments_on_time_percent': -1, 'works_completed': -1}
+        
+        data = derive(line)
+        
+        assert data == to_snapshot(record)
+        assert data['raw_json'] == record
+    
+    def test_mock_record_keeps_archived_values(self):
+        """Test records without an upstream period keep their archived values"""
+        line = {**row(1), 'record': {'source': 'mock_data'}}
+        
+        data = derive(line)
+        
+        assert data['people_benefited'] == row(1)['people_benefited']
+        assert data['raw_json'] == {'source': 'mock_data'}
+
+
+class TestArchivedIngestion:
+    """Test the write path and replay against a database"""
+    
+    def test_table_stores_reference(self, database, archive_dir):
+        """Test raw_json holds a reference to the archived payload"""
+        run_backfill((2025, 9), (2025, 9), processes=1, rps=0)
+        
+        with database.connect() as conn:
+            district_id, raw_json = conn.execute(text(
+                "SELECT s.district_id, r.raw_json FROM mgnrega_snapshots s "
+                "JOIN mgnrega_snapshot_raw r ON r.snapshot_id = s.id ORDER BY s.district_id LIMIT 1"
+            )).fetchone()
+        ref = json.loads(raw_json)
+        assert archive.is_reference(ref)
+        line = read_member(str(archive_dir), ref)[0]
+        assert line['district_id'] == district_id
+        assert line['record']['district_code'] == 'UP-LUC'
+    
+    def test_table_storage_keeps_json(self, database, monkeypatch, archive_dir):
+        """Test INGEST_RAW_STORAGE=table writes full JSON and no archive"""
+        monkeypatch.setattr(worker, 'INGEST_RAW_STORAGE', 'table')
+        run_backfill((2025, 9), (2025, 9), processes=1, rps=0)
+        
+        with database.connect() as conn:
+            raw_json = conn.execute(text("SELECT raw_json FROM mgnrega_snapshot_raw LIMIT 1")).scalar()
+        assert json.loads(raw_json)['year'] == 2025
+        assert not archive_dir.exists()
+    
+    def test_replay_restores_snapshots(self, database, monkeypatch):
+        """Test replay rewrites snapshots from the archive alone"""
+        query = text(
+            "SELECT s.district_id, s.year, s.month, s.people_benefited, s.wages_paid, r.raw_json, s.content_hash "
+            "FROM mgnrega_snapshots s JOIN mgnrega_snapshot_raw r ON r.snapshot_id = s.id ORDER BY s.id"
+        )
+        run_backfill((2025, 8), (2025, 9), processes=1, rps=0)
+        with database.begin() as conn:
+            expected = conn.execute(query).fetchall()
+            conn.execute(text("UPDATE mgnrega_snapshots SET people_benefited = 0, content_hash = 'stale'"))
+        monkeypatch.setattr(worker, 'fetch_mgnrega_data', None)  # replay must not fetch
+        
+        totals = run_replay((2025, 8), (2025, 9))
+        
+        assert totals['changed'] == 6
+        assert totals['failed'] == 0
+        with database.connect() as conn:
+            assert conn.execute(query).fetchall() == expected
+    
+    def test_replay_is_idempotent(self, database):
+        """Test a second replay finds nothing to change"""
+        run_backfill((2025, 9), (2025, 9), processes=1, rps=0)
+        
+        totals = run_replay((2025, 9), (2025, 9), codes=['UP-LUC'])
+        
+        assert totals['unchanged'] == 1
+        assert totals['new'] == totals['changed'] == 0
+    
+    def test_replay_quarantines_implausible_rows(self, database, monkeypatch):
+        """Test rows rebuilt by a broken mapping are validated and held back, not published"""
+        run_backfill((2025, 9), (2025, 9), processes=1, rps=0)
+        monkeypatch.setattr(replay, 'derive', lambda line: {**derive(line), 'wages_paid': 0.0})
+        
+        totals = run_replay((2025, 9), (2025, 9))
+        
+        assert totals['quarantined'] == 3
+        assert totals['failed'] == 0
+        with database.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM mgnrega_snapshot_quarantine")).scalar() == 3
+            assert conn.execute(text("SELECT MIN(wages_paid) FROM mgnrega_snapshots")).scalar() > 0
+    
+    def test_bulk_writer_archives_before_writing(self, database, archive_dir):
+        """Test a failed database write still leaves a readable archive"""
+        session = worker.SessionLocal()
+        session.execute(text("DROP TABLE mgnrega_snapshots"))
+        session.commit()
+        writer = SnapshotBulkWriter(session, 10, archive=worker.raw_archive())
+        writer.add(1, 2025, 9, make_data('UP-LUC', 2025, 9), 'UP-LUC')
+        writer.flush()
+        session.close()
+        
+        assert writer.rows_failed == 1
+        assert lookup(str(archive_dir), 1, 2025, 9)['district_code'] == 'UP-LUC'
@@ -0,0 +1,181 @@
+"""
+Tests for the token-bucket limiter and the concurrent ingestion engine
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from async_ingest import RunStats, percentile, run_ingestion
+from ratelimit import TokenBucket
+
+
+class FakeClock:
+    """Manual clock whose sleep advances time instantly"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+    
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket:
+    """Test request-per-second limiting"""
+    
+    def test_burst_then_rate(self):
+        """Test that a full bucket allows a burst, then holds requests to the rate"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+        
+        async def take(n):
+            return [await bucket.acquire() for _ in range(n)]
+        
+        waits = asyncio.run(take(6))
+        
+        assert waits[:2] == [0.0, 0.0]
+        assert all(w == pytest.approx(0.5) for w in waits[2:])
+        # 6 requests at 2/s with a burst of 2 take 2 seconds
+        assert clock.now == pytest.approx(2.0)
+    
+    def test_refills_while_idle(self):
+        """Test that tokens accumulate while idle, up to the capacity"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=3, clock=clock, sleep=clock.sleep)
+        
+        async def scenario():
+            for _ in range(3):
+                await bucket.acquire()
+            clock.now += 10  # Idle far longer than needed to refill
+            return [await bucket.acquire() for _ in range(4)]
+        
+        waits = asyncio.run(scenario())
+        assert waits == [0.0, 0.0, 0.0, pytest.approx(1.0)]
+    
+    def test_zero_rate_is_unlimited(self):
+        """Test that a rate of 0 never waits"""
+        bucket = TokenBucket(rate=0)
+        
+        async def take(n):
+            return [await bucket.acquire() for _ in range(n)]
+        
+        assert asyncio.run(take(100)) == [0.0] * 100
+
+
+class TestRunIngestion:
+    """Test the concurrent ingestion engine"""
+    
+    def test_stores_every_district_and_reports(self):
+        """Test that every fetched district is stored and counted"""
+        districts = [(i, f"D-{i}") for i in range(1, 21)]
+        stored = []
+        
+        async def fetch(client, code, year, month):
+            await asyncio.sleep(0)
+            return {'code': code}
+        
+        def store(district_id, code, data):
+            stored.append((district_id, data['code']))
+            return True
+        
+        stats = asyncio.run(run_ingestion(districts, 2025, 1, fetch, store, concurrency=4, rps=0))
+        
+        assert sorted(stored) == districts
+        report = stats.report()
+        assert report['districts'] == 20
+        assert report['succeeded'] == 20
+        assert report['failed'] == 0
+        assert len(stats.latencies) == 20
+        assert set(report['fetch_latency_ms']) == {'p50', 'p95', 'p99', 'max'}
+    
+    def test_respects_concurrency_limit(self):
+        """Test that no more than `concurrency` fetches are in flight"""
+        in_flight = 0
+        peak = 0
+        
+        async def fetch(client, code, year, month):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            return {}
+        
+        stats = asyncio.run(run_ingestion(
+            [(i, f"D-{i}") for i in range(30)], 2025, 1, fetch, lambda *a: True, concurrency=5, rps=0
+        ))
+        
+        assert peak == 5
+        assert stats.succeeded == 30
+    
+    def test_failures_are_counted_not_raised(self):
+        """Test that fetch and store errors fail only their district"""
+        async def fetch(client, code, year, month):
+            if code == "BAD-FETCH":
+                raise RuntimeError("upstream 500")
+            return {}
+        
+        def store(district_id, code, data):
+            if code == "BAD-STORE":
+                raise RuntimeError("db down")
+            return code != "FALSE-STORE"
+        
+        districts = [(1, "OK"), (2, "BAD-FETCH"), (3, "BAD-STORE"), (4, "FALSE-STORE")]
+        stats = asyncio.run(run_ingestion(districts, 2025, 1, fetch, store, rps=0))
+        
+        assert stats.succeeded == 1
+        assert stats.failed == 3
+    
+    def test_writes_run_on_a_single_thread_at_a_time(self):
+        """Test that store calls never overlap (the session is not thread-safe)"""
+        active = 0
+        overlapped = False
+        lock = threading.Lock()
+        
+        def store(district_id, code, data):
+            nonlocal active, overlapped
+            with lock:
+                active += 1
+                overlapped = overlapped or active > 1
+            with lock:
+                active -= 1
+            return True
+        
+        async def fetch(client, code, year, month):
+            return {}
+        
+        asyncio.run(run_ingestion([(i, str(i)) for i in range(50)], 2025, 1, fetch, store, concurrency=10, rps=0))
+        assert not overlapped
+    
+    def test_finish_reports_late_failures(self):
+        """Test that records failing in the final flush are moved to the failed count"""
+        async def fetch(client, code, year, month):
+            return {}
+        
+        stats = asyncio.run(run_ingestion(
+            [(i, str(i)) for i in range(10)], 2025, 1, fetch, lambda *a: True, rps=0, finish=lambda: 3
+        ))
+        
+        assert stats.succeeded == 7
+        assert stats.failed == 3
+
+
+class TestPercentile:
+    """Test latency percentile calculation"""
+    
+    def test_nearest_rank(self):
+        """Test nearest-rank percentiles over 1..100"""
+        values = list(range(100, 0, -1))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile(values, 100) == 100
+    
+    def test_empty(self):
+        """Test that no samples give zero"""
+        assert percentile([], 95) == 0.0
+        assert RunStats().throughput == 0.0
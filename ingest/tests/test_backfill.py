@@ -0,0 +1,97 @@
+"""
+Tests for the historical backfill command
+"""
+
+import argparse
+
+import pytest
+
+import backfill
+import worker
+from backfill import month_range, parse_month, run_backfill, select_districts
+from ratelimit import SharedTokenBucket
+from tests.conftest import count_rows
+
+
+class TestMonthRange:
+    """Test month parsing and iteration"""
+    
+    def test_range_crosses_years(self):
+        """Test months roll over from December to January"""
+        assert month_range((2024, 11), (2025, 2)) == [(2024, 11), (2024, 12), (2025, 1), (2025, 2)]
+        assert month_range((2025, 3), (2025, 3)) == [(2025, 3)]
+    
+    def test_parse_month(self):
+        """Test YYYY-MM parsing and validation"""
+        assert parse_month("2024-04") == (2024, 4)
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_month("2024-13")
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_month("April 2024")
+
+
+class TestSharedTokenBucket:
+    """Test the cross-process rate budget"""
+    
+    def test_reservations_queue_behind_each_other(self):
+        """Test each reservation beyond the burst waits one more interval"""
+        now = [0.0]
+        bucket = SharedTokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+        
+        assert [bucket.reserve() for _ in range(5)] == [0.0, 0.0, 0.5, 1.0, 1.5]
+        now[0] = 10.0
+        assert bucket.reserve() == 0.0
+
+
+class TestBackfill:
+    """Test backfill runs"""
+    
+    def test_filters(self, database):
+        """Test state and district filters"""
+        session = worker.SessionLocal()
+        assert [row[1] for row in select_districts(session, states=['uttar pradesh'])] == ['UP-LUC', 'UP-AGR']
+        assert [row[1] for row in select_districts(session, codes=['BR-PAT'])] == ['BR-PAT']
+        session.close()
+    
+    def test_backfill_in_process(self, database):
+        """Test every district-month in range is written"""
+        totals = run_backfill((2024, 11), (2025, 2), processes=1, rps=0)
+        
+        assert totals['new'] == 12
+        assert totals['failed'] == 0
+        assert count_rows(database) == 12
+    
+    def test_backfill_process_pool(self, database):
+        """Test months are spread over worker processes"""
+        totals = run_backfill((2024, 1), (2024, 6), states=['Uttar Pradesh'], processes=2, rps=0)
+        
+        assert totals['new'] == 12
+        assert count_rows(database) == 12
+    
+    def test_rerun_is_idempotent(self, database):
+        """Test a repeated backfill writes nothing new"""
+        run_backfill((2024, 1), (2024, 3), processes=1, rps=0)
+        totals = run_backfill((2024, 1), (2024, 3), processes=1, rps=0, fresh=True)
+        
+        assert totals['unchanged'] == 9
+        assert totals['new'] == totals['changed'] == 0
+        assert count_rows(database) == 9
+    
+    def test_resumes_after_interruption(self, database, monkeypatch):
+        """Test months finished before a failure are skipped on restart"""
+        original = backfill.backfill_month
+        
+        def fail_march(task):
+            if task[1] == 3:
+                raise KeyboardInterrupt
+            return original(task)
+        
+        monkeypatch.setattr(backfill, 'backfill_month', fail_march)
+        with pytest.raises(KeyboardInterrupt):
+            run_backfill((2024, 1), (2024, 4), processes=1, rps=0)
+        monkeypatch.setattr(backfill, 'backfill_month', original)
+        
+        totals = run_backfill((2024, 1), (2024, 4), processes=1, rps=0)
+        
+        assert totals['months'] == 2  # March and April only
+        assert count_rows(database) == 12
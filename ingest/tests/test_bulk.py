@@ -0,0 +1,154 @@
+"""
+Tests for the batched snapshot writer
+"""
+
+import csv
+import json
+
+from unittest.mock import patch
+from sqlalchemy import text
+
+from bulk import SNAPSHOT_COLUMNS, SnapshotBulkWriter, copy_buffer, snapshot_row
+from worker import invalidate_district_caches
+
+
+def make_data(people=45000):
+    return {
+        'people_benefited': people,
+        'workdays_created': people * 20,
+        'wages_paid': people * 20 * 176.0,
+        'payments_on_time_percent': 92.5,
+        'works_completed': 350,
+        'raw_json': {'source': 'test', 'note': 'comma, "quote"'},
+    }
+
+
+class TestSnapshotBulkWriter:
+    """Test buffering, batching and upserts"""
+    
+    def test_writes_in_batches(self, session):
+        """Test that records are written once per full batch and on flush"""
+        flushed = []
+        writer = SnapshotBulkWriter(session, batch_size=2, on_flush=flushed.append)
+        
+        for district_id in range(1, 6):
+            writer.add(district_id, 2025, 1, make_data(), f"D-{district_id}")
+        
+        assert writer.batches == 2
+        assert len(writer) == 1
+        writer.flush()
+        
+        assert writer.batches == 3
+        assert writer.rows_written == 5
+        assert flushed == [["D-1", "D-2"], ["D-3", "D-4"], ["D-5"]]
+        assert session.execute(text("SELECT COUNT(*) FROM mgnrega_snapshots")).scalar() == 5
+    
+    def test_upserts_existing_rows(self, session):
+        """Test that a second write of the same month updates instead of duplicating"""
+        with SnapshotBulkWriter(session, batch_size=10) as writer:
+            writer.add(1, 2025, 1, make_data(45000))
+        with SnapshotBulkWriter(session, batch_size=10) as writer:
+            writer.add(1, 2025, 1, make_data(46000))
+        
+        rows = session.execute(text(
+            "SELECT s.people_benefited, r.raw_json FROM mgnrega_snapshots s "
+            "JOIN mgnrega_snapshot_raw r ON r.snapshot_id = s.id AND r.snapshot_year = s.year"
+        )).fetchall()
+        assert len(rows) == 1
+        assert rows[0][0] == 46000
+        # Stored as real JSON, not a Python repr
+        assert json.loads(rows[0][1])['source'] == 'test'
+    
+    def test_raw_payload_in_side_table(self, session):
+        """Test payloads are keyed by snapshot and skipped when absent"""
+        with SnapshotBulkWriter(session, batch_size=10) as writer:
+            writer.add(1, 2025, 1, make_data(45000))
+            writer.add(2, 2025, 1, {**make_data(45000), 'raw_json': None})
+        
+        raw = session.execute(text("SELECT snapshot_id, snapshot_year FROM mgnrega_snapshot_raw")).fetchall()
+        snapshot_id = session.execute(text("SELECT id FROM mgnrega_snapshots WHERE district_id = 1")).scalar()
+        assert [tuple(row) for row in raw] == [(snapshot_id, 2025)]
+    
+    def test_later_record_wins_within_batch(self, session):
+        """Test that duplicates in one batch collapse to the last record"""
+        with SnapshotBulkWriter(session, batch_size=10) as writer:
+            writer.add(1, 2025, 1, make_data(40000))
+            writer.add(1, 2025, 1, make_data(41000))
+        
+        assert writer.rows_written == 1
+        assert session.execute(text("SELECT people_benefited FROM mgnrega_snapshots")).scalar() == 41000
+    
+    def test_failed_batch_is_counted_and_rolled_back(self, session):
+        """Test that a failing batch does not raise or invalidate caches"""
+        flushed = []
+        writer = SnapshotBulkWriter(session, batch_size=10, on_flush=flushed.append)
+        writer.add(1, 2025, 1, make_data(), "D-1")
+        session.execute(text("DROP TABLE mgnrega_snapshots"))
+        
+        assert writer.flush() == 0
+        assert writer.rows_failed == 1
+        assert writer.rows_written == 0
+        assert flushed == []
+    
+    def test_derives_batch_districts_in_the_same_transaction(self, session):
+        """Test derived rows are written for the batch's districts before the commit"""
+        with SnapshotBulkWriter(session, batch_size=10) as writer:
+            writer.add(1, 2025, 1, make_data(40000))
+        with SnapshotBulkWriter(session, batch_size=10, derive=True) as writer:
+            writer.add(1, 2025, 2, make_data(50000))
+        session.rollback()
+        
+        rows = session.execute(text(
+            "SELECT month, people_benefited_mom, wages_per_workday FROM mgnrega_derived_metrics ORDER BY month"
+        )).fetchall()
+        assert [tuple(row) for row in rows] == [(1, None, 176.0), (2, 25.0, 176.0)]
+    
+    def test_derive_failure_keeps_the_batch(self, session):
+        """Test a failing derived refresh does not fail the snapshot write"""
+        session.execute(text("DROP TABLE mgnrega_derived_metrics"))
+        session.commit()
+        with SnapshotBulkWriter(session, batch_size=10, derive=True) as writer:
+            writer.add(1, 2025, 1, make_data())
+        
+        assert writer.rows_written == 1
+        assert writer.rows_failed == 0
+        assert session.execute(text("SELECT COUNT(*) FROM mgnrega_snapshots")).scalar() == 1
+
+
+class TestCopyBuffer:
+    """Test the CSV rendering used by COPY"""
+    
+    def test_round_trips_json_and_nulls(self):
+        """Test that JSON with quotes and commas and NULLs survive CSV encoding"""
+        rows = [snapshot_row(1, 2025, 1, make_data()), snapshot_row(2, 2025, 1, {**make_data(), 'raw_json': None})]
+        
+        lines = copy_buffer(rows).getvalue().splitlines()
+        parsed = list(csv.reader(lines))
+        
+        assert len(parsed) == 2
+        assert len(parsed[0]) == len(SNAPSHOT_COLUMNS)
+        raw_json = SNAPSHOT_COLUMNS.index('raw_json')
+        assert json.loads(parsed[0][raw_json])['note'] == 'comma, "quote"'
+        # Unquoted empty field is NULL for COPY ... (FORMAT csv)
+        assert ',,' in lines[1]
+        assert parsed[1][raw_json] == ''
+
+
+class TestBatchInvalidation:
+    """Test invalidation of many districts at once"""
+    
+    @patch('worker.redis_client')
+    def test_one_delete_and_one_event(self, mock_redis):
+        """Test a batch issues a single DELETE and a single invalidation event"""
+        mock_redis.scan_iter.side_effect = [iter(["district:trend:A:6"]), iter([])]
+        
+        invalidate_district_caches(["A", "B"])
+        
+        mock_redis.delete.assert_called_once_with(
+            "district:snapshot:A", "district:snapshot:B", "district:trend:A:6"
+        )
+        assert mock_redis.publish.call_count == 1
+        patterns = json.loads(mock_redis.publish.call_args.args[1])["patterns"]
+        assert patterns == [
+            "district:snapshot:A", "district:trend:A:*", "district:snapshot:B", "district:trend:B:*"
+        ]
@@ -0,0 +1,236 @@
+"""
+Tests for the data.gov.in client against the local stub server
+"""
+
+import asyncio
+import os
+import random
+import threading
+from contextlib import contextmanager
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+from anomaly import AnomalyDetector, hard_rule_reasons, quarantined
+from bulk import SnapshotBulkWriter
+from client import (
+    MGNREGAClient, MonthSource, UpstreamError, WAGES_UNIT, calendar_month, district_key, fin_year, to_snapshot
+)
+from stub_server import StubAPI, load_fixtures, make_server
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'fixtures')
+
+
+@contextmanager
+def serving(api):
+    server = make_server(api)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    api.base_url = f"http://127.0.0.1:{server.server_address[1]}/resource"
+    try:
+        yield api
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def stub():
+    """Stub API serving the recorded fixtures on an ephemeral port"""
+    with serving(StubAPI(load_fixtures(FIXTURES), api_key='test-key')) as api:
+        yield api
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestPeriods:
+    """Test financial-year and month conversions"""
+    
+    def test_fin_year(self):
+        """Test April starts a new financial year"""
+        assert fin_year(2025, 4) == "2025-2026"
+        assert fin_year(2026, 3) == "2025-2026"
+    
+    def test_calendar_month(self):
+        """Test upstream (fin_year, month name) maps to calendar (year, month)"""
+        assert calendar_month({'fin_year': '2025-2026', 'month': 'Oct'}) == (2025, 10)
+        assert calendar_month({'fin_year': '2025-2026', 'month': 'February'}) == (2026, 2)
+        assert calendar_month({'fin_year': 'n/a', 'month': 'Oct'}) is None
+    
+    def test_missing_values_are_none(self):
+        """Test absent or unparseable fields map to None rather than 0"""
+        snapshot = to_snapshot({
+            'Total_Individuals_Worked': '45000', 'Persondays_of_Central_Liability_so_far': '',
+            'Wages': 'n/a', 'percentage_payments_gererated_within_15_days': 'NaN',
+        })
+        
+        assert snapshot['people_benefited'] == 45000
+        assert snapshot['workdays_created'] is None
+        assert snapshot['wages_paid'] is None
+        assert snapshot['payments_on_time_percent'] is None
+        assert snapshot['works_completed'] is None
+        assert hard_rule_reasons(snapshot) == [
+            "workdays_created missing", "wages_paid missing", "works_completed missing",
+            "payments_on_time_percent missing",
+        ]
+    
+    def test_record_without_payments_is_quarantined(self, session):
+        """Test an upstream record lacking the on-time field is held back, not published with NULL"""
+        records = load_fixtures(FIXTURES)
+        record = next(r for r in records if r['district_name'] == 'LUCKNOW' and r['month'] == 'Oct')
+        del record['percentage_payments_gererated_within_15_days']
+        
+        async def fetch():
+            async with MGNREGAClient('test-key', base_url=api.base_url, page_size=100) as client:
+                return await client.fetch_month(2025, 10)
+        
+        with serving(StubAPI(records, api_key='test-key')) as api:
+            snapshots = run(fetch())
+        with SnapshotBulkWriter(session, batch_size=10, detector=AnomalyDetector()) as writer:
+            writer.add(1, 2025, 10, snapshots[district_key('Uttar Pradesh', 'Lucknow')], 'UP-LUC')
+        
+        assert writer.rows_quarantined == 1
+        assert session.execute(text("SELECT COUNT(*) FROM mgnrega_snapshots")).scalar() == 0
+        assert quarantined(session)[0]['reasons'] == ["payments_on_time_percent missing"]
+
+
+class TestMGNREGAClient:
+    """Test pagination, conditional requests and retries"""
+    
+    def test_fetch_month_paginates(self, stub):
+        """Test a month is assembled from several pages and mapped to snapshot fields"""
+        async def fetch():
+            async with MGNREGAClient('test-key', base_url=stub.base_url, page_size=4) as api:
+                return await api.fetch_month(2025, 10), api.requests
+        
+        snapshots, requests = run(fetch())
+        
+        assert len(snapshots) == 15
+        assert requests == 4  # ceil(15 / 4)
+        lucknow = snapshots[district_key('Uttar Pradesh', 'Lucknow')]
+        raw = lucknow['raw_json']
+        assert raw['month'] == 'Oct'
+        assert lucknow['people_benefited'] == int(raw['Total_Individuals_Worked'])
+        assert lucknow['wages_paid'] == pytest.approx(float(raw['Wages']) * WAGES_UNIT)
+    
+    def test_capped_page_size_fetches_every_record(self):
+        """Test a server serving fewer rows than the requested limit still yields the whole month"""
+        async def fetch():
+            async with MGNREGAClient('test-key', base_url=api.base_url, page_size=10) as client:
+                return await client.fetch_month(2025, 10), client.requests
+        
+        with serving(StubAPI(load_fixtures(FIXTURES), api_key='test-key', max_limit=4)) as api:
+            snapshots, requests = run(fetch())
+        
+        assert len(snapshots) == 15
+        assert requests == 4  # ceil(15 / 4), at the served page size
+    
+    def test_conditional_requests_reuse_body(self, stub):
+        """Test that a repeated query is answered with 304 and the cached body"""
+        async def fetch_twice():
+            async with MGNREGAClient('test-key', base_url=stub.base_url, page_size=100) as api:
+                first = await api.fetch_month(2025, 9)
+                second = await api.fetch_month(2025, 9)
+                return first, second, api.not_modified
+        
+        first, second, not_modified = run(fetch_twice())
+        
+        assert first == second
+        assert not_modified == 1
+    
+    def test_retries_with_jittered_backoff(self):
+        """Test 429/503 responses are retried with bounded, jittered sleeps"""
+        responses = iter([
+            httpx.Response(429),
+            httpx.Response(503),
+            httpx.Response(200, json={'total': 0, 'records': []}),
+        ])
+        sleeps = []
+        
+        async def sleep(seconds):
+            sleeps.append(seconds)
+        
+        async def fetch():
+            transport = httpx.MockTransport(lambda request: next(responses))
+            async with MGNREGAClient('k', base_url='http://upstream', transport=transport, sleep=sleep,
+                                     rng=random.Random(1), backoff_base=1.0) as api:
+                return await api.get_page({}, 0), api.retries
+        
+        body, retries = run(fetch())
+        
+        assert body == {'total': 0, 'records': []}
+        assert retries == 2
+        assert 0 <= sleeps[0] <= 1.0 and 0 <= sleeps[1] <= 2.0
+    
+    def test_honours_retry_after(self):
+        """Test Retry-After overrides the computed backoff"""
+        responses = iter([httpx.Response(429, headers={'Retry-After': '3'}), httpx.Response(200, json={})])
+        sleeps = []
+        
+        async def sleep(seconds):
+            sleeps.append(seconds)
+        
+        async def fetch():
+            transport = httpx.MockTransport(lambda request: next(responses))
+            async with MGNREGAClient('k', base_url='http://upstream', transport=transport, sleep=sleep) as api:
+                return await api.get_page({}, 0)
+        
+        run(fetch())
+        assert sleeps == [3.0]
+    
+    def test_gives_up_after_max_retries(self):
+        """Test persistent failures raise UpstreamError"""
+        async def sleep(seconds):
+            pass
+        
+        async def fetch():
+            transport = httpx.MockTransport(lambda request: httpx.Response(500))
+            async with MGNREGAClient('k', base_url='http://upstream', transport=transport, sleep=sleep,
+                                     max_retries=2) as api:
+                try:
+                    await api.get_page({}, 0)
+                finally:
+                    assert api.requests == 3
+        
+        with pytest.raises(UpstreamError):
+            run(fetch())
+    
+    def test_rejected_key_is_not_retried(self, stub):
+        """Test a 403 fails immediately instead of being retried"""
+        async def fetch():
+            async with MGNREGAClient('wrong', base_url=stub.base_url) as api:
+                await api.fetch_month(2025, 10)
+        
+        with pytest.raises(httpx.HTTPStatusError):
+            run(fetch())
+        assert stub.requests == 1
+
+
+class TestMonthSource:
+    """Test the per-district adapter used by the ingestion engine"""
+    
+    def test_one_download_serves_all_districts(self, stub):
+        """Test concurrent district fetches share a single month download"""
+        names = {'UP-LUC': ('Uttar Pradesh', 'Lucknow'), 'UP-KAN': ('Uttar Pradesh', 'Kanpur Nagar'),
+                 'XX-NONE': ('Nowhere', 'Missing')}
+        
+        async def fetch():
+            async with MGNREGAClient('test-key', base_url=stub.base_url, page_size=1000) as api:
+                source = MonthSource(api, names)
+                results = await asyncio.gather(
+                    source.fetch(api.http, 'UP-LUC', 2025, 8),
+                    source.fetch(api.http, 'UP-KAN', 2025, 8),
+                    source.fetch(api.http, 'XX-NONE', 2025, 8),
+                    return_exceptions=True,
+                )
+                return results, api.requests
+        
+        (lucknow, kanpur, missing), requests = run(fetch())
+        
+        assert requests == 1
+        assert lucknow['raw_json']['district_name'] == 'LUCKNOW'
+        assert kanpur['raw_json']['district_name'] == 'KANPUR NAGAR'
+        assert isinstance(missing, LookupError)
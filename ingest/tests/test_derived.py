@@ -0,0 +1,154 @@
+"""
+Tests for the derived metrics recomputation
+"""
+
+from sqlalchemy import text
+
+import worker
+from derived import refresh_derived_metrics
+
+
+def add_snapshot(session, district_id, year, month, people=1000, workdays=20000, wages=5000000.0,
+                 on_time=90.0, works=100):
+    session.execute(text("""
+        INSERT INTO mgnrega_snapshots (district_id, year, month, people_benefited, workdays_created,
+                                       wages_paid, payments_on_time_percent, works_completed)
+        VALUES (:district_id, :year, :month, :people, :workdays, :wages, :on_time, :works)
+        ON CONFLICT (district_id, year, month) DO UPDATE SET people_benefited = excluded.people_benefited
+    """), {'district_id': district_id, 'year': year, 'month': month, 'people': people,
+           'workdays': workdays, 'wages': wages, 'on_time': on_time, 'works': works})
+
+
+def derived(session, district_id, year, month):
+    return session.execute(
+        text("SELECT * FROM mgnrega_derived_metrics WHERE district_id = :d AND year = :y AND month = :m"),
+        {'d': district_id, 'y': year, 'm': month}
+    ).mappings().first()
+
+
+class TestMetrics:
+    """Test the computed values"""
+    
+    def test_month_over_month_change(self, session):
+        """Test MoM is the change from the previous snapshot, across year boundaries"""
+        add_snapshot(session, 1, 2023, 12, people=1000)
+        add_snapshot(session, 1, 2024, 1, people=1100)
+        refresh_derived_metrics(session)
+        
+        assert derived(session, 1, 2023, 12)['people_benefited_mom'] is None
+        assert derived(session, 1, 2024, 1)['people_benefited_mom'] == 10.0
+    
+    def test_month_over_month_skips_missing_months(self, session):
+        """Test a gap compares against the last available snapshot, like district_latest"""
+        add_snapshot(session, 1, 2024, 1, people=1000)
+        add_snapshot(session, 1, 2024, 4, people=500)
+        refresh_derived_metrics(session)
+        
+        assert derived(session, 1, 2024, 4)['people_benefited_mom'] == -50.0
+    
+    def test_year_over_year_needs_the_same_month(self, session):
+        """Test YoY compares with exactly twelve months earlier and is NULL without it"""
+        add_snapshot(session, 1, 2023, 3, wages=4000000.0)
+        add_snapshot(session, 1, 2023, 4, wages=1.0)
+        add_snapshot(session, 1, 2024, 3, wages=5000000.0)
+        add_snapshot(session, 1, 2024, 5, wages=5000000.0)
+        refresh_derived_metrics(session)
+        
+        assert derived(session, 1, 2024, 3)['wages_paid_yoy'] == 25.0
+        assert derived(session, 1, 2024, 5)['wages_paid_yoy'] is None
+    
+    def test_rolling_average_covers_three_calendar_months(self, session):
+        """Test the 3-month average spans calendar months, not the last three rows"""
+        add_snapshot(session, 1, 2024, 1, people=100)
+        add_snapshot(session, 1, 2024, 2, people=200)
+        add_snapshot(session, 1, 2024, 3, people=600)
+        add_snapshot(session, 1, 2024, 6, people=900)
+        refresh_derived_metrics(session)
+        
+        assert derived(session, 1, 2024, 3)['people_benefited_avg_3m'] == 300.0
+        assert derived(session, 1, 2024, 6)['people_benefited_avg_3m'] == 900.0
+    
+    def test_ratios_and_zero_denominators(self, session):
+        """Test per-capita ratios and NULL instead of dividing by zero"""
+        add_snapshot(session, 1, 2024, 1, people=1000, workdays=20000, wages=5000000.0)
+        add_snapshot(session, 1, 2024, 2, people=0, workdays=0, wages=0.0)
+        add_snapshot(session, 1, 2024, 3, people=1000, workdays=20000, wages=5000000.0)
+        refresh_derived_metrics(session)
+        
+        first = derived(session, 1, 2024, 1)
+        assert first['wages_per_workday'] == 250.0
+        assert first['workdays_per_person'] == 20.0
+        assert first['wages_per_person'] == 5000.0
+        assert derived(session, 1, 2024, 2)['wages_per_workday'] is None
+        assert derived(session, 1, 2024, 3)['people_benefited_mom'] is None
+    
+    def test_districts_do_not_mix(self, session):
+        """Test windows are partitioned by district"""
+        add_snapshot(session, 1, 2024, 1, people=1000)
+        add_snapshot(session, 2, 2024, 2, people=3000)
+        refresh_derived_metrics(session)
+        
+        assert derived(session, 2, 2024, 2)['people_benefited_mom'] is None
+
+
+class TestRefresh:
+    """Test incremental refreshes"""
+    
+    def test_returns_only_changed_districts(self, session):
+        """Test a second pass over unchanged data rewrites nothing"""
+        add_snapshot(session, 1, 2024, 1)
+        add_snapshot(session, 2, 2024, 1)
+        
+        assert refresh_derived_metrics(session) == {1, 2}
+        assert refresh_derived_metrics(session) == set()
+        
+        add_snapshot(session, 2, 2024, 2, people=1200)
+        assert refresh_derived_metrics(session) == {2}
+    
+    def test_restricted_to_districts(self, session):
+        """Test a filtered pass leaves other districts alone and matches a full pass"""
+        add_snapshot(session, 1, 2024, 1)
+        add_snapshot(session, 1, 2024, 2, people=1500)
+        add_snapshot(session, 2, 2024, 1)
+        
+        assert refresh_derived_metrics(session, [1]) == {1}
+        assert derived(session, 2, 2024, 1) is None
+        assert derived(session, 1, 2024, 2)['people_benefited_mom'] == 50.0
+        assert refresh_derived_metrics(session) == {2}
+        assert refresh_derived_metrics(session, []) == set()
+    
+    def test_prunes_rows_of_deleted_snapshots(self, session):
+        """Test derived rows go away with their snapshot"""
+        add_snapshot(session, 1, 2024, 1)
+        add_snapshot(session, 1, 2024, 2)
+        refresh_derived_metrics(session)
+        session.execute(text("DELETE FROM mgnrega_snapshots WHERE month = 2"))
+        
+        assert refresh_derived_metrics(session, [1]) == {1}
+        assert derived(session, 1, 2024, 2) is None
+        assert derived(session, 1, 2024, 1) is not None
+
+
+class TestWorkerRefresh:
+    """Test the worker wrapper"""
+    
+    def test_commits_and_invalidates_changed_districts(self, session, monkeypatch):
+        """Test caches are invalidated only for districts whose metrics changed"""
+        invalidated = []
+        monkeypatch.setattr(worker, 'invalidate_district_caches', invalidated.append)
+        add_snapshot(session, 1, 2024, 1)
+        add_snapshot(session, 2, 2024, 1)
+        session.commit()
+        
+        assert worker.refresh_derived(session, [1]) == 1
+        assert worker.refresh_derived(session, [1, 2]) == 1
+        assert invalidated == [['UP-LUC'], ['UP-AGR']]
+        session.rollback()
+        assert derived(session, 1, 2024, 1) is not None
+    
+    def test_failures_are_not_fatal(self, session):
+        """Test a failing refresh is logged and rolled back"""
+        session.execute(text("DROP TABLE mgnrega_derived_metrics"))
+        
+        assert worker.refresh_derived(session) == 0
+        assert worker.refresh_derived(session, []) == 0
@@ -0,0 +1,218 @@
+"""
+Tests for change detection and resumable checkpoints
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+import worker
+from incremental import CHANGED, NEW, UNCHANGED, ChangeTracker, Checkpoint, content_hash
+
+
+def make_data(people=45000):
+    return {
+        'people_benefited': people,
+        'workdays_created': people * 20,
+        'wages_paid': people * 20 * 176.0,
+        'payments_on_time_percent': 92.5,
+        'works_completed': 350,
+        'raw_json': {'source': 'test', 'people': people},
+    }
+
+
+class TestContentHash:
+    """Test payload hashing"""
+    
+    def test_stable_across_key_order(self):
+        """Test that the hash depends on content, not dict ordering"""
+        data = make_data()
+        reordered = dict(reversed(list(data.items())))
+        reordered['raw_json'] = dict(reversed(list(data['raw_json'].items())))
+        
+        assert content_hash(data) == content_hash(reordered)
+    
+    def test_changes_with_values_only(self):
+        """Test that metric changes alter the hash and unrelated keys do not"""
+        data = make_data()
+        
+        assert content_hash(data) != content_hash(make_data(people=45001))
+        assert content_hash(data) == content_hash({**data, 'content_hash': 'x', 'extra': 1})
+
+
+class TestChangeTracker:
+    """Test classification against stored hashes"""
+    
+    def test_classify(self):
+        """Test new, changed and unchanged outcomes"""
+        tracker = ChangeTracker({1: content_hash(make_data()), 2: content_hash(make_data())})
+        
+        assert tracker.classify(1, make_data()) == UNCHANGED
+        assert tracker.classify(2, make_data(people=1)) == CHANGED
+        assert tracker.classify(3, make_data()) == NEW
+        assert tracker.counts == {NEW: 1, CHANGED: 1, UNCHANGED: 1}
+    
+    def test_load_reads_one_month(self, engine):
+        """Test stored hashes are loaded for the requested month only"""
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO mgnrega_snapshots (district_id, year, month, content_hash) "
+                "VALUES (1, 2025, 1, 'a'), (2, 2025, 1, 'b'), (1, 2025, 2, 'c')"
+            ))
+        session = sessionmaker(bind=engine)()
+        
+        assert ChangeTracker.load(session, 2025, 1).known == {1: 'a', 2: 'b'}
+        session.close()
+
+
+class TestCheckpoint:
+    """Test the checkpoint file"""
+    
+    def test_mark_load_clear(self, tmp_path):
+        """Test finished codes persist until cleared"""
+        checkpoint = Checkpoint.for_month(str(tmp_path / "checkpoints"), 2025, 3)
+        assert checkpoint.load() == set()
+        
+        checkpoint.mark(["UP-LUC", "UP-AGR"])
+        checkpoint.mark(["UP-KAN"])
+        assert Checkpoint(checkpoint.path).load() == {"UP-LUC", "UP-AGR", "UP-KAN"}
+        
+        checkpoint.clear()
+        assert checkpoint.load() == set()
+        checkpoint.clear()  # Clearing twice is harmless
+    
+    def test_age(self, tmp_path):
+        """Test the age is measured from the first mark, not the latest"""
+        checkpoint = Checkpoint(str(tmp_path / "run.checkpoint"))
+        assert checkpoint.age() == 0
+        
+        with patch('incremental.time.time', return_value=1000.0):
+            checkpoint.mark(["UP-LUC"])
+        with patch('incremental.time.time', return_value=5000.0):
+            checkpoint.mark(["UP-AGR"])
+            assert checkpoint.age() == 4000
+        assert checkpoint.load() == {"UP-LUC", "UP-AGR"}
+
+
+class TestIncrementalRun:
+    """Test ingest_all_districts with change detection and checkpoints"""
+    
+    @pytest.fixture
+    def run(self, engine, tmp_path, monkeypatch):
+        """Run ingest_all_districts against the test database with deterministic data"""
+        monkeypatch.setattr(worker, 'SessionLocal', sessionmaker(bind=engine))
+        monkeypatch.setattr(worker, 'INGEST_CHECKPOINT_DIR', str(tmp_path))
+        monkeypatch.setattr(worker, 'CACHE_WARM_URL', '')
+        monkeypatch.setattr(worker, 'redis_client', MagicMock())
+        fetched = []
+        
+        def fetch(district_code, year, month):
+            fetched.append(district_code)
+            return make_data()
+        
+        monkeypatch.setattr(worker, 'fetch_mgnrega_data', fetch)
+        
+        def run(**kwargs):
+            fetched.clear()
+            return worker.ingest_all_districts(rps=0, **kwargs), list(fetched)
+        
+        return run
+    
+    def test_second_run_skips_unchanged_rows(self, run):
+        """Test that only changed rows are written and invalidated on a re-run"""
+        stats, _ = run(batch_size=10)
+        assert stats.counts['new'] == 3
+        
+        with patch('worker.invalidate_district_caches') as invalidate:
+            stats, _ = run(batch_size=10)
+        
+        assert stats.counts == {NEW: 0, CHANGED: 0, UNCHANGED: 3, 'resumed': 0}
+        invalidate.assert_not_called()
+    
+    def test_changed_row_is_written(self, run, engine):
+        """Test a changed payload updates the row and invalidates only that district"""
+        run(batch_size=10)
+        
+        with patch('worker.fetch_mgnrega_data', side_effect=lambda code, y, m: make_data(
+                people=50000 if code == 'UP-KAN' else 45000)), \
+                patch('worker.invalidate_district_caches') as invalidate:
+            stats, _ = run(batch_size=10)
+        
+        assert stats.counts[CHANGED] == 1
+        assert stats.counts[UNCHANGED] == 2
+        invalidate.assert_called_once_with(['UP-KAN'])
+        with engine.connect() as conn:
+            people = conn.execute(text(
+                "SELECT people_benefited FROM mgnrega_snapshots s JOIN districts d ON d.id = s.district_id "
+                "WHERE d.district_code = 'UP-KAN'"
+            )).scalar()
+        assert people == 50000
+    
+    @pytest.mark.parametrize('batch_size', [1, 10])
+    def test_unchanged_refetch_clears_quarantine(self, run, engine, batch_size):
+        """Test upstream returning to the published values releases the month from quarantine"""
+        def quarantined():
+            with engine.connect() as conn:
+                return conn.execute(text("SELECT COUNT(*) FROM mgnrega_snapshot_quarantine")).scalar()
+        
+        run(batch_size=batch_size)
+        with patch('worker.fetch_mgnrega_data', side_effect=lambda code, y, m: {**make_data(), 'wages_paid': 0.0}):
+            stats, _ = run(batch_size=batch_size)
+        assert stats.counts['quarantined'] == 3
+        assert quarantined() == 3
+        
+        stats, _ = run(batch_size=batch_size)
+        
+        assert stats.counts[UNCHANGED] == 3
+        assert quarantined() == 0
+    
+    def test_resumes_from_checkpoint(self, run, tmp_path):
+        """Test that districts finished by an interrupted run are not fetched again"""
+        from datetime import datetime
+        now = datetime.now()
+        Checkpoint.for_month(str(tmp_path), now.year, now.month).mark(['UP-LUC', 'UP-AGR'])
+        
+        stats, fetched = run(batch_size=10)
+        
+        assert fetched == ['UP-KAN']
+        assert stats.counts['resumed'] == 2
+        # A complete run removes its checkpoint
+        assert Checkpoint.for_month(str(tmp_path), now.year, now.month).load() == set()
+    
+    def test_failed_district_does_not_hold_back_the_next_run(self, run, tmp_path):
+        """Test a run with a failure clears its checkpoint so the next run refreshes every district"""
+        def fetch(code, year, month):
+            if code == 'UP-KAN':
+                raise LookupError(code)
+            return make_data()
+        
+        with patch('worker.fetch_mgnrega_data', side_effect=fetch):
+            stats, _ = run(batch_size=10)
+        assert stats.failed == 1
+        
+        stats, fetched = run(batch_size=10)
+        
+        assert sorted(fetched) == ['UP-AGR', 'UP-KAN', 'UP-LUC']
+        assert stats.counts['resumed'] == 0
+    
+    def test_stale_checkpoint_is_ignored(self, run, tmp_path, monkeypatch):
+        """Test a checkpoint left by an interrupted run expires after the max age"""
+        from datetime import datetime
+        now = datetime.now()
+        Checkpoint.for_month(str(tmp_path), now.year, now.month).mark(['UP-LUC'])
+        monkeypatch.setattr(worker, 'INGEST_CHECKPOINT_MAX_AGE', -1)
+        
+        _, fetched = run(batch_size=10)
+        
+        assert sorted(fetched) == ['UP-AGR', 'UP-KAN', 'UP-LUC']
+    
+    def test_fresh_ignores_checkpoint(self, run, tmp_path):
+        """Test that --fresh starts over"""
+        from datetime import datetime
+        now = datetime.now()
+        Checkpoint.for_month(str(tmp_path), now.year, now.month).mark(['UP-LUC'])
+        
+        _, fetched = run(batch_size=10, fresh=True)
+        
+        assert sorted(fetched) == ['UP-AGR', 'UP-KAN', 'UP-LUC']
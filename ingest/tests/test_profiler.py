@@ -0,0 +1,141 @@
+"""
+Tests for the ingestion stage profiler and run reports
+"""
+
+import json
+import pstats
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import worker
+from async_ingest import RunStats
+from profiler import STAGES, StageProfiler, histogram, timed, write_report
+from tests.conftest import make_data
+
+
+class FakeClock:
+    """Clock advanced by hand"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestStageProfiler:
+    """Test stage timing and summaries"""
+    
+    def test_nested_stages_are_exclusive(self):
+        """Test a nested stage's time is not also counted in the outer stage"""
+        clock = FakeClock()
+        profiler = StageProfiler(clock=clock)
+        
+        with profiler.stage('transform', 'UP-LUC'):
+            clock.now += 0.010
+            with profiler.stage('write', ['UP-LUC', 'UP-KAN']):
+                clock.now += 0.040
+            with profiler.stage('commit', ['UP-LUC', 'UP-KAN']):
+                clock.now += 0.020
+            clock.now += 0.005
+        
+        assert profiler.samples['transform'] == [pytest.approx(0.015)]
+        assert profiler.samples['write'] == [pytest.approx(0.040)]
+        assert profiler.samples['commit'] == [pytest.approx(0.020)]
+    
+    def test_batch_stages_are_split_across_districts(self):
+        """Test a batch's time is shared evenly by its districts"""
+        profiler = StageProfiler()
+        profiler.record('fetch', 0.100, 'UP-LUC')
+        profiler.record('fetch', 0.010, 'UP-KAN')
+        profiler.record('write', 0.060, ['UP-LUC', 'UP-KAN'])
+        
+        slowest = profiler.slowest_districts()
+        
+        assert [d['district_code'] for d in slowest] == ['UP-LUC', 'UP-KAN']
+        assert slowest[0]['total_ms'] == pytest.approx(130.0)
+        assert slowest[1]['stages_ms']['write'] == pytest.approx(30.0)
+    
+    def test_summary_percentiles_and_histogram(self):
+        """Test per-stage percentiles and bucket counts"""
+        profiler = StageProfiler()
+        for ms in range(1, 101):
+            profiler.record('fetch', ms / 1000)
+        
+        fetch = profiler.stage_summary()['fetch']
+        
+        assert fetch['count'] == 100
+        assert (fetch['p50_ms'], fetch['p95_ms'], fetch['p99_ms'], fetch['max_ms']) == (50.0, 95.0, 99.0, 100.0)
+        assert sum(fetch['histogram_ms'].values()) == 100
+        assert fetch['histogram_ms']['100'] == 50  # 51..100 ms
+    
+    def test_histogram_overflow_bucket(self):
+        """Test samples above the last bound land in +Inf"""
+        counts = histogram([0.0005, 30.0])
+        assert counts['1'] == 1
+        assert counts['+Inf'] == 1
+    
+    def test_timed_without_profiler_is_noop(self):
+        """Test instrumented code runs unchanged when profiling is off"""
+        with timed(None, 'write'):
+            pass
+    
+    def test_report_is_json_serializable(self, tmp_path):
+        """Test the run report includes every stage and round-trips through JSON"""
+        profiler = StageProfiler()
+        profiler.record('fetch', 0.05, 'UP-LUC')
+        stats = RunStats(total=1)
+        stats.succeeded = 1
+        stats.elapsed = 0.5
+        
+        path = write_report(profiler.report(stats, year=2025, month=9), str(tmp_path))
+        with open(path) as f:
+            report = json.load(f)
+        
+        assert report['run'] == {'year': 2025, 'month': 9}
+        assert report['throughput_per_second'] == 2.0
+        assert set(report['stages']) == set(STAGES)
+        assert report['stages']['fetch']['share'] == 1.0
+
+
+class TestRunReport:
+    """Test ingest_all_districts writes a report (and a cProfile when asked)"""
+    
+    @pytest.fixture
+    def run(self, engine, tmp_path, monkeypatch):
+        """Run ingest_all_districts against the test database with mock data"""
+        monkeypatch.setattr(worker, 'SessionLocal', sessionmaker(bind=engine))
+        monkeypatch.setattr(worker, 'INGEST_CHECKPOINT_DIR', str(tmp_path / 'checkpoints'))
+        monkeypatch.setattr(worker, 'CACHE_WARM_URL', '')
+        monkeypatch.setattr(worker, 'redis_client', MagicMock())
+        monkeypatch.setattr(worker, 'fetch_mgnrega_data', make_data)
+        return lambda **kwargs: worker.ingest_all_districts(rps=0, **kwargs)
+    
+    @pytest.mark.parametrize('batch_size', [1, 10])
+    def test_report_covers_every_stage(self, run, report_dir, batch_size):
+        """Test both write paths record all five stages for every district"""
+        run(batch_size=batch_size)
+        
+        (path,) = report_dir.iterdir()
+        report = json.loads(path.read_text())
+        
+        assert report['run']['batch_size'] == batch_size
+        assert report['succeeded'] == 3
+        assert report['counts']['new'] == 3
+        for stage in STAGES:
+            assert report['stages'][stage]['count'] > 0, stage
+        assert report['stages']['fetch']['count'] == 3
+        assert report['stages']['transform']['count'] == 3
+        assert {d['district_code'] for d in report['slowest_districts']} == {'UP-LUC', 'UP-KAN', 'UP-AGR'}
+    
+    def test_cprofile_dump(self, run, tmp_path):
+        """Test --profile writes stats that include the writer thread"""
+        path = tmp_path / 'run.prof'
+        run(batch_size=10, profile_path=str(path))
+        
+        functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+        
+        assert 'flush' in functions
+        assert 'fetch_mgnrega_data_async' in functions
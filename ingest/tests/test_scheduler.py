@@ -0,0 +1,154 @@
+"""
+Tests for the ingestion scheduler
+"""
+
+import fakeredis
+import pytest
+from sqlalchemy import text
+
+import worker
+from tests.conftest import count_rows
+
+
+class FakeTime:
+    """Wall clock advanced only by sleep"""
+    
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.sleeps = []
+    
+    def clock(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def scheduler(database, monkeypatch):
+    fake = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(worker, 'redis_client', fake)
+    return fake
+
+
+def codes(ranked):
+    return [district[2] for district in ranked]
+
+
+class TestRefreshPriorities:
+
+    def test_never_refreshed_first(self, database, scheduler):
+        """Districts without any refresh outrank recently refreshed ones"""
+        scheduler.zadd(worker.REFRESHED_KEY, {'UP-LUC': 999_000.0, 'UP-AGR': 990_000.0})
+        with worker.SessionLocal() as session:
+            ranked = worker.refresh_priorities(session, 2025, 9, now=1_000_000.0)
+        
+        assert codes(ranked) == ['BR-PAT', 'UP-AGR', 'UP-LUC']
+    
+    def test_popularity_raises_priority(self, database, scheduler):
+        """Among equally stale districts the most viewed comes first"""
+        scheduler.zadd(worker.REFRESHED_KEY, {'UP-LUC': 990_000.0, 'UP-AGR': 990_000.0, 'BR-PAT': 990_000.0})
+        scheduler.zadd(worker.POPULARITY_KEY, {'UP-AGR': 500, 'BR-PAT': 5})
+        with worker.SessionLocal() as session:
+            ranked = worker.refresh_priorities(session, 2025, 9, now=1_000_000.0)
+        
+        assert codes(ranked) == ['UP-AGR', 'BR-PAT', 'UP-LUC']
+    
+    def test_popularity_does_not_outweigh_staleness(self, database, scheduler):
+        """A much staler district still beats a slightly more popular one"""
+        scheduler.zadd(worker.REFRESHED_KEY, {'UP-LUC': 999_900.0, 'UP-AGR': 900_000.0, 'BR-PAT': 999_900.0})
+        scheduler.zadd(worker.POPULARITY_KEY, {'UP-LUC': 10})
+        with worker.SessionLocal() as session:
+            ranked = worker.refresh_priorities(session, 2025, 9, now=1_000_000.0)
+        
+        assert codes(ranked)[0] == 'UP-AGR'
+    
+    def test_fetched_at_counts_as_refresh(self, database, scheduler):
+        """A stored snapshot's fetched_at is used when the scheduler has no record"""
+        with database.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO mgnrega_snapshots (district_id, year, month, fetched_at) "
+                "VALUES (1, 2025, 9, '2099-01-01 00:00:00')"
+            ))
+        with worker.SessionLocal() as session:
+            ranked = worker.refresh_priorities(session, 2025, 9, now=1_000_000.0)
+        
+        assert codes(ranked)[-1] == 'UP-LUC'
+        assert ranked[-1][0] == 0.0
+
+
+class TestScheduleCycle:
+
+    def test_refreshes_are_spread_over_window(self, database, scheduler):
+        """Each district gets its own evenly spaced slot in the window"""
+        fake = FakeTime()
+        with database.connect() as lock_conn:
+            counts = worker.run_schedule_cycle(lock_conn, window=30.0, clock=fake.clock, sleep=fake.sleep)
+        
+        assert fake.sleeps == [10.0, 10.0]
+        assert counts['new'] == 3
+        assert count_rows(database) == 3
+        assert set(scheduler.zrange(worker.REFRESHED_KEY, 0, -1)) == {'UP-LUC', 'UP-AGR', 'BR-PAT'}
+    
+    def test_unchanged_districts_not_rewritten(self, database, scheduler, monkeypatch):
+        """A second window skips the write and the cache invalidation for unchanged data"""
+        fake = FakeTime()
+        with database.connect() as lock_conn:
+            worker.run_schedule_cycle(lock_conn, window=3.0, clock=fake.clock, sleep=fake.sleep)
+            invalidated = []
+            monkeypatch.setattr(worker, 'invalidate_district_caches', invalidated.extend)
+            counts = worker.run_schedule_cycle(lock_conn, window=3.0, clock=fake.clock, sleep=fake.sleep)
+        
+        assert counts['unchanged'] == 3
+        assert counts['new'] == counts['changed'] == 0
+        assert invalidated == []
+    
+    def test_popularity_decays_each_window(self, database, scheduler):
+        """View counts are scaled down after every window"""
+        scheduler.zadd(worker.POPULARITY_KEY, {'UP-LUC': 100})
+        fake = FakeTime()
+        with database.connect() as lock_conn:
+            worker.run_schedule_cycle(lock_conn, window=3.0, clock=fake.clock, sleep=fake.sleep)
+        
+        assert scheduler.zscore(worker.POPULARITY_KEY, 'UP-LUC') == 100 * worker.SCHEDULER_POPULARITY_DECAY
+    
+    def test_failed_fetch_does_not_stop_window(self, database, scheduler, monkeypatch):
+        """One failing district is counted and the rest are still refreshed"""
+        def fetch(district_code, year, month):
+            if district_code == 'UP-AGR':
+                raise RuntimeError("upstream down")
+            return {
+                'people_benefited': 1, 'workdays_created': 1, 'wages_paid': 1.0,
+                'payments_on_time_percent': 90.0, 'works_completed': 1, 'raw_json': {},
+            }
+        
+        monkeypatch.setattr(worker, 'fetch_mgnrega_data', fetch)
+        fake = FakeTime()
+        with database.connect() as lock_conn:
+            counts = worker.run_schedule_cycle(lock_conn, window=3.0, clock=fake.clock, sleep=fake.sleep)
+        
+        assert counts['failed'] == 1
+        assert counts['new'] == 2
+        assert scheduler.zscore(worker.REFRESHED_KEY, 'UP-AGR') is None
+    
+    def test_lost_lock_stops_window(self, database, scheduler):
+        """The window is abandoned once the lock connection is gone"""
+        fake = FakeTime()
+        lock_conn = database.connect()
+        lock_conn.close()
+        
+        with pytest.raises(worker.SchedulerLockLost):
+            worker.run_schedule_cycle(lock_conn, window=3.0, clock=fake.clock, sleep=fake.sleep)
+        assert count_rows(database) == 0
+
+
+class TestRunScheduler:
+
+    def test_runs_requested_cycles(self, database, scheduler):
+        """The daemon takes the lock and runs windows back to back"""
+        fake = FakeTime()
+        worker.run_scheduler(window=3.0, cycles=2, clock=fake.clock, sleep=fake.sleep)
+        
+        assert count_rows(database) == 3
+        assert len(fake.sleeps) == 4
@@ -0,0 +1,175 @@
+"""
+Tests for the Redis Streams ingestion queue
+"""
+
+import fakeredis
+import pytest
+from sqlalchemy import text
+
+import stream_queue
+from stream_queue import StreamConsumer, enqueue, ingest_jobs, requeue_dead, status
+
+
+@pytest.fixture
+def queue():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def consumer(queue, handler, name='worker-1', **kwargs):
+    # fakeredis drops messages on blocking reads, so poll without blocking
+    kwargs.setdefault('block_ms', 0)
+    kwargs.setdefault('claim_idle_ms', 0)
+    return StreamConsumer(queue, handler, name=name, **kwargs)
+
+
+class TestStreamConsumer:
+
+    def test_enqueued_jobs_are_processed_and_removed(self, queue):
+        """Successful jobs are acked and deleted from the stream"""
+        seen = []
+        
+        def handler(jobs):
+            seen.extend(job for _, job in jobs)
+            return {}
+        
+        enqueue(queue, [('UP-LUC', 2025, 9), ('UP-AGR', 2025, 9)])
+        worker = consumer(queue, handler)
+        
+        assert worker.poll() == 2
+        assert seen == [
+            {'district_code': 'UP-LUC', 'year': 2025, 'month': 9},
+            {'district_code': 'UP-AGR', 'year': 2025, 'month': 9},
+        ]
+        assert status(queue) == {'queued': 0, 'pending': 0, 'dead': 0, 'consumers': {}}
+        assert worker.poll() == 0
+    
+    def test_failed_job_is_retried_then_dead_lettered(self, queue):
+        """A job failing every attempt ends up in the dead-letter stream with its error"""
+        attempts = []
+        
+        def handler(jobs):
+            attempts.append(len(jobs))
+            return {message_id: "upstream 503" for message_id, _ in jobs}
+        
+        enqueue(queue, [('UP-LUC', 2025, 9)])
+        worker = consumer(queue, handler, max_attempts=3)
+        for _ in range(5):
+            worker.poll()
+        
+        assert attempts == [1, 1, 1]
+        dead = queue.xrange(stream_queue.dead_letter_stream())
+        assert len(dead) == 1
+        assert dead[0][1]['district_code'] == 'UP-LUC'
+        assert dead[0][1]['error'] == "upstream 503"
+        assert dead[0][1]['attempts'] == '3'
+        assert queue.xlen(stream_queue.STREAM) == 0
+        assert worker.dead_lettered == 1
+    
+    def test_handler_exception_fails_whole_batch(self, queue):
+        """An exception in the handler leaves every job in the batch pending"""
+        def handler(jobs):
+            raise RuntimeError("database unavailable")
+        
+        enqueue(queue, [('UP-LUC', 2025, 9), ('UP-AGR', 2025, 9)])
+        worker = consumer(queue, handler, claim_idle_ms=60000)
+        worker.poll()
+        
+        assert status(queue)['pending'] == 2
+        assert worker.failed == 2
+        assert queue.hget(f"{stream_queue.STREAM}:errors", queue.xrange(stream_queue.STREAM)[0][0]) == \
+            "RuntimeError: database unavailable"
+    
+    def test_jobs_of_dead_consumer_are_reclaimed(self, queue):
+        """Another consumer takes over jobs a crashed consumer never acked"""
+        enqueue(queue, [('UP-LUC', 2025, 9)])
+        crashed = consumer(queue, lambda jobs: {}, name='crashed')
+        crashed._read_new()
+        assert status(queue)['consumers'] == {'crashed': 1}
+        
+        done = []
+        survivor = consumer(queue, lambda jobs: done.extend(jobs) or {}, name='survivor')
+        survivor.poll()
+        
+        assert [job['district_code'] for _, job in done] == ['UP-LUC']
+        assert status(queue)['pending'] == 0
+    
+    def test_reclaimed_deleted_entries_are_cleaned_up(self, queue):
+        """Jobs deleted from the stream while pending lose their delivery count and error"""
+        enqueue(queue, [('UP-LUC', 2025, 9), ('UP-AGR', 2025, 9)])
+        failing = consumer(queue, lambda jobs: {message_id: "upstream 503" for message_id, _ in jobs},
+                           name='failing', claim_idle_ms=60000)
+        failing.poll()
+        deleted_id = queue.xrange(stream_queue.STREAM)[0][0]
+        queue.xdel(stream_queue.STREAM, deleted_id)
+        
+        done = []
+        survivor = consumer(queue, lambda jobs: done.extend(jobs) or {}, name='survivor')
+        survivor.poll()
+        
+        assert [job['district_code'] for _, job in done] == ['UP-AGR']
+        assert status(queue)['pending'] == 0
+        assert queue.hlen(f"{stream_queue.STREAM}:deliveries") == 0
+        assert queue.hlen(f"{stream_queue.STREAM}:errors") == 0
+    
+    def test_recent_jobs_are_not_stolen(self, queue):
+        """Jobs pending for less than claim_idle_ms stay with their consumer"""
+        enqueue(queue, [('UP-LUC', 2025, 9)])
+        consumer(queue, lambda jobs: {}, name='busy')._read_new()
+        
+        other = consumer(queue, lambda jobs: {}, name='other', claim_idle_ms=60000)
+        assert other.poll() == 0
+        assert status(queue)['consumers'] == {'busy': 1}
+    
+    def test_requeue_dead(self, queue):
+        """Dead-lettered jobs go back on the queue with fresh attempts"""
+        enqueue(queue, [('UP-LUC', 2025, 9)])
+        worker = consumer(queue, lambda jobs: {message_id: "boom" for message_id, _ in jobs}, max_attempts=1)
+        worker.poll()
+        assert status(queue)['dead'] == 1
+        
+        assert requeue_dead(queue) == 1
+        assert status(queue)['dead'] == 0
+        assert status(queue)['queued'] == 1
+        
+        done = []
+        consumer(queue, lambda jobs: done.extend(jobs) or {}, name='retry').poll()
+        assert done[0][1] == {'district_code': 'UP-LUC', 'year': 2025, 'month': 9}
+
+
+class TestIngestJobs:
+
+    def test_jobs_are_written_per_month(self, database):
+        """The handler writes snapshots for every job in the batch"""
+        failures = ingest_jobs([
+            ('1-0', {'district_code': 'UP-LUC', 'year': 2025, 'month': 8}),
+            ('2-0', {'district_code': 'UP-AGR', 'year': 2025, 'month': 8}),
+            ('3-0', {'district_code': 'UP-LUC', 'year': 2025, 'month': 9}),
+        ])
+        
+        assert failures == {}
+        with database.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT d.district_code, s.month FROM mgnrega_snapshots s "
+                "JOIN districts d ON d.id = s.district_id ORDER BY s.month, d.district_code"
+            )).fetchall()
+        assert [tuple(row) for row in rows] == [('UP-AGR', 8), ('UP-LUC', 8), ('UP-LUC', 9)]
+    
+    def test_unknown_district_fails(self, database):
+        """Jobs for districts not in the database are reported as failures"""
+        failures = ingest_jobs([
+            ('1-0', {'district_code': 'XX-NOPE', 'year': 2025, 'month': 9}),
+            ('2-0', {'district_code': 'UP-LUC', 'year': 2025, 'month': 9}),
+        ])
+        
+        assert failures == {'1-0': "unknown district XX-NOPE"}
+    
+    def test_missing_upstream_data_fails(self, database, monkeypatch):
+        """A district without upstream data for the month is retried later"""
+        monkeypatch.setattr(stream_queue, 'fetch_districts_month', _fetch_nothing)
+        failures = ingest_jobs([('1-0', {'district_code': 'UP-LUC', 'year': 2025, 'month': 9})])
+        
+        assert failures == {'1-0': "no upstream data for UP-LUC in 2025-09"}
+
+
+async def _fetch_nothing(districts, year, month, limiter=None):
+    return {}
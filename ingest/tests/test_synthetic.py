@@ -0,0 +1,100 @@
+"""
+Tests for the synthetic dataset generator and loader
+"""
+
+from sqlalchemy import text
+
+import synthetic
+from synthetic import SNAPSHOT_COLUMNS, csv_chunks, district_year, generate_districts, generate_snapshots
+
+
+class TestGenerator:
+    """Test the shape and determinism of generated data"""
+    
+    def test_districts_are_unique_and_deterministic(self):
+        """Test codes are unique per state and the same seed gives the same districts"""
+        districts = generate_districts(3, 50, seed=7)
+        
+        assert len(districts) == 150
+        assert len({d['district_code'] for d in districts}) == 150
+        assert len({(d['state'], d['district_name']) for d in districts}) == 150
+        assert districts == generate_districts(3, 50, seed=7)
+        assert districts != generate_districts(3, 50, seed=8)
+        assert districts[0]['district_code'] == 'SYN-UP-001'
+    
+    def test_more_districts_than_names(self):
+        """Test names stay unique past the syllable combinations"""
+        districts = generate_districts(1, 400)
+        assert len({d['district_name'] for d in districts}) == 400
+    
+    def test_rows_are_plausible(self):
+        """Test every month is present with values in realistic ranges"""
+        rows = district_year(42, 'SYN-UP-001', 1, 2024)
+        
+        assert [row[2] for row in rows] == list(range(1, 13))
+        for _, year, _, people, workdays, wages, on_time, works in rows:
+            assert year == 2024
+            assert people > 0 and works > 0
+            assert 10 <= workdays / people <= 30
+            assert 0 <= on_time <= 100
+            assert 150 <= wages / workdays <= 500
+    
+    def test_subsets_match_full_dataset(self):
+        """Test a district-year is the same whatever else is generated"""
+        districts = [(1, 'SYN-UP-001'), (2, 'SYN-UP-002')]
+        full = list(generate_snapshots(districts, range(2020, 2023)))
+        
+        (only,) = generate_snapshots(districts[1:], [2021])
+        
+        assert only == full[1][12:]
+    
+    def test_seasonality_and_shock(self):
+        """Test summer demand exceeds monsoon demand, and 2020-21 runs hot"""
+        districts = generate_districts(1, 50)
+        totals = {}
+        for index, district in enumerate(districts):
+            for year in (2019, 2020):
+                for row in district_year(42, district['district_code'], index, year):
+                    totals[(year, row[2])] = totals.get((year, row[2]), 0) + row[3]
+        
+        assert totals[(2019, 5)] > 1.5 * totals[(2019, 8)]
+        assert totals[(2020, 5)] > 1.2 * totals[(2019, 5)]
+    
+    def test_parallel_chunks_match_serial(self):
+        """Test process-parallel CSV generation keeps order and content"""
+        districts = [(1, 'SYN-UP-001'), (2, 'SYN-UP-002')]
+        serial = list(csv_chunks(districts, range(2020, 2023), processes=1))
+        
+        assert list(csv_chunks(districts, range(2020, 2023), processes=2)) == serial
+        assert serial[0].splitlines()[0].split(',')[:3] == ['1', '2020', '1']
+        assert all(len(line.split(',')) == len(SNAPSHOT_COLUMNS) for line in serial[0].splitlines())
+
+
+class TestSeed:
+    """Test loading the dataset"""
+    
+    def test_loads_every_district_year_month(self, session):
+        """Test the loader inserts districts, all snapshots and their derived metrics"""
+        result = synthetic.seed(session, states=2, districts_per_state=3, years=2, end_year=2025)
+        
+        assert result['districts'] == 6
+        assert result['rows'] == 6 * 2 * 12
+        count = session.execute(text("SELECT COUNT(*) FROM mgnrega_snapshots")).scalar()
+        assert count == 144
+        years = session.execute(text("SELECT DISTINCT year FROM mgnrega_snapshots ORDER BY year")).scalars().all()
+        assert years == [2024, 2025]
+        derived = session.execute(text("SELECT COUNT(*) FROM mgnrega_derived_metrics")).scalar()
+        assert derived == 144
+    
+    def test_refuses_to_load_twice_without_reset(self, session):
+        """Test a second load needs --reset, which leaves real districts alone"""
+        synthetic.seed(session, states=1, districts_per_state=2, years=1, end_year=2025)
+        
+        assert synthetic.seed(session, states=1, districts_per_state=2, years=1, end_year=2025) is None
+        
+        session.execute(text("PRAGMA foreign_keys = ON"))
+        result = synthetic.seed(session, states=1, districts_per_state=2, years=1, end_year=2025, reset=True)
+        assert result['rows'] == 24
+        assert session.execute(text("SELECT COUNT(*) FROM mgnrega_snapshots")).scalar() == 24
+        codes = session.execute(text("SELECT district_code FROM districts ORDER BY id")).scalars().all()
+        assert codes[0] == 'UP-LUC'
@@ -2,65 +2,13 @@
 Tests for ingestion worker functions
 """
 
-import pytest
 from unittest.mock import patch, MagicMock
-from worker import fetch_mgnrega_data, store_snapshot
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from worker import (
+    fetch_mgnrega_data, store_snapshot, invalidate_district_cache, invalidate_district_lists, warm_api_cache
+)
 from sqlalchemy import text
 
 
-@pytest.fixture
-def db_session():
-    """In-memory database for testing"""
-    engine = create_engine("sqlite:///:memory:")
-    
-    # Create tables
-    with engine.connect() as conn:
-        conn.execute(text("""
-            CREATE TABLE districts (
-                id INTEGER PRIMARY KEY,
-                state TEXT,
-                district_name TEXT,
-                district_code TEXT UNIQUE,
-                latitude NUMERIC,
-                longitude NUMERIC
-            )
-        """))
-        
-        conn.execute(text("""
-            CREATE TABLE mgnrega_snapshots (
-                id INTEGER PRIMARY KEY,
-                district_id INTEGER,
-                year INTEGER,
-                month INTEGER,
-                people_benefited INTEGER,
-                workdays_created INTEGER,
-                wages_paid NUMERIC,
-                payments_on_time_percent NUMERIC,
-                works_completed INTEGER,
-                UNIQUE(district_id, year, month)
-            )
-        """))
-        
-        conn.commit()
-    
-    SessionLocal = sessionmaker(bind=engine)
-    session = SessionLocal()
-    
-    # Insert test district
-    with engine.connect() as conn:
-        conn.execute(text("""
-            INSERT INTO districts (state, district_name, district_code, latitude, longitude)
-            VALUES ('Uttar Pradesh', 'Lucknow', 'UP-LUC', 26.8467, 80.9462)
-        """))
-        conn.commit()
-    
-    yield session
-    session.close()
-    engine.dispose()
-
-
 class TestFetchMGNREGAData:
     """Test data fetching functions"""
     
@@ -106,10 +54,10 @@ class TestFetchMGNREGAData:
 class TestStoreSnapshot:
     """Test snapshot storage functions"""
     
-    def test_store_snapshot_upsert_logic(self, db_session):
+    def test_store_snapshot_upsert_logic(self, session):
         """Test that storing same snapshot twice doesn't duplicate"""
         # Get district ID
-        result = db_session.execute(
+        result = session.execute(
             text("SELECT id FROM districts WHERE district_code = 'UP-LUC'")
         ).fetchone()
         district_id = result[0]
@@ -125,36 +73,36 @@ class TestStoreSnapshot:
         }
         
         # Store first time
-        result1 = store_snapshot(db_session, district_id, 2025, 1, data)
+        result1 = store_snapshot(session, district_id, 2025, 1, data)
         assert result1 is True
         
         # Verify count
-        count1 = db_session.execute(
+        count1 = session.execute(
             text("SELECT COUNT(*) FROM mgnrega_snapshots")
         ).scalar()
         assert count1 == 1
         
         # Store second time (should update, not duplicate)
         data['people_benefited'] = 46000  # Updated value
-        result2 = store_snapshot(db_session, district_id, 2025, 1, data)
+        result2 = store_snapshot(session, district_id, 2025, 1, data)
         assert result2 is True
         
         # Verify count is still 1
-        count2 = db_session.execute(
+        count2 = session.execute(
             text("SELECT COUNT(*) FROM mgnrega_snapshots")
         ).scalar()
         assert count2 == 1
         
         # Verify updated value
-        result = db_session.execute(
+        result = session.execute(
             text("SELECT people_benefited FROM mgnrega_snapshots WHERE district_id = :id"),
             {'id': district_id}
         ).fetchone()
         assert result[0] == 46000
     
-    def test_store_snapshot_handles_invalid_data(self, db_session):
+    def test_store_snapshot_handles_invalid_data(self, session):
         """Test handling of invalid data"""
-        result = db_session.execute(
+        result = session.execute(
             text("SELECT id FROM districts WHERE district_code = 'UP-LUC'")
         ).fetchone()
         district_id = result[0]
@@ -166,11 +114,78 @@ class TestStoreSnapshot:
         }
         
         # Should handle gracefully
-        result = store_snapshot(db_session, district_id, 2025, 1, invalid_data)
+        result = store_snapshot(session, district_id, 2025, 1, invalid_data)
         # Function might return False or raise exception
         assert isinstance(result, bool)
 
 
+class TestCacheInvalidation:
+    """Test API cache invalidation and warming"""
+    
+    @patch('worker.redis_client')
+    def test_invalidate_uses_district_code_keys(self, mock_redis):
+        """Test invalidation deletes snapshot and trend keys by district code"""
+        mock_redis.scan_iter.return_value = iter(["district:trend:UP-LUC:6", "district:trend:UP-LUC:12"])
+        
+        invalidate_district_cache("UP-LUC")
+        
+        mock_redis.scan_iter.assert_called_once_with("district:trend:UP-LUC:*")
+        mock_redis.delete.assert_called_once_with(
+            "district:snapshot:UP-LUC", "district:trend:UP-LUC:6", "district:trend:UP-LUC:12"
+        )
+    
+    @patch('worker.redis_client')
+    def test_invalidate_publishes_event(self, mock_redis):
+        """Test API processes are told to evict their local entries"""
+        import json
+        mock_redis.scan_iter.return_value = iter([])
+        
+        invalidate_district_cache("UP-LUC")
+        
+        channel, message = mock_redis.publish.call_args.args
+        assert channel == "cache:invalidate"
+        assert json.loads(message)["patterns"] == [
+            "district:snapshot:UP-LUC", "district:trend:UP-LUC:*"
+        ]
+    
+    @patch('worker.redis_client')
+    def test_invalidate_tolerates_redis_errors(self, mock_redis):
+        """Test Redis failures do not break ingestion"""
+        import redis
+        mock_redis.scan_iter.side_effect = redis.ConnectionError("down")
+        
+        # Should not raise
+        invalidate_district_cache("UP-LUC")
+    
+    @patch('worker.redis_client')
+    def test_invalidate_district_lists(self, mock_redis):
+        """Test list keys are deleted and API registries are told to reload"""
+        import json
+        mock_redis.scan_iter.side_effect = [iter(["districts:state:all"]), iter(["states:all"])]
+        
+        invalidate_district_lists()
+        
+        mock_redis.delete.assert_called_once_with("districts:state:all", "states:all")
+        channel, message = mock_redis.publish.call_args.args
+        assert json.loads(message)["patterns"] == ["districts:*", "states:*"]
+    
+    @patch('worker.httpx.Client')
+    def test_warm_api_cache_requests_hot_endpoints(self, mock_client_cls, session):
+        """Test warming requests lists, snapshot and trend endpoints"""
+        client = mock_client_cls.return_value.__enter__.return_value
+        client.get.return_value = MagicMock(status_code=200)
+        
+        warmed, failures, elapsed = warm_api_cache(session, base_url="http://api", concurrency=2)
+        
+        requested = {call.args[0] for call in client.get.call_args_list}
+        assert '/districts/states' in requested
+        assert '/districts/UP-LUC/snapshot' in requested
+        assert '/districts/UP-LUC/trend' in requested
+        assert failures == 0
+        assert warmed == client.get.call_count
+        assert mock_client_cls.call_args.kwargs['headers'] == {'X-Cache-Warm': '1'}
+
+
 class TestErrorHandling:
     """Test error handling scenarios"""
     
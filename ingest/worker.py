@@ -3,16 +3,32 @@ MGNREGA Data Ingestion Worker
 Fetches data from MGNREGA API and stores in database
 """
 
+import argparse
+import asyncio
+import math
 import os
-import sys
+import json
+import socket
 import time
 import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from sqlalchemy import create_engine, text
+import httpx
+from sqlalchemy import bindparam, create_engine, text
 from sqlalchemy.orm import sessionmaker
 import redis
 from redis import Redis
 
+from anomaly import AnomalyDetector, quarantined, release
+from archive import RawArchive
+from async_ingest import print_report, run_ingestion
+from bulk import SnapshotBulkWriter
+from client import DEFAULT_RESOURCE_ID, MGNREGAClient, MonthSource, district_key
+from derived import refresh_derived_metrics
+from incremental import UNCHANGED, ChangeTracker, Checkpoint
+from profiler import StageProfiler, print_stages, timed, write_report
+from ratelimit import TokenBucket
+
 # Database configuration
 DATABASE_URL = os.getenv(
     'DATABASE_URL',
@@ -21,6 +37,64 @@ DATABASE_URL = os.getenv(
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 API_KEY = os.getenv('MGNREGA_API_KEY', '')
 
+# data.gov.in resource (mock data is generated when no API key is set)
+API_BASE_URL = os.getenv('MGNREGA_API_BASE_URL', 'https://api.data.gov.in/resource')
+API_RESOURCE_ID = os.getenv('MGNREGA_RESOURCE_ID', DEFAULT_RESOURCE_ID)
+API_PAGE_SIZE = int(os.getenv('MGNREGA_PAGE_SIZE', '1000'))
+API_CONCURRENCY = int(os.getenv('MGNREGA_API_CONCURRENCY', '4'))
+
+# API processes evict their in-process caches on events from this channel
+INVALIDATION_CHANNEL = os.getenv('INVALIDATION_CHANNEL', 'cache:invalidate')
+
+# Cache warming: base URL of the dashboard API (e.g. http://backend:8000/api/v1)
+CACHE_WARM_URL = os.getenv('CACHE_WARM_URL', '')
+CACHE_WARM_CONCURRENCY = int(os.getenv('CACHE_WARM_CONCURRENCY', '8'))
+CACHE_WARM_TREND_MONTHS = (6, 12)
+# Tells the API not to count warm-up requests as dashboard views
+CACHE_WARM_HEADERS = {'X-Cache-Warm': '1'}
+
+# Concurrent ingestion: fetches in flight and upstream requests-per-second budget
+INGEST_CONCURRENCY = int(os.getenv('INGEST_CONCURRENCY', '16'))
+INGEST_RPS = float(os.getenv('INGEST_RPS', '10'))
+INGEST_BURST = float(os.getenv('INGEST_BURST', '0')) or None
+
+# Snapshots written per COPY + merge batch (1 = one upsert and commit per row)
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '500'))
+
+# Where interrupted runs record finished districts so they can resume
+INGEST_CHECKPOINT_DIR = os.getenv('INGEST_CHECKPOINT_DIR', os.path.join(os.path.dirname(__file__), 'checkpoints'))
+
+# Checkpoints of interrupted runs older than this are ignored, so a stale
+# checkpoint cannot hold back districts for the rest of the month
+INGEST_CHECKPOINT_MAX_AGE = float(os.getenv('INGEST_CHECKPOINT_MAX_AGE', '21600'))
+
+# Raw upstream payloads: 'archive' appends them to compressed segments under
+# INGEST_ARCHIVE_DIR and stores a reference in raw_json; 'table' stores the
+# full JSON in raw_json
+INGEST_RAW_STORAGE = os.getenv('INGEST_RAW_STORAGE', 'archive')
+INGEST_ARCHIVE_DIR = os.getenv('INGEST_ARCHIVE_DIR', os.path.join(os.path.dirname(__file__), 'archive'))
+INGEST_ARCHIVE_CODEC = os.getenv('INGEST_ARCHIVE_CODEC', '') or None  # zstd or gzip; default zstd if installed
+
+# Per-run JSON performance reports (stage timings, slowest districts); empty disables
+INGEST_REPORT_DIR = os.getenv('INGEST_REPORT_DIR', os.path.join(os.path.dirname(__file__), 'reports'))
+
+# Anomaly detection: rows whose robust z-score against the district's
+# trailing ANOMALY_WINDOW months exceeds the threshold (or that break the
+# hard rules) are quarantined instead of published; a threshold of 0 keeps
+# only the hard rules
+ANOMALY_Z_THRESHOLD = float(os.getenv('ANOMALY_Z_THRESHOLD', '6'))
+ANOMALY_WINDOW = int(os.getenv('ANOMALY_WINDOW', '12'))
+ANOMALY_MIN_HISTORY = int(os.getenv('ANOMALY_MIN_HISTORY', '6'))
+
+# Scheduler: every district is refreshed once per window, one at a time at
+# evenly spaced slots, stalest and most viewed first
+SCHEDULER_WINDOW = float(os.getenv('SCHEDULER_WINDOW_SECONDS', '86400'))
+SCHEDULER_LOCK_ID = int(os.getenv('SCHEDULER_LOCK_ID', '4104'))  # Postgres advisory lock key
+SCHEDULER_POPULARITY_WEIGHT = float(os.getenv('SCHEDULER_POPULARITY_WEIGHT', '1.0'))
+SCHEDULER_POPULARITY_DECAY = float(os.getenv('SCHEDULER_POPULARITY_DECAY', '0.5'))  # per window
+POPULARITY_KEY = os.getenv('POPULARITY_KEY', 'district:views')  # written by the API
+REFRESHED_KEY = 'ingest:refreshed'  # district_code -> unix time of the last refresh
+
 # Initialize connections
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
@@ -29,11 +103,11 @@ redis_client = Redis.from_url(REDIS_URL, decode_responses=True)
 
 def fetch_mgnrega_data(district_code, year, month):
     """
-    Fetch MGNREGA data from API or generate mock data
+    Generate realistic mock data for a district-month
     
-    TODO: Implement actual API call to data.gov.in when API is available
+    Used when MGNREGA_API_KEY is not set; with a key, data comes from
+    data.gov.in through client.MGNREGAClient.
     """
-    # Generate realistic mock data for now
     base_people = random.randint(35000, 55000)
     workdays = base_people * 20
     wages = workdays * 176  # Average wage per day
@@ -55,64 +129,226 @@ def fetch_mgnrega_data(district_code, year, month):
     }
 
 
-def store_snapshot(session, district_id, year, month, data):
+async def fetch_mgnrega_data_async(client, district_code, year, month):
+    """
+    Async mock fetch used by the concurrent engine when no API key is set
+    """
+    return fetch_mgnrega_data(district_code, year, month)
+
+
+def create_api_client(limiter=None):
+    """
+    Create a data.gov.in client from the environment
+    
+    Args:
+        limiter: TokenBucket applied to every upstream request
+    """
+    return MGNREGAClient(
+        API_KEY,
+        base_url=API_BASE_URL,
+        resource_id=API_RESOURCE_ID,
+        page_size=API_PAGE_SIZE,
+        concurrency=API_CONCURRENCY,
+        limiter=limiter,
+    )
+
+
+async def fetch_district_upstream(state, district_name, year, month):
+    """
+    Fetch one district-month from data.gov.in
+    
+    Returns:
+        Snapshot data, or None if the API has no record for the district
+    """
+    async with create_api_client() as api:
+        snapshots = await api.fetch_month(year, month, state=state)
+    return snapshots.get(district_key(state, district_name))
+
+
+def raw_archive():
+    """
+    Archive for raw payloads, or None when they are stored in the table
+    """
+    if INGEST_RAW_STORAGE != 'archive':
+        return None
+    return RawArchive(INGEST_ARCHIVE_DIR, INGEST_ARCHIVE_CODEC)
+
+
+def anomaly_detector():
+    """
+    Validator for write batches (hard rules only when the threshold is 0)
+    """
+    return AnomalyDetector(ANOMALY_Z_THRESHOLD, ANOMALY_WINDOW, ANOMALY_MIN_HISTORY)
+
+
+def publish_invalidation(patterns):
+    """
+    Tell every API process to evict matching entries from its local caches
+    """
+    message = json.dumps({
+        'patterns': list(patterns),
+        'origin': f"{socket.gethostname()}:{os.getpid()}"
+    })
+    redis_client.publish(INVALIDATION_CHANNEL, message)
+
+
+def invalidate_district_cache(district_code):
+    """
+    Remove the API cache entries for a district, in Redis and in every
+    API process's local caches
+    
+    Cache failures are logged but never fail ingestion; the entries expire
+    on their own TTL.
+    """
+    invalidate_district_caches([district_code])
+
+
+def invalidate_district_caches(district_codes):
+    """
+    Remove the API cache entries for several districts at once
+    
+    Issues one DELETE and one invalidation event for the whole batch.
+    """
+    patterns = []
+    for district_code in district_codes:
+        patterns += [f"district:snapshot:{district_code}", f"district:trend:{district_code}:*"]
+    try:
+        keys = patterns[0::2]
+        for pattern in patterns[1::2]:
+            keys += list(redis_client.scan_iter(pattern))
+        if keys:
+            redis_client.delete(*keys)
+        publish_invalidation(patterns)
+    except redis.RedisError as e:
+        print(f"⚠ Cache invalidation failed for {', '.join(district_codes)}: {e}")
+
+
+def invalidate_district_lists():
+    """
+    Remove the cached district and state lists after districts change
+    
+    The same event makes every API process reload its in-memory district
+    registry. Failures are logged; the lists expire on their own TTL.
+    """
+    patterns = ["districts:*", "states:*"]
+    try:
+        keys = []
+        for pattern in patterns:
+            keys += list(redis_client.scan_iter(pattern))
+        if keys:
+            redis_client.delete(*keys)
+        publish_invalidation(patterns)
+    except redis.RedisError as e:
+        print(f"⚠ District list invalidation failed: {e}")
+
+
+def store_snapshot(session, district_id, year, month, data, district_code=None, profiler=None, detector=None):
     """
     Store or update snapshot in database
+    
+    A one-row batch through SnapshotBulkWriter, so the snapshot, its raw
+    payload and the content-hash guard are written exactly as in batches.
+    ``profiler`` (a StageProfiler) times the write, commit and invalidate
+    stages; ``detector`` (default: anomaly_detector()) validates the row.
+    A quarantined row counts as stored.
     """
     try:
-        # Use ON CONFLICT UPDATE for upsert
-        query = text("""
-            INSERT INTO mgnrega_snapshots 
-            (district_id, year, month, people_benefited, workdays_created, 
-             wages_paid, payments_on_time_percent, works_completed, raw_json)
-            VALUES (:district_id, :year, :month, :people_benefited, :workdays_created,
-                    :wages_paid, :payments_on_time_percent, :works_completed, 
-                    :raw_json::jsonb)
-            ON CONFLICT (district_id, year, month) 
-            DO UPDATE SET 
-                people_benefited = EXCLUDED.people_benefited,
-                workdays_created = EXCLUDED.workdays_created,
-                wages_paid = EXCLUDED.wages_paid,
-                payments_on_time_percent = EXCLUDED.payments_on_time_percent,
-                works_completed = EXCLUDED.works_completed,
-                raw_json = EXCLUDED.raw_json,
-                fetched_at = CURRENT_TIMESTAMP
-        """)
-        
-        session.execute(query, {
-            'district_id': district_id,
-            'year': year,
-            'month': month,
-            'people_benefited': data['people_benefited'],
-            'workdays_created': data['workdays_created'],
-            'wages_paid': data['wages_paid'],
-            'payments_on_time_percent': data['payments_on_time_percent'],
-            'works_completed': data['works_completed'],
-            'raw_json': str(data['raw_json'])
-        })
-        
-        session.commit()
-        
-        # Clear cache for this district
-        redis_client.delete(f"district:snapshot:{district_id}")
-        redis_client.delete(f"district:trend:{district_id}:*")
-        
-        return True
+        # Cache keys are built from the district code
+        if district_code is None:
+            district_code = session.execute(
+                text("SELECT district_code FROM districts WHERE id = :id"),
+                {'id': district_id}
+            ).scalar()
+        writer = SnapshotBulkWriter(session, 1, on_flush=invalidate_district_caches, archive=raw_archive(),
+                                    profiler=profiler, derive=True, detector=detector or anomaly_detector())
+        writer.add(district_id, year, month, data, district_code)
+        return writer.rows_failed == 0
     except Exception as e:
         session.rollback()
         print(f"✗ Error storing snapshot: {e}")
         return False
 
 
-def ingest_all_districts():
+def ensure_snapshot_partition(session, year):
+    """
+    Make sure the year partition of mgnrega_snapshots exists (Postgres only)
+    
+    Rows for a year without a partition still land in the default partition,
+    so this only keeps data in the right place; failures are not fatal.
+    """
+    if session.get_bind().dialect.name != 'postgresql':
+        return
+    try:
+        session.execute(text("SELECT ensure_snapshot_partition(:year)"), {'year': year})
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"⚠ Could not ensure partition for {year}: {e}")
+
+
+def refresh_derived(session, district_ids=None):
+    """
+    Recompute derived metrics in one pass after a bulk load
+    
+    Regular ingestion refreshes them per batch in the bulk writer; backfills
+    and replays write the same districts month after month, so they refresh
+    once at the end instead. Commits and invalidates the caches of districts
+    whose derived rows changed. Failures are logged but never fail the load;
+    the next refresh recomputes the same rows.
+    
+    Args:
+        session: SQLAlchemy session
+        district_ids: Districts that were written (default: all)
+    
+    Returns:
+        Number of districts whose derived metrics changed
+    """
+    if district_ids is not None and not district_ids:
+        return 0
+    try:
+        changed = refresh_derived_metrics(session, district_ids)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"⚠ Could not refresh derived metrics: {e}")
+        return 0
+    if changed:
+        codes = session.execute(
+            text("SELECT district_code FROM districts WHERE id IN :ids").bindparams(bindparam('ids', expanding=True)),
+            {'ids': sorted(changed)}
+        ).scalars().all()
+        if codes:
+            invalidate_district_caches(codes)
+    return len(changed)
+
+
+def ingest_all_districts(concurrency=None, rps=None, batch_size=None, fresh=False, profile_path=None):
     """
     Ingest data for all districts
+    
+    Districts are fetched concurrently, at most ``concurrency`` at a time
+    and no faster than ``rps`` upstream requests per second, and written
+    ``batch_size`` snapshots per transaction.
+    
+    Snapshots whose content hash matches the stored row are not written
+    and their caches are not invalidated. Finished districts are recorded
+    in a checkpoint, so re-running an interrupted month skips them unless
+    ``fresh`` is set or the checkpoint is older than
+    INGEST_CHECKPOINT_MAX_AGE. A run that finishes removes its checkpoint,
+    failed districts included.
+    
+    Every stage is timed and a JSON report is written to INGEST_REPORT_DIR;
+    ``profile_path`` additionally writes a cProfile dump of the run.
+    
+    Returns:
+        RunStats with counts, throughput and fetch latencies
     """
     print("\n" + "="*60)
     print("  MGNREGA DATA INGESTION WORKER")
     print("="*60 + "\n")
     
     session = SessionLocal()
+    profiler = StageProfiler(cprofile=bool(profile_path))
     
     try:
         # Get current year and month
@@ -121,39 +357,210 @@ def ingest_all_districts():
         month = now.month
         
         # Get all districts
-        result = session.execute(text("SELECT id, district_code FROM districts"))
-        districts = result.fetchall()
+        result = session.execute(text("SELECT id, district_code, state, district_name FROM districts"))
+        rows = result.fetchall()
+        districts = [(district_id, code) for district_id, code, _, _ in rows]
+        
+        checkpoint = Checkpoint.for_month(INGEST_CHECKPOINT_DIR, year, month)
+        if fresh or checkpoint.age() > INGEST_CHECKPOINT_MAX_AGE:
+            checkpoint.clear()
+        finished = checkpoint.load()
+        pending = [(district_id, code) for district_id, code in districts if code not in finished]
         
-        print(f"Ingesting data for {len(districts)} districts...")
+        print(f"Ingesting data for {len(pending)} districts...")
+        if len(pending) < len(districts):
+            print(f"Resuming from checkpoint: {len(districts) - len(pending)} already done")
         print(f"Month: {month}/{year}\n")
         
-        success_count = 0
-        error_count = 0
+        ensure_snapshot_partition(session, year)
+        tracker = ChangeTracker.load(session, year, month)
+        detector = anomaly_detector()
         
-        for district_id, district_code in districts:
-            try:
-                data = fetch_mgnrega_data(district_code, year, month)
-                if store_snapshot(session, district_id, year, month, data):
-                    print(f"✓ {district_code}")
-                    success_count += 1
-                else:
-                    print(f"✗ {district_code} (storage failed)")
-                    error_count += 1
-                
-                time.sleep(0.5)  # Rate limiting
-                
-            except Exception as e:
-                print(f"✗ {district_code}: {e}")
-                error_count += 1
+        def committed(district_codes):
+            invalidate_district_caches(district_codes)
+            checkpoint.mark(district_codes)
+        
+        batch_size = batch_size or INGEST_BATCH_SIZE
+        finish = None
+        if batch_size > 1:
+            writer = SnapshotBulkWriter(session, batch_size, on_flush=committed, archive=raw_archive(),
+                                        profiler=profiler, derive=True, detector=detector)
+            
+            def write(district_id, district_code, data):
+                return writer.add(district_id, year, month, data, district_code)
+            
+            def skip(district_id):
+                writer.unchanged(district_id, year, month)
+            
+            def finish():
+                with profiler.profiled(writer=True):
+                    writer.flush()
+                return writer.rows_failed
+        else:
+            def write(district_id, district_code, data):
+                # store_snapshot invalidates the cache itself
+                stored = store_snapshot(session, district_id, year, month, data, district_code, profiler, detector)
+                if stored:
+                    checkpoint.mark([district_code])
+                return stored
+            
+            def skip(district_id):
+                with SnapshotBulkWriter(session, 1, detector=detector) as single:
+                    single.unchanged(district_id, year, month)
+        
+        def store(district_id, district_code, data):
+            with profiler.profiled(writer=True), timed(profiler, 'transform', district_code):
+                if tracker.classify(district_id, data) == UNCHANGED:
+                    skip(district_id)
+                    checkpoint.mark([district_code])
+                    return True
+                return write(district_id, district_code, data)
+        
+        concurrency = concurrency or INGEST_CONCURRENCY
+        rps = INGEST_RPS if rps is None else rps
+        
+        async def run():
+            if not API_KEY:
+                return await run_ingestion(
+                    pending, year, month, fetch_mgnrega_data_async, store,
+                    concurrency=concurrency, rps=rps, burst=INGEST_BURST, finish=finish, profiler=profiler,
+                )
+            # Whole months come from a few large pages, so the RPS budget
+            # applies to the client's HTTP requests rather than per district
+            async with create_api_client(TokenBucket(rps, INGEST_BURST)) as api:
+                source = MonthSource(api, {code: (state, name) for _, code, state, name in rows})
+                return await run_ingestion(
+                    pending, year, month, source.fetch, store,
+                    concurrency=concurrency, rps=0, client=api.http, finish=finish, profiler=profiler,
+                )
         
-        print(f"\n{'='*60}")
-        print(f"  Summary: {success_count} successful, {error_count} errors")
+        with profiler.profiled():
+            stats = asyncio.run(run())
+        stats.counts = {**tracker.counts, 'resumed': len(districts) - len(pending)}
+        if detector is not None and detector.rows_flagged:
+            stats.counts['quarantined'] = detector.rows_flagged
+        print_report(stats)
+        
+        report = profiler.report(
+            stats, year=year, month=month, source='api' if API_KEY else 'mock',
+            concurrency=concurrency, rps=rps, batch_size=batch_size,
+        )
+        print_stages(report)
+        if INGEST_REPORT_DIR:
+            print(f"  Report: {write_report(report, INGEST_REPORT_DIR)}")
+        if profile_path:
+            profiler.dump_cprofile(profile_path)
+            print(f"  cProfile: {profile_path}")
         print("="*60 + "\n")
         
+        # The checkpoint only resumes interrupted runs; districts that failed
+        # here are fetched again with all the others next time
+        checkpoint.clear()
+        
+        if CACHE_WARM_URL:
+            warm_api_cache(session)
+        
+        return stats
+        
+    finally:
+        session.close()
+
+
+def list_quarantined(district_code=None):
+    """
+    Print quarantined snapshots with the reasons they were held back
+    
+    Returns:
+        Number of quarantined snapshots listed
+    """
+    session = SessionLocal()
+    try:
+        codes = dict(session.execute(text("SELECT id, district_code FROM districts")).fetchall())
+        district_id = next((d_id for d_id, code in codes.items() if code == district_code), None)
+        if district_code and district_id is None:
+            print(f"✗ District '{district_code}' not found")
+            return 0
+        rows = quarantined(session, district_id)
+    finally:
+        session.close()
+    
+    for row in rows:
+        print(f"{codes.get(row['district_id'], row['district_id'])} {row['year']}-{row['month']:02d}: "
+              f"{'; '.join(row['reasons'])}")
+    print(f"{len(rows)} quarantined snapshots")
+    return len(rows)
+
+
+def release_quarantined(district_code, year, month):
+    """
+    Publish a quarantined snapshot after it was checked by hand
+    
+    Returns:
+        True if the snapshot was released
+    """
+    session = SessionLocal()
+    try:
+        district_id = session.execute(
+            text("SELECT id FROM districts WHERE district_code = :code"), {'code': district_code}
+        ).scalar()
+        writer = SnapshotBulkWriter(session, 1, on_flush=invalidate_district_caches,
+                                    archive=raw_archive(), derive=True)
+        if district_id is not None and release(session, district_id, year, month, writer, district_code):
+            print(f"✓ Released {district_code} {year}-{month:02d}")
+            return True
+        print(f"✗ No releasable quarantined snapshot for {district_code} {year}-{month:02d}")
+        return False
     finally:
         session.close()
 
 
+def warm_api_cache(session, base_url=None, concurrency=None):
+    """
+    Re-populate the API cache after ingestion
+    
+    Requests every hot endpoint through the dashboard API with bounded
+    concurrency, so the entries invalidated by ingestion are rebuilt before
+    users ask for them.
+    
+    Returns:
+        Tuple of (requests warmed, failures, elapsed seconds)
+    """
+    base_url = (base_url or CACHE_WARM_URL).rstrip('/')
+    concurrency = concurrency or CACHE_WARM_CONCURRENCY
+    
+    rows = session.execute(text("SELECT district_code, state FROM districts")).fetchall()
+    states = sorted({state for _, state in rows})
+    
+    paths = [('/districts/states', None), ('/districts', None)]
+    paths += [('/districts', {'state': state}) for state in states]
+    for district_code, _ in rows:
+        paths.append((f'/districts/{district_code}/snapshot', None))
+        paths += [
+            (f'/districts/{district_code}/trend', {'months': months})
+            for months in CACHE_WARM_TREND_MONTHS
+        ]
+    
+    start = time.perf_counter()
+    
+    with httpx.Client(base_url=base_url, timeout=30.0, headers=CACHE_WARM_HEADERS) as client:
+        def warm(path_params):
+            path, params = path_params
+            try:
+                response = client.get(path, params=params)
+                # 404 means no data for the district yet, which is not a failure
+                return response.status_code < 500
+            except httpx.HTTPError:
+                return False
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(warm, paths))
+    
+    elapsed = time.perf_counter() - start
+    failures = results.count(False)
+    print(f"Cache warmed: {len(paths) - failures}/{len(paths)} requests in {elapsed:.2f}s")
+    return len(paths) - failures, failures, elapsed
+
+
 def ingest_single_district(district_code, year=None, month=None):
     """
     Ingest data for a single district
@@ -167,7 +574,7 @@ def ingest_single_district(district_code, year=None, month=None):
     
     try:
         result = session.execute(
-            text("SELECT id FROM districts WHERE district_code = :code"),
+            text("SELECT id, state, district_name FROM districts WHERE district_code = :code"),
             {'code': district_code}
         )
         district = result.fetchone()
@@ -176,10 +583,17 @@ def ingest_single_district(district_code, year=None, month=None):
             print(f"✗ District '{district_code}' not found")
             return
         
-        district_id = district[0]
-        data = fetch_mgnrega_data(district_code, year, month)
+        district_id, state, district_name = district
+        ensure_snapshot_partition(session, year)
+        if API_KEY:
+            data = asyncio.run(fetch_district_upstream(state, district_name, year, month))
+            if data is None:
+                print(f"✗ No upstream data for {district_code} in {month}/{year}")
+                return
+        else:
+            data = fetch_mgnrega_data(district_code, year, month)
         
-        if store_snapshot(session, district_id, year, month, data):
+        if store_snapshot(session, district_id, year, month, data, district_code):
             print(f"✓ Ingested data for {district_code}")
         else:
             print(f"✗ Failed to ingest data for {district_code}")
@@ -187,15 +601,263 @@ def ingest_single_district(district_code, year=None, month=None):
     finally:
         session.close()
 
+class SchedulerLockLost(Exception):
+    """Raised when the connection holding the scheduler lock goes away"""
+
+
+def acquire_scheduler_lock(conn):
+    """
+    Try to become the active scheduler
+    
+    Takes a session-level Postgres advisory lock on ``conn``; it is held
+    until released or the connection closes, so a crashed scheduler hands
+    over automatically. Other databases (tests) always succeed.
+    
+    Returns:
+        True if this process holds the lock
+    """
+    if conn.dialect.name != 'postgresql':
+        return True
+    return bool(conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {'id': SCHEDULER_LOCK_ID}).scalar())
+
+
+def check_scheduler_lock(conn):
+    """Raise SchedulerLockLost if the lock connection is no longer usable"""
+    try:
+        conn.execute(text("SELECT 1"))
+    except Exception as e:
+        raise SchedulerLockLost(str(e)) from e
+
+
+def release_scheduler_lock(conn):
+    if conn.dialect.name != 'postgresql':
+        return
+    try:
+        conn.execute(text("SELECT pg_advisory_unlock(:id)"), {'id': SCHEDULER_LOCK_ID})
+    except Exception:
+        # The lock goes with the connection anyway
+        pass
+
+
+def _scores(key):
+    """Read a sorted set as a dictionary (empty if Redis is unavailable)"""
+    try:
+        return dict(redis_client.zrange(key, 0, -1, withscores=True))
+    except redis.RedisError as e:
+        print(f"⚠ Could not read {key}: {e}")
+        return {}
+
+
+def refresh_priorities(session, year, month, now=None):
+    """
+    Order districts for one scheduler window
+    
+    Staleness is the time since the later of the last scheduler refresh
+    and the stored snapshot's fetched_at (never-fetched districts count
+    from the epoch). It is scaled up by popularity, the API's decayed view
+    count: ``staleness * (1 + weight * log1p(views))``.
+    
+    Returns:
+        List of (priority, id, district_code, state, district_name), highest first
+    """
+    now = time.time() if now is None else now
+    rows = session.execute(text("""
+        SELECT d.id, d.district_code, d.state, d.district_name, s.fetched_at
+        FROM districts d
+        LEFT JOIN mgnrega_snapshots s
+            ON s.district_id = d.id AND s.year = :year AND s.month = :month
+    """), {'year': year, 'month': month}).fetchall()
+    refreshed = _scores(REFRESHED_KEY)
+    views = _scores(POPULARITY_KEY)
+    
+    ranked = []
+    for district_id, code, state, name, fetched_at in rows:
+        if isinstance(fetched_at, str):
+            fetched_at = datetime.fromisoformat(fetched_at)
+        last = max(refreshed.get(code, 0.0), fetched_at.timestamp() if fetched_at else 0.0)
+        staleness = max(0.0, now - last)
+        priority = staleness * (1 + SCHEDULER_POPULARITY_WEIGHT * math.log1p(views.get(code, 0.0)))
+        ranked.append((priority, district_id, code, state, name))
+    ranked.sort(key=lambda district: (-district[0], district[2]))
+    return ranked
+
+
+async def _fetch_scheduled(api, code, state, name, year, month):
+    if api is None:
+        return fetch_mgnrega_data(code, year, month)
+    snapshots = await api.fetch_month(year, month, state=state)
+    return snapshots.get(district_key(state, name))
+
+
+def run_schedule_cycle(lock_conn, window=None, clock=time.time, sleep=time.sleep):
+    """
+    Refresh every district once, spread evenly across ``window`` seconds
+    
+    Each refresh writes (and invalidates the caches of) at most one
+    district, so cache rebuilds trickle in instead of arriving at once.
+    With an API key one client is kept for the window; repeated state
+    queries are answered 304 from its ETag cache until upstream changes.
+    
+    Returns:
+        Dictionary of counts (new, changed, unchanged, missing, quarantined, failed)
+    """
+    window = window or SCHEDULER_WINDOW
+    counts = {'new': 0, 'changed': 0, 'unchanged': 0, 'missing': 0, 'quarantined': 0, 'failed': 0}
+    session = SessionLocal()
+    loop = asyncio.new_event_loop()
+    api = create_api_client(TokenBucket(INGEST_RPS, INGEST_BURST)) if API_KEY else None
+    archive = raw_archive()
+    detector = anomaly_detector()
+    
+    try:
+        now = datetime.now()
+        districts = refresh_priorities(session, now.year, now.month, clock())
+        if not districts:
+            return counts
+        interval = window / len(districts)
+        print(f"Scheduling {len(districts)} districts over {window:.0f}s (one every {interval:.1f}s)")
+        
+        start = clock()
+        tracked_month = None
+        for slot, (_, district_id, code, state, name) in enumerate(districts):
+            delay = start + slot * interval - clock()
+            if delay > 0:
+                sleep(delay)
+            check_scheduler_lock(lock_conn)
+            
+            now = datetime.now()
+            year, month = now.year, now.month
+            if tracked_month != (year, month):
+                ensure_snapshot_partition(session, year)
+                tracker = ChangeTracker.load(session, year, month)
+                tracked_month = (year, month)
+            
+            try:
+                data = loop.run_until_complete(_fetch_scheduled(api, code, state, name, year, month))
+                if data is None:
+                    counts['missing'] += 1
+                    continue
+                status = tracker.classify(district_id, data)
+                writer = SnapshotBulkWriter(session, 1, on_flush=invalidate_district_caches, archive=archive,
+                                            derive=True, detector=detector)
+                if status == UNCHANGED:
+                    writer.unchanged(district_id, year, month)
+                else:
+                    writer.add(district_id, year, month, data, code)
+                writer.flush()
+                if writer.rows_failed:
+                    counts['failed'] += 1
+                    continue
+                if writer.rows_quarantined:
+                    status = 'quarantined'
+                counts[status] += 1
+                redis_client.zadd(REFRESHED_KEY, {code: clock()})
+            except redis.RedisError as e:
+                # The snapshot is stored; only the refresh time was lost
+                print(f"⚠ Could not record refresh of {code}: {e}")
+            except Exception as e:
+                counts['failed'] += 1
+                print(f"✗ Scheduled refresh of {code} failed: {e}")
+        
+        try:
+            # Age view counts so popularity follows recent traffic
+            redis_client.zunionstore(POPULARITY_KEY, {POPULARITY_KEY: SCHEDULER_POPULARITY_DECAY})
+        except redis.RedisError as e:
+            print(f"⚠ Could not decay popularity: {e}")
+        
+        print(f"Window done: {counts['new']} new, {counts['changed']} changed, "
+              f"{counts['unchanged']} unchanged, {counts['missing']} missing, "
+              f"{counts['quarantined']} quarantined, {counts['failed']} failed")
+        return counts
+    finally:
+        if api is not None:
+            loop.run_until_complete(api.aclose())
+        loop.close()
+        session.close()
+
+
+def run_scheduler(window=None, cycles=None, standby_interval=30.0, clock=time.time, sleep=time.sleep):
+    """
+    Run the ingestion scheduler until interrupted
+    
+    Only the replica holding the advisory lock schedules; the others stand
+    by and take over when its connection goes away.
+    
+    Args:
+        window: Seconds over which every district is refreshed once
+        cycles: Stop after this many windows (default: run forever)
+        standby_interval: Seconds between lock attempts while standing by
+    """
+    print("\n" + "="*60)
+    print("  MGNREGA INGESTION SCHEDULER")
+    print("="*60 + "\n")
+    
+    completed = 0
+    while cycles is None or completed < cycles:
+        conn = engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+        try:
+            if not acquire_scheduler_lock(conn):
+                print(f"Another scheduler is active; retrying in {standby_interval:.0f}s")
+                sleep(standby_interval)
+                continue
+            print(f"✓ Scheduler lock acquired ({socket.gethostname()}:{os.getpid()})")
+            try:
+                while cycles is None or completed < cycles:
+                    run_schedule_cycle(conn, window, clock, sleep)
+                    completed += 1
+            finally:
+                release_scheduler_lock(conn)
+        except SchedulerLockLost as e:
+            print(f"⚠ Lost the scheduler lock: {e}")
+            sleep(standby_interval)
+        finally:
+            conn.close()
+
 
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
+    parser = argparse.ArgumentParser(description="Ingest MGNREGA data")
+    parser.add_argument('district_code', nargs='?', help="Ingest a single district (default: all)")
+    parser.add_argument('year', nargs='?', type=int)
+    parser.add_argument('month', nargs='?', type=int)
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help=f"Fetches in flight (default {INGEST_CONCURRENCY})")
+    parser.add_argument('--rps', type=float, default=None,
+                        help=f"Upstream requests per second, 0 for unlimited (default {INGEST_RPS:g})")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help=f"Snapshots per write batch, 1 for per-row upserts (default {INGEST_BATCH_SIZE})")
+    parser.add_argument('--fresh', action='store_true',
+                        help="Ignore the checkpoint of an interrupted run and start over")
+    parser.add_argument('--profile', metavar='PATH', default=None,
+                        help="Write a cProfile dump of the run to PATH (view with pstats or snakeviz)")
+    parser.add_argument('--quarantined', action='store_true',
+                        help="List snapshots held back by anomaly detection (optionally for one district)")
+    parser.add_argument('--release', action='store_true',
+                        help="Publish the quarantined snapshot of district_code, year and month")
+    parser.add_argument('--derive', action='store_true',
+                        help="Only recompute derived metrics for every district")
+    parser.add_argument('--schedule', action='store_true',
+                        help="Run as a daemon refreshing districts continuously (one active per database)")
+    parser.add_argument('--window', type=float, default=None,
+                        help=f"Scheduler: seconds over which every district is refreshed (default {SCHEDULER_WINDOW:g})")
+    args = parser.parse_args()
+    
+    if args.quarantined:
+        list_quarantined(args.district_code)
+    elif args.release:
+        if not (args.district_code and args.year and args.month):
+            parser.error("--release needs district_code, year and month")
+        release_quarantined(args.district_code, args.year, args.month)
+    elif args.derive:
+        with SessionLocal() as session:
+            print(f"✓ Derived metrics changed for {refresh_derived(session)} districts")
+    elif args.schedule:
+        run_scheduler(window=args.window)
+    elif args.district_code:
         # Single district mode
-        district_code = sys.argv[1]
-        year = int(sys.argv[2]) if len(sys.argv) > 2 else None
-        month = int(sys.argv[3]) if len(sys.argv) > 3 else None
-        ingest_single_district(district_code, year, month)
+        ingest_single_district(args.district_code, args.year, args.month)
     else:
         # All districts mode
-        ingest_all_districts()
-
+        ingest_all_districts(
+            concurrency=args.concurrency, rps=args.rps, batch_size=args.batch_size, fresh=args.fresh,
+            profile_path=args.profile,
+        )
@@ -28,9 +28,11 @@ CREATE INDEX IF NOT EXISTS idx_districts_coords ON districts(latitude, longitude
 -- ============================================================================
 -- TABLE: mgnrega_snapshots
 -- Stores MGNREGA performance data snapshots by month
+-- Range-partitioned by year: each year is a small table, so index maintenance
+-- during ingestion and trend scans only touch the partitions involved
 -- ============================================================================
 CREATE TABLE IF NOT EXISTS mgnrega_snapshots (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     district_id INTEGER NOT NULL REFERENCES districts(id) ON DELETE CASCADE,
     year INTEGER NOT NULL,
     month INTEGER NOT NULL CHECK (month >= 1 AND month <= 12),
@@ -39,20 +41,282 @@ CREATE TABLE IF NOT EXISTS mgnrega_snapshots (
     wages_paid NUMERIC(15, 2) DEFAULT 0,
     payments_on_time_percent NUMERIC(5, 2) DEFAULT 0,
     works_completed INTEGER DEFAULT 0,
-    raw_json JSONB,
     fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    content_hash TEXT,
+    PRIMARY KEY (id, year),
     UNIQUE (district_id, year, month)
+) PARTITION BY RANGE (year);
+
+-- Catches years without a dedicated partition so inserts never fail
+CREATE TABLE IF NOT EXISTS mgnrega_snapshots_default PARTITION OF mgnrega_snapshots DEFAULT;
+
+-- ============================================================================
+-- TABLE: mgnrega_snapshot_raw
+-- Original API payload behind each snapshot, kept out of the hot
+-- mgnrega_snapshots heap: trend queries and the district_latest trigger read
+-- a few numeric columns, and multi-KB JSONB in the same rows spreads them
+-- over many more pages
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS mgnrega_snapshot_raw (
+    snapshot_id INTEGER NOT NULL,
+    snapshot_year INTEGER NOT NULL,
+    raw_json JSONB NOT NULL,
+    PRIMARY KEY (snapshot_id, snapshot_year),
+    FOREIGN KEY (snapshot_id, snapshot_year)
+        REFERENCES mgnrega_snapshots (id, year) ON DELETE CASCADE
+);
+
+-- Creates the partition for a year, moving any rows that already landed in
+-- the default partition. Called by the ingest worker before writing a year.
+CREATE OR REPLACE FUNCTION ensure_snapshot_partition(p_year INTEGER) RETURNS VOID AS $$
+DECLARE
+    partition_name TEXT := format('mgnrega_snapshots_y%s', p_year);
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    
+    CREATE TEMP TABLE IF NOT EXISTS _snapshot_partition_move
+        (LIKE mgnrega_snapshots) ON COMMIT DROP;
+    CREATE TEMP TABLE IF NOT EXISTS _snapshot_raw_partition_move
+        (LIKE mgnrega_snapshot_raw) ON COMMIT DROP;
+    
+    -- Deleting the snapshots cascades to their payloads, so copy those first
+    INSERT INTO _snapshot_raw_partition_move
+    SELECT r.* FROM mgnrega_snapshot_raw r
+    JOIN mgnrega_snapshots_default s ON s.id = r.snapshot_id AND s.year = r.snapshot_year
+    WHERE s.year = p_year;
+    
+    WITH moved AS (
+        DELETE FROM mgnrega_snapshots_default WHERE year = p_year RETURNING *
+    )
+    INSERT INTO _snapshot_partition_move SELECT * FROM moved;
+    
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF mgnrega_snapshots FOR VALUES FROM (%s) TO (%s)',
+        partition_name, p_year, p_year + 1
+    );
+    
+    INSERT INTO mgnrega_snapshots SELECT * FROM _snapshot_partition_move;
+    INSERT INTO mgnrega_snapshot_raw SELECT * FROM _snapshot_raw_partition_move;
+    TRUNCATE _snapshot_partition_move, _snapshot_raw_partition_move;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Yearly partitions for the MGNREGA data range plus the next few years
+SELECT ensure_snapshot_partition(y)
+FROM generate_series(2015, EXTRACT(YEAR FROM CURRENT_DATE)::INTEGER + 2) AS y;
+
+-- Index set for mgnrega_snapshots:
+--   * The UNIQUE (district_id, year, month) index serves the upsert conflict
+--     target and the router queries (WHERE district_id = ? ORDER BY year DESC,
+--     month DESC LIMIT n) via a backward scan, so separate district_id and
+--     (district_id, year DESC, month DESC) B-trees are redundant.
+--   * Year filters are answered by partition pruning.
+--   * fetched_at grows with insertion order, so a BRIN index is a tiny
+--     fraction of a B-tree's size and costs almost nothing to maintain.
+CREATE INDEX IF NOT EXISTS idx_snapshots_fetched_brin ON mgnrega_snapshots
+    USING BRIN (fetched_at) WITH (pages_per_range = 32);
+
+-- ============================================================================
+-- TABLE: district_latest
+-- Current and previous month metrics per district with precomputed
+-- percentage changes, kept current by a trigger on mgnrega_snapshots so the
+-- dashboard reads one row by primary key instead of sorting snapshots
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS district_latest (
+    district_id INTEGER PRIMARY KEY REFERENCES districts(id) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    people_benefited INTEGER,
+    workdays_created INTEGER,
+    wages_paid NUMERIC(15, 2),
+    payments_on_time_percent NUMERIC(5, 2),
+    works_completed INTEGER,
+    prev_year INTEGER,
+    prev_month INTEGER,
+    prev_people_benefited INTEGER,
+    prev_workdays_created INTEGER,
+    prev_wages_paid NUMERIC(15, 2),
+    prev_payments_on_time_percent NUMERIC(5, 2),
+    prev_works_completed INTEGER,
+    people_benefited_change NUMERIC(12, 2),
+    workdays_created_change NUMERIC(12, 2),
+    wages_paid_change NUMERIC(12, 2),
+    payments_on_time_percent_change NUMERIC(12, 2),
+    works_completed_change NUMERIC(12, 2),
+    fetched_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Create indexes for mgnrega_snapshots table
-CREATE INDEX IF NOT EXISTS idx_snapshots_district ON mgnrega_snapshots(district_id);
-CREATE INDEX IF NOT EXISTS idx_snapshots_year_month ON mgnrega_snapshots(year, month);
-CREATE INDEX IF NOT EXISTS idx_snapshots_fetched ON mgnrega_snapshots(fetched_at);
-CREATE INDEX IF NOT EXISTS idx_snapshots_composite ON mgnrega_snapshots(district_id, year DESC, month DESC);
+-- Percentage change rounded to 2 decimals; NULL when previous is 0 or missing
+-- (same rules as the API's _calculate_change)
+CREATE OR REPLACE FUNCTION snapshot_pct_change(cur NUMERIC, prev NUMERIC) RETURNS NUMERIC AS $$
+    SELECT CASE
+        WHEN prev IS NULL OR prev = 0 OR cur IS NULL THEN NULL
+        ELSE ROUND((cur - prev) / prev * 100, 2)
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Recompute the district_latest row for one district from its two newest snapshots
+CREATE OR REPLACE FUNCTION refresh_district_latest(p_district_id INTEGER) RETURNS VOID AS $$
+DECLARE
+    cur mgnrega_snapshots%ROWTYPE;
+    prev mgnrega_snapshots%ROWTYPE;
+BEGIN
+    SELECT * INTO cur FROM mgnrega_snapshots
+    WHERE district_id = p_district_id
+    ORDER BY year DESC, month DESC
+    LIMIT 1;
+    
+    IF NOT FOUND THEN
+        DELETE FROM district_latest WHERE district_id = p_district_id;
+        RETURN;
+    END IF;
+    
+    SELECT * INTO prev FROM mgnrega_snapshots
+    WHERE district_id = p_district_id AND (year, month) < (cur.year, cur.month)
+    ORDER BY year DESC, month DESC
+    LIMIT 1;
+    
+    INSERT INTO district_latest (
+        district_id, year, month,
+        people_benefited, workdays_created, wages_paid, payments_on_time_percent, works_completed,
+        prev_year, prev_month,
+        prev_people_benefited, prev_workdays_created, prev_wages_paid,
+        prev_payments_on_time_percent, prev_works_completed,
+        people_benefited_change, workdays_created_change, wages_paid_change,
+        payments_on_time_percent_change, works_completed_change,
+        fetched_at, updated_at
+    ) VALUES (
+        p_district_id, cur.year, cur.month,
+        cur.people_benefited, cur.workdays_created, cur.wages_paid,
+        cur.payments_on_time_percent, cur.works_completed,
+        prev.year, prev.month,
+        prev.people_benefited, prev.workdays_created, prev.wages_paid,
+        prev.payments_on_time_percent, prev.works_completed,
+        snapshot_pct_change(cur.people_benefited, prev.people_benefited),
+        snapshot_pct_change(cur.workdays_created, prev.workdays_created),
+        snapshot_pct_change(cur.wages_paid, prev.wages_paid),
+        snapshot_pct_change(cur.payments_on_time_percent, prev.payments_on_time_percent),
+        snapshot_pct_change(cur.works_completed, prev.works_completed),
+        cur.fetched_at, CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (district_id) DO UPDATE SET
+        year = EXCLUDED.year,
+        month = EXCLUDED.month,
+        people_benefited = EXCLUDED.people_benefited,
+        workdays_created = EXCLUDED.workdays_created,
+        wages_paid = EXCLUDED.wages_paid,
+        payments_on_time_percent = EXCLUDED.payments_on_time_percent,
+        works_completed = EXCLUDED.works_completed,
+        prev_year = EXCLUDED.prev_year,
+        prev_month = EXCLUDED.prev_month,
+        prev_people_benefited = EXCLUDED.prev_people_benefited,
+        prev_workdays_created = EXCLUDED.prev_workdays_created,
+        prev_wages_paid = EXCLUDED.prev_wages_paid,
+        prev_payments_on_time_percent = EXCLUDED.prev_payments_on_time_percent,
+        prev_works_completed = EXCLUDED.prev_works_completed,
+        people_benefited_change = EXCLUDED.people_benefited_change,
+        workdays_created_change = EXCLUDED.workdays_created_change,
+        wages_paid_change = EXCLUDED.wages_paid_change,
+        payments_on_time_percent_change = EXCLUDED.payments_on_time_percent_change,
+        works_completed_change = EXCLUDED.works_completed_change,
+        fetched_at = EXCLUDED.fetched_at,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row trigger: rows older than the district's previous month cannot change
+-- the latest two, so historical backfills skip the refresh
+CREATE OR REPLACE FUNCTION district_latest_trigger() RETURNS TRIGGER AS $$
+DECLARE
+    latest district_latest%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM refresh_district_latest(OLD.district_id);
+        RETURN NULL;
+    END IF;
+    
+    -- A row moved to another district or month may have been the latest one
+    IF TG_OP = 'UPDATE'
+       AND (OLD.district_id <> NEW.district_id OR (OLD.year, OLD.month) <> (NEW.year, NEW.month)) THEN
+        PERFORM refresh_district_latest(OLD.district_id);
+    END IF;
+    
+    SELECT * INTO latest FROM district_latest WHERE district_id = NEW.district_id;
+    IF FOUND AND latest.prev_year IS NOT NULL
+       AND (NEW.year, NEW.month) < (latest.prev_year, latest.prev_month) THEN
+        RETURN NULL;
+    END IF;
+    
+    PERFORM refresh_district_latest(NEW.district_id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_district_latest ON mgnrega_snapshots;
+CREATE TRIGGER trg_district_latest
+    AFTER INSERT OR UPDATE OR DELETE ON mgnrega_snapshots
+    FOR EACH ROW EXECUTE FUNCTION district_latest_trigger();
+
+-- ============================================================================
+-- TABLE: mgnrega_derived_metrics
+-- Month-over-month and year-over-year changes, rolling 3-month averages and
+-- per-capita ratios per district and month, recomputed by ingestion in one
+-- window-function pass (ingest/derived.py) so the API does not compute them
+-- per request
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS mgnrega_derived_metrics (
+    district_id INTEGER NOT NULL REFERENCES districts(id) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    people_benefited_mom NUMERIC(12, 2),
+    workdays_created_mom NUMERIC(12, 2),
+    wages_paid_mom NUMERIC(12, 2),
+    payments_on_time_percent_mom NUMERIC(12, 2),
+    works_completed_mom NUMERIC(12, 2),
+    people_benefited_yoy NUMERIC(12, 2),
+    workdays_created_yoy NUMERIC(12, 2),
+    wages_paid_yoy NUMERIC(12, 2),
+    payments_on_time_percent_yoy NUMERIC(12, 2),
+    works_completed_yoy NUMERIC(12, 2),
+    people_benefited_avg_3m NUMERIC(15, 2),
+    workdays_created_avg_3m NUMERIC(15, 2),
+    wages_paid_avg_3m NUMERIC(15, 2),
+    wages_per_workday NUMERIC(15, 2),
+    workdays_per_person NUMERIC(15, 2),
+    wages_per_person NUMERIC(15, 2),
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (district_id, year, month)
+);
+
+-- ============================================================================
+-- TABLE: mgnrega_snapshot_quarantine
+-- Fetched snapshots held back by ingestion's anomaly detection
+-- (ingest/anomaly.py) with the reasons; wider column types than
+-- mgnrega_snapshots so implausible values still fit
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS mgnrega_snapshot_quarantine (
+    district_id INTEGER NOT NULL REFERENCES districts(id) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    people_benefited BIGINT,
+    workdays_created BIGINT,
+    wages_paid NUMERIC(18, 2),
+    payments_on_time_percent NUMERIC(15, 2),
+    works_completed BIGINT,
+    raw_json JSONB,
+    content_hash TEXT,
+    reasons JSONB NOT NULL,
+    quarantined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (district_id, year, month)
+);
 
 -- ============================================================================
 -- VIEW: latest_district_snapshots
 -- Provides the latest snapshot for each district with district info
+-- (a join against district_latest, no per-district subquery)
 -- ============================================================================
 CREATE OR REPLACE VIEW latest_district_snapshots AS
 SELECT 
@@ -62,21 +326,29 @@ SELECT
     d.district_code,
     d.latitude,
     d.longitude,
-    s.year,
-    s.month,
-    s.people_benefited,
-    s.workdays_created,
-    s.wages_paid,
-    s.payments_on_time_percent,
-    s.works_completed,
-    s.fetched_at
+    l.year,
+    l.month,
+    l.people_benefited,
+    l.workdays_created,
+    l.wages_paid,
+    l.payments_on_time_percent,
+    l.works_completed,
+    l.fetched_at
 FROM districts d
-LEFT JOIN LATERAL (
-    SELECT * FROM mgnrega_snapshots 
-    WHERE district_id = d.id 
-    ORDER BY year DESC, month DESC 
-    LIMIT 1
-) s ON true;
+LEFT JOIN district_latest l ON l.district_id = d.id;
+
+-- ============================================================================
+-- TABLE: schema_migrations
+-- Schema versions applied to this database (checked by the API at startup)
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- init.sql already includes every numbered migration
+INSERT INTO schema_migrations (version) VALUES (1), (2), (3), (4), (5), (6), (7)
+ON CONFLICT (version) DO NOTHING;
 
 -- ============================================================================
 -- SAMPLE DATA: Uttar Pradesh Districts
@@ -100,9 +372,14 @@ ON CONFLICT (district_code) DO NOTHING;
 -- ============================================================================
 COMMENT ON TABLE districts IS 'Stores district information with geolocation for MGNREGA tracking';
 COMMENT ON TABLE mgnrega_snapshots IS 'Monthly snapshots of MGNREGA performance data per district';
+COMMENT ON TABLE district_latest IS 'Trigger-maintained current and previous month metrics per district';
+COMMENT ON TABLE mgnrega_snapshot_raw IS 'Original API payload per snapshot, split from the hot snapshot rows';
+COMMENT ON TABLE mgnrega_derived_metrics IS 'Per-month changes, rolling averages and ratios recomputed after ingestion';
+COMMENT ON TABLE mgnrega_snapshot_quarantine IS 'Fetched snapshots held back by anomaly detection, with the reasons';
 COMMENT ON COLUMN districts.latitude IS 'Decimal degrees latitude for geolocation';
 COMMENT ON COLUMN districts.longitude IS 'Decimal degrees longitude for geolocation';
 COMMENT ON COLUMN mgnrega_snapshots.year IS 'Fiscal or calendar year of snapshot';
 COMMENT ON COLUMN mgnrega_snapshots.month IS 'Month number 1-12';
-COMMENT ON COLUMN mgnrega_snapshots.raw_json IS 'Original API response stored as JSONB for audit';
+COMMENT ON COLUMN mgnrega_snapshots.content_hash IS 'SHA-256 of the fetched payload, used to skip unchanged rows';
+COMMENT ON COLUMN mgnrega_snapshot_raw.raw_json IS 'Original API response (or an archive reference) stored as JSONB for audit';
 
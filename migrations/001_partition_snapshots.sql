@@ -0,0 +1,147 @@
+-- ============================================================================
+-- Migration 001: Partition mgnrega_snapshots by year
+--
+-- Converts an existing heap mgnrega_snapshots table (original init.sql) into
+-- the year-partitioned layout with the trimmed index set. Runs in a single
+-- transaction; the table is locked for writes while rows are copied. A table
+-- that is already partitioned (init.sql, or a re-run) is left alone.
+--
+-- Usage:
+--   docker-compose exec -T postgres psql -U mgnrega_user -d mgnrega_db \
+--       -v ON_ERROR_STOP=1 < migrations/001_partition_snapshots.sql
+-- ============================================================================
+
+BEGIN;
+
+-- Skipped when the table is already partitioned: the partition function and
+-- view are then newer versions from later migrations
+DO $migration$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_partitioned_table
+        WHERE partrelid = to_regclass('mgnrega_snapshots')
+    ) THEN
+        RAISE NOTICE 'mgnrega_snapshots is already partitioned, skipping conversion';
+        RETURN;
+    END IF;
+    
+    -- Move the old table aside; constraint names are renamed so the new table can
+    -- use the default names
+    ALTER TABLE mgnrega_snapshots RENAME TO mgnrega_snapshots_legacy;
+    ALTER TABLE mgnrega_snapshots_legacy RENAME CONSTRAINT mgnrega_snapshots_pkey
+        TO mgnrega_snapshots_legacy_pkey;
+    ALTER TABLE mgnrega_snapshots_legacy RENAME CONSTRAINT mgnrega_snapshots_district_id_year_month_key
+        TO mgnrega_snapshots_legacy_district_id_year_month_key;
+    ALTER TABLE mgnrega_snapshots_legacy RENAME CONSTRAINT mgnrega_snapshots_month_check
+        TO mgnrega_snapshots_legacy_month_check;
+    ALTER TABLE mgnrega_snapshots_legacy RENAME CONSTRAINT mgnrega_snapshots_district_id_fkey
+        TO mgnrega_snapshots_legacy_district_id_fkey;
+    
+    -- Redundant B-trees from the original schema
+    DROP INDEX IF EXISTS idx_snapshots_district;
+    DROP INDEX IF EXISTS idx_snapshots_year_month;
+    DROP INDEX IF EXISTS idx_snapshots_fetched;
+    DROP INDEX IF EXISTS idx_snapshots_composite;
+    
+    CREATE TABLE mgnrega_snapshots (
+        id INTEGER NOT NULL DEFAULT nextval('mgnrega_snapshots_id_seq'),
+        district_id INTEGER NOT NULL REFERENCES districts(id) ON DELETE CASCADE,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL CHECK (month >= 1 AND month <= 12),
+        people_benefited INTEGER DEFAULT 0,
+        workdays_created INTEGER DEFAULT 0,
+        wages_paid NUMERIC(15, 2) DEFAULT 0,
+        payments_on_time_percent NUMERIC(5, 2) DEFAULT 0,
+        works_completed INTEGER DEFAULT 0,
+        raw_json JSONB,
+        fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, year),
+        UNIQUE (district_id, year, month)
+    ) PARTITION BY RANGE (year);
+    
+    -- Keep the existing id sequence alive when the legacy table is dropped
+    ALTER SEQUENCE mgnrega_snapshots_id_seq OWNED BY mgnrega_snapshots.id;
+    
+    CREATE TABLE mgnrega_snapshots_default PARTITION OF mgnrega_snapshots DEFAULT;
+    
+    CREATE OR REPLACE FUNCTION ensure_snapshot_partition(p_year INTEGER) RETURNS VOID AS $$
+    DECLARE
+        partition_name TEXT := format('mgnrega_snapshots_y%s', p_year);
+    BEGIN
+        IF to_regclass(partition_name) IS NOT NULL THEN
+            RETURN;
+        END IF;
+        
+        CREATE TEMP TABLE IF NOT EXISTS _snapshot_partition_move
+            (LIKE mgnrega_snapshots) ON COMMIT DROP;
+        
+        WITH moved AS (
+            DELETE FROM mgnrega_snapshots_default WHERE year = p_year RETURNING *
+        )
+        INSERT INTO _snapshot_partition_move SELECT * FROM moved;
+        
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF mgnrega_snapshots FOR VALUES FROM (%s) TO (%s)',
+            partition_name, p_year, p_year + 1
+        );
+        
+        INSERT INTO mgnrega_snapshots SELECT * FROM _snapshot_partition_move;
+        TRUNCATE _snapshot_partition_move;
+    END;
+    $$ LANGUAGE plpgsql;
+    
+    -- One partition per year present in the data, plus the standard range
+    PERFORM ensure_snapshot_partition(y)
+    FROM (
+        SELECT DISTINCT year AS y FROM mgnrega_snapshots_legacy
+        UNION
+        SELECT generate_series(2015, EXTRACT(YEAR FROM CURRENT_DATE)::INTEGER + 2)
+    ) years;
+    
+    INSERT INTO mgnrega_snapshots
+        (id, district_id, year, month, people_benefited, workdays_created, wages_paid,
+         payments_on_time_percent, works_completed, raw_json, fetched_at)
+    SELECT id, district_id, year, month, people_benefited, workdays_created, wages_paid,
+           payments_on_time_percent, works_completed, raw_json, fetched_at
+    FROM mgnrega_snapshots_legacy;
+    
+    CREATE INDEX idx_snapshots_fetched_brin ON mgnrega_snapshots
+        USING BRIN (fetched_at) WITH (pages_per_range = 32);
+    
+    -- Repoint the view at the new table before the legacy table goes away
+    CREATE OR REPLACE VIEW latest_district_snapshots AS
+    SELECT 
+        d.id as district_id,
+        d.state,
+        d.district_name,
+        d.district_code,
+        d.latitude,
+        d.longitude,
+        s.year,
+        s.month,
+        s.people_benefited,
+        s.workdays_created,
+        s.wages_paid,
+        s.payments_on_time_percent,
+        s.works_completed,
+        s.fetched_at
+    FROM districts d
+    LEFT JOIN LATERAL (
+        SELECT * FROM mgnrega_snapshots 
+        WHERE district_id = d.id 
+        ORDER BY year DESC, month DESC 
+        LIMIT 1
+    ) s ON true;
+    
+    DROP TABLE mgnrega_snapshots_legacy;
+    
+    COMMENT ON TABLE mgnrega_snapshots IS 'Monthly snapshots of MGNREGA performance data per district';
+    COMMENT ON COLUMN mgnrega_snapshots.year IS 'Fiscal or calendar year of snapshot';
+    COMMENT ON COLUMN mgnrega_snapshots.month IS 'Month number 1-12';
+    COMMENT ON COLUMN mgnrega_snapshots.raw_json IS 'Original API response stored as JSONB for audit';
+END
+$migration$;
+
+COMMIT;
+
+ANALYZE mgnrega_snapshots;
@@ -0,0 +1,178 @@
+-- ============================================================================
+-- Migration 002: Trigger-maintained district_latest table
+--
+-- Adds district_latest (current and previous month per district with
+-- precomputed percentage changes), the trigger that keeps it current, and
+-- backfills it from existing snapshots. The latest_district_snapshots view is
+-- redefined on top of it.
+--
+-- Usage:
+--   docker-compose exec -T postgres psql -U mgnrega_user -d mgnrega_db \
+--       -v ON_ERROR_STOP=1 < migrations/002_district_latest.sql
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS district_latest (
+    district_id INTEGER PRIMARY KEY REFERENCES districts(id) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    people_benefited INTEGER,
+    workdays_created INTEGER,
+    wages_paid NUMERIC(15, 2),
+    payments_on_time_percent NUMERIC(5, 2),
+    works_completed INTEGER,
+    prev_year INTEGER,
+    prev_month INTEGER,
+    prev_people_benefited INTEGER,
+    prev_workdays_created INTEGER,
+    prev_wages_paid NUMERIC(15, 2),
+    prev_payments_on_time_percent NUMERIC(5, 2),
+    prev_works_completed INTEGER,
+    people_benefited_change NUMERIC(12, 2),
+    workdays_created_change NUMERIC(12, 2),
+    wages_paid_change NUMERIC(12, 2),
+    payments_on_time_percent_change NUMERIC(12, 2),
+    works_completed_change NUMERIC(12, 2),
+    fetched_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Percentage change rounded to 2 decimals; NULL when previous is 0 or missing
+-- (same rules as the API's _calculate_change)
+CREATE OR REPLACE FUNCTION snapshot_pct_change(cur NUMERIC, prev NUMERIC) RETURNS NUMERIC AS $$
+    SELECT CASE
+        WHEN prev IS NULL OR prev = 0 OR cur IS NULL THEN NULL
+        ELSE ROUND((cur - prev) / prev * 100, 2)
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Recompute the district_latest row for one district from its two newest snapshots
+CREATE OR REPLACE FUNCTION refresh_district_latest(p_district_id INTEGER) RETURNS VOID AS $$
+DECLARE
+    cur mgnrega_snapshots%ROWTYPE;
+    prev mgnrega_snapshots%ROWTYPE;
+BEGIN
+    SELECT * INTO cur FROM mgnrega_snapshots
+    WHERE district_id = p_district_id
+    ORDER BY year DESC, month DESC
+    LIMIT 1;
+    
+    IF NOT FOUND THEN
+        DELETE FROM district_latest WHERE district_id = p_district_id;
+        RETURN;
+    END IF;
+    
+    SELECT * INTO prev FROM mgnrega_snapshots
+    WHERE district_id = p_district_id AND (year, month) < (cur.year, cur.month)
+    ORDER BY year DESC, month DESC
+    LIMIT 1;
+    
+    INSERT INTO district_latest (
+        district_id, year, month,
+        people_benefited, workdays_created, wages_paid, payments_on_time_percent, works_completed,
+        prev_year, prev_month,
+        prev_people_benefited, prev_workdays_created, prev_wages_paid,
+        prev_payments_on_time_percent, prev_works_completed,
+        people_benefited_change, workdays_created_change, wages_paid_change,
+        payments_on_time_percent_change, works_completed_change,
+        fetched_at, updated_at
+    ) VALUES (
+        p_district_id, cur.year, cur.month,
+        cur.people_benefited, cur.workdays_created, cur.wages_paid,
+        cur.payments_on_time_percent, cur.works_completed,
+        prev.year, prev.month,
+        prev.people_benefited, prev.workdays_created, prev.wages_paid,
+        prev.payments_on_time_percent, prev.works_completed,
+        snapshot_pct_change(cur.people_benefited, prev.people_benefited),
+        snapshot_pct_change(cur.workdays_created, prev.workdays_created),
+        snapshot_pct_change(cur.wages_paid, prev.wages_paid),
+        snapshot_pct_change(cur.payments_on_time_percent, prev.payments_on_time_percent),
+        snapshot_pct_change(cur.works_completed, prev.works_completed),
+        cur.fetched_at, CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (district_id) DO UPDATE SET
+        year = EXCLUDED.year,
+        month = EXCLUDED.month,
+        people_benefited = EXCLUDED.people_benefited,
+        workdays_created = EXCLUDED.workdays_created,
+        wages_paid = EXCLUDED.wages_paid,
+        payments_on_time_percent = EXCLUDED.payments_on_time_percent,
+        works_completed = EXCLUDED.works_completed,
+        prev_year = EXCLUDED.prev_year,
+        prev_month = EXCLUDED.prev_month,
+        prev_people_benefited = EXCLUDED.prev_people_benefited,
+        prev_workdays_created = EXCLUDED.prev_workdays_created,
+        prev_wages_paid = EXCLUDED.prev_wages_paid,
+        prev_payments_on_time_percent = EXCLUDED.prev_payments_on_time_percent,
+        prev_works_completed = EXCLUDED.prev_works_completed,
+        people_benefited_change = EXCLUDED.people_benefited_change,
+        workdays_created_change = EXCLUDED.workdays_created_change,
+        wages_paid_change = EXCLUDED.wages_paid_change,
+        payments_on_time_percent_change = EXCLUDED.payments_on_time_percent_change,
+        works_completed_change = EXCLUDED.works_completed_change,
+        fetched_at = EXCLUDED.fetched_at,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row trigger: rows older than the district's previous month cannot change
+-- the latest two, so historical backfills skip the refresh
+CREATE OR REPLACE FUNCTION district_latest_trigger() RETURNS TRIGGER AS $$
+DECLARE
+    latest district_latest%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM refresh_district_latest(OLD.district_id);
+        RETURN NULL;
+    END IF;
+    
+    -- A row moved to another district or month may have been the latest one
+    IF TG_OP = 'UPDATE'
+       AND (OLD.district_id <> NEW.district_id OR (OLD.year, OLD.month) <> (NEW.year, NEW.month)) THEN
+        PERFORM refresh_district_latest(OLD.district_id);
+    END IF;
+    
+    SELECT * INTO latest FROM district_latest WHERE district_id = NEW.district_id;
+    IF FOUND AND latest.prev_year IS NOT NULL
+       AND (NEW.year, NEW.month) < (latest.prev_year, latest.prev_month) THEN
+        RETURN NULL;
+    END IF;
+    
+    PERFORM refresh_district_latest(NEW.district_id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_district_latest ON mgnrega_snapshots;
+CREATE TRIGGER trg_district_latest
+    AFTER INSERT OR UPDATE OR DELETE ON mgnrega_snapshots
+    FOR EACH ROW EXECUTE FUNCTION district_latest_trigger();
+
+-- Backfill from existing data
+SELECT refresh_district_latest(id) FROM districts;
+
+CREATE OR REPLACE VIEW latest_district_snapshots AS
+SELECT 
+    d.id as district_id,
+    d.state,
+    d.district_name,
+    d.district_code,
+    d.latitude,
+    d.longitude,
+    l.year,
+    l.month,
+    l.people_benefited,
+    l.workdays_created,
+    l.wages_paid,
+    l.payments_on_time_percent,
+    l.works_completed,
+    l.fetched_at
+FROM districts d
+LEFT JOIN district_latest l ON l.district_id = d.id;
+
+COMMENT ON TABLE district_latest IS 'Trigger-maintained current and previous month metrics per district';
+
+COMMIT;
+
+ANALYZE district_latest;
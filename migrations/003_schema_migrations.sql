@@ -0,0 +1,23 @@
+-- ============================================================================
+-- Migration 003: Schema version tracking
+--
+-- Adds schema_migrations, which the API reads at startup (SCHEMA_CHECK) to
+-- detect a database that is behind the deployed code. Migrations 001 and 002
+-- are recorded as applied because this migration requires them.
+--
+-- Usage:
+--   docker-compose exec -T postgres psql -U mgnrega_user -d mgnrega_db \
+--       -v ON_ERROR_STOP=1 < migrations/003_schema_migrations.sql
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO schema_migrations (version) VALUES (1), (2), (3)
+ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
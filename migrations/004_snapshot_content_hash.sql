@@ -0,0 +1,24 @@
+-- ============================================================================
+-- Migration 004: Snapshot content hashes
+--
+-- Ingestion stores a SHA-256 of each fetched payload and skips the write
+-- (and cache invalidation) when the hash matches. The upsert only updates
+-- rows whose hash differs, so unchanged rows produce no WAL or dead tuples.
+-- Existing rows keep NULL until they are next written.
+--
+-- Usage:
+--   docker-compose exec -T postgres psql -U mgnrega_user -d mgnrega_db \
+--       -v ON_ERROR_STOP=1 < migrations/004_snapshot_content_hash.sql
+-- ============================================================================
+
+BEGIN;
+
+-- Adding a nullable column without a default is a catalog-only change
+ALTER TABLE mgnrega_snapshots ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+COMMENT ON COLUMN mgnrega_snapshots.content_hash IS 'SHA-256 of the fetched payload, used to skip unchanged rows';
+
+INSERT INTO schema_migrations (version) VALUES (4)
+ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,89 @@
+-- ============================================================================
+-- Migration 005: Move raw payloads to mgnrega_snapshot_raw
+--
+-- raw_json (the original API record, often several KB) made each snapshot
+-- row many times wider than its numeric columns, so trend queries and the
+-- district_latest trigger read and cached pages that were mostly JSON. The
+-- payloads move to a side table keyed by the snapshot's (id, year); the
+-- snapshot rows keep only the metrics.
+--
+-- DROP COLUMN only marks the column dropped; the old payloads are removed
+-- from the snapshot partitions as rows are rewritten. Run VACUUM FULL (or
+-- pg_repack) on the partitions afterwards to reclaim the space at once.
+--
+-- Usage:
+--   docker-compose exec -T postgres psql -U mgnrega_user -d mgnrega_db \
+--       -v ON_ERROR_STOP=1 < migrations/005_snapshot_raw_side_table.sql
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS mgnrega_snapshot_raw (
+    snapshot_id INTEGER NOT NULL,
+    snapshot_year INTEGER NOT NULL,
+    raw_json JSONB NOT NULL,
+    PRIMARY KEY (snapshot_id, snapshot_year),
+    FOREIGN KEY (snapshot_id, snapshot_year)
+        REFERENCES mgnrega_snapshots (id, year) ON DELETE CASCADE
+);
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'mgnrega_snapshots' AND column_name = 'raw_json'
+    ) THEN
+        INSERT INTO mgnrega_snapshot_raw (snapshot_id, snapshot_year, raw_json)
+        SELECT id, year, raw_json FROM mgnrega_snapshots
+        WHERE raw_json IS NOT NULL
+        ON CONFLICT (snapshot_id, snapshot_year) DO NOTHING;
+    END IF;
+END;
+$$;
+
+ALTER TABLE mgnrega_snapshots DROP COLUMN IF EXISTS raw_json;
+
+-- Same as before, but keeps the payloads of rows moved out of the default
+-- partition
+CREATE OR REPLACE FUNCTION ensure_snapshot_partition(p_year INTEGER) RETURNS VOID AS $$
+DECLARE
+    partition_name TEXT := format('mgnrega_snapshots_y%s', p_year);
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    
+    CREATE TEMP TABLE IF NOT EXISTS _snapshot_partition_move
+        (LIKE mgnrega_snapshots) ON COMMIT DROP;
+    CREATE TEMP TABLE IF NOT EXISTS _snapshot_raw_partition_move
+        (LIKE mgnrega_snapshot_raw) ON COMMIT DROP;
+    
+    -- Deleting the snapshots cascades to their payloads, so copy those first
+    INSERT INTO _snapshot_raw_partition_move
+    SELECT r.* FROM mgnrega_snapshot_raw r
+    JOIN mgnrega_snapshots_default s ON s.id = r.snapshot_id AND s.year = r.snapshot_year
+    WHERE s.year = p_year;
+    
+    WITH moved AS (
+        DELETE FROM mgnrega_snapshots_default WHERE year = p_year RETURNING *
+    )
+    INSERT INTO _snapshot_partition_move SELECT * FROM moved;
+    
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF mgnrega_snapshots FOR VALUES FROM (%s) TO (%s)',
+        partition_name, p_year, p_year + 1
+    );
+    
+    INSERT INTO mgnrega_snapshots SELECT * FROM _snapshot_partition_move;
+    INSERT INTO mgnrega_snapshot_raw SELECT * FROM _snapshot_raw_partition_move;
+    TRUNCATE _snapshot_partition_move, _snapshot_raw_partition_move;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE mgnrega_snapshot_raw IS 'Original API payload per snapshot, split from the hot snapshot rows';
+COMMENT ON COLUMN mgnrega_snapshot_raw.raw_json IS 'Original API response (or an archive reference) stored as JSONB for audit';
+
+INSERT INTO schema_migrations (version) VALUES (5)
+ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,51 @@
+-- ============================================================================
+-- Migration 006: Precomputed derived metrics
+--
+-- The dashboard recomputed month-over-month changes in Python on every
+-- snapshot cache miss, and year-over-year changes, rolling averages and
+-- per-capita ratios were not available at all. mgnrega_derived_metrics
+-- holds them per district and month; ingestion recomputes the rows of the
+-- districts it wrote in one window-function pass (ingest/derived.py).
+--
+-- The table starts empty and the API falls back to computing changes
+-- itself for months without a row. Fill it once after migrating:
+--
+--   docker-compose exec ingest python worker.py --derive
+--
+-- Usage:
+--   docker-compose exec -T postgres psql -U mgnrega_user -d mgnrega_db \
+--       -v ON_ERROR_STOP=1 < migrations/006_derived_metrics.sql
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS mgnrega_derived_metrics (
+    district_id INTEGER NOT NULL REFERENCES districts(id) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    people_benefited_mom NUMERIC(12, 2),
+    workdays_created_mom NUMERIC(12, 2),
+    wages_paid_mom NUMERIC(12, 2),
+    payments_on_time_percent_mom NUMERIC(12, 2),
+    works_completed_mom NUMERIC(12, 2),
+    people_benefited_yoy NUMERIC(12, 2),
+    workdays_created_yoy NUMERIC(12, 2),
+    wages_paid_yoy NUMERIC(12, 2),
+    payments_on_time_percent_yoy NUMERIC(12, 2),
+    works_completed_yoy NUMERIC(12, 2),
+    people_benefited_avg_3m NUMERIC(15, 2),
+    workdays_created_avg_3m NUMERIC(15, 2),
+    wages_paid_avg_3m NUMERIC(15, 2),
+    wages_per_workday NUMERIC(15, 2),
+    workdays_per_person NUMERIC(15, 2),
+    wages_per_person NUMERIC(15, 2),
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (district_id, year, month)
+);
+
+COMMENT ON TABLE mgnrega_derived_metrics IS 'Per-month changes, rolling averages and ratios recomputed after ingestion';
+
+INSERT INTO schema_migrations (version) VALUES (6)
+ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
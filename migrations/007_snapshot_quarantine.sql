@@ -0,0 +1,43 @@
+-- ============================================================================
+-- Migration 007: Quarantine for implausible snapshots
+--
+-- Ingestion scores every write batch against each district's trailing
+-- history (ingest/anomaly.py). Rows that break the hard rules (negative
+-- counts, zero wages for a month with workdays, ...) or whose robust
+-- z-score is too high are held here with their reasons instead of being
+-- published; the previously published snapshot stays in place. A later
+-- normal fetch of the same month clears the entry, and
+--
+--   docker-compose exec ingest python worker.py UP-LUC 2025 3 --release
+--
+-- publishes it after a manual check.
+--
+-- Usage:
+--   docker-compose exec -T postgres psql -U mgnrega_user -d mgnrega_db \
+--       -v ON_ERROR_STOP=1 < migrations/007_snapshot_quarantine.sql
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS mgnrega_snapshot_quarantine (
+    district_id INTEGER NOT NULL REFERENCES districts(id) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    people_benefited BIGINT,
+    workdays_created BIGINT,
+    wages_paid NUMERIC(18, 2),
+    payments_on_time_percent NUMERIC(15, 2),
+    works_completed BIGINT,
+    raw_json JSONB,
+    content_hash TEXT,
+    reasons JSONB NOT NULL,
+    quarantined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (district_id, year, month)
+);
+
+COMMENT ON TABLE mgnrega_snapshot_quarantine IS 'Fetched snapshots held back by anomaly detection, with the reasons';
+
+INSERT INTO schema_migrations (version) VALUES (7)
+ON CONFLICT (version) DO NOTHING;
+
+COMMIT;